@@ -4,6 +4,7 @@ Tracks user progress and awards badges for milestones
 """
 
 from database import db
+from user_context import UserContext
 import discord
 from datetime import datetime
 
@@ -221,19 +222,20 @@ class AchievementManager:
     def __init__(self):
         self.db = db
     
-    def check_and_award_achievements(self, user_id: int, achievement_type: str = None):
+    def check_and_award_achievements(self, user_id: int, achievement_type: str = None, ctx: UserContext = None):
         """Check if user has earned any new achievements"""
         awarded_achievements = []
+        ctx = ctx or UserContext(user_id)
         
         # Get user stats
-        user_stats = self.db.get_user_stats(user_id)
+        user_stats = ctx.stats
         if not user_stats:
             return awarded_achievements
         
         username, xp, level, current_course, current_module, current_lesson = user_stats
         
         # Get user's existing achievements
-        existing_achievements = [ach[0] for ach in self.db.get_user_achievements(user_id)]
+        existing_achievements = ctx.achievement_names
         
         # Check each achievement
         for achievement_id, achievement in ACHIEVEMENTS.items():
@@ -253,37 +255,32 @@ class AchievementManager:
             
             # Check lesson completion count
             elif achievement["type"] == "lesson_completion":
-                completed_lessons = self._count_completed_lessons(user_id)
-                if completed_lessons >= achievement["requirement"]:
+                if ctx.completed_lessons >= achievement["requirement"]:
                     earned = True
             
             # Check course completion
             elif achievement["type"] == "course_completion":
-                if self._is_course_completed(user_id, achievement["requirement"]):
+                if self._is_course_completed(user_id, achievement["requirement"], ctx):
                     earned = True
             
             # Check perfect quiz scores
             elif achievement["type"] == "perfect_quiz":
-                perfect_quizzes = self._count_perfect_quizzes(user_id)
-                if perfect_quizzes >= achievement["requirement"]:
+                if ctx.perfect_quizzes >= achievement["requirement"]:
                     earned = True
             
             # Check CTF solves
             elif achievement["type"] == "ctf_solve":
-                ctf_solves = self._count_ctf_solves(user_id)
-                if ctf_solves >= achievement["requirement"]:
+                if ctx.ctf_solves >= achievement["requirement"]:
                     earned = True
             
             # Check multimedia interactions
             elif achievement["type"] == "multimedia_interaction":
-                multimedia_interactions = self._count_multimedia_interactions(user_id)
-                if multimedia_interactions >= achievement["requirement"]:
+                if self._count_multimedia_interactions(user_id, ctx) >= achievement["requirement"]:
                     earned = True
             
             # Check phishing quiz performance
             elif achievement["type"] == "phishing_quiz":
-                phishing_correct = self._count_phishing_quiz_correct(user_id)
-                if phishing_correct >= achievement["requirement"]:
+                if self._count_phishing_quiz_correct(user_id, ctx) >= achievement["requirement"]:
                     earned = True
             
             # Award achievement if earned
@@ -294,149 +291,51 @@ class AchievementManager:
                     self.db.add_xp_no_achievements(user_id, achievement["xp_bonus"])
                     awarded_achievements.append(achievement)
         
+        if awarded_achievements:
+            ctx.invalidate()
+        
         return awarded_achievements
     
-    def _count_completed_lessons(self, user_id: int) -> int:
+    def _count_completed_lessons(self, user_id: int, ctx: UserContext = None) -> int:
         """Count total completed lessons for user"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) FROM course_progress 
-                WHERE user_id = ? AND completed = TRUE
-            """, (user_id,))
-            result = cursor.fetchone()
-            return result[0] if result else 0
-        except Exception as e:
-            print(f"Error counting completed lessons: {e}")
-            return 0
-        finally:
-            conn.close()
+        return (ctx or UserContext(user_id)).completed_lessons
     
-    def _is_course_completed(self, user_id: int, course_id: int) -> bool:
+    def _is_course_completed(self, user_id: int, course_id: int, ctx: UserContext = None) -> bool:
         """Check if user has completed all lessons in a course"""
-        from courses import get_course
+        from courses import count_course_lessons
         
-        course = get_course(course_id)
-        if not course:
+        total_lessons = count_course_lessons(course_id)
+        if not total_lessons:
             return False
         
-        # Count total lessons in course
-        total_lessons = 0
-        for module in course["modules"].values():
-            total_lessons += len(module["lessons"])
-        
-        # Count completed lessons in course
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) FROM course_progress 
-                WHERE user_id = ? AND course_id = ? AND completed = TRUE
-            """, (user_id, course_id))
-            result = cursor.fetchone()
-            completed_lessons = result[0] if result else 0
-            
-            return completed_lessons >= total_lessons
-        except Exception as e:
-            print(f"Error checking course completion: {e}")
-            return False
-        finally:
-            conn.close()
+        return (ctx or UserContext(user_id)).completed_in_course(course_id) >= total_lessons
     
-    def _count_perfect_quizzes(self, user_id: int) -> int:
+    def _count_perfect_quizzes(self, user_id: int, ctx: UserContext = None) -> int:
         """Count quizzes where user scored 100%"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) FROM quiz_attempts 
-                WHERE user_id = ? AND score = total_questions
-            """, (user_id,))
-            result = cursor.fetchone()
-            return result[0] if result else 0
-        except Exception as e:
-            print(f"Error counting perfect quizzes: {e}")
-            return 0
-        finally:
-            conn.close()
+        return (ctx or UserContext(user_id)).perfect_quizzes
     
-    def _count_ctf_solves(self, user_id: int) -> int:
+    def _count_ctf_solves(self, user_id: int, ctx: UserContext = None) -> int:
         """Count CTF challenges solved by user"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                SELECT COUNT(DISTINCT challenge_id) FROM ctf_submissions 
-                WHERE user_id = ? AND is_correct = 1
-            """, (user_id,))
-            result = cursor.fetchone()
-            return result[0] if result else 0
-        except Exception as e:
-            print(f"Error counting CTF solves: {e}")
-            return 0
-        finally:
-            conn.close()
+        return (ctx or UserContext(user_id)).ctf_solves
     
-    def _count_multimedia_interactions(self, user_id: int) -> int:
+    def _count_multimedia_interactions(self, user_id: int, ctx: UserContext = None) -> int:
         """Count multimedia interactions by user"""
-        # For now, we'll track this through a separate table or estimate based on activity
         # This is a placeholder - in a real implementation, you'd track multimedia interactions
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Estimate based on lesson completions and quiz attempts
-            cursor.execute("""
-                SELECT COUNT(*) FROM course_progress 
-                WHERE user_id = ? AND completed = TRUE
-            """, (user_id,))
-            lessons = cursor.fetchone()[0] if cursor.fetchone() else 0
-            
-            cursor.execute("""
-                SELECT COUNT(*) FROM quiz_attempts 
-                WHERE user_id = ?
-            """, (user_id,))
-            quizzes = cursor.fetchone()[0] if cursor.fetchone() else 0
-            
-            # Estimate multimedia interactions as lessons + quizzes (rough approximation)
-            return lessons + quizzes
-        except Exception as e:
-            print(f"Error counting multimedia interactions: {e}")
-            return 0
-        finally:
-            conn.close()
+        # Estimate multimedia interactions as lessons + quizzes (rough approximation)
+        ctx = ctx or UserContext(user_id)
+        return ctx.completed_lessons + ctx.quiz_attempts
     
-    def _count_phishing_quiz_correct(self, user_id: int) -> int:
+    def _count_phishing_quiz_correct(self, user_id: int, ctx: UserContext = None) -> int:
         """Count correct phishing quiz answers"""
         # This would be tracked in a separate phishing_quiz_attempts table
-        # For now, we'll use a placeholder implementation
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Placeholder: estimate based on quiz performance
-            cursor.execute("""
-                SELECT COUNT(*) FROM quiz_attempts 
-                WHERE user_id = ? AND score = total_questions
-            """, (user_id,))
-            result = cursor.fetchone()
-            # Estimate phishing quiz performance as a portion of perfect quiz scores
-            return (result[0] * 2) if result else 0  # Rough estimate
-        except Exception as e:
-            print(f"Error counting phishing quiz correct: {e}")
-            return 0
-        finally:
-            conn.close()
+        # Placeholder: estimate phishing quiz performance as a portion of perfect quiz scores
+        return (ctx or UserContext(user_id)).perfect_quizzes * 2
     
-    def get_user_achievement_summary(self, user_id: int) -> dict:
+    def get_user_achievement_summary(self, user_id: int, ctx: UserContext = None) -> dict:
         """Get comprehensive achievement summary for user"""
-        achievements = self.db.get_user_achievements(user_id)
-        user_stats = self.db.get_user_stats(user_id)
+        ctx = ctx or UserContext(user_id)
+        achievements = ctx.achievements
+        user_stats = ctx.stats
         
         if not user_stats:
             return {"error": "User not found"}
@@ -462,17 +361,13 @@ class AchievementManager:
                 "date": date_awarded
             })
         
-        # Calculate progress stats
-        completed_lessons = self._count_completed_lessons(user_id)
-        perfect_quizzes = self._count_perfect_quizzes(user_id)
-        
         return {
             "username": username,
             "xp": xp,
             "level": level,
             "total_achievements": len(achievements),
-            "completed_lessons": completed_lessons,
-            "perfect_quizzes": perfect_quizzes,
+            "completed_lessons": ctx.completed_lessons,
+            "perfect_quizzes": ctx.perfect_quizzes,
             "achievements_by_category": categorized
         }
     
@@ -501,9 +396,9 @@ class AchievementManager:
         
         return embed
     
-    def create_achievements_list_embed(self, user_id: int) -> discord.Embed:
+    def create_achievements_list_embed(self, user_id: int, ctx: UserContext = None) -> discord.Embed:
         """Create embed showing all user achievements"""
-        summary = self.get_user_achievement_summary(user_id)
+        summary = self.get_user_achievement_summary(user_id, ctx)
         
         if "error" in summary:
             embed = discord.Embed(
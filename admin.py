@@ -5,12 +5,20 @@ Provides administrative functionality for managing courses, users, and bot setti
 
 import discord
 from discord.ext import commands
-from discord.ui import Modal, TextInput, View, Button
+from discord.ui import Modal, TextInput, Button
 from discord import app_commands
+import asyncio
+import io
 import json
 from database import db
+from cache import response_cache
 from achievements import achievement_manager
-from courses import COURSES
+from courses import COURSES, get_lesson, get_module
+from prerequisites import unlock_tracker
+from review import review_scheduler
+from ratings import rating_engine
+from item_analysis import MIN_ANSWERS, item_report_cache, render_item_report
+from timer_wheel import WheelView, timer_wheel
 
 # Admin user IDs - replace with actual admin Discord IDs
 ADMIN_IDS = [
@@ -50,20 +58,254 @@ class AddCourseModal(Modal):
         self.add_item(self.course_level)
     
     async def on_submit(self, interaction: discord.Interaction):
-        # This would typically save to a database or file
-        # For now, we'll just show a confirmation
+        title = self.course_title.value.strip()
+        level = self.course_level.value.strip()
+        if not title or not level:
+            await interaction.response.send_message("❌ The course needs a title and a level.", ephemeral=True)
+            return
+        
+        # Authored ids continue after the highest course file id
+        course_id = await asyncio.to_thread(
+            db.create_authored_course, title, self.course_description.value.strip(), level, max(COURSES, default=0) + 1
+        )
+        if course_id is None:
+            await interaction.response.send_message("❌ Could not save the course. Check the logs.", ephemeral=True)
+            return
+        
         embed = discord.Embed(
-            title="✅ Course Added Successfully",
-            description=f"**{self.course_title.value}** has been added to the course catalog.",
+            title="✅ Course Created",
+            description=f"**{title}** was saved as course **{course_id}**.",
             color=0x00FF00
         )
         
         embed.add_field(name="Description", value=self.course_description.value, inline=False)
-        embed.add_field(name="Level", value=self.course_level.value, inline=True)
+        embed.add_field(name="Level", value=level, inline=True)
+        embed.add_field(
+            name="Next Step",
+            value=f"Add its first lesson with `/admin_add_lesson {course_id} 1 1`; "
+                  f"the course joins the catalog once it has a lesson.",
+            inline=False
+        )
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class AdminView(View):
+def authoring_result_embed(course_id: int, saved: str, published: bool) -> discord.Embed:
+    """Confirm an authoring change and say whether learners already see it"""
+    if published:
+        return discord.Embed(
+            title=f"✅ {saved} Saved",
+            description=f"Course {course_id} is live at content version {COURSES.version(course_id)}.",
+            color=0x00FF00
+        )
+    
+    error = COURSES.authoring_errors.get(course_id)
+    return discord.Embed(
+        title=f"⚠️ {saved} Saved, Not Live",
+        description=f"Course {course_id} keeps serving its previous content:\n{error}" if error
+                    else f"Course {course_id} appears once it has at least one lesson.",
+        color=0xFF8000
+    )
+
+class AddLessonModal(Modal):
+    def __init__(self, course_id: int, module_id: int, lesson_id: int):
+        super().__init__(title=f"Lesson {course_id}.{module_id}.{lesson_id}")
+        self.course_id = course_id
+        self.module_id = module_id
+        self.lesson_id = lesson_id
+        
+        # Pre-fill when editing existing content
+        module = get_module(course_id, module_id)
+        lesson = get_lesson(course_id, module_id, lesson_id)
+        
+        self.module_title = TextInput(
+            label="Module Title",
+            placeholder="Required for a new module",
+            default=module["title"] if module else None,
+            required=module is None,
+            max_length=100
+        )
+        
+        self.lesson_title = TextInput(
+            label="Lesson Title",
+            default=lesson["title"] if lesson else None,
+            max_length=100
+        )
+        
+        self.lesson_content = TextInput(
+            label="Lesson Content (markdown)",
+            style=discord.TextStyle.paragraph,
+            default=lesson["content"] if lesson and len(lesson["content"]) <= 4000 else None,
+            max_length=4000
+        )
+        
+        self.xp_reward = TextInput(
+            label="XP Reward",
+            default=str(lesson["xp_reward"]) if lesson else "100",
+            max_length=5
+        )
+        
+        self.add_item(self.module_title)
+        self.add_item(self.lesson_title)
+        self.add_item(self.lesson_content)
+        self.add_item(self.xp_reward)
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            xp_reward = int(self.xp_reward.value)
+            if xp_reward < 0:
+                raise ValueError
+        except ValueError:
+            await interaction.response.send_message("❌ XP reward must be a whole number of 0 or more.", ephemeral=True)
+            return
+        
+        saved = await asyncio.to_thread(
+            db.save_authored_lesson, self.course_id, self.module_id, self.lesson_id,
+            self.lesson_title.value.strip(), self.lesson_content.value, xp_reward,
+            self.module_title.value.strip() or None
+        )
+        if not saved:
+            await interaction.response.send_message("❌ Could not save the lesson. Check the logs.", ephemeral=True)
+            return
+        
+        published = await asyncio.to_thread(COURSES.reload_course, self.course_id)
+        await interaction.response.send_message(
+            embed=authoring_result_embed(self.course_id, "Lesson", published), ephemeral=True
+        )
+
+class AddQuizModal(Modal):
+    def __init__(self, course_id: int, module_id: int, lesson_id: int):
+        super().__init__(title=f"Quiz for Lesson {course_id}.{module_id}.{lesson_id}")
+        self.course_id = course_id
+        self.module_id = module_id
+        self.lesson_id = lesson_id
+        
+        quiz = get_lesson(course_id, module_id, lesson_id).get("quiz")
+        
+        self.question = TextInput(
+            label="Question",
+            style=discord.TextStyle.paragraph,
+            default=quiz["question"] if quiz else None,
+            max_length=500
+        )
+        
+        self.options = TextInput(
+            label="Options (one per line, 2-4)",
+            style=discord.TextStyle.paragraph,
+            default="\n".join(quiz["options"]) if quiz else None,
+            max_length=1000
+        )
+        
+        self.correct = TextInput(
+            label="Correct Option Number",
+            placeholder="1 for the first option",
+            default=str(quiz["correct"] + 1) if quiz else None,
+            max_length=1
+        )
+        
+        self.explanation = TextInput(
+            label="Explanation",
+            style=discord.TextStyle.paragraph,
+            default=quiz["explanation"] if quiz else None,
+            required=False,
+            max_length=1000
+        )
+        
+        self.add_item(self.question)
+        self.add_item(self.options)
+        self.add_item(self.correct)
+        self.add_item(self.explanation)
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        options = [line.strip() for line in self.options.value.splitlines() if line.strip()]
+        if not 2 <= len(options) <= 4:
+            await interaction.response.send_message("❌ A quiz needs between 2 and 4 options.", ephemeral=True)
+            return
+        if not self.correct.value.isdigit() or not 1 <= int(self.correct.value) <= len(options):
+            await interaction.response.send_message(
+                f"❌ The correct option must be a number from 1 to {len(options)}.", ephemeral=True
+            )
+            return
+        
+        saved = await asyncio.to_thread(
+            db.save_authored_quiz, self.course_id, self.module_id, self.lesson_id,
+            self.question.value.strip(), options, int(self.correct.value) - 1, self.explanation.value.strip()
+        )
+        if not saved:
+            await interaction.response.send_message("❌ Could not save the quiz. Check the logs.", ephemeral=True)
+            return
+        
+        published = await asyncio.to_thread(COURSES.reload_course, self.course_id)
+        await interaction.response.send_message(
+            embed=authoring_result_embed(self.course_id, "Quiz", published), ephemeral=True
+        )
+
+def render_bot_stats() -> dict:
+    """Query overall statistics and render them as an embed dict"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Total users
+        cursor.execute("SELECT COUNT(*) FROM users")
+        total_users = cursor.fetchone()[0]
+        
+        # Active users (users with XP > 0)
+        cursor.execute("SELECT COUNT(*) FROM users WHERE xp > 0")
+        active_users = cursor.fetchone()[0]
+        
+        # Total XP awarded
+        cursor.execute("SELECT SUM(xp) FROM users")
+        total_xp = cursor.fetchone()[0] or 0
+        
+        # Total lessons completed
+        cursor.execute("SELECT COUNT(*) FROM lesson_completion_times")
+        total_lessons = cursor.fetchone()[0]
+        
+        # Total quiz attempts
+        cursor.execute("SELECT COUNT(*) FROM quiz_attempts")
+        total_quizzes = cursor.fetchone()[0]
+        
+        # Top users
+        cursor.execute("SELECT username, xp, level FROM users ORDER BY xp DESC LIMIT 5")
+        top_users = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    embed = discord.Embed(
+        title="📊 Bot Statistics",
+        color=0x0099FF
+    )
+    
+    embed.add_field(
+        name="👥 Users",
+        value=f"• **Total:** {total_users}\n• **Active:** {active_users}",
+        inline=True
+    )
+    
+    embed.add_field(
+        name="📚 Learning Activity",
+        value=f"• **Lessons Completed:** {total_lessons}\n• **Quiz Attempts:** {total_quizzes}",
+        inline=True
+    )
+    
+    embed.add_field(
+        name="⭐ XP System",
+        value=f"• **Total XP Awarded:** {total_xp:,}",
+        inline=True
+    )
+    
+    if top_users:
+        top_users_text = "\n".join([f"{i+1}. {username} - {xp:,} XP (Level {level})" 
+                                  for i, (username, xp, level) in enumerate(top_users)])
+        embed.add_field(
+            name="🏆 Top Learners",
+            value=top_users_text,
+            inline=False
+        )
+    
+    return embed.to_dict()
+
+class AdminView(WheelView):
     def __init__(self):
         super().__init__(timeout=300)
     
@@ -73,73 +315,12 @@ class AdminView(View):
             await interaction.response.send_message("❌ Admin access required.", ephemeral=True)
             return
         
-        # Get overall statistics
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            # Total users
-            cursor.execute("SELECT COUNT(*) FROM users")
-            total_users = cursor.fetchone()[0]
-            
-            # Active users (users with XP > 0)
-            cursor.execute("SELECT COUNT(*) FROM users WHERE xp > 0")
-            active_users = cursor.fetchone()[0]
-            
-            # Total XP awarded
-            cursor.execute("SELECT SUM(xp) FROM users")
-            total_xp = cursor.fetchone()[0] or 0
-            
-            # Total lessons completed
-            cursor.execute("SELECT COUNT(*) FROM course_progress WHERE completed = TRUE")
-            total_lessons = cursor.fetchone()[0]
-            
-            # Total quiz attempts
-            cursor.execute("SELECT COUNT(*) FROM quiz_attempts")
-            total_quizzes = cursor.fetchone()[0]
-            
-            # Top users
-            cursor.execute("SELECT username, xp, level FROM users ORDER BY xp DESC LIMIT 5")
-            top_users = cursor.fetchall()
-            
-            embed = discord.Embed(
-                title="📊 Bot Statistics",
-                color=0x0099FF
-            )
-            
-            embed.add_field(
-                name="👥 Users",
-                value=f"• **Total:** {total_users}\n• **Active:** {active_users}",
-                inline=True
-            )
-            
-            embed.add_field(
-                name="📚 Learning Activity",
-                value=f"• **Lessons Completed:** {total_lessons}\n• **Quiz Attempts:** {total_quizzes}",
-                inline=True
-            )
-            
-            embed.add_field(
-                name="⭐ XP System",
-                value=f"• **Total XP Awarded:** {total_xp:,}",
-                inline=True
-            )
-            
-            if top_users:
-                top_users_text = "\n".join([f"{i+1}. {username} - {xp:,} XP (Level {level})" 
-                                          for i, (username, xp, level) in enumerate(top_users)])
-                embed.add_field(
-                    name="🏆 Top Learners",
-                    value=top_users_text,
-                    inline=False
-                )
-            
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            
+            # Admins opening the panel together share one set of queries
+            payload = await response_cache.get("admin_stats", render_bot_stats)
+            await interaction.response.send_message(embed=discord.Embed.from_dict(payload), ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(f"❌ Error retrieving stats: {e}", ephemeral=True)
-        finally:
-            conn.close()
     
     @discord.ui.button(label="🎓 Add Course", style=discord.ButtonStyle.success)
     async def add_course(self, interaction: discord.Interaction, button: Button):
@@ -204,14 +385,14 @@ class AdminCommands(commands.Cog):
             return
         
         # Add user to database if not exists
-        self.db.add_user(user.id, user.display_name)
+        await self.db.run(self.db.add_user, user.id, user.display_name)
         
         # Award achievement
-        success = self.db.add_achievement(user.id, achievement_name, "special")
+        success = await self.db.run(self.db.add_achievement, user.id, achievement_name, "special")
         
         if success:
             # Award bonus XP
-            self.db.add_xp(user.id, 300)
+            await self.db.run(self.db.add_xp, user.id, 300)
             
             embed = discord.Embed(
                 title="🏆 Achievement Awarded!",
@@ -251,10 +432,10 @@ class AdminCommands(commands.Cog):
             return
         
         # Add user to database if not exists
-        self.db.add_user(user.id, user.display_name)
+        await self.db.run(self.db.add_user, user.id, user.display_name)
         
         # Award XP
-        new_xp = self.db.add_xp(user.id, amount)
+        new_xp = await self.db.run(self.db.add_xp, user.id, amount)
         
         embed = discord.Embed(
             title="⭐ XP Awarded!",
@@ -267,7 +448,7 @@ class AdminCommands(commands.Cog):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         
         # Check for new achievements
-        new_achievements = achievement_manager.check_and_award_achievements(user.id)
+        new_achievements = await asyncio.to_thread(achievement_manager.check_and_award_achievements, user.id)
         if new_achievements:
             achievement_text = "\n".join([f"🏆 {ach['name']}" for ach in new_achievements])
             follow_up = discord.Embed(
@@ -292,7 +473,7 @@ class AdminCommands(commands.Cog):
         )
         
         # Add confirmation buttons
-        view = View(timeout=30)
+        view = WheelView(timeout=30)
         
         async def confirm_reset(button_interaction):
             if button_interaction.user.id != interaction.user.id:
@@ -306,9 +487,20 @@ class AdminCommands(commands.Cog):
                 # Reset user data
                 cursor.execute("UPDATE users SET xp = 0, level = 1, current_course = 1, current_module = 1, current_lesson = 1 WHERE user_id = ?", (user.id,))
                 cursor.execute("DELETE FROM achievements WHERE user_id = ?", (user.id,))
-                cursor.execute("DELETE FROM course_progress WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM lesson_completion_bits WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM lesson_completion_times WHERE user_id = ?", (user.id,))
                 cursor.execute("DELETE FROM quiz_attempts WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM quiz_seen WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM review_cards WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM review_reminders WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM user_ratings WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM quiz_answers WHERE user_id = ?", (user.id,))
+                cursor.execute("DELETE FROM tournament_results WHERE user_id = ?", (user.id,))
                 conn.commit()
+                self.db.invalidate_user(user.id)
+                unlock_tracker.invalidate(user.id)
+                review_scheduler.invalidate(user.id)
+                rating_engine.forget_user(user.id)
                 
                 reset_embed = discord.Embed(
                     title="✅ User Reset Complete",
@@ -369,7 +561,11 @@ class AdminCommands(commands.Cog):
             cursor.execute("SELECT * FROM achievements")
             achievements = cursor.fetchall()
             
-            cursor.execute("SELECT * FROM course_progress")
+            # Completions as readable rows rather than the packed bitsets
+            cursor.execute("""
+                SELECT t.user_id, s.course_id, s.module_id, s.lesson_id, t.completed_at
+                FROM lesson_completion_times t JOIN lesson_slots s USING (slot)
+            """)
             progress = cursor.fetchall()
             
             cursor.execute("SELECT * FROM quiz_attempts")
@@ -409,6 +605,168 @@ class AdminCommands(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
         finally:
             conn.close()
+    
+    @app_commands.command(name="admin_reload_courses", description="Reload edited course files without restarting")
+    async def reload_courses(self, interaction: discord.Interaction):
+        """Reload edited course files without restarting"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message("❌ Admin access required.", ephemeral=True)
+            return
+        
+        changed = await asyncio.to_thread(COURSES.reload_changed)
+        
+        embed = discord.Embed(
+            title="🔄 Course Content Reloaded",
+            color=0x00FF00
+        )
+        if changed:
+            embed.description = "\n".join(
+                f"• Course {course_id} → version {COURSES.version(course_id)}" if course_id in COURSES
+                else f"• Course {course_id} removed"
+                for course_id in changed
+            )
+        else:
+            embed.description = "No course files changed."
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="admin_add_lesson", description="Write or edit a lesson; it goes live immediately")
+    async def add_lesson(self, interaction: discord.Interaction, course_id: int, module_id: int, lesson_id: int):
+        """Write or edit a lesson; it goes live immediately"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message("❌ Admin access required.", ephemeral=True)
+            return
+        
+        if min(course_id, module_id, lesson_id) < 1:
+            await interaction.response.send_message("❌ Ids start at 1.", ephemeral=True)
+            return
+        
+        if course_id not in COURSES and not await self.db.run(self.db.is_authored_course, course_id):
+            await interaction.response.send_message(
+                f"❌ Course {course_id} doesn't exist. Create it from the `/admin` panel first.", ephemeral=True
+            )
+            return
+        
+        await interaction.response.send_modal(AddLessonModal(course_id, module_id, lesson_id))
+    
+    @app_commands.command(name="admin_add_quiz", description="Write or replace the quiz of a lesson")
+    async def add_quiz(self, interaction: discord.Interaction, course_id: int, module_id: int, lesson_id: int):
+        """Write or replace the quiz of a lesson"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message("❌ Admin access required.", ephemeral=True)
+            return
+        
+        if not get_lesson(course_id, module_id, lesson_id):
+            await interaction.response.send_message(
+                f"❌ Lesson {course_id}.{module_id}.{lesson_id} doesn't exist. Add it with `/admin_add_lesson` first.",
+                ephemeral=True
+            )
+            return
+        
+        await interaction.response.send_modal(AddQuizModal(course_id, module_id, lesson_id))
+    
+    @app_commands.command(name="admin_item_analysis", description="Find quiz questions that are too easy, too hard or misleading")
+    async def item_analysis(self, interaction: discord.Interaction, min_answers: int = MIN_ANSWERS):
+        """Find quiz questions that are too easy, too hard or misleading"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message("❌ Admin access required.", ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        min_answers = max(1, min_answers)
+        # Include answers still waiting for the periodic rating flush
+        await asyncio.to_thread(rating_engine.flush)
+        report = await item_report_cache.get(("items", min_answers), render_item_report, min_answers)
+        await interaction.followup.send(
+            embed=discord.Embed.from_dict(report["embed"]),
+            file=discord.File(io.BytesIO(report["csv"].encode()), filename="item_analysis.csv"),
+            ephemeral=True
+        )
+    
+    @app_commands.command(name="admin_dbstats", description="Show database query timings and retry counters")
+    async def db_stats(self, interaction: discord.Interaction):
+        """Show database query timings and retry counters"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message("❌ Admin access required.", ephemeral=True)
+            return
+        
+        tracer = self.db.tracer
+        operation_stats = self.db.get_operation_stats()
+        
+        embed = discord.Embed(
+            title="🗄️ Database Statistics",
+            color=0x0099FF
+        )
+        
+        if tracer is None:
+            embed.description = "Query tracing is disabled (`DB_QUERY_TRACING=0`)."
+        else:
+            statements = tracer.snapshot()
+            embed.description = f"Since {tracer.started_at:%Y-%m-%d %H:%M} • slow threshold {tracer.slow_threshold_ms:g}ms"
+            
+            top_text = ""
+            for entry in statements[:5]:
+                caller = next(iter(entry["callers"]), "unknown")
+                top_text += (f"`{entry['sql'][:70]}`\n"
+                             f"{entry['count']}× • avg {entry['avg_ms']:.1f}ms • p95 ≤{entry['p95_ms']:g}ms • "
+                             f"max {entry['max_ms']:.1f}ms • {caller}\n")
+            embed.add_field(
+                name="⏱️ Top Statements (total time)",
+                value=top_text[:1024] or "No statements recorded yet.",
+                inline=False
+            )
+            
+            slow = [entry for entry in statements if entry["slow_count"]]
+            if slow:
+                embed.add_field(
+                    name="🐢 Slow Statements",
+                    value="\n".join(f"{entry['slow_count']}× `{entry['sql'][:80]}`" for entry in slow[:5])[:1024],
+                    inline=False
+                )
+        
+        retries = sum(stats.get("retries", 0) for stats in operation_stats.values())
+        failures = sum(stats.get("failures", 0) for stats in operation_stats.values())
+        worst = sorted(operation_stats.items(), key=lambda item: (item[1].get("failures", 0), item[1].get("retries", 0)), reverse=True)
+        worst_text = "\n".join(f"• `{name}`: {stats.get('retries', 0)} retries, {stats.get('failures', 0)} failures"
+                               for name, stats in worst[:5] if stats.get("retries") or stats.get("failures"))
+        embed.add_field(
+            name="🔁 Retries & Failures",
+            value=f"**{retries}** retries • **{failures}** failures\n{worst_text}"[:1024],
+            inline=False
+        )
+        
+        cache_stats = self.db.profile_cache.stats()
+        embed.add_field(
+            name="💾 Profile Cache",
+            value=(f"{cache_stats['size']}/{cache_stats['maxsize']} entries • hit rate {cache_stats['hit_rate']:.0%}\n"
+                   f"{cache_stats['hits']} hits • {cache_stats['misses']} misses • "
+                   f"{cache_stats['evictions']} evictions • {cache_stats['expirations']} expired"),
+            inline=False
+        )
+        
+        response_stats = response_cache.stats()
+        embed.add_field(
+            name="⚡ Response Cache",
+            value=(f"{response_stats['hits']} hits • {response_stats['executions']} renders • "
+                   f"{response_stats['shared']} coalesced"),
+            inline=False
+        )
+        
+        timer_stats = timer_wheel.stats()
+        embed.add_field(
+            name="⏲️ Timers",
+            value=(f"{timer_stats['live']} live • {timer_stats['fired']} fired • "
+                   f"{timer_stats['cancelled']} cancelled • {timer_stats['errors']} errors"),
+            inline=False
+        )
+        
+        if tracer is None:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        tracer.dump("dbstats.json", extra={"operations": operation_stats, "profile_cache": cache_stats,
+                                           "response_cache": response_stats, "timers": timer_stats})
+        await interaction.response.send_message(embed=embed, file=discord.File("dbstats.json"), ephemeral=True)
 
 def setup(bot):
     """Setup function for the cog"""
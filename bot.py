@@ -4,12 +4,14 @@ Interactive, gamified cybersecurity education platform
 """
 
 import discord
+from discord import app_commands
 from discord.ext import commands
-from discord.ui import Button, View
+from discord.ui import Button, DynamicItem, Select, View
 import os
 import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -24,12 +26,25 @@ logger = logging.getLogger("cyberbot")
 
 # Import our custom modules
 from database import db
-from courses import get_course, get_lesson, get_next_lesson, get_course_list, get_module
+from cache import response_cache
+from courses import (COURSES, get_course, get_lesson, get_next_lesson, get_course_list, get_module,
+                     get_curriculum_index, get_completion_masks)
+from lesson_render import get_lesson_embed, get_rendered_lesson
+from catalog import get_catalog
+from pagination import PagerView
+from timer_wheel import WheelView, timer_wheel
+from persistent import PERSISTENT_ITEMS, BrowseCoursesButton, OpenLessonButton, OwnedItem, persistent
+from search import build_search_index, search_content
+from prerequisites import challenge_node, get_prerequisite_graph, unlock_tracker
 from achievements import achievement_manager
+from user_context import UserContext
 from quiz import quiz_manager
+from review import review_message, review_scheduler
+from tournament import DEFAULT_QUESTIONS, DEFAULT_SECONDS, tournament_manager
+from ratings import rating_engine
 from admin import AdminCommands
 from ctf import ctf_manager, CTFChallengeView
-from multimedia import multimedia_manager
+from multimedia import CONTENT_TYPES, multimedia_manager, initialize_sample_content
 from training_session import training_session_manager, StopResumeView
 
 # Bot configuration from environment variables
@@ -41,43 +56,84 @@ intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents)
 
-class CourseSelectionView(View):
-    def __init__(self, user_id: int):
-        super().__init__(timeout=300)
-        self.user_id = user_id
+class CourseSelectionView(PagerView):
+    """Paged course catalog with a level filter and a course picker for the current page"""
+    
+    def __init__(self, user_id: int, level: str = None):
+        self.catalog = get_catalog(level)
+        super().__init__(user_id, self.catalog.page_count)
+        
+        self.level_select = Select(placeholder="🎚️ Filter by level", row=0)
+        self.level_select.callback = self.filter_level
+        self.add_item(self.level_select)
         
-        # Add course selection buttons
-        courses = get_course_list()
-        for course in courses[:5]:  # Limit to 5 courses to avoid button limit
-            # Only append "..." if title is longer than 20 characters
-            title = course['title']
-            label = f"{title[:20]}..." if len(title) > 20 else title
-            button = Button(
-                label=label,
-                style=discord.ButtonStyle.primary,
-                custom_id=f"course_{course['id']}"
+        self.course_select = Select(placeholder="📚 Choose a course", row=2)
+        self.course_select.callback = self.select_course
+        self.add_item(self.course_select)
+        self._sync_selects()
+    
+    def _sync_selects(self):
+        """Point both menus at the current filter and page"""
+        catalog = self.catalog
+        self.level_select.options = [
+            discord.SelectOption(label=f"All levels ({sum(catalog.level_counts.values())})", value="*",
+                                 default=catalog.level is None)
+        ] + [
+            discord.SelectOption(label=f"{level} ({catalog.level_counts[level]})", value=level,
+                                 default=catalog.level == level)
+            for level in catalog.levels[:24]
+        ]
+        
+        courses = catalog.pages[catalog.clamp(self.page)]
+        self.course_select.options = [
+            discord.SelectOption(
+                label=course['title'][:100],
+                value=str(course['id']),
+                description=f"Course {course['id']} • {course['level']}"[:100]
             )
-            button.callback = self.select_course
-            self.add_item(button)
+            for course in courses
+        ] or [discord.SelectOption(label="No courses available", value="0")]
+        self.course_select.disabled = not courses
+    
+    def render_page(self, page: int) -> discord.Embed:
+        self._sync_selects()
+        return self.catalog.page_embed(page)
+    
+    async def _reject(self, interaction: discord.Interaction) -> bool:
+        """Tell other users this selection isn't theirs; returns True if rejected"""
+        if interaction.user.id == self.user_id:
+            return False
+        try:
+            await interaction.response.send_message(
+                "❌ This isn't your course selection! Use `/start` to begin your own journey.",
+                ephemeral=True
+            )
+        except discord.errors.NotFound:
+            # Interaction expired, ignore
+            pass
+        return True
+    
+    async def filter_level(self, interaction: discord.Interaction):
+        if await self._reject(interaction):
+            return
+        
+        value = self.level_select.values[0]
+        self.catalog = get_catalog(None if value == "*" else value)
+        self.set_page_count(self.catalog.page_count)
+        await interaction.response.edit_message(embed=self.render_page(0), view=self)
     
     async def select_course(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            try:
-                await interaction.response.send_message(
-                    "❌ This isn't your course selection! Use `/start` to begin your own journey.",
-                    ephemeral=True
-                )
-            except discord.errors.NotFound:
-                # Interaction expired, ignore
-                pass
+        if await self._reject(interaction):
             return
         
-        # Extract course ID from custom_id
-        course_id = int(interaction.data['custom_id'].split('_')[1])
+        course_id = int(self.course_select.values[0])
         course = get_course(course_id)
+        if not course:
+            await interaction.response.send_message("❌ That course is no longer available.", ephemeral=True)
+            return
         
         # Update user's progress to start this course
-        db.update_user_progress(self.user_id, course_id, 1, 1)
+        await db.run(db.update_user_progress, self.user_id, course_id, 1, 1)
         
         try:
             await interaction.response.send_message(
@@ -94,18 +150,57 @@ class CourseSelectionView(View):
             if channel:
                 await show_lesson(channel, course_id, 1, 1, self.user_id)
 
-class LessonView(View):
-    def __init__(self, user_id: int, course_id: int, module_id: int, lesson_id: int):
-        super().__init__(timeout=300)
+@persistent
+class LessonButton(OwnedItem, DynamicItem[Button],
+                   template=r"lesson:(?P<action>prev|next|stop|done|quiz):(?P<user>\d+):(?P<course>\d+)"
+                            r":(?P<module>\d+):(?P<lesson>\d+):(?P<page>\d+)"):
+    """A button of a lesson message; `page` is the page the button leads to, or the one shown"""
+    
+    denied_message = "❌ This isn't your lesson! Use `/start` to begin your own journey."
+    
+    def __init__(self, action: str, user_id: int, course_id: int, module_id: int, lesson_id: int, page: int,
+                 label: str, style=discord.ButtonStyle.secondary, disabled: bool = False, row: int = None):
+        self.action = action
         self.user_id = user_id
         self.course_id = course_id
         self.module_id = module_id
         self.lesson_id = lesson_id
+        self.page = page
+        super().__init__(Button(
+            label=label,
+            style=style,
+            disabled=disabled,
+            custom_id=f"lesson:{action}:{user_id}:{course_id}:{module_id}:{lesson_id}:{page}"
+        ), row=row)
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["user"]), int(match["course"]), int(match["module"]),
+                   int(match["lesson"]), int(match["page"]), item.label, item.style)
+    
+    async def callback(self, interaction: discord.Interaction):
+        if self.action in ("prev", "next"):
+            await self.turn_page(interaction)
+        elif self.action == "stop":
+            await self.stop_lesson(interaction)
+        elif self.action == "done":
+            await self.complete_lesson(interaction)
+        else:
+            await self.take_quiz(interaction)
     
-    @discord.ui.button(label="⏸️ Stop & Save", style=discord.ButtonStyle.secondary)
-    async def stop_lesson(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your lesson!", ephemeral=True)
+    async def turn_page(self, interaction: discord.Interaction):
+        rendered = get_rendered_lesson(self.course_id, self.module_id, self.lesson_id)
+        if rendered is None:
+            await interaction.response.send_message("❌ Lesson not found.", ephemeral=True)
+            return
+        page = max(0, min(self.page, len(rendered.pages) - 1))
+        view = LessonView(self.user_id, self.course_id, self.module_id, self.lesson_id, len(rendered.pages), page)
+        await interaction.response.edit_message(embed=rendered.page_embed(page), view=view)
+    
+    async def stop_lesson(self, interaction: discord.Interaction):
+        lesson = get_lesson(self.course_id, self.module_id, self.lesson_id)
+        if not lesson:
+            await interaction.response.send_message("❌ Lesson not found.", ephemeral=True)
             return
         
         # Save lesson session
@@ -115,11 +210,12 @@ class LessonView(View):
             'lesson': self.lesson_id
         }
         session_data = {
-            'lesson_title': get_lesson(self.course_id, self.module_id, self.lesson_id)['title'],
+            'lesson_title': lesson['title'],
             'saved_at': str(datetime.now())
         }
         
-        success = training_session_manager.save_session(
+        success = await asyncio.to_thread(
+            training_session_manager.save_session,
             self.user_id, 
             'lesson', 
             current_position, 
@@ -146,19 +242,7 @@ class LessonView(View):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
-    @discord.ui.button(label="✅ Complete Lesson", style=discord.ButtonStyle.green)
-    async def complete_lesson(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.user_id:
-            try:
-                await interaction.response.send_message(
-                    "❌ This isn't your lesson! Use `/start` to begin your own journey.",
-                    ephemeral=True
-                )
-            except discord.errors.NotFound:
-                # Interaction expired, ignore
-                pass
-            return
-        
+    async def complete_lesson(self, interaction: discord.Interaction):
         # Get lesson data
         lesson = get_lesson(self.course_id, self.module_id, self.lesson_id)
         if not lesson:
@@ -170,23 +254,28 @@ class LessonView(View):
             return
         
         # Add user to database if not exists
-        db.add_user(interaction.user.id, interaction.user.display_name)
+        await db.run(db.add_user, interaction.user.id, interaction.user.display_name)
         
         # Award XP
         xp_reward = lesson.get("xp_reward", 100)
-        new_xp = db.add_xp(interaction.user.id, xp_reward)
+        new_xp = await db.run(db.add_xp, interaction.user.id, xp_reward)
+        
+        # Update completion progress (setting the lesson's bit again is a no-op)
+        await db.run(db.update_progress, interaction.user.id, self.course_id, self.module_id, self.lesson_id)
+        unlock_tracker.record_completion(interaction.user.id, self.course_id, self.module_id, self.lesson_id)
         
-        # Update progress to next lesson
+        # The next lesson in order may still need prerequisites from another course
         next_lesson_info = get_next_lesson(self.course_id, self.module_id, self.lesson_id)
-        if next_lesson_info:
-            next_course_id, next_module_id, next_lesson_id = next_lesson_info
-            db.update_user_progress(interaction.user.id, next_course_id, next_module_id, next_lesson_id)
+        await unlock_tracker.load(interaction.user.id)
+        if next_lesson_info and not unlock_tracker.is_unlocked(interaction.user.id, next_lesson_info):
+            next_lesson_info = unlock_tracker.next_lesson(interaction.user.id, self.course_id)
         
-        # Update completion progress
-        db.update_progress(interaction.user.id, self.course_id, self.module_id, self.lesson_id)
+        # Move on after update_progress, whose lesson_id + 1 guess misses module boundaries
+        if next_lesson_info:
+            await db.run(db.update_user_progress, interaction.user.id, *next_lesson_info)
         
         # Check for achievements
-        new_achievements = achievement_manager.check_and_award_achievements(interaction.user.id)
+        new_achievements = await asyncio.to_thread(achievement_manager.check_and_award_achievements, interaction.user.id)
         
         # Create completion embed
         embed = discord.Embed(
@@ -206,12 +295,8 @@ class LessonView(View):
                 inline=False
             )
         
-        # Disable the complete button
-        button.disabled = True
-        button.label = "✅ Completed"
-        
         # Create new view with progression options
-        new_view = View(timeout=300)
+        new_view = View(timeout=None)
         
         # Check for next lesson
         if next_lesson_info:
@@ -237,26 +322,8 @@ class LessonView(View):
                 next_button_label = f"📖 Next Lesson"
             
             # Add next lesson button
-            async def next_lesson_callback(inter):
-                if inter.user.id != self.user_id:
-                    try:
-                        await inter.response.send_message("❌ This isn't your journey!", ephemeral=True)
-                    except discord.errors.NotFound:
-                        # Interaction expired, ignore
-                        pass
-                    return
-                try:
-                    await inter.response.send_message("📖 Loading next lesson...", ephemeral=True)
-                    await show_lesson(inter.followup, next_course_id, next_module_id, next_lesson_id, self.user_id)
-                except discord.errors.NotFound:
-                    # Interaction expired, send a new message instead
-                    channel = inter.channel if hasattr(inter, 'channel') else None
-                    if channel:
-                        await show_lesson(channel, next_course_id, next_module_id, next_lesson_id, self.user_id)
-            
-            next_button = Button(label=next_button_label, style=discord.ButtonStyle.primary)
-            next_button.callback = next_lesson_callback
-            new_view.add_item(next_button)
+            new_view.add_item(OpenLessonButton(self.user_id, next_course_id, next_module_id, next_lesson_id,
+                                               label=next_button_label))
         else:
             embed.add_field(
                 name="🎓 Congratulations!",
@@ -265,26 +332,7 @@ class LessonView(View):
             )
         
         # Add browse courses button
-        async def browse_courses_callback(inter):
-            if inter.user.id != self.user_id:
-                try:
-                    await inter.response.send_message("❌ This isn't your journey!", ephemeral=True)
-                except discord.errors.NotFound:
-                    # Interaction expired, ignore
-                    pass
-                return
-            try:
-                await inter.response.send_message("📚 Loading course catalog...", ephemeral=True)
-                await list_courses_with_selection(inter.followup, self.user_id)
-            except discord.errors.NotFound:
-                # Interaction expired, send a new message instead
-                channel = inter.channel if hasattr(inter, 'channel') else None
-                if channel:
-                    await list_courses_with_selection(channel, self.user_id)
-        
-        browse_button = Button(label="📚 Browse Courses", style=discord.ButtonStyle.secondary)
-        browse_button.callback = browse_courses_callback
-        new_view.add_item(browse_button)
+        new_view.add_item(BrowseCoursesButton(self.user_id))
         
         try:
             await interaction.response.edit_message(embed=embed, view=new_view)
@@ -313,19 +361,7 @@ class LessonView(View):
             except Exception as e:
                 logger.exception(f"Error sending achievement DM to user {interaction.user.id}: {e}")
     
-    @discord.ui.button(label="❓ Take Quiz", style=discord.ButtonStyle.primary)
-    async def take_quiz(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.user_id:
-            try:
-                await interaction.response.send_message(
-                    "❌ This isn't your lesson! Use `/start` to begin your own journey.",
-                    ephemeral=True
-                )
-            except discord.errors.NotFound:
-                # Interaction expired, ignore
-                pass
-            return
-        
+    async def take_quiz(self, interaction: discord.Interaction):
         # Check if lesson has a quiz
         lesson = get_lesson(self.course_id, self.module_id, self.lesson_id)
         if not lesson or "quiz" not in lesson:
@@ -357,6 +393,24 @@ class LessonView(View):
                     channel, self.course_id, self.module_id, self.lesson_id, self.user_id
                 )
 
+class LessonView(View):
+    """Buttons of one page of a lesson; the page and lesson ids live in their custom_ids"""
+    
+    def __init__(self, user_id: int, course_id: int, module_id: int, lesson_id: int, page_count: int = 1,
+                 page: int = 0):
+        super().__init__(timeout=None)
+        ids = (user_id, course_id, module_id, lesson_id)
+        self.add_item(LessonButton("stop", *ids, page, label="⏸️ Stop & Save"))
+        self.add_item(LessonButton("done", *ids, page, label="✅ Complete Lesson", style=discord.ButtonStyle.green))
+        self.add_item(LessonButton("quiz", *ids, page, label="❓ Take Quiz", style=discord.ButtonStyle.primary))
+        
+        # Single-page lessons get no pager buttons
+        if page_count > 1:
+            self.add_item(LessonButton("prev", *ids, max(0, page - 1), label="◀️ Previous",
+                                       disabled=page == 0, row=1))
+            self.add_item(LessonButton("next", *ids, min(page + 1, page_count - 1), label="Next ▶️",
+                                       disabled=page >= page_count - 1, row=1))
+
 @bot.event
 async def on_ready():
     logger.info(f"✅ {bot.user} is online and ready to teach cybersecurity!")
@@ -374,10 +428,10 @@ async def start_journey(interaction: discord.Interaction):
     """🚀 Start your cybersecurity learning journey!"""
     
     # Add user to database
-    db.add_user(interaction.user.id, interaction.user.display_name)
+    await db.run(db.add_user, interaction.user.id, interaction.user.display_name)
     
     # Get user stats
-    user_stats = db.get_user_stats(interaction.user.id)
+    user_stats = await db.run(db.get_user_stats, interaction.user.id)
     
     # Check if this is a new user (no progress yet)
     if not user_stats or user_stats[1] == 0:  # No XP means new user
@@ -388,28 +442,23 @@ async def start_journey(interaction: discord.Interaction):
             color=0x0099FF
         )
         
-        courses = get_course_list()
-        course_descriptions = []
-        for course in courses:
-            course_descriptions.append(f"**{course['title']}** ({course['level']})\n{course['description']}")
-        
+        # Level counts only; the catalog below pages through the courses themselves
+        view = CourseSelectionView(interaction.user.id)
         embed.add_field(
-            name="📚 Available Courses",
-            value="\n\n".join(course_descriptions),
+            name=f"📚 {view.catalog.total} Available Courses",
+            value=view.catalog.summary() or "No courses available yet",
             inline=False
         )
         
         embed.add_field(
             name="🎯 Getting Started",
-            value="Select a course below to begin your cybersecurity journey!\nEach course contains multiple modules with hands-on lessons.",
+            value="Pick a course from the catalog below to begin your cybersecurity journey!\nEach course contains multiple modules with hands-on lessons.",
             inline=False
         )
         
         embed.set_footer(text="Choose wisely! You can always switch courses later.")
         
-        # Create course selection view
-        view = CourseSelectionView(interaction.user.id)
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        await interaction.response.send_message(embeds=[embed, view.render_page(0)], view=view, ephemeral=True)
         
     else:
         # Existing user - show progress and continue
@@ -456,7 +505,7 @@ async def start_journey(interaction: discord.Interaction):
         embed.set_footer(text="Click the button below to continue your learning!")
         
         # Create continue button
-        view = View(timeout=300)
+        view = WheelView(timeout=300)
         
         async def continue_lesson(button_interaction):
             if button_interaction.user.id != interaction.user.id:
@@ -512,6 +561,22 @@ async def start_journey(interaction: discord.Interaction):
         
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
+def describe_lesson(ids: tuple) -> str:
+    """One line naming a lesson and the command that opens it"""
+    lesson = get_lesson(*ids)
+    title = lesson['title'] if lesson else "Unknown lesson"
+    return f"**{title}** • `/lesson {ids[0]} {ids[1]} {ids[2]}`"
+
+def create_locked_embed(title: str, missing: list) -> discord.Embed:
+    """Explain which lessons still have to be completed to unlock something"""
+    embed = discord.Embed(
+        title=title,
+        description="Complete these lessons first:\n" + "\n".join(f"• {describe_lesson(ids)}" for ids in missing[:10]),
+        color=0xFF8000
+    )
+    embed.set_footer(text="Use /next to see what you can take right now")
+    return embed
+
 async def show_lesson(ctx_or_followup, course_id: int, module_id: int, lesson_id: int, user_id: int = None):
     """Internal function to show a lesson - works with both ctx and followup"""
     
@@ -532,13 +597,12 @@ async def show_lesson(ctx_or_followup, course_id: int, module_id: int, lesson_id
         display_name = ctx_or_followup.author.display_name
     
     # Add user to database with proper display name
-    db.add_user(user_id, display_name)
+    await db.run(db.add_user, user_id, display_name)
     
-    # Get lesson and course data
-    lesson = get_lesson(course_id, module_id, lesson_id)
-    course = get_course(course_id)
+    # Lesson embeds are pre-rendered and paginated per content version
+    rendered = get_rendered_lesson(course_id, module_id, lesson_id)
     
-    if not lesson:
+    if rendered is None:
         embed = discord.Embed(
             title="❌ Lesson Not Found",
             description="Could not find the specified lesson.",
@@ -550,46 +614,17 @@ async def show_lesson(ctx_or_followup, course_id: int, module_id: int, lesson_id
             await ctx_or_followup.send(embed=embed)
         return
     
-    # Create lesson embed
-    embed = discord.Embed(
-        title=f"📖 {lesson['title']}",
-        description=lesson['content'],
-        color=0x0099FF
-    )
-    
-    embed.add_field(
-        name="📚 Course Info",
-        value=f"**{course['title']}**\nCourse {course_id} • Module {module_id} • Lesson {lesson_id}",
-        inline=True
-    )
-    
-    embed.add_field(
-        name="⭐ XP Reward",
-        value=f"{lesson.get('xp_reward', 100)} XP",
-        inline=True
-    )
-    
-    # Add practical exercise if available
-    if "practical_exercise" in lesson:
-        exercise = lesson["practical_exercise"]
-        embed.add_field(
-            name="🛠️ Practical Exercise",
-            value=f"**{exercise['title']}**\n{exercise['description']}",
-            inline=False
-        )
-    
-    # Add quiz info if available
-    if "quiz" in lesson:
-        embed.add_field(
-            name="🎯 Quiz Available",
-            value="Test your knowledge with the lesson quiz!",
-            inline=False
-        )
+    await unlock_tracker.load(user_id)
+    if not unlock_tracker.is_unlocked(user_id, (course_id, module_id, lesson_id)):
+        missing = unlock_tracker.missing(user_id, (course_id, module_id, lesson_id))
+        await ctx_or_followup.send(embed=create_locked_embed("🔒 Lesson Locked", missing))
+        return
     
-    embed.set_footer(text="Complete the lesson to earn XP and unlock achievements!")
+    # Only the first page is materialized; the pager renders others on demand
+    embed = rendered.page_embed(0)
     
     # Create lesson view with interactive buttons
-    view = LessonView(user_id, course_id, module_id, lesson_id)
+    view = LessonView(user_id, course_id, module_id, lesson_id, len(rendered.pages))
     
     if hasattr(ctx_or_followup, 'send'):
         await ctx_or_followup.send(embed=embed, view=view)
@@ -599,25 +634,8 @@ async def show_lesson(ctx_or_followup, course_id: int, module_id: int, lesson_id
 async def list_courses_with_selection(ctx_or_followup, user_id: int):
     """Show course list with selection buttons"""
     
-    courses = get_course_list()
-    
-    embed = discord.Embed(
-        title="📚 Course Catalog",
-        description="Choose a course to start or switch to:",
-        color=0x0099FF
-    )
-    
-    for course in courses:
-        embed.add_field(
-            name=f"{course['title']} ({course['level']})",
-            value=f"{course['description']}\n\n",
-            inline=False
-        )
-    
-    embed.set_footer(text="Select a course below to begin!")
-    
-    # Create course selection view
     view = CourseSelectionView(user_id)
+    embed = view.render_page(0)
     
     if hasattr(ctx_or_followup, 'send'):
         await ctx_or_followup.send(embed=embed, view=view)
@@ -629,11 +647,11 @@ async def lesson_command(interaction: discord.Interaction, course_id: int = None
     """📖 View a specific lesson or your current lesson"""
     
     # Add user to database
-    db.add_user(interaction.user.id, interaction.user.display_name)
+    await db.run(db.add_user, interaction.user.id, interaction.user.display_name)
     
     # If no parameters provided, show current lesson
     if not all([course_id, module_id, lesson_id]):
-        user_stats = db.get_user_stats(interaction.user.id)
+        user_stats = await db.run(db.get_user_stats, interaction.user.id)
         if user_stats:
             _, _, _, course_id, module_id, lesson_id = user_stats
         else:
@@ -649,24 +667,8 @@ async def lesson_command(interaction: discord.Interaction, course_id: int = None
 async def list_courses(interaction: discord.Interaction):
     """📚 Browse all available courses"""
     
-    courses = get_course_list()
-    
-    embed = discord.Embed(
-        title="📚 Available Courses",
-        description="Choose your cybersecurity learning path:",
-        color=0x0099FF
-    )
-    
-    for course in courses:
-        embed.add_field(
-            name=f"{course['title']} ({course['level']})",
-            value=f"{course['description']}\nUse `/lesson {course['id']} 1 1` to start",
-            inline=False
-        )
-    
-    embed.set_footer(text="More courses coming soon!")
-    
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    view = CourseSelectionView(interaction.user.id)
+    await interaction.response.send_message(embed=view.render_page(0), view=view, ephemeral=True)
 
 @bot.tree.command(name="progress", description="📊 Check your learning progress")
 async def show_progress(interaction: discord.Interaction, user: discord.Member = None):
@@ -675,9 +677,11 @@ async def show_progress(interaction: discord.Interaction, user: discord.Member =
     target_user = user or interaction.user
     
     # Add user to database
-    db.add_user(target_user.id, target_user.display_name)
+    await db.run(db.add_user, target_user.id, target_user.display_name)
     
-    user_stats = db.get_user_stats(target_user.id)
+    # One snapshot read serves both the stats and the achievement summary
+    ctx = await UserContext(target_user.id).load()
+    user_stats = ctx.stats
     if not user_stats:
         embed = discord.Embed(
             title="❌ No Progress Found",
@@ -690,7 +694,7 @@ async def show_progress(interaction: discord.Interaction, user: discord.Member =
     username, xp, level, current_course, current_module, current_lesson = user_stats
     
     # Get achievement summary
-    achievement_summary = achievement_manager.get_user_achievement_summary(target_user.id)
+    achievement_summary = achievement_manager.get_user_achievement_summary(target_user.id, ctx)
     
     embed = discord.Embed(
         title=f"📊 {username}'s Progress",
@@ -715,6 +719,13 @@ async def show_progress(interaction: discord.Interaction, user: discord.Member =
         inline=True
     )
     
+    embed.add_field(
+        name="🧮 Curriculum",
+        value=f"**{ctx.percent_complete():.0f}%** of all lessons • "
+              f"**{ctx.percent_complete(current_course):.0f}%** of course {current_course}",
+        inline=False
+    )
+    
     # XP to next level
     xp_to_next = ((level * 1000) - xp)
     if xp_to_next > 0:
@@ -726,11 +737,11 @@ async def show_progress(interaction: discord.Interaction, user: discord.Member =
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
-@bot.tree.command(name="leaderboard", description="🏆 View the top cybersecurity learners")
-async def show_leaderboard(interaction: discord.Interaction):
-    """🏆 View the top cybersecurity learners"""
-    
+def render_leaderboard():
+    """Render the XP leaderboard as an embed dict (None on error)"""
     leaderboard = db.get_leaderboard(10)
+    if leaderboard is None:
+        return None
     
     if not leaderboard:
         embed = discord.Embed(
@@ -738,8 +749,7 @@ async def show_leaderboard(interaction: discord.Interaction):
             description="No learners yet! Be the first to start your cybersecurity journey!",
             color=0xFFD700
         )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
+        return embed.to_dict()
     
     embed = discord.Embed(
         title="🏆 Cybersecurity Leaderboard",
@@ -762,10 +772,28 @@ async def show_leaderboard(interaction: discord.Interaction):
     
     embed.set_footer(text="Keep learning to climb the ranks!")
     
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    return embed.to_dict()
+
+@bot.tree.command(name="leaderboard", description="🏆 View the top cybersecurity learners")
+async def show_leaderboard(interaction: discord.Interaction):
+    """🏆 View the top cybersecurity learners"""
+    
+    # Concurrent /leaderboard calls share one query and reuse it for a few seconds
+    payload = await response_cache.get("leaderboard", render_leaderboard)
+    if payload is None:
+        embed = discord.Embed(
+            title="❌ Error",
+            description="Could not load the leaderboard.",
+            color=0xFF0000
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    await interaction.response.send_message(embed=discord.Embed.from_dict(payload), ephemeral=True)
 
 @bot.tree.command(name="quiz", description="🎯 Take a quiz for a lesson or module")
-async def start_quiz(interaction: discord.Interaction, course_id: int = None, module_id: int = None, lesson_id: int = None):
+async def start_quiz(interaction: discord.Interaction, course_id: int = None, module_id: int = None, lesson_id: int = None,
+                     topic: str = None, difficulty: app_commands.Range[int, 1, 5] = None,
+                     timed: bool = False):
     """🎯 Take a quiz for a lesson or module"""
     
     if all([course_id, module_id, lesson_id]):
@@ -773,13 +801,15 @@ async def start_quiz(interaction: discord.Interaction, course_id: int = None, mo
         await interaction.response.send_message("🎯 Starting quiz...", ephemeral=True)
         await quiz_manager.start_lesson_quiz(interaction.followup, course_id, module_id, lesson_id)
     elif course_id and module_id:
-        # Module quiz
-        await interaction.response.send_message("🎯 Starting module quiz...", ephemeral=True)
-        await quiz_manager.start_module_quiz(interaction.followup, course_id, module_id, interaction.user.id)
+        # Module quiz, optionally narrowed to one topic tag and/or difficulty (1-5), optionally timed;
+        # the deferred response is completed by the first question itself
+        await interaction.response.defer(thinking=True)
+        await quiz_manager.start_module_quiz(interaction.followup, course_id, module_id, interaction.user.id,
+                                             topic, difficulty, timed)
     else:
         # Current lesson quiz
-        db.add_user(interaction.user.id, interaction.user.display_name)
-        user_stats = db.get_user_stats(interaction.user.id)
+        await db.run(db.add_user, interaction.user.id, interaction.user.display_name)
+        user_stats = await db.run(db.get_user_stats, interaction.user.id)
         if user_stats:
             _, _, _, current_course, current_module, current_lesson = user_stats
             await interaction.response.send_message("🎯 Starting current lesson quiz...", ephemeral=True)
@@ -799,11 +829,28 @@ async def show_achievements(interaction: discord.Interaction, user: discord.Memb
     target_user = user or interaction.user
     
     # Add user to database
-    db.add_user(target_user.id, target_user.display_name)
+    await db.run(db.add_user, target_user.id, target_user.display_name)
     
-    embed = achievement_manager.create_achievements_list_embed(target_user.id)
+    ctx = await UserContext(target_user.id).load()
+    embed = achievement_manager.create_achievements_list_embed(target_user.id, ctx)
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
+@bot.tree.command(name="review", description="🔁 Review quiz questions that are due")
+async def review(interaction: discord.Interaction):
+    """🔁 Review quiz questions that are due"""
+    embed, view = await review_message(interaction.user.id)
+    if view is None:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embed, view=view)
+
+@bot.tree.command(name="tournament", description="🏟️ Host a live quiz tournament for this channel")
+async def tournament(interaction: discord.Interaction, course_id: int, module_id: int,
+                     questions: int = DEFAULT_QUESTIONS, seconds: int = DEFAULT_SECONDS):
+    """🏟️ Host a live quiz tournament for this channel"""
+    await db.run(db.add_user, interaction.user.id, interaction.user.display_name)
+    await tournament_manager.start(interaction, course_id, module_id, questions, seconds)
+
 @bot.tree.command(name="stats", description="📊 View quiz statistics")
 async def quiz_stats(interaction: discord.Interaction, user: discord.Member = None):
     """📊 View quiz statistics"""
@@ -830,7 +877,7 @@ async def help_command(interaction: discord.Interaction):
     
     embed.add_field(
         name="📚 Learning Commands",
-        value="`/lesson [course] [module] [lesson]` - View specific lesson\n`/quiz` - Take a quiz\n`/quiz [course] [module]` - Take module quiz",
+        value="`/lesson [course] [module] [lesson]` - View specific lesson\n`/search <query>` - Find lessons, quizzes and CTF challenges\n`/quiz` - Take a quiz\n`/quiz [course] [module] [topic] [difficulty] [timed]` - Take module quiz\n`/review` - Review questions that are due\n`/tournament <course> <module> [questions] [seconds]` - Host a live quiz for the channel",
         inline=False
     )
     
@@ -842,7 +889,7 @@ async def help_command(interaction: discord.Interaction):
     
     embed.add_field(
         name="🚩 Advanced Features",
-        value="`/ctf` - CTF challenges (500+ XP required)\n`/ctf_leaderboard` - CTF rankings\n`/multimedia [type]` - Interactive content\n`/xp_gates` - View feature unlock requirements",
+        value="`/ctf` - CTF challenges (500+ XP required)\n`/ctf_leaderboard` - CTF rankings\n`/multimedia [type]` - Interactive content\n`/xp_gates` - View feature unlock requirements\n`/next` - Lessons and challenges you can take next",
         inline=False
     )
     
@@ -866,22 +913,163 @@ async def help_command(interaction: discord.Interaction):
 async def setup_cogs():
     await bot.add_cog(AdminCommands(bot))
 
+async def warm_up():
+    """Create the schema and seed catalogs off the event loop, timing each phase"""
+    phases = [
+        ("database schema", db.ensure_initialized),
+        ("CTF challenges", ctf_manager.initialize_challenges),
+        ("multimedia samples", initialize_sample_content),
+        ("course index", get_curriculum_index),
+        ("course catalog", get_catalog),
+        ("prerequisite graph", get_prerequisite_graph),
+        ("lesson slots", get_completion_masks),
+        ("search index", build_search_index)
+    ]
+    
+    startup_began = time.perf_counter()
+    for phase_name, phase in phases:
+        phase_began = time.perf_counter()
+        try:
+            await asyncio.to_thread(phase)
+        except Exception as e:
+            logger.exception(f"❌ Startup phase '{phase_name}' failed: {e}")
+            continue
+        logger.info(f"⏱️ Startup phase '{phase_name}' took {(time.perf_counter() - phase_began) * 1000:.1f}ms")
+    
+    logger.info(f"✅ Warm-up finished in {(time.perf_counter() - startup_began) * 1000:.1f}ms")
+
+async def watch_course_content():
+    """Poll the course files and hot-reload any that changed"""
+    interval = float(os.getenv("COURSE_RELOAD_INTERVAL", "30"))
+    if interval <= 0:
+        return
+    
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changed = await asyncio.to_thread(COURSES.reload_changed)
+        except Exception as e:
+            logger.error(f"❌ Course reload failed: {e}")
+            continue
+        if changed:
+            logger.info(f"🔄 Reloaded course content: {changed}")
+
+REVIEW_REMINDER_INTERVAL = float(os.getenv("REVIEW_REMINDER_INTERVAL", "3600"))
+
+async def send_review_reminders():
+    """DM everyone whose reviews came due since their last reminder, one batch per pass.
+    
+    Each pass re-arms itself on the timer wheel instead of keeping a sleeping task.
+    """
+    try:
+        now = time.time()
+        try:
+            pending = await asyncio.to_thread(review_scheduler.pending_reminders, now)
+        except Exception as e:
+            logger.error(f"❌ Review reminder query failed: {e}")
+            return
+        
+        for user_id, due in pending:
+            try:
+                user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+                await user.send(embed=discord.Embed(
+                    title="🔁 Reviews Due",
+                    description=f"You have **{due}** review(s) due. Use `/review` to keep them fresh!",
+                    color=0x9B59B6
+                ))
+            except discord.HTTPException as e:
+                logger.debug(f"Could not send review reminder to {user_id}: {e}")
+        
+        if pending:
+            await asyncio.to_thread(db.mark_review_reminders, [user_id for user_id, _ in pending], now)
+            logger.info(f"🔁 Sent review reminders to {len(pending)} user(s)")
+    finally:
+        timer_wheel.schedule(REVIEW_REMINDER_INTERVAL, send_review_reminders)
+
+async def flush_ratings():
+    """Write rating changes and logged quiz answers to the database in periodic batches"""
+    interval = float(os.getenv("RATING_FLUSH_INTERVAL", "30"))
+    while True:
+        await asyncio.sleep(interval)
+        if rating_engine.recalibrating:
+            continue  # Its closing flush writes these too
+        try:
+            await asyncio.to_thread(rating_engine.flush)
+        except Exception as e:
+            logger.error(f"❌ Rating flush failed: {e}")
+
+async def recalibrate_ratings_nightly():
+    """Refit all ratings from the answer log once a day at RATING_RECALIBRATION_HOUR (local time)"""
+    hour = int(os.getenv("RATING_RECALIBRATION_HOUR", "3"))
+    if not 0 <= hour <= 23:
+        return
+    
+    while True:
+        now = datetime.now()
+        run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        await asyncio.sleep((run_at - now).total_seconds())
+        began = time.perf_counter()
+        try:
+            answers = await asyncio.to_thread(rating_engine.recalibrate)
+        except Exception as e:
+            logger.exception(f"❌ Rating recalibration failed: {e}")
+            continue
+        logger.info(f"📐 Recalibrated ratings from {answers} answers in {time.perf_counter() - began:.1f}s")
+
 @bot.event
 async def setup_hook():
     await setup_cogs()
+    # Buttons decode their state from custom_ids, so messages sent before a restart keep working
+    bot.add_dynamic_items(*PERSISTENT_ITEMS)
+    # Run DB warm-up alongside the gateway connection instead of before it
+    bot.warm_up_task = asyncio.create_task(warm_up())
+    bot.course_watch_task = asyncio.create_task(watch_course_content())
+    # View timeouts, quiz deadlines and reminders all run off this one task
+    bot.timer_wheel_task = asyncio.create_task(timer_wheel.run())
+    if REVIEW_REMINDER_INTERVAL > 0:
+        timer_wheel.schedule(REVIEW_REMINDER_INTERVAL, send_review_reminders)
+    bot.rating_flush_task = asyncio.create_task(flush_ratings())
+    bot.rating_recalibration_task = asyncio.create_task(recalibrate_ratings_nightly())
 
 # Error handling
 # CTF Commands
+async def send_ctf_challenge(interaction: discord.Interaction, challenge_id: int, xp: int):
+    """Show one CTF challenge if the user has enough XP for it"""
+    challenges = await asyncio.to_thread(ctf_manager.get_available_challenges, xp)
+    challenge = next((c for c in challenges if c[0] == challenge_id), None)
+    
+    if not challenge:
+        embed = discord.Embed(
+            title="❌ Challenge Not Available",
+            description="This challenge doesn't exist or you don't have enough XP to access it.",
+            color=0xFF0000
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    node = challenge_node(challenge[1])
+    await unlock_tracker.load(interaction.user.id)
+    if not unlock_tracker.is_unlocked(interaction.user.id, node):
+        embed = create_locked_embed("🔒 Challenge Locked", unlock_tracker.missing(interaction.user.id, node))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    embed, challenge_data = ctf_manager.create_challenge_embed(challenge)
+    view = CTFChallengeView(challenge_data["id"], interaction.user.id)
+    await interaction.response.send_message(embed=embed, view=view)
+
 @bot.tree.command(name="ctf", description="🚩 Access CTF (Capture The Flag) challenges")
 async def ctf_command(interaction: discord.Interaction, challenge_id: int = None):
     """CTF challenge system for advanced users"""
     user_id = interaction.user.id
     
     # Register user if not exists
-    db.add_user(user_id, interaction.user.display_name)
+    await db.run(db.add_user, user_id, interaction.user.display_name)
     
     # Get user stats to check XP requirements
-    user_stats = db.get_user_stats(user_id)
+    user_stats = await db.run(db.get_user_stats, user_id)
     if not user_stats:
         await interaction.response.send_message("❌ Error getting user data.", ephemeral=True)
         return
@@ -889,26 +1077,11 @@ async def ctf_command(interaction: discord.Interaction, challenge_id: int = None
     username, xp, level, current_course, current_module, current_lesson = user_stats
     
     if challenge_id:
-        # Show specific challenge
-        challenges = ctf_manager.get_available_challenges(xp)
-        challenge = next((c for c in challenges if c[0] == challenge_id), None)
-        
-        if not challenge:
-            embed = discord.Embed(
-                title="❌ Challenge Not Available",
-                description="This challenge doesn't exist or you don't have enough XP to access it.",
-                color=0xFF0000
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
-        embed, challenge_data = ctf_manager.create_challenge_embed(challenge)
-        view = CTFChallengeView(challenge_data, user_id)
-        await interaction.response.send_message(embed=embed, view=view)
+        await send_ctf_challenge(interaction, challenge_id, xp)
     
     else:
         # Show available challenges
-        challenges = ctf_manager.get_available_challenges(xp)
+        challenges = await asyncio.to_thread(ctf_manager.get_available_challenges, xp)
         
         if not challenges:
             embed = discord.Embed(
@@ -930,6 +1103,12 @@ async def ctf_command(interaction: discord.Interaction, challenge_id: int = None
             color=0x0099FF
         )
         
+        # XP opens a challenge only once its prerequisite lessons are done too
+        await unlock_tracker.load(user_id)
+        unlocked = unlock_tracker.unlocked_challenges(user_id)
+        locked = [challenge for challenge in challenges if challenge[1] not in unlocked]
+        challenges = [challenge for challenge in challenges if challenge[1] in unlocked]
+        
         challenge_list = ""
         for challenge_id, name, category, difficulty, points, description, required_xp in challenges[:10]:
             challenge_list += f"**{challenge_id}.** {name}\n"
@@ -938,10 +1117,18 @@ async def ctf_command(interaction: discord.Interaction, challenge_id: int = None
         
         embed.add_field(
             name="Challenges",
-            value=challenge_list,
+            value=challenge_list or "None yet. Finish the prerequisite lessons to open them.",
             inline=False
         )
         
+        if locked:
+            embed.add_field(
+                name="🔒 Waiting on Lessons",
+                value="\n".join(f"**{challenge[0]}.** {challenge[1]}" for challenge in locked[:10]) +
+                      "\nUse `/ctf <challenge_id>` to see which lessons each one needs.",
+                inline=False
+            )
+        
         embed.add_field(
             name="How to start",
             value="Use `/ctf <challenge_id>` to start a specific challenge",
@@ -950,10 +1137,97 @@ async def ctf_command(interaction: discord.Interaction, challenge_id: int = None
         
         await interaction.response.send_message(embed=embed)
 
+SEARCH_EMOJIS = {"lesson": "📖", "quiz": "🎯", "multimedia": "🎬", "ctf": "🚩"}
+
+class SearchResultsView(WheelView):
+    """Buttons that open the top search results"""
+    
+    def __init__(self, user_id: int, results: list):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        
+        for number, (score, result) in enumerate(results[:5], 1):
+            emoji = SEARCH_EMOJIS[result["kind"]]
+            title = result["title"]
+            label = f"{number}. {title[:30]}..." if len(title) > 30 else f"{number}. {title}"
+            button = Button(label=label, emoji=emoji, style=discord.ButtonStyle.primary)
+            button.callback = self.make_callback(result)
+            self.add_item(button)
+    
+    def make_callback(self, result: dict):
+        async def open_result(interaction: discord.Interaction):
+            if interaction.user.id != self.user_id:
+                await interaction.response.send_message("❌ Run `/search` to get your own results.", ephemeral=True)
+                return
+            
+            if result["kind"] == "lesson":
+                await interaction.response.send_message(f"📖 Opening **{result['title']}**...", ephemeral=True)
+                await show_lesson(interaction.followup, *result["ids"], interaction.user.id)
+                return
+            if result["kind"] == "quiz":
+                # Completed by the first question, as with /quiz
+                await interaction.response.defer(thinking=True)
+                await quiz_manager.start_module_quiz(interaction.followup, *result["ids"], interaction.user.id)
+                return
+            if result["kind"] == "multimedia":
+                embed, view = multimedia_manager.create_multimedia_embed(result["ids"][0], interaction.user.id,
+                                                                         result["ids"][1])
+                if view:
+                    await interaction.response.send_message(embed=embed, view=view)
+                else:
+                    await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+            
+            user_stats = await db.run(db.get_user_stats, interaction.user.id)
+            await send_ctf_challenge(interaction, result["ids"][0], user_stats[1] if user_stats else 0)
+        return open_result
+
+@bot.tree.command(name="search", description="🔎 Search lessons, quizzes and CTF challenges")
+async def search_command(interaction: discord.Interaction, query: str):
+    """Search lessons, quizzes and CTF challenges"""
+    await db.run(db.add_user, interaction.user.id, interaction.user.display_name)
+    
+    results = await asyncio.to_thread(search_content, query, 10)
+    if not results:
+        embed = discord.Embed(
+            title="🔎 No Results",
+            description=f"Nothing matched **{query}**. Try fewer or shorter words.",
+            color=0xFF8000
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title=f"🔎 Results for \"{query[:100]}\"",
+        color=0x0099FF
+    )
+    
+    for number, (score, result) in enumerate(results, 1):
+        if result["kind"] == "lesson":
+            course_id, module_id, lesson_id = result["ids"]
+            name = f"{number}. 📖 {result['title']}"
+            value = f"{result['course_title']} • Course {course_id} • Module {module_id} • Lesson {lesson_id}\n{result['snippet']}"
+        elif result["kind"] == "quiz":
+            course_id, module_id = result["ids"]
+            name = f"{number}. 🎯 {result['title']}"
+            value = f"{result['course_title']} • {result['snippet']}\n`/quiz course_id:{course_id} module_id:{module_id}`"
+        elif result["kind"] == "multimedia":
+            name = f"{number}. 🎬 {result['title']}"
+            value = result["snippet"]
+        else:
+            name = f"{number}. 🚩 {result['title']}"
+            value = f"{result['snippet']}\n`/ctf challenge_id:{result['ids'][0]}`"
+        embed.add_field(name=name[:256], value=value[:1024], inline=False)
+    
+    embed.set_footer(text="Use the buttons to open one of the top results")
+    
+    view = SearchResultsView(interaction.user.id, results)
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
 @bot.tree.command(name="ctf_leaderboard", description="🏆 View CTF challenge leaderboard")
 async def ctf_leaderboard_command(interaction: discord.Interaction):
     """Show CTF leaderboard"""
-    embed = ctf_manager.create_leaderboard_embed()
+    embed = await ctf_manager.get_leaderboard_embed()
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(name="multimedia", description="🎬 Access interactive multimedia content")
@@ -962,13 +1236,12 @@ async def multimedia_command(interaction: discord.Interaction, content_type: str
     user_id = interaction.user.id
     
     # Register user if not exists
-    db.add_user(user_id, interaction.user.display_name)
+    await db.run(db.add_user, user_id, interaction.user.display_name)
     
-    valid_types = ["phishing", "passwords", "network", "malware", "videos", "audio"]
-    if content_type not in valid_types:
+    if content_type not in CONTENT_TYPES:
         embed = discord.Embed(
             title="❌ Invalid Content Type",
-            description=f"Available content types: {', '.join(valid_types)}",
+            description=f"Available content types: {', '.join(CONTENT_TYPES)}",
             color=0xFF0000
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -981,16 +1254,54 @@ async def multimedia_command(interaction: discord.Interaction, content_type: str
     else:
         await interaction.response.send_message(embed=embed)
 
+@bot.tree.command(name="next", description="🧭 See which lessons and challenges you can take next")
+async def next_command(interaction: discord.Interaction):
+    """Show the lessons and CTF challenges the user has unlocked but not finished"""
+    user_id = interaction.user.id
+    await db.run(db.add_user, user_id, interaction.user.display_name)
+    
+    await unlock_tracker.load(user_id)
+    available = unlock_tracker.available_lessons(user_id)
+    completed, open_count, total = unlock_tracker.counts(user_id)
+    
+    embed = discord.Embed(
+        title="🧭 What's Next",
+        description=f"**{completed}/{total}** lessons completed • **{open_count}** ready to take",
+        color=0x0099FF
+    )
+    
+    embed.add_field(
+        name="📖 Unlocked Lessons",
+        value="\n".join(f"• {describe_lesson(ids)}" for ids in available[:10]) or
+              "You've completed every lesson! 🎓",
+        inline=False
+    )
+    
+    user_stats = await db.run(db.get_user_stats, user_id)
+    xp = user_stats[1] if user_stats else 0
+    unlocked = unlock_tracker.unlocked_challenges(user_id)
+    challenges = await asyncio.to_thread(ctf_manager.get_available_challenges, xp)
+    challenges = [challenge for challenge in challenges if challenge[1] in unlocked]
+    if challenges:
+        embed.add_field(
+            name="🚩 Open CTF Challenges",
+            value="\n".join(f"• **{challenge[1]}** • `/ctf challenge_id:{challenge[0]}`" for challenge in challenges[:10]),
+            inline=False
+        )
+    
+    embed.set_footer(text="Lessons unlock as you complete their prerequisites")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="xp_gates", description="🔒 View XP requirements for unlocking features")
 async def xp_gates_command(interaction: discord.Interaction):
     """Show XP requirements for different features"""
     user_id = interaction.user.id
     
     # Register user if not exists
-    db.add_user(user_id, interaction.user.display_name)
+    await db.run(db.add_user, user_id, interaction.user.display_name)
     
     # Get user stats
-    user_stats = db.get_user_stats(user_id)
+    user_stats = await db.run(db.get_user_stats, user_id)
     if not user_stats:
         await interaction.response.send_message("❌ Error getting user data.", ephemeral=True)
         return
@@ -1038,6 +1349,15 @@ async def xp_gates_command(interaction: discord.Interaction):
             inline=False
         )
     
+    await unlock_tracker.load(user_id)
+    completed, open_count, total = unlock_tracker.counts(user_id)
+    embed.add_field(
+        name="🧭 Lesson Unlocks",
+        value=f"Lessons and CTF challenges also unlock through their prerequisite lessons.\n"
+              f"**{open_count}** lessons ready to take • **{completed}/{total}** completed • See `/next`",
+        inline=False
+    )
+    
     embed.add_field(
         name="💡 How to Earn XP",
         value="• Complete lessons (+100-250 XP)\n• Take quizzes (+50-150 XP)\n• Solve CTF challenges (+100-600 XP)\n• Earn achievements (bonus XP)",
@@ -1052,9 +1372,10 @@ async def sessions_command(interaction: discord.Interaction):
     user_id = interaction.user.id
     
     # Register user if not exists
-    db.add_user(user_id, interaction.user.display_name)
+    await db.run(db.add_user, user_id, interaction.user.display_name)
     
-    embed, view = training_session_manager.create_session_embed(user_id)
+    sessions = await asyncio.to_thread(training_session_manager.get_user_sessions, user_id)
+    embed, view = training_session_manager.create_session_embed(user_id, sessions)
     
     if view:
         await interaction.response.send_message(embed=embed, view=view)
@@ -1110,3 +1431,6 @@ if __name__ == "__main__":
         logger.error("❌ Error: Invalid bot token! Please check your .env file.")
     except Exception as e:
         logger.exception(f"❌ Error starting bot: {e}")
+    finally:
+        # Ratings and answers still waiting for the periodic flush
+        rating_engine.flush()
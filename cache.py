@@ -0,0 +1,190 @@
+"""
+In-process caches for the bot
+LRU caches with per-entry expiry, single-flight request coalescing and a
+short-lived cache for rendered responses
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire `ttl` seconds after being set.
+    
+    Every update or invalidation bumps a generation for its key, so a reader that
+    loaded a value before a concurrent write can skip caching it: take version(key)
+    before the read and pass it to set().
+    """
+    
+    GENERATION_SLOTS = 256  # Keys share counters by hash; a collision only skips one fill
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, clock=time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Entries pushed out by the size bound
+        self.expirations = 0  # Entries dropped because their TTL ran out
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._generations = [0] * self.GENERATION_SLOTS
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """Return the cached value, or `default` if it is missing or expired"""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def version(self, key) -> int:
+        """Current generation of a key, to pass to set() after a slow read"""
+        with self._lock:
+            return self._generations[hash(key) % self.GENERATION_SLOTS]
+    
+    def set(self, key, value, version: int = None) -> bool:
+        """Store a value, evicting the least recently used entry when full.
+        
+        With `version`, nothing is stored if the key was updated or invalidated
+        since that version was taken; returns whether the value was stored.
+        """
+        with self._lock:
+            if version is not None and version != self._generations[hash(key) % self.GENERATION_SLOTS]:
+                return False
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+    
+    def update(self, key, func) -> bool:
+        """Replace a live entry with func(old value); returns False if nothing was cached.
+        
+        Used for write-through so a write does not count as a hit or refresh the TTL.
+        """
+        with self._lock:
+            # A read in flight may hold the old value even when nothing is cached yet
+            self._bump(key)
+            entry = self._live_entry(key)
+            if entry is None:
+                return False
+            self._entries[key] = (entry[0], func(entry[1]))
+            return True
+    
+    def invalidate(self, key):
+        """Drop one entry if present"""
+        with self._lock:
+            self._bump(key)
+            self._entries.pop(key, None)
+    
+    def invalidate_where(self, predicate) -> int:
+        """Drop every entry whose key matches predicate(key); returns how many"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self._bump(key)
+                del self._entries[key]
+            return len(stale)
+    
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._generations = [version + 1 for version in self._generations]
+            self._entries.clear()
+    
+    def _bump(self, key):
+        """Mark values read before now as stale for key; caller holds the lock"""
+        self._generations[hash(key) % self.GENERATION_SLOTS] += 1
+    
+    def _live_entry(self, key):
+        """Return (expires_at, value) for an unexpired entry; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self) -> dict:
+        """Get size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+class SingleFlight:
+    """Coalesce concurrent identical computations onto one in-flight call"""
+    
+    def __init__(self):
+        self.executions = 0  # Computations actually started
+        self.shared = 0  # Callers that joined one already in flight
+        self._inflight = {}  # key -> asyncio.Future
+    
+    async def do(self, key, func, *args):
+        """Run func(*args) in a worker thread, unless the same key is already running.
+        
+        Every caller for the key awaits the same result (or exception). A caller
+        being cancelled does not cancel the shared computation.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            self.executions += 1
+            future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+class ResponseCache:
+    """Short-TTL cache of rendered payloads (e.g. embed dicts) behind a SingleFlight"""
+    
+    def __init__(self, ttl: float = 5.0, maxsize: int = 128):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.flight = SingleFlight()
+    
+    async def get(self, key, build, *args):
+        """Return the cached payload for key, building it at most once per burst.
+        
+        `build` runs in a worker thread; a None result is returned but not cached.
+        """
+        payload = self.cache.get(key)
+        if payload is None:
+            payload = await self.flight.do(key, build, *args)
+            if payload is not None:
+                self.cache.set(key, payload)
+        return payload
+    
+    def invalidate(self, key):
+        self.cache.invalidate(key)
+    
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        stats["executions"] = self.flight.executions
+        stats["shared"] = self.flight.shared
+        return stats
+
+# Rendered leaderboards and stats panels; a few seconds of staleness is fine for them
+response_cache = ResponseCache(ttl=float(os.getenv("RESPONSE_CACHE_TTL", "5")))
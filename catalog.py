@@ -0,0 +1,109 @@
+"""
+Course Catalog
+Paginated course listings with level filters; pages are split once per catalog
+generation and each page embed is rendered only when someone views it
+"""
+
+import threading
+import discord
+from cache import TTLCache
+from courses import COURSES, get_course_list
+from lesson_render import clone_embed
+
+# Courses per page; also bounded by the 25 options a select menu can hold
+CATALOG_PAGE_SIZE = 10
+DESCRIPTION_PREVIEW = 300
+LEVEL_ORDER = ("Beginner", "Intermediate", "Advanced", "Expert")
+
+# (CourseStore.generation, level) -> Catalog; a reload bumps the generation
+catalog_cache = TTLCache(maxsize=32, ttl=float("inf"))
+
+def _level_key(level: str):
+    """Sort known levels by difficulty, then anything else alphabetically"""
+    return (LEVEL_ORDER.index(level), "") if level in LEVEL_ORDER else (len(LEVEL_ORDER), level)
+
+def _preview(text: str, length: int = DESCRIPTION_PREVIEW) -> str:
+    return text if len(text) <= length else text[:length].rsplit(" ", 1)[0] + "…"
+
+class Catalog:
+    """The course list for one level filter, split into pages of CATALOG_PAGE_SIZE"""
+    
+    __slots__ = ("level", "levels", "level_counts", "total", "pages", "_payloads", "_lock")
+    
+    def __init__(self, courses: list, level: str = None):
+        self.level = level
+        self.level_counts = {}
+        for course in courses:
+            self.level_counts[course["level"]] = self.level_counts.get(course["level"], 0) + 1
+        self.levels = tuple(sorted(self.level_counts, key=_level_key))
+        
+        if level is not None:
+            courses = [course for course in courses if course["level"] == level]
+        self.total = len(courses)
+        self.pages = tuple(
+            tuple(courses[start:start + CATALOG_PAGE_SIZE])
+            for start in range(0, len(courses), CATALOG_PAGE_SIZE)
+        ) or ((),)
+        self._payloads = {}  # page -> embed dict, filled on first view
+        self._lock = threading.Lock()
+    
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+    
+    def clamp(self, page: int) -> int:
+        return max(0, min(page, len(self.pages) - 1))
+    
+    def summary(self) -> str:
+        """One line per level with its course count, for the /start welcome"""
+        return "\n".join(f"• **{level}:** {self.level_counts[level]} course(s)" for level in self.levels)
+    
+    def render_page(self, page: int) -> dict:
+        """Build the embed payload for one page"""
+        page = self.clamp(page)
+        courses = self.pages[page]
+        scope = f"{self.level} courses" if self.level else "courses"
+        if courses:
+            first = page * CATALOG_PAGE_SIZE + 1
+            description = f"Showing {first}–{first + len(courses) - 1} of {self.total} {scope}"
+        else:
+            description = f"No {scope} available yet"
+        
+        embed = discord.Embed(
+            title="📚 Course Catalog",
+            description=description,
+            color=0x0099FF
+        )
+        
+        for course in courses:
+            embed.add_field(
+                name=f"{course['id']}. {course['title']} ({course['level']})"[:256],
+                value=_preview(course["description"]) or "—",
+                inline=False
+            )
+        
+        footer = "Pick a course from the menu below to begin!"
+        if len(self.pages) > 1:
+            footer = f"Page {page + 1}/{len(self.pages)} • {footer}"
+        embed.set_footer(text=footer)
+        return embed.to_dict()
+    
+    def page_embed(self, page: int = 0) -> discord.Embed:
+        """Get a fresh Embed for one page, rendering it on first use"""
+        page = self.clamp(page)
+        payload = self._payloads.get(page)
+        if payload is None:
+            with self._lock:
+                payload = self._payloads.get(page)
+                if payload is None:
+                    payload = self._payloads[page] = self.render_page(page)
+        return clone_embed(payload)
+
+def get_catalog(level: str = None) -> Catalog:
+    """Get the cached catalog for a level filter (None for every level)"""
+    key = (COURSES.generation, level)
+    catalog = catalog_cache.get(key)
+    if catalog is None:
+        catalog = Catalog(get_course_list(), level)
+        catalog_cache.set(key, catalog)
+    return catalog
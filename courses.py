@@ -1,637 +1,507 @@
 """
 Cybersecurity Course Content - From Beginner to Intermediate
-Interactive, practical lessons with hands-on exercises
+Loads the per-course lesson files in content/courses, merges admin-authored content
+from the database over them and navigates between lessons
 """
 
-COURSES = {
-    1: {
-        "title": "🛡️ Cybersecurity Fundamentals",
-        "description": "Learn the basics of cybersecurity and develop a security mindset",
-        "level": "Beginner",
+import json
+import logging
+import os
+import re
+import threading
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Optional, Tuple
+from cache import TTLCache
+from database import db
+from curriculum import Course, CurriculumError, compile_course, merge_course
+
+logger = logging.getLogger("cyberbot.courses")
+
+# One JSON file per course, e.g. content/courses/course_01.json
+CONTENT_DIR = os.getenv("COURSE_CONTENT_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "content", "courses"
+)
+COURSE_FILE_PATTERN = re.compile(r"^course_(\d+)\.json$")
+
+def _read_course_file(path: str) -> dict:
+    """Raw JSON of a course file"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _outline(course: dict) -> dict:
+    """Titles and ids of a course, without lesson text"""
+    return {
+        "title": course["title"],
+        "description": course["description"],
+        "level": course["level"],
         "modules": {
-            1: {
-                "title": "Introduction to Cybersecurity",
+            module_id: {
+                "title": module.get("title"),
                 "lessons": {
-                    1: {
-                        "title": "What is Cybersecurity?",
-                        "content": """
-🔐 **Welcome to Cybersecurity!**
-
-Cybersecurity is like being a digital bodyguard - protecting information, systems, and networks from digital attacks.
-
-**Think of it this way:**
-• Your phone = Your house
-• Your apps = Rooms in your house  
-• Cybersecurity = Locks, alarms, and security cameras
-
-**Real-world example:** 
-When you use online banking, cybersecurity protects your money from digital thieves trying to steal it through the internet.
-
-**Why does it matter?**
-• 🏦 Protects your money and identity
-• 📱 Keeps your personal photos and messages safe
-• 💼 Secures business data and operations
-• 🌐 Maintains trust in digital services
-
-**Your mission:** Complete this lesson to earn your first 100 XP!
-                        """,
-                        "xp_reward": 100,
-                        "practical_exercise": {
-                            "title": "Security Mindset Challenge",
-                            "description": "Look around your digital life and identify 3 things you want to protect",
-                            "example_answers": ["Bank account", "Social media", "Email", "Photos", "Work files"]
-                        },
-                        "quiz": {
-                            "question": "What is the primary goal of cybersecurity?",
-                            "options": ["Making computers faster", "Protecting information and systems from digital attacks", "Creating new software", "Designing websites"],
-                            "correct": 1,
-                            "explanation": "Cybersecurity's main purpose is to protect information, systems, and networks from digital attacks, just like a digital bodyguard."
-                        }
-                    },
-                    2: {
-                        "title": "Common Cyber Threats",
-                        "content": """
-⚠️ **Know Your Digital Enemies**
-
-Just like in the real world, the digital world has different types of threats:
-
-**1. 🎣 Phishing (Digital Fishing)**
-• Fake emails/websites trying to steal your info
-• Example: "Your bank account is locked! Click here to unlock"
-• Reality: It's a trap to steal your login details
-
-**2. 🦠 Malware (Digital Viruses)**
-• Harmful software that damages your device
-• Types: Viruses, ransomware, spyware
-• Like getting your computer "sick"
-
-**3. 👤 Social Engineering (Digital Manipulation)**
-• Tricking people into giving away secrets
-• Example: Fake tech support calls
-• Uses psychology, not just technology
-
-**4. 🔓 Data Breaches (Digital Break-ins)**
-• When hackers break into company databases
-• Your personal info gets stolen in bulk
-• Like someone breaking into a filing cabinet
-
-**Real Example:** In 2017, Equifax was breached and 147 million people's personal data was stolen - including Social Security numbers!
-
-**Remember:** Knowing these threats is your first line of defense!
-                        """,
-                        "xp_reward": 150,
-                        "quiz": {
-                            "question": "Which threat involves tricking people psychologically rather than using technical methods?",
-                            "options": ["Malware", "Social Engineering", "Data Breach", "Phishing"],
-                            "correct": 1,
-                            "explanation": "Social Engineering uses psychological manipulation to trick people into revealing information or performing actions."
-                        }
-                    },
-                    3: {
-                        "title": "Building a Security Mindset",
-                        "content": """
-🧠 **Think Like a Security Expert**
-
-A security mindset means always thinking "What could go wrong?" and "How can I protect myself?"
-
-**The Security Mindset Principles:**
-
-**1. 🤔 Question Everything**
-• Is this email really from my bank?
-• Why is this app asking for my location?
-• Should I really click this link?
-
-**2. 🔒 Assume Breach**
-• What if someone gets my password?
-• How would I recover if my phone was stolen?
-• What's my backup plan?
-
-**3. 🎯 Think Like an Attacker**
-• How would someone try to trick me?
-• What information am I sharing publicly?
-• Where are my weak points?
-
-**Practical Exercise:**
-Look at your social media profiles. What could a cybercriminal learn about you?
-• Your birthday (for password guessing)
-• Your location (for targeted attacks)
-• Your friends/family (for social engineering)
-
-**Real-world Application:**
-Before posting "Going on vacation to Hawaii!" think: "Am I telling criminals my house will be empty?"
-
-**Your Challenge:** Practice the security mindset for one day. Question 3 things you normally wouldn't think twice about!
-                        """,
-                        "xp_reward": 200,
-                        "practical_exercise": {
-                            "title": "Security Mindset Practice",
-                            "description": "For the next 24 hours, question 3 digital activities you normally do without thinking",
-                            "examples": ["Why does this app need camera access?", "Is this WiFi network safe?", "Should I share this location?"]
-                        },
-                        "quiz": {
-                            "question": "What is the most important principle of a security mindset?",
-                            "options": ["Never use technology", "Question everything and think 'what could go wrong?'", "Only use expensive security software", "Avoid all social media"],
-                            "correct": 1,
-                            "explanation": "A security mindset means always questioning things and thinking about potential risks before acting, not avoiding technology entirely."
-                        }
-                    }
+                    lesson_id: {"title": lesson.get("title"), "prerequisites": lesson.get("prerequisites")}
+                    for lesson_id, lesson in module["lessons"].items()
                 }
             }
+            for module_id, module in course["modules"].items()
         }
-    },
-    2: {
-        "title": "🔐 Password Security Mastery",
-        "description": "Master the art of creating and managing secure passwords",
-        "level": "Beginner",
-        "modules": {
-            1: {
-                "title": "Password Fundamentals",
-                "lessons": {
-                    1: {
-                        "title": "Password Strength Secrets",
-                        "content": """
-💪 **What Makes a Password Strong?**
-
-Think of passwords like the locks on your house. A weak password is like a flimsy lock - easy to break!
-
-**The Password Strength Formula:**
-
-**Length > Complexity**
-• "ILovePizza123!" = Weak (predictable pattern)
-• "Coffee-Morning-Sunshine-2024" = Strong (long + unpredictable)
-
-**What Makes Passwords Weak:**
-• 🚫 Personal info (birthday, pet names)
-• 🚫 Dictionary words
-• 🚫 Common patterns (123456, qwerty)
-• 🚫 Short length (under 12 characters)
-
-**What Makes Passwords Strong:**
-• ✅ 12+ characters long
-• ✅ Mix of words, numbers, symbols
-• ✅ Unpredictable combinations
-• ✅ Unique for each account
-
-**The Passphrase Method:**
-Instead of "P@ssw0rd1" try "Purple-Elephant-Dancing-42"
-• Easier to remember
-• Harder to crack
-• More fun to create!
-
-**Real Example:**
-Bad: "Sarah1995!" (name + birth year)
-Good: "Midnight-Coffee-Tastes-Purple-77"
-
-**Your Mission:** Create a strong password using the passphrase method!
-                        """,
-                        "xp_reward": 150,
-                        "quiz": {
-                            "question": "Which password is stronger?",
-                            "options": ["P@ssw0rd123!", "Banana-Helicopter-Music-2024", "JohnSmith1990", "abc123"],
-                            "correct": 1,
-                            "explanation": "Long passphrases with random words are much stronger than short complex passwords with predictable patterns."
-                        }
-                    },
-                    2: {
-                        "title": "Password Managers: Your Digital Vault",
-                        "content": """
-🗝️ **Never Remember Another Password!**
-
-Password managers are like having a super-secure digital vault that remembers all your passwords for you.
-
-**How Password Managers Work:**
-1. You create ONE master password
-2. The manager generates unique, strong passwords for every site
-3. It automatically fills them in when you need them
-4. Everything is encrypted and secure
-
-**Popular Password Managers:**
-• **Bitwarden** (Free & Open Source)
-• **1Password** (Premium features)
-• **LastPass** (Freemium)
-• **Dashlane** (User-friendly)
-
-**Real-world Benefits:**
-• 🎯 Unique password for every account
-• 🚀 Faster login (auto-fill)
-• 🛡️ Protection against data breaches
-• 📱 Works across all your devices
-
-**The "Breach-Proof" Strategy:**
-When LinkedIn gets hacked and your password is stolen, it doesn't matter because:
-1. That password is unique to LinkedIn
-2. Your other accounts are still safe
-3. You can easily change just that one password
-
-**Practical Exercise:**
-Set up a password manager today and migrate your top 5 most important accounts (email, banking, social media).
-
-**Pro Tip:** Your master password should be a long, memorable passphrase that you'll never forget - like "My-Favorite-Coffee-Shop-Has-Purple-Chairs-2024"
-                        """,
-                        "xp_reward": 200,
-                        "practical_exercise": {
-                            "title": "Password Manager Setup",
-                            "description": "Install a password manager and secure your top 3 accounts with unique, strong passwords",
-                            "steps": ["Choose a password manager", "Create a strong master password", "Add your most important accounts"]
-                        },
-                        "quiz": {
-                            "question": "What is the main benefit of using a password manager?",
-                            "options": ["It makes your computer faster", "It allows you to use unique, strong passwords for every account", "It blocks all malware", "It makes websites load faster"],
-                            "correct": 1,
-                            "explanation": "Password managers allow you to use unique, strong passwords for every account without having to remember them all, significantly improving your security."
-                        }
-                    },
-                    3: {
-                        "title": "Two-Factor Authentication (2FA)",
-                        "content": """
-🔐 **Double Your Security Power!**
-
-2FA is like having two locks on your door instead of one. Even if someone steals your password, they still can't get in!
-
-**How 2FA Works:**
-1. **Something you know** (your password)
-2. **Something you have** (your phone/app)
-3. Both are required to log in
-
-**Types of 2FA:**
-
-**📱 Authenticator Apps (BEST)**
-• Google Authenticator, Authy, Microsoft Authenticator
-• Generates time-based codes
-• Works without internet
-
-**📧 Email Codes (OKAY)**
-• Code sent to your email
-• Better than nothing
-• Vulnerable if email is compromised
-
-**📞 SMS Codes (RISKY)**
-• Code sent via text message
-• Can be intercepted
-• Still better than no 2FA
-
-**🔑 Hardware Keys (ULTIMATE)**
-• Physical USB/NFC devices
-• Highest security level
-• Used by security professionals
-
-**Real-world Impact:**
-Google found that 2FA blocks 99.9% of automated attacks!
-
-**Where to Enable 2FA First:**
-1. 📧 Email accounts (Gmail, Outlook)
-2. 🏦 Banking and financial accounts
-3. 📱 Social media accounts
-4. 💼 Work accounts
-5. 🛒 Shopping accounts with saved payment info
+    }
 
-**Your Challenge:** Enable 2FA on your email account right now - it takes 2 minutes and dramatically improves your security!
-                        """,
-                        "xp_reward": 250,
-                        "quiz": {
-                            "question": "What percentage of automated attacks does 2FA block according to Google?",
-                            "options": ["50%", "75%", "90%", "99.9%"],
-                            "correct": 3,
-                            "explanation": "Google's research shows that 2FA blocks 99.9% of automated attacks, making it incredibly effective."
-                        }
-                    }
-                }
-            }
-        }
-    },
-    3: {
-        "title": "🎣 Phishing Defense Academy",
-        "description": "Learn to spot and avoid phishing attacks like a pro",
-        "level": "Beginner",
+def encode_outline(outline: dict) -> str:
+    """JSON for an outline; modules and lessons become lists so their ids stay integers"""
+    return json.dumps({
+        "title": outline["title"],
+        "description": outline["description"],
+        "level": outline["level"],
+        "modules": [
+            [module_id, module["title"], [
+                [lesson_id, lesson["title"], lesson["prerequisites"]]
+                for lesson_id, lesson in module["lessons"].items()
+            ]]
+            for module_id, module in outline["modules"].items()
+        ]
+    })
+
+def decode_outline(text: str) -> dict:
+    """Outline stored by encode_outline"""
+    data = json.loads(text)
+    return {
+        "title": data["title"],
+        "description": data["description"],
+        "level": data["level"],
         "modules": {
-            1: {
-                "title": "Phishing Detection Mastery",
+            module_id: {
+                "title": module_title,
                 "lessons": {
-                    1: {
-                        "title": "Anatomy of a Phishing Email",
-                        "content": """
-🕵️ **Become a Phishing Detective!**
-
-Phishing emails are like digital disguises - they pretend to be someone trustworthy to steal your information.
-
-**🚨 Red Flags to Watch For:**
-
-**1. Urgent Language**
-• "Your account will be closed in 24 hours!"
-• "Immediate action required!"
-• "Verify now or lose access!"
-
-**2. Generic Greetings**
-• "Dear Customer" instead of your actual name
-• "Dear Sir/Madam"
-• No personalization
-
-**3. Suspicious Sender**
-• amazon-security@gmail.com (not @amazon.com)
-• Misspelled company names
-• Random email addresses
-
-**4. Suspicious Links**
-• Hover over links to see the real destination
-• bit.ly/suspicious-link instead of official URLs
-• Misspelled domains (amazom.com instead of amazon.com)
-
-**5. Grammar and Spelling Errors**
-• Professional companies proofread their emails
-• Multiple typos = major red flag
-• Awkward phrasing
-
-**Real Phishing Example:**
-"Dear Valued Customer, Your PayPal account has been limited due to suspicious activity. Click here to verify: http://paypal-security.fake-site.com"
-
-**Red Flags Found:**
-• Generic greeting ❌
-• Urgent language ❌
-• Suspicious URL ❌
-• Creates fear ❌
-
-**Your Mission:** Practice identifying these red flags in every email you receive!
-                        """,
-                        "xp_reward": 175,
-                        "practical_exercise": {
-                            "title": "Phishing Email Analysis",
-                            "description": "Look at your recent emails and identify any that have phishing red flags",
-                            "red_flags": ["Urgent language", "Generic greetings", "Suspicious links", "Grammar errors", "Requests for personal info"]
-                        },
-                        "quiz": {
-                            "question": "Which of these is the BIGGEST red flag in a phishing email?",
-                            "options": ["Perfect grammar", "Using your real name", "Urgent language demanding immediate action", "Coming from a .com address"],
-                            "correct": 2,
-                            "explanation": "Urgent language that creates panic and demands immediate action is a classic phishing tactic designed to bypass your logical thinking."
-                        },
-                        "multimedia": {
-                            "has_content": True,
-                            "types": ["image", "interactive"],
-                            "description": "Interactive phishing email examples with red flag identification"
-                        }
-                    },
-                    2: {
-                        "title": "Social Engineering Tactics",
-                        "content": """
-🎭 **The Psychology of Deception**
-
-Social engineering is like being a con artist - attackers use psychology to manipulate you into giving them what they want.
-
-**Common Social Engineering Tactics:**
-
-**1. 😨 Fear and Urgency**
-• "Your computer is infected! Call now!"
-• "Suspicious login detected!"
-• Creates panic to bypass logical thinking
-
-**2. 🎁 Too Good to Be True**
-• "You've won $1,000,000!"
-• "Free iPhone - just pay shipping!"
-• Exploits greed and excitement
-
-**3. 👔 Authority Impersonation**
-• "This is IT support, we need your password"
-• "IRS calling about unpaid taxes"
-• People naturally obey authority figures
-
-**4. 🤝 Trust and Familiarity**
-• "Hi, I'm calling from your bank..."
-• Using information from social media
-• Building fake relationships
-
-**5. 💔 Emotional Manipulation**
-• Fake charity appeals
-• Romance scams
-• Exploiting empathy and kindness
-
-**Real-world Example:**
-Scammer calls pretending to be your grandchild: "Grandma, I'm in jail and need bail money. Please don't tell my parents!"
-
-**Defense Strategy - The STOP Method:**
-• **S**top and think
-• **T**ake a breath
-• **O**bserve red flags
-• **P**roceed with caution (or not at all)
-
-**Your Challenge:** Next time someone asks for personal information (even if they seem legitimate), use the STOP method!
-                        """,
-                        "xp_reward": 200,
-                        "quiz": {
-                            "question": "What should you do when someone creates urgency to get you to act quickly?",
-                            "options": ["Act immediately to avoid problems", "Use the STOP method", "Give them what they want", "Ignore them completely"],
-                            "correct": 1,
-                            "explanation": "The STOP method helps you pause and think rationally when someone is trying to create urgency to manipulate you."
-                        }
-                    },
-                    3: {
-                        "title": "Safe Browsing Practices",
-                        "content": """
-🌐 **Navigate the Web Like a Security Pro**
-
-The internet is like a big city - there are safe neighborhoods and dangerous ones. Learn to stay in the safe areas!
-
-**🛡️ Safe Browsing Rules:**
-
-**1. Check the Lock (HTTPS)**
-• Look for 🔒 in the address bar
-• URL starts with "https://" not "http://"
-• Especially important for login pages and shopping
-
-**2. Verify Website URLs**
-• amazon.com ✅ vs amazom.com ❌
-• paypal.com ✅ vs paypaI.com ❌ (that's an "i" not "l")
-• When in doubt, type the URL manually
-
-**3. Be Suspicious of Pop-ups**
-• "Your computer is infected!" = Fake
-• "You've won a prize!" = Scam
-• Close pop-ups with the X button, never click inside them
-
-**4. Download Safely**
-• Only download from official websites
-• Avoid "free" versions of paid software
-• Scan downloads with antivirus
-
-**5. Use Reputable Browsers**
-• Chrome, Firefox, Safari, Edge
-• Keep them updated
-• Use ad blockers to reduce malicious ads
-
-**Browser Security Features:**
-• **Safe Browsing** - Warns about dangerous sites
-• **Pop-up Blocker** - Stops annoying/malicious pop-ups
-• **Password Manager** - Built-in password storage
-• **Private/Incognito Mode** - Doesn't save browsing history
-
-**Red Flag Websites:**
-• Excessive pop-ups and ads
-• Poor design and grammar
-• Requests for unnecessary personal information
-• No contact information or privacy policy
-• Too-good-to-be-true offers
-
-**Your Mission:** Check your browser's security settings and enable safe browsing features!
-                        """,
-                        "xp_reward": 225,
-                        "practical_exercise": {
-                            "title": "Browser Security Audit",
-                            "description": "Check and enable security features in your web browser",
-                            "checklist": ["Enable safe browsing", "Turn on pop-up blocker", "Update browser", "Install ad blocker", "Check privacy settings"]
-                        },
-                        "quiz": {
-                            "question": "What does the 🔒 lock icon in your browser's address bar indicate?",
-                            "options": ["The website is popular", "The connection is encrypted (HTTPS)", "The website is free", "The website loads faster"],
-                            "correct": 1,
-                            "explanation": "The lock icon indicates that your connection to the website is encrypted using HTTPS, making it much safer for transmitting sensitive information."
-                        }
+                    lesson_id: {
+                        "title": title,
+                        "prerequisites": tuple(map(tuple, prerequisites)) if prerequisites is not None else None
                     }
+                    for lesson_id, title, prerequisites in lessons
                 }
             }
+            for module_id, module_title, lessons in data["modules"]
         }
-    },
-    4: {
-        "title": "🌐 Network Security Basics",
-        "description": "Understand networks and protect your connections",
-        "level": "Intermediate",
-        "modules": {
-            1: {
-                "title": "Understanding Networks",
-                "lessons": {
-                    1: {
-                        "title": "How Networks Work",
-                        "content": """
-🔗 **The Digital Highway System**
-
-Networks are like roads that connect different places. Understanding how they work helps you travel safely!
-
-**Network Basics:**
-
-**What is a Network?**
-• A system that connects devices together
-• Allows sharing of information and resources
-• Like a postal system for digital messages
-
-**Types of Networks:**
-
-**🏠 Home Network (LAN - Local Area Network)**
-• Your WiFi router connects all your devices
-• Printer, laptop, phone, smart TV all connected
-• Private and controlled by you
-
-**🌍 Internet (WAN - Wide Area Network)**
-• Global network connecting millions of devices
-• Public and shared by everyone
-• Requires security measures
-
-**☁️ Cloud Networks**
-• Remote servers you access over the internet
-• Google Drive, Netflix, email services
-• Your data stored on someone else's computers
-
-**How Data Travels:**
-1. Your device sends a request
-2. Router forwards it to your ISP
-3. ISP routes it across the internet
-4. Destination server receives and responds
-5. Response travels back the same way
-
-**Network Security Concerns:**
-• **Eavesdropping** - Someone listening to your traffic
-• **Man-in-the-Middle** - Someone intercepting your communications
-• **Unauthorized Access** - Strangers using your network
-
-**Real-world Analogy:**
-Sending data is like mailing a postcard - anyone handling it can read it unless you put it in an envelope (encryption)!
-                        """,
-                        "xp_reward": 200,
-                        "quiz": {
-                            "question": "What does LAN stand for?",
-                            "options": ["Large Area Network", "Local Area Network", "Limited Access Network", "Long Access Network"],
-                            "correct": 1,
-                            "explanation": "LAN stands for Local Area Network - a network that connects devices in a small area like your home or office."
-                        }
-                    },
-                    2: {
-                        "title": "WiFi Security Essentials",
-                        "content": """
-📶 **Secure Your Wireless World**
-
-WiFi is like having an invisible cable connecting your devices. But if not secured properly, anyone can tap into that cable!
-
-**WiFi Security Standards:**
-
-**🔐 WPA3 (Best)**
-• Latest and strongest encryption
-• Protects against most attacks
-• Use this if available
-
-**🔒 WPA2 (Good)**
-• Still secure for most users
-• Widely supported
-• Minimum acceptable standard
-
-**⚠️ WEP (Dangerous)**
-• Old and easily cracked
-• Never use this
-• Can be broken in minutes
-
-**🚫 Open/No Security (Never!)**
-• No encryption at all
-• Anyone can see your traffic
-• Only use for guest access
-
-**Securing Your Home WiFi:**
-
-**1. Change Default Passwords**
-• Router admin password
-• WiFi network password
-• Use strong, unique passwords
-
-**2. Update Router Firmware**
-• Fixes security vulnerabilities
-• Check manufacturer's website
-• Enable automatic updates if available
-
-**3. Use Strong Network Names**
-• Avoid personal information
-• "Smith_Family_WiFi" reveals too much
-• "Network_2024" is better
-
-**4. Enable Guest Networks**
-• Separate network for visitors
-• Protects your main devices
-• Can be turned off when not needed
-
-**5. Disable WPS**
-• WiFi Protected Setup has vulnerabilities
-• Turn it off in router settings
-• Use manual password entry instead
-
-**Public WiFi Safety:**
-• Never access sensitive accounts
-• Use your phone's hotspot instead
-• If you must use public WiFi, use a VPN
+    }
 
-**Your Mission:** Check your home WiFi security settings and upgrade to WPA3 if possible!
-                        """,
-                        "xp_reward": 250,
-                        "practical_exercise": {
-                            "title": "WiFi Security Audit",
-                            "description": "Check and improve your home WiFi security settings",
-                            "steps": ["Check WiFi encryption type", "Change default passwords", "Update router firmware", "Set up guest network", "Disable WPS"]
-                        },
-                        "quiz": {
-                            "question": "Which WiFi security standard is the strongest and most secure?",
-                            "options": ["WEP", "WPA", "WPA2", "WPA3"],
-                            "correct": 3,
-                            "explanation": "WPA3 is the latest and strongest WiFi security standard, providing the best protection against attacks."
-                        }
-                    }
-                }
-            }
+class CourseStore(Mapping):
+    """Course content read lazily from per-course JSON files plus authored overlays.
+    
+    Parsed courses live in a bounded LRU cache, while a small outline (titles
+    and ids) is kept for every course so listings and the curriculum index do
+    not need the full text. reload_changed() swaps edited files in atomically;
+    reload_course() applies admin edits stored through the `authored` source.
+    Outlines are persisted through `outline_store`, so after a restart they are
+    served without parsing files that have not changed since.
+    """
+    
+    def __init__(self, directory: str = CONTENT_DIR, cache_size: int = 32, authored=None, outline_store=None):
+        self.directory = directory
+        self.authored = authored  # get_authored_course_ids()/get_authored_course(id) provider, e.g. the database
+        self.outline_store = outline_store  # get_course_outlines()/save_course_outline(...) provider, e.g. the database
+        self.cache = TTLCache(maxsize=cache_size, ttl=float("inf"))
+        self.generation = 0  # Bumped whenever a course is added, edited or removed
+        self.authoring_errors = {}  # course_id -> why its authored changes are not being served
+        self._files = None  # course_id -> path, scanned on first access
+        self._authored_ids = None  # ids of courses that exist only as authored content
+        self._stamps = {}  # course_id -> (file st_mtime_ns, authored revision) last parsed
+        self._versions = {}  # course_id -> content version, bumped on every change
+        self._outlines = {}
+        self._stored_outlines = None  # course_id -> row from outline_store, read once and used up
+        self._reload_listeners = []
+        self._lock = threading.RLock()
+    
+    def _scan(self) -> dict:
+        files = {}
+        for name in os.listdir(self.directory):
+            match = COURSE_FILE_PATTERN.match(name)
+            if match:
+                files[int(match.group(1))] = os.path.join(self.directory, name)
+        return files
+    
+    def _course_files(self) -> dict:
+        if self._files is None:
+            with self._lock:
+                if self._files is None:
+                    self._files = self._scan()
+        return self._files
+    
+    def _authored_course_ids(self) -> frozenset:
+        if self._authored_ids is None:
+            with self._lock:
+                if self._authored_ids is None:
+                    ids = self.authored.get_authored_course_ids() if self.authored else ()
+                    self._authored_ids = frozenset(ids)
+        return self._authored_ids
+    
+    def _course_ids(self) -> set:
+        return self._course_files().keys() | self._authored_course_ids()
+    
+    def _parse(self, course_id: int, path: Optional[str]):
+        """Read a course file and lay its authored changes over it, returning (course, stamp).
+        
+        Authored changes that do not validate are logged in authoring_errors and
+        the file content is served on its own.
+        """
+        mtime = os.stat(path).st_mtime_ns if path else 0
+        base = _read_course_file(path) if path else None
+        authored = self.authored.get_authored_course(course_id) if self.authored else None
+        if authored is None:
+            self.authoring_errors.pop(course_id, None)
+            return compile_course(course_id, base), (mtime, 0)
+        
+        revision, overlay = authored
+        try:
+            course = compile_course(course_id, merge_course(base, overlay))
+        except CurriculumError as e:
+            if base is None:
+                raise
+            logger.error(f"Ignoring authored changes to course {course_id}: {e}")
+            self.authoring_errors[course_id] = str(e)
+            return compile_course(course_id, base), (mtime, revision)
+        self.authoring_errors.pop(course_id, None)
+        return course, (mtime, revision)
+    
+    def _publish(self, course_id: int, course: Course, stamp: tuple, path: Optional[str]):
+        """Make a parsed course visible to readers; caller holds the lock"""
+        outline = _outline(course)
+        if self._stamps.get(course_id) != stamp:
+            if course_id in self._stamps:
+                self.generation += 1
+            self._versions[course_id] = self._versions.get(course_id, 0) + 1
+            self._stamps[course_id] = stamp
+            if self.outline_store is not None:
+                self.outline_store.save_course_outline(course_id, path, *stamp, encode_outline(outline))
+        self._outlines[course_id] = outline
+        self.cache.set(course_id, course)
+    
+    def _stored_outline(self, course_id: int) -> Optional[dict]:
+        """Adopt the persisted outline of a course whose file and authored revision are unchanged; caller holds the lock"""
+        if self.outline_store is None or course_id in self._stamps:
+            return None
+        if self._stored_outlines is None:
+            self._stored_outlines = self.outline_store.get_course_outlines()
+        stored = self._stored_outlines.pop(course_id, None)
+        if stored is None:
+            return None
+        
+        stored_path, mtime, revision, current_revision, text = stored
+        path = self._course_files().get(course_id)
+        try:
+            current_mtime = os.stat(path).st_mtime_ns if path else 0
+            if (stored_path, mtime, revision) != (path, current_mtime, current_revision):
+                return None
+            outline = decode_outline(text)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring stored outline of course {course_id}: {e}")
+            return None
+        
+        self._versions[course_id] = self._versions.get(course_id, 0) + 1
+        self._stamps[course_id] = (mtime, revision)
+        self._outlines[course_id] = outline
+        return outline
+    
+    def _drop(self, course_id: int):
+        """Forget a course that no longer exists; caller holds the lock"""
+        self.cache.invalidate(course_id)
+        self._outlines.pop(course_id, None)
+        self._stamps.pop(course_id, None)
+    
+    def __getitem__(self, course_id: int) -> Course:
+        course = self.cache.get(course_id)
+        if course is not None:
+            return course
+        
+        with self._lock:
+            if course_id not in self._course_ids():
+                raise KeyError(course_id)
+            path = self._course_files().get(course_id)
+            try:
+                course, stamp = self._parse(course_id, path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Could not load course {course_id} from {path or 'authored content'}: {e}")
+                raise KeyError(course_id) from e
+            self._publish(course_id, course, stamp, path)
+            return course
+    
+    def __contains__(self, course_id) -> bool:
+        return course_id in self._course_files() or course_id in self._authored_course_ids()
+    
+    def __iter__(self):
+        return iter(sorted(self._course_ids()))
+    
+    def __len__(self) -> int:
+        return len(self._course_ids())
+    
+    def version(self, course_id: int) -> int:
+        """Content version of a course, bumped every time its file or authored content changes"""
+        return self._versions.get(course_id, 0)
+    
+    def outline(self, course_id: int) -> Optional[dict]:
+        """Titles and ids of a course, from the outline store or by loading it once if needed"""
+        outline = self._outlines.get(course_id)
+        if outline is not None or course_id not in self:
+            return outline
+        
+        with self._lock:
+            outline = self._outlines.get(course_id) or self._stored_outline(course_id)
+        if outline is None and self.get(course_id) is not None:
+            outline = self._outlines.get(course_id)
+        return outline
+    
+    def outlines(self) -> dict:
+        """Outlines of every course that loads"""
+        outlines = {}
+        for course_id in self:
+            outline = self.outline(course_id)
+            if outline is not None:
+                outlines[course_id] = outline
+        return outlines
+    
+    def add_reload_listener(self, callback):
+        """Call callback(changed_course_ids) after reload_changed or reload_course swaps in new content"""
+        self._reload_listeners.append(callback)
+    
+    def _notify(self, changed: list):
+        for callback in self._reload_listeners:
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Course reload listener {callback!r} failed: {e}")
+    
+    def reload_changed(self) -> list:
+        """Re-read added, edited or deleted course files and return their ids.
+        
+        Files are parsed before anything is swapped, so a file that fails to
+        parse (e.g. half-saved) keeps serving its previous content.
+        """
+        with self._lock:
+            old_files = self._course_files()
+            files = self._scan()
+            authored_ids = self._authored_course_ids()
+            changed = []
+            
+            for course_id in sorted(set(old_files) | set(files)):
+                if course_id not in files and course_id not in authored_ids:
+                    self._drop(course_id)
+                    changed.append(course_id)
+                    continue
+                
+                known = course_id in old_files
+                path = files.get(course_id)
+                try:
+                    mtime = os.stat(path).st_mtime_ns if path else 0
+                    stamp = self._stamps.get(course_id)
+                    if known and (stamp is None or stamp[0] == mtime):
+                        continue  # Unchanged, or never loaded and will be read fresh
+                    course, stamp = self._parse(course_id, path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f"Keeping previous content for course {course_id}: {e}")
+                    if known and path:
+                        files[course_id] = old_files[course_id]
+                    else:
+                        files.pop(course_id, None)
+                    continue
+                
+                self._publish(course_id, course, stamp, path)
+                changed.append(course_id)
+            
+            self._files = files
+            if changed:
+                self.generation += 1
+        
+        if changed:
+            self._notify(changed)
+        return changed
+    
+    def reload_course(self, course_id: int) -> bool:
+        """Re-read one course after its authored content changed and notify listeners.
+        
+        Returns False if the changes are not being served: the course has no
+        lessons yet, or it failed validation (see authoring_errors).
+        """
+        with self._lock:
+            self._authored_ids = None
+            if course_id not in self._course_ids():
+                return False
+            path = self._course_files().get(course_id)
+            try:
+                course, stamp = self._parse(course_id, path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Keeping previous content for course {course_id}: {e}")
+                self.authoring_errors[course_id] = str(e)
+                return False
+            self._publish(course_id, course, stamp, path)
+            self.generation += 1
+        
+        self._notify([course_id])
+        return course_id not in self.authoring_errors
+
+COURSES = CourseStore(cache_size=int(os.getenv("COURSE_CACHE_SIZE", "32")), authored=db, outline_store=db)
+
+class CurriculumIndex:
+    """Flattened, read-only lesson ordering built once from a courses mapping.
+    
+    Every lesson gets a global ordinal in (course, module, lesson) id order, so
+    next/previous, "lesson N of M" and per-course counts are single lookups.
+    """
+    
+    __slots__ = ("lessons", "ordinals", "course_counts", "module_counts", "course_starts", "generation", "versions")
+    
+    def __init__(self, courses, generation: int = 0, versions: Optional[dict] = None):
+        segments = {course_id: self._course_lessons(course_id, courses[course_id]) for course_id in courses}
+        self._build(segments, generation, versions or {})
+    
+    @staticmethod
+    def _course_lessons(course_id: int, course) -> tuple:
+        modules = course.get("modules", {})
+        return tuple(
+            (course_id, module_id, lesson_id)
+            for module_id in sorted(modules)
+            for lesson_id in sorted(modules[module_id].get("lessons", {}))
+        )
+    
+    def _build(self, segments: dict, generation: int, versions: dict):
+        """Lay out per-course lesson tuples in course order"""
+        self.generation = generation  # CourseStore.generation this index was built from
+        self.versions = MappingProxyType(versions)  # course_id -> CourseStore.version its lessons came from
+        lessons = []
+        starts = {}
+        for course_id in sorted(segments):
+            if segments[course_id]:
+                starts[course_id] = len(lessons)  # Ordinal of the course's first lesson
+                lessons.extend(segments[course_id])
+        
+        self.lessons = tuple(lessons)  # ordinal -> (course_id, module_id, lesson_id)
+        self.ordinals = MappingProxyType({ids: ordinal for ordinal, ids in enumerate(lessons)})
+        self.course_counts = MappingProxyType({course_id: len(segments[course_id]) for course_id in starts})
+        self.module_counts = MappingProxyType(Counter(ids[:2] for ids in lessons))
+        self.course_starts = MappingProxyType(starts)
+    
+    def replace_courses(self, courses: dict, generation: int, versions: Optional[dict] = None) -> "CurriculumIndex":
+        """A new index with some courses' lessons swapped in (None drops a course).
+        
+        Every other course keeps its existing entries, so its outline is not re-read.
+        """
+        merged = dict(self.versions)
+        merged.update(versions or {})
+        segments = {
+            course_id: self.lessons[start:start + self.course_counts[course_id]]
+            for course_id, start in self.course_starts.items()
         }
-    }
-}
+        for course_id, course in courses.items():
+            if course is None:
+                segments.pop(course_id, None)
+                merged.pop(course_id, None)
+            else:
+                segments[course_id] = self._course_lessons(course_id, course)
+        index = CurriculumIndex.__new__(CurriculumIndex)
+        index._build(segments, generation, merged)
+        return index
+    
+    def __len__(self):
+        return len(self.lessons)
+    
+    def ordinal(self, course_id: int, module_id: int, lesson_id: int) -> Optional[int]:
+        return self.ordinals.get((course_id, module_id, lesson_id))
+    
+    def at(self, ordinal: int) -> Optional[Tuple[int, int, int]]:
+        """Ids of the lesson at a global ordinal"""
+        if 0 <= ordinal < len(self.lessons):
+            return self.lessons[ordinal]
+        return None
+    
+    def next(self, course_id: int, module_id: int, lesson_id: int) -> Optional[Tuple[int, int, int]]:
+        """Ids of the following lesson; unknown ids resolve to the next lesson after them"""
+        ordinal = self.ordinal(course_id, module_id, lesson_id)
+        if ordinal is None:
+            ordinal = bisect_right(self.lessons, (course_id, module_id, lesson_id)) - 1
+        return self.at(ordinal + 1)
+    
+    def previous(self, course_id: int, module_id: int, lesson_id: int) -> Optional[Tuple[int, int, int]]:
+        """Ids of the preceding lesson"""
+        ordinal = self.ordinal(course_id, module_id, lesson_id)
+        if ordinal is None:
+            ordinal = bisect_right(self.lessons, (course_id, module_id, lesson_id))
+        return self.at(ordinal - 1) if ordinal > 0 else None
+    
+    def position_in_course(self, course_id: int, module_id: int, lesson_id: int) -> Optional[Tuple[int, int]]:
+        """(N, M) for "lesson N of M" within the lesson's course"""
+        ordinal = self.ordinal(course_id, module_id, lesson_id)
+        if ordinal is None:
+            return None
+        return ordinal - self.course_starts[course_id] + 1, self.course_counts[course_id]
+
+_curriculum_index = None
+
+def _course_outlines(course_ids) -> Tuple[dict, dict]:
+    """(outlines, versions) of some courses; courses that are gone or do not load get a None outline and no version"""
+    outlines = {}
+    versions = {}
+    for course_id in course_ids:
+        with COURSES._lock:  # A reload cannot slip in between an outline and its version
+            outlines[course_id] = COURSES.outline(course_id)
+            if outlines[course_id] is not None:
+                versions[course_id] = COURSES.version(course_id)
+    return outlines, versions
+
+def get_curriculum_index() -> CurriculumIndex:
+    """Get the lesson ordering index, splicing in only the courses that changed since it was built"""
+    global _curriculum_index
+    index = _curriculum_index
+    if index is None:
+        generation = COURSES.generation
+        outlines, versions = _course_outlines(list(COURSES))
+        courses = {course_id: outline for course_id, outline in outlines.items() if outline is not None}
+        index = _curriculum_index = CurriculumIndex(courses, generation, versions)
+    elif index.generation != COURSES.generation:
+        generation = COURSES.generation
+        course_ids = set(COURSES)
+        changed = [course_id for course_id in course_ids if COURSES.version(course_id) != index.versions.get(course_id)]
+        changed.extend(course_id for course_id in index.versions if course_id not in course_ids)
+        outlines, versions = _course_outlines(changed)
+        index = _curriculum_index = index.replace_courses(outlines, generation, versions)
+    return index
+
+def _update_curriculum_index(course_ids):
+    """Splice reloaded courses into the current index instead of rebuilding it"""
+    global _curriculum_index
+    index = _curriculum_index
+    if index is not None:
+        generation = COURSES.generation
+        outlines, versions = _course_outlines(course_ids)
+        _curriculum_index = index.replace_courses(outlines, generation, versions)
+
+COURSES.add_reload_listener(_update_curriculum_index)
+
+_completion_masks = None  # (CurriculumIndex, all-lessons slot mask, course_id -> slot mask)
+
+def get_completion_masks() -> Tuple[int, dict]:
+    """Masks over completion-bitset slots for the current lessons, overall and per course"""
+    global _completion_masks
+    index = get_curriculum_index()
+    cached = _completion_masks
+    if cached is None or cached[0] is not index:
+        slots = db.assign_lesson_slots(index.lessons)
+        everything = 0
+        by_course = {}
+        missing = 0
+        for ids in index.lessons:
+            slot = slots.get(ids)
+            if slot is None:
+                missing += 1
+            else:
+                everything |= 1 << slot
+                by_course[ids[0]] = by_course.get(ids[0], 0) | 1 << slot
+        cached = (index, everything, by_course)
+        if missing:
+            # The database call failed (it returns {}); serve these masks but retry next time
+            logger.warning(f"{missing} lesson(s) have no completion slot yet; not caching completion masks")
+        else:
+            _completion_masks = cached
+    return cached[1], cached[2]
 
 def get_course(course_id: int):
     """Get course by ID"""
@@ -646,9 +516,9 @@ def get_module(course_id: int, module_id: int):
 
 def get_lesson(course_id: int, module_id: int, lesson_id: int):
     """Get lesson by course, module, and lesson ID"""
-    module = get_module(course_id, module_id)
-    if module:
-        return module.get("lessons", {}).get(lesson_id)
+    course = COURSES.get(course_id)
+    if course:
+        return course.lesson(module_id, lesson_id)
     return None
 
 def get_all_courses():
@@ -658,7 +528,7 @@ def get_all_courses():
 def get_course_list():
     """Get simplified course list for display"""
     course_list = []
-    for course_id, course in COURSES.items():
+    for course_id, course in COURSES.outlines().items():
         course_list.append({
             "id": course_id,
             "title": course["title"],
@@ -669,23 +539,24 @@ def get_course_list():
 
 def get_next_lesson(course_id: int, module_id: int, lesson_id: int):
     """Get the next lesson in sequence"""
-    course = get_course(course_id)
-    if not course:
+    if course_id not in COURSES:
         return None
-    
-    # Try next lesson in current module
-    next_lesson = get_lesson(course_id, module_id, lesson_id + 1)
-    if next_lesson:
-        return (course_id, module_id, lesson_id + 1)
-    
-    # Try first lesson of next module
-    next_module = get_module(course_id, module_id + 1)
-    if next_module:
-        return (course_id, module_id + 1, 1)
-    
-    # Try first lesson of next course
-    next_course = get_course(course_id + 1)
-    if next_course:
-        return (course_id + 1, 1, 1)
-    
-    return None  # No more lessons
+    return get_curriculum_index().next(course_id, module_id, lesson_id)
+
+def get_previous_lesson(course_id: int, module_id: int, lesson_id: int):
+    """Get the previous lesson in sequence"""
+    if course_id not in COURSES:
+        return None
+    return get_curriculum_index().previous(course_id, module_id, lesson_id)
+
+def get_lesson_position(course_id: int, module_id: int, lesson_id: int):
+    """Get (N, M) for "lesson N of M" within a course, or None for unknown lessons"""
+    return get_curriculum_index().position_in_course(course_id, module_id, lesson_id)
+
+def count_course_lessons(course_id: int) -> int:
+    """Get the number of lessons in a course"""
+    return get_curriculum_index().course_counts.get(course_id, 0)
+
+def count_module_lessons(course_id: int, module_id: int) -> int:
+    """Get the number of lessons in a module"""
+    return get_curriculum_index().module_counts.get((course_id, module_id), 0)
@@ -3,11 +3,14 @@ CTF (Capture The Flag) Challenge System
 Advanced cybersecurity challenges for experienced users
 """
 
+import asyncio
 import discord
-from discord.ui import Button, View, Modal, TextInput
+from discord.ui import Button, DynamicItem, View, Modal, TextInput
 import random
 from database import db
+from cache import response_cache
 from achievements import achievement_manager
+from persistent import OwnedItem, persistent
 
 # CTF Challenge Categories
 CTF_CATEGORIES = {
@@ -31,7 +34,8 @@ CTF_CHALLENGES = [
         "description": "Decode this Base64 string: `Q3liZXJTZWN1cml0eUJvdA==`",
         "flag": "CyberSecurityBot",
         "hints": "Base64 is a common encoding method. Try using an online decoder or command line tools.",
-        "required_xp": 500
+        "required_xp": 500,
+        "prerequisites": ["1.1.2"]
     },
     {
         "name": "Caesar's Secret",
@@ -41,7 +45,8 @@ CTF_CHALLENGES = [
         "description": "Julius Caesar used this cipher: `FBOHU{FDHVDU_FLSKHU_LV_HDV}`",
         "flag": "CYBER{CAESAR_CIPHER_IS_EAS}",
         "hints": "Caesar cipher shifts letters by a fixed number. Try different shift values.",
-        "required_xp": 750
+        "required_xp": 750,
+        "prerequisites": ["1.1.3"]
     },
     {
         "name": "Hidden in Plain Sight",
@@ -51,7 +56,8 @@ CTF_CHALLENGES = [
         "description": "Look carefully at this text: `The flag is hidden in Every Very Easy Riddle You Tackle Here In New Games`",
         "flag": "EVERYTHING",
         "hints": "Sometimes the answer is in the first letter of each word.",
-        "required_xp": 1000
+        "required_xp": 1000,
+        "prerequisites": []
     },
     {
         "name": "SQL Injection Basics",
@@ -61,7 +67,8 @@ CTF_CHALLENGES = [
         "description": "What SQL injection payload would bypass this login? `SELECT * FROM users WHERE username='$input' AND password='$pass'`",
         "flag": "' OR '1'='1",
         "hints": "Think about how to make the WHERE clause always true.",
-        "required_xp": 1200
+        "required_xp": 1200,
+        "prerequisites": ["1.1.2"]
     },
     {
         "name": "Network Detective",
@@ -71,7 +78,8 @@ CTF_CHALLENGES = [
         "description": "What port is commonly used for HTTPS traffic?",
         "flag": "443",
         "hints": "HTTP uses port 80, but what about its secure version?",
-        "required_xp": 800
+        "required_xp": 800,
+        "prerequisites": ["4.1.1"]
     },
     {
         "name": "Hash Cracker",
@@ -81,7 +89,8 @@ CTF_CHALLENGES = [
         "description": "Crack this MD5 hash: `5d41402abc4b2a76b9719d911017c592`",
         "flag": "hello",
         "hints": "This is a common word. Try a dictionary attack or online hash crackers.",
-        "required_xp": 1500
+        "required_xp": 1500,
+        "prerequisites": ["2.1.1"]
     },
     {
         "name": "OSINT Investigation",
@@ -91,7 +100,8 @@ CTF_CHALLENGES = [
         "description": "What is the most common password used in data breaches according to security reports?",
         "flag": "123456",
         "hints": "Look up recent security reports about the most common passwords.",
-        "required_xp": 2000
+        "required_xp": 2000,
+        "prerequisites": ["3.1.2"]
     },
     {
         "name": "Binary Puzzle",
@@ -101,7 +111,8 @@ CTF_CHALLENGES = [
         "description": "Convert this binary to ASCII: `01000011 01011001 01000010 01000101 01010010`",
         "flag": "CYBER",
         "hints": "Each 8-bit binary number represents one ASCII character.",
-        "required_xp": 2500
+        "required_xp": 2500,
+        "prerequisites": []
     }
 ]
 
@@ -123,7 +134,7 @@ class CTFSubmissionModal(Modal):
         submitted_flag = self.flag_input.value.strip()
         
         # Submit flag to database
-        is_correct, points = db.submit_ctf_flag(user_id, self.challenge_id, submitted_flag)
+        is_correct, points = await db.run(db.submit_ctf_flag, user_id, self.challenge_id, submitted_flag)
         
         if is_correct:
             embed = discord.Embed(
@@ -133,7 +144,8 @@ class CTFSubmissionModal(Modal):
             )
             
             # Check for achievements
-            new_achievements = achievement_manager.check_and_award_achievements(user_id, "ctf_solve")
+            new_achievements = await asyncio.to_thread(achievement_manager.check_and_award_achievements,
+                                                       user_id, "ctf_solve")
             if new_achievements:
                 achievement_text = "\n".join([f"🏆 {ach['name']}" for ach in new_achievements])
                 embed.add_field(
@@ -155,89 +167,71 @@ class CTFSubmissionModal(Modal):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class CTFChallengeView(View):
-    def __init__(self, challenge_data: dict, user_id: int):
-        super().__init__(timeout=300)
-        self.challenge_data = challenge_data
+@persistent
+class CTFChallengeButton(OwnedItem, DynamicItem[Button],
+                         template=r"ctf:(?P<action>flag|hint|stop):(?P<user>\d+):(?P<challenge>\d+)"):
+    """A button of a CTF challenge message"""
+    
+    denied_message = "❌ This isn't your challenge! Use `/ctf` to start your own."
+    
+    def __init__(self, action: str, user_id: int, challenge_id: int, label: str, style, emoji: str):
+        self.action = action
         self.user_id = user_id
-        
-        # Add submit flag button
-        submit_button = Button(
-            label="Submit Flag",
-            style=discord.ButtonStyle.primary,
-            emoji="🚩"
-        )
-        submit_button.callback = self.submit_flag
-        self.add_item(submit_button)
-        
-        # Add hint button
-        hint_button = Button(
-            label="Get Hint",
-            style=discord.ButtonStyle.secondary,
-            emoji="💡"
-        )
-        hint_button.callback = self.show_hint
-        self.add_item(hint_button)
-        
-        # Add stop & save button
-        stop_button = Button(
-            label="⏸️ Stop & Save",
-            style=discord.ButtonStyle.danger,
-            emoji="⏸️"
-        )
-        stop_button.callback = self.stop_ctf
-        self.add_item(stop_button)
+        self.challenge_id = challenge_id
+        super().__init__(Button(
+            label=label,
+            style=style,
+            emoji=emoji,
+            custom_id=f"ctf:{action}:{user_id}:{challenge_id}"
+        ))
     
-    async def submit_flag(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message(
-                "❌ This isn't your challenge! Use `/ctf` to start your own.",
-                ephemeral=True
-            )
-            return
-        
-        modal = CTFSubmissionModal(self.challenge_data['id'], self.challenge_data['name'])
-        await interaction.response.send_modal(modal)
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["user"]), int(match["challenge"]), item.label, item.style, item.emoji)
     
-    async def show_hint(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message(
-                "❌ This isn't your challenge!",
-                ephemeral=True
-            )
+    async def callback(self, interaction: discord.Interaction):
+        challenge = await db.run(db.get_ctf_challenge, self.challenge_id)
+        if challenge is None:
+            await interaction.response.send_message("❌ This challenge is no longer available.", ephemeral=True)
             return
+        challenge_id, name, category, difficulty, points, description, required_xp = challenge
         
-        embed = discord.Embed(
-            title="💡 Hint",
-            description=self.challenge_data.get('hints', 'No hints available for this challenge.'),
-            color=0xFFFF00
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        if self.action == "flag":
+            modal = CTFSubmissionModal(challenge_id, name)
+            await interaction.response.send_modal(modal)
+        elif self.action == "hint":
+            embed = discord.Embed(
+                title="💡 Hint",
+                description=ctf_manager.get_challenge_hints(name),
+                color=0xFFFF00
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        else:
+            await self.stop_ctf(interaction, challenge)
     
-    async def stop_ctf(self, interaction: discord.Interaction):
+    async def stop_ctf(self, interaction: discord.Interaction, challenge: tuple):
         """Stop and save CTF challenge progress"""
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your challenge!", ephemeral=True)
-            return
-        
         # Import here to avoid circular imports
         from training_session import training_session_manager
         from datetime import datetime
         
+        challenge_id, name, category, difficulty, points, description, required_xp = challenge
+        
         # Save CTF session
         current_position = {
-            'challenge_id': self.challenge_data['id'],
-            'challenge_name': self.challenge_data['name'],
-            'category': self.challenge_data['category']
+            'challenge_id': challenge_id,
+            'challenge_name': name,
+            'category': category
         }
         session_data = {
-            'challenge_description': self.challenge_data['description'],
-            'difficulty': self.challenge_data['difficulty'],
-            'points': self.challenge_data['points'],
+            'challenge_description': description,
+            'difficulty': difficulty,
+            'points': points,
             'saved_at': str(datetime.now())
         }
         
-        success = training_session_manager.save_session(
+        success = await asyncio.to_thread(
+            training_session_manager.save_session,
             self.user_id, 
             'ctf', 
             current_position, 
@@ -247,12 +241,12 @@ class CTFChallengeView(View):
         if success:
             embed = discord.Embed(
                 title="⏸️ CTF Challenge Session Saved",
-                description=f"Your CTF challenge progress has been saved. Resume anytime with `/ctf {self.challenge_data['id']}` or `/sessions`.",
+                description=f"Your CTF challenge progress has been saved. Resume anytime with `/ctf {challenge_id}` or `/sessions`.",
                 color=0x00FF00
             )
             embed.add_field(
                 name="Saved Challenge",
-                value=f"{self.challenge_data['name']} ({self.challenge_data['category']})",
+                value=f"{name} ({category})",
                 inline=False
             )
         else:
@@ -264,26 +258,29 @@ class CTFChallengeView(View):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+class CTFChallengeView(View):
+    """Submit, hint and save buttons of a challenge; the challenge id lives in their custom_ids"""
+    
+    def __init__(self, challenge_id: int, user_id: int):
+        super().__init__(timeout=None)
+        self.add_item(CTFChallengeButton("flag", user_id, challenge_id, "Submit Flag", discord.ButtonStyle.primary, "🚩"))
+        self.add_item(CTFChallengeButton("hint", user_id, challenge_id, "Get Hint", discord.ButtonStyle.secondary, "💡"))
+        self.add_item(CTFChallengeButton("stop", user_id, challenge_id, "⏸️ Stop & Save", discord.ButtonStyle.danger, "⏸️"))
+
 class CTFManager:
     def __init__(self):
-        self.initialize_challenges()
+        self.challenges_seeded = False
     
     def initialize_challenges(self):
-        """Initialize CTF challenges in the database"""
-        for challenge in CTF_CHALLENGES:
-            db.add_ctf_challenge(
-                name=challenge['name'],
-                category=challenge['category'],
-                difficulty=challenge['difficulty'],
-                points=challenge['points'],
-                description=challenge['description'],
-                flag=challenge['flag'],
-                hints=challenge['hints'],
-                required_xp=challenge['required_xp']
-            )
+        """Seed the built-in CTF challenges into the database (idempotent)"""
+        added = db.seed_ctf_challenges(CTF_CHALLENGES)
+        self.challenges_seeded = True
+        return added
     
     def get_available_challenges(self, user_xp: int):
         """Get challenges available to user based on XP"""
+        if not self.challenges_seeded:
+            self.initialize_challenges()
         return db.get_ctf_challenges(user_xp)
     
     def create_challenge_embed(self, challenge_data: tuple):
@@ -343,61 +340,51 @@ class CTFManager:
         """Get user's CTF progress"""
         return db.get_user_ctf_progress(user_id)
     
-    def create_leaderboard_embed(self):
-        """Create CTF leaderboard embed"""
-        # Get top CTF solvers
-        conn = db.get_connection()
-        cursor = conn.cursor()
+    def create_leaderboard_embed(self, leaderboard: list) -> discord.Embed:
+        """Create CTF leaderboard embed from (username, points, solved) rows"""
+        embed = discord.Embed(
+            title="🏆 CTF Leaderboard",
+            description="Top CTF challenge solvers",
+            color=0xFFD700
+        )
         
-        try:
-            cursor.execute("""
-                SELECT u.username, SUM(c.points) as total_points, COUNT(s.id) as challenges_solved
-                FROM ctf_submissions s
-                JOIN users u ON s.user_id = u.user_id
-                JOIN ctf_challenges c ON s.challenge_id = c.id
-                WHERE s.is_correct = 1
-                GROUP BY u.user_id, u.username
-                ORDER BY total_points DESC, challenges_solved DESC
-                LIMIT 10
-            """)
+        if leaderboard:
+            leaderboard_text = ""
+            for i, (username, points, solved) in enumerate(leaderboard, 1):
+                medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
+                leaderboard_text += f"{medal} **{username}** - {points} pts ({solved} solved)\n"
             
-            leaderboard = cursor.fetchall()
-            
-            embed = discord.Embed(
-                title="🏆 CTF Leaderboard",
-                description="Top CTF challenge solvers",
-                color=0xFFD700
+            embed.add_field(
+                name="Rankings",
+                value=leaderboard_text,
+                inline=False
+            )
+        else:
+            embed.add_field(
+                name="No Data",
+                value="No CTF challenges have been solved yet!",
+                inline=False
             )
-            
-            if leaderboard:
-                leaderboard_text = ""
-                for i, (username, points, solved) in enumerate(leaderboard, 1):
-                    medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-                    leaderboard_text += f"{medal} **{username}** - {points} pts ({solved} solved)\n"
-                
-                embed.add_field(
-                    name="Rankings",
-                    value=leaderboard_text,
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="No Data",
-                    value="No CTF challenges have been solved yet!",
-                    inline=False
-                )
-            
-            return embed
         
-        except Exception as e:
-            print(f"Error creating CTF leaderboard: {e}")
+        return embed
+    
+    def _render_leaderboard(self):
+        """Query and render the leaderboard as an embed dict (None on error)"""
+        leaderboard = db.get_ctf_leaderboard(10)
+        if leaderboard is None:
+            return None
+        return self.create_leaderboard_embed(leaderboard).to_dict()
+    
+    async def get_leaderboard_embed(self) -> discord.Embed:
+        """Get the CTF leaderboard, sharing one query across a burst of requests"""
+        payload = await response_cache.get("ctf_leaderboard", self._render_leaderboard)
+        if payload is None:
             return discord.Embed(
                 title="❌ Error",
                 description="Could not load CTF leaderboard.",
                 color=0xFF0000
             )
-        finally:
-            conn.close()
+        return discord.Embed.from_dict(payload)
 
 # Global CTF manager instance
 ctf_manager = CTFManager()
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+Compiled Curriculum
+Immutable, slotted records for courses, modules, lessons, quizzes and exercises,
+built from the JSON course files with a validation pass
+"""
+
+import sys
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, Tuple
+
+# Quiz difficulty runs from 1 (easiest) to 5; unrated questions sit in the middle
+QUIZ_DIFFICULTIES = range(1, 6)
+DEFAULT_DIFFICULTY = 3
+
+class CurriculumError(ValueError):
+    """Raised when course content is malformed"""
+
+class _Record:
+    """Read-only dict-style access (record["title"], .get, in) over a record's public keys"""
+    
+    __slots__ = ()
+    KEYS = ()
+    
+    def __getitem__(self, key):
+        if key in self.KEYS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def __contains__(self, key) -> bool:
+        return key in self.KEYS and getattr(self, key) is not None
+    
+    def keys(self) -> tuple:
+        return tuple(key for key in self.KEYS if getattr(self, key) is not None)
+    
+    def items(self) -> tuple:
+        return tuple((key, getattr(self, key)) for key in self.keys())
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Quiz(_Record):
+    KEYS = ("question", "options", "correct", "explanation", "tags", "difficulty")
+    
+    question: str
+    options: Tuple[str, ...]
+    correct: int
+    explanation: str
+    tags: Tuple[str, ...] = ()
+    difficulty: int = DEFAULT_DIFFICULTY
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Exercise(_Record):
+    KEYS = ("title", "description", "example_answers", "examples", "steps", "red_flags", "checklist")
+    
+    title: str
+    description: str
+    example_answers: Optional[Tuple[str, ...]] = None
+    examples: Optional[Tuple[str, ...]] = None
+    steps: Optional[Tuple[str, ...]] = None
+    red_flags: Optional[Tuple[str, ...]] = None
+    checklist: Optional[Tuple[str, ...]] = None
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Multimedia(_Record):
+    KEYS = ("has_content", "types", "description")
+    
+    has_content: bool
+    types: Tuple[str, ...]
+    description: str
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Lesson(_Record):
+    KEYS = ("title", "content", "xp_reward", "practical_exercise", "quiz", "questions", "multimedia", "prerequisites")
+    
+    course_id: int
+    module_id: int
+    id: int
+    title: str
+    content: str
+    xp_reward: int
+    practical_exercise: Optional[Exercise] = None
+    quiz: Optional[Quiz] = None
+    multimedia: Optional[Multimedia] = None
+    # (course, module, lesson) ids that must be completed first; None means the previous lesson of the course
+    prerequisites: Optional[Tuple[Tuple[int, int, int], ...]] = None
+    questions: Optional[Tuple[Quiz, ...]] = None  # Extra question-bank entries beyond the lesson quiz
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Module(_Record):
+    KEYS = ("title", "lessons", "questions")
+    
+    course_id: int
+    id: int
+    title: str
+    lessons: MappingProxyType  # lesson_id -> Lesson
+    questions: Optional[Tuple[Quiz, ...]] = None  # Question-bank entries not tied to one lesson
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Course(_Record):
+    KEYS = ("title", "description", "level", "modules")
+    
+    id: int
+    title: str
+    description: str
+    level: str
+    modules: MappingProxyType  # module_id -> Module
+    all_lessons: Tuple[Lesson, ...]  # Every lesson in (module, lesson) order
+    lesson_index: MappingProxyType  # (module_id, lesson_id) -> Lesson
+    
+    def lesson(self, module_id: int, lesson_id: int) -> Optional[Lesson]:
+        """Look a lesson up with one flat dict probe"""
+        return self.lesson_index.get((module_id, lesson_id))
+
+def _object(data, where: str) -> dict:
+    if not isinstance(data, dict):
+        raise CurriculumError(f"{where}: expected an object, got {type(data).__name__}")
+    return data
+
+def _require(data, key: str, kind, where: str, optional: bool = False):
+    """Fetch data[key] and check its type"""
+    value = _object(data, where).get(key)
+    if value is None and optional:
+        return None
+    if not isinstance(value, kind) or isinstance(value, bool) and kind is not bool:
+        raise CurriculumError(f"{where}: '{key}' must be {getattr(kind, '__name__', kind)}, got {value!r:.40}")
+    return value
+
+def _label(data, key: str, where: str, optional: bool = False) -> Optional[str]:
+    """A short required string; interned since titles and options repeat across caches"""
+    value = _require(data, key, str, where, optional)
+    if value is None:
+        return None
+    if not value.strip():
+        raise CurriculumError(f"{where}: '{key}' must not be empty")
+    return sys.intern(value)
+
+def _strings(data, key: str, where: str, optional: bool = True) -> Optional[Tuple[str, ...]]:
+    values = _require(data, key, list, where, optional)
+    if values is None:
+        return None
+    if not all(isinstance(value, str) for value in values):
+        raise CurriculumError(f"{where}: '{key}' must be a list of strings")
+    return tuple(sys.intern(value) for value in values)
+
+def _check_keys(data: dict, allowed: tuple, where: str):
+    unknown = set(data) - set(allowed)
+    if unknown:
+        raise CurriculumError(f"{where}: unknown keys {sorted(unknown)}")
+
+def _ids(children, kind: str, where: str) -> list:
+    """(int id, child) pairs from a JSON object keyed by numeric strings"""
+    if not isinstance(children, dict) or not children:
+        raise CurriculumError(f"{where}: '{kind}' must be a non-empty object")
+    pairs = []
+    for key, child in children.items():
+        try:
+            pairs.append((int(key), child))
+        except (TypeError, ValueError):
+            raise CurriculumError(f"{where}: {kind} id {key!r} is not an integer") from None
+    return sorted(pairs, key=lambda pair: pair[0])
+
+def parse_lesson_ref(ref) -> Tuple[int, int, int]:
+    """Turn a "course.module.lesson" reference such as "2.1.3" into an id tuple"""
+    parts = ref.split(".") if isinstance(ref, str) else ()
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise CurriculumError(f"lesson reference {ref!r} is not in course.module.lesson form")
+    return tuple(int(part) for part in parts)
+
+def _prerequisites(data, where: str) -> Optional[Tuple[Tuple[int, int, int], ...]]:
+    refs = _strings(data, "prerequisites", where)
+    if refs is None:
+        return None
+    try:
+        return tuple(dict.fromkeys(parse_lesson_ref(ref) for ref in refs))
+    except CurriculumError as e:
+        raise CurriculumError(f"{where}: {e}") from None
+
+def _compile_quiz(data, where: str, name: str = "quiz") -> Quiz:
+    where = f"{where} › {name}"
+    _check_keys(_object(data, where), Quiz.KEYS, where)
+    options = _strings(data, "options", where, optional=False)
+    if len(options) < 2:
+        raise CurriculumError(f"{where}: needs at least two options")
+    correct = _require(data, "correct", int, where)
+    if not 0 <= correct < len(options):
+        raise CurriculumError(f"{where}: 'correct' index {correct} is out of range")
+    difficulty = _require(data, "difficulty", int, where, optional=True)
+    if difficulty is not None and difficulty not in QUIZ_DIFFICULTIES:
+        raise CurriculumError(f"{where}: 'difficulty' must be between {QUIZ_DIFFICULTIES[0]} and {QUIZ_DIFFICULTIES[-1]}")
+    tags = _strings(data, "tags", where) or ()
+    return Quiz(
+        _label(data, "question", where), options, correct, _require(data, "explanation", str, where),
+        tuple(dict.fromkeys(sys.intern(tag.strip().lower()) for tag in tags if tag.strip())),
+        DEFAULT_DIFFICULTY if difficulty is None else difficulty
+    )
+
+def _compile_questions(data, where: str) -> Optional[Tuple[Quiz, ...]]:
+    questions = _require(data, "questions", list, where, optional=True)
+    if questions is None:
+        return None
+    return tuple(_compile_quiz(question, where, f"questions[{i}]") for i, question in enumerate(questions))
+
+def _compile_exercise(data, where: str) -> Exercise:
+    where = f"{where} › practical_exercise"
+    _check_keys(_object(data, where), Exercise.KEYS, where)
+    return Exercise(
+        _label(data, "title", where),
+        _require(data, "description", str, where),
+        **{key: _strings(data, key, where) for key in Exercise.KEYS[2:]}
+    )
+
+def _compile_multimedia(data, where: str) -> Multimedia:
+    where = f"{where} › multimedia"
+    _check_keys(_object(data, where), Multimedia.KEYS, where)
+    return Multimedia(
+        bool(data.get("has_content", False)),
+        _strings(data, "types", where) or (),
+        _require(data, "description", str, where)
+    )
+
+def _compile_lesson(course_id: int, module_id: int, lesson_id: int, data, where: str) -> Lesson:
+    where = f"{where} › lesson {lesson_id}"
+    _check_keys(_object(data, where), Lesson.KEYS, where)
+    xp_reward = _require(data, "xp_reward", int, where, optional=True)
+    if xp_reward is not None and xp_reward < 0:
+        raise CurriculumError(f"{where}: 'xp_reward' must not be negative")
+    exercise = _require(data, "practical_exercise", dict, where, optional=True)
+    quiz = _require(data, "quiz", dict, where, optional=True)
+    multimedia = _require(data, "multimedia", dict, where, optional=True)
+    return Lesson(
+        course_id, module_id, lesson_id,
+        _label(data, "title", where),
+        _require(data, "content", str, where),
+        100 if xp_reward is None else xp_reward,
+        _compile_exercise(exercise, where) if exercise is not None else None,
+        _compile_quiz(quiz, where) if quiz is not None else None,
+        _compile_multimedia(multimedia, where) if multimedia is not None else None,
+        _prerequisites(data, where),
+        _compile_questions(data, where)
+    )
+
+def merge_course(base: Optional[dict], overlay: dict) -> dict:
+    """Lay authored content over a course file's raw JSON; the overlay wins field by field"""
+    course = dict(base or {})
+    course.update((key, value) for key, value in overlay.items() if key != "modules")
+    modules = dict(course.get("modules") or {})
+    for module_id, module_patch in overlay.get("modules", {}).items():
+        module = dict(modules.get(module_id) or {})
+        module.update((key, value) for key, value in module_patch.items() if key != "lessons")
+        lessons = dict(module.get("lessons") or {})
+        for lesson_id, lesson_patch in module_patch.get("lessons", {}).items():
+            lessons[lesson_id] = {**lessons.get(lesson_id, {}), **lesson_patch}
+        module["lessons"] = lessons
+        modules[module_id] = module
+    course["modules"] = modules
+    return course
+
+def compile_course(course_id: int, data) -> Course:
+    """Validate raw course JSON and build its immutable Course, or raise CurriculumError"""
+    where = f"course {course_id}"
+    _check_keys(_object(data, where), Course.KEYS, where)
+    
+    modules = {}
+    all_lessons = []
+    for module_id, module_data in _ids(data.get("modules"), "modules", where):
+        module_where = f"{where} › module {module_id}"
+        _check_keys(_object(module_data, module_where), Module.KEYS, module_where)
+        lessons = {
+            lesson_id: _compile_lesson(course_id, module_id, lesson_id, lesson_data, module_where)
+            for lesson_id, lesson_data in _ids(module_data.get("lessons"), "lessons", module_where)
+        }
+        modules[module_id] = Module(course_id, module_id, _label(module_data, "title", module_where),
+                                    MappingProxyType(lessons), _compile_questions(module_data, module_where))
+        all_lessons.extend(lessons.values())
+    
+    return Course(
+        course_id,
+        _label(data, "title", where),
+        _require(data, "description", str, where),
+        _label(data, "level", where),
+        MappingProxyType(modules),
+        tuple(all_lessons),
+        MappingProxyType({(lesson.module_id, lesson.id): lesson for lesson in all_lessons})
+    )
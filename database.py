@@ -1,19 +1,223 @@
 import sqlite3
+import asyncio
 import datetime
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
 from typing import Optional, List, Tuple
+from cache import TTLCache
+from query_tracer import QueryTracer, TracedConnection
+
+logger = logging.getLogger("cyberbot.database")
+
+# SQLite primary result codes for lock contention (SQLITE_BUSY, SQLITE_LOCKED)
+TRANSIENT_ERROR_CODES = (5, 6)
+TRANSIENT_ERROR_MESSAGES = ("database is locked", "database table is locked", "database is busy")
+
+def on_event_loop() -> bool:
+    """Whether the calling thread is running an asyncio event loop (e.g. inside a discord.py callback)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def is_transient_error(error: Exception) -> bool:
+    """Return True for busy/locked errors that are worth retrying"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    error_code = getattr(error, "sqlite_errorcode", None)
+    if error_code is not None:
+        return (error_code & 0xFF) in TRANSIENT_ERROR_CODES
+    message = str(error).lower()
+    return any(text in message for text in TRANSIENT_ERROR_MESSAGES)
+
+class RetryPolicy:
+    """Jittered exponential backoff for transient database errors"""
+    
+    def __init__(self, base_delay: float = 0.05, max_delay: float = 1.0,
+                 deadline: float = 5.0, busy_timeout: float = 0.25, loop_busy_timeout: float = 0.01):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline  # Total seconds one operation may spend retrying
+        self.busy_timeout = busy_timeout  # SQLite's own busy wait before raising
+        self.loop_busy_timeout = loop_busy_timeout  # The same, for a connection opened on the event loop thread
+    
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (full jitter)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+# Column order of the get_user_stats tuple kept in the profile cache
+PROFILE_FIELDS = ("username", "xp", "level", "current_course", "current_module", "current_lesson")
+
+def level_for_xp(xp: int) -> int:
+    """Every 1000 XP = 1 level"""
+    return (xp // 1000) + 1
+
+def bits_to_blob(bits: int) -> bytes:
+    """Little-endian bytes of a completion bitset (bit n = lesson slot n)"""
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+def blob_to_bits(blob) -> int:
+    return int.from_bytes(blob or b"", "little")
+
+def db_operation(action: str, default=None):
+    """Run a DatabaseManager method with retries on busy/locked errors.
+    
+    Other errors, and transient ones that outlive the retry deadline, are logged,
+    counted and turned into `default` (called first if it is a type such as list).
+    Coroutines should await DatabaseManager.run() instead of calling the method.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self._run_with_retry(method, action, default, args, kwargs)
+        wrapper.db_operation = (method, action, default)
+        return wrapper
+    return decorator
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "academy.db"):
+    def __init__(self, db_path: str = "academy.db", retry_policy: RetryPolicy = None,
+                 tracer: QueryTracer = None):
         self.db_path = db_path
-        self.init_database()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.operation_stats = defaultdict(Counter)  # method name -> calls/retries/failures
+        self._stats_lock = threading.Lock()  # Counted from the event loop and worker threads alike
+        self.tracer = tracer or QueryTracer.from_env()  # None when DB_QUERY_TRACING=0
+        # user_id -> display name already stored; a miss only costs one no-op upsert
+        self.known_users = TTLCache(maxsize=int(os.getenv("KNOWN_USERS_CACHE_SIZE", "4096")), ttl=float("inf"))
+        # ((course_id, module_id, lesson_id) -> bit position, course_id -> mask of its slots) as
+        # committed, loaded on first use
+        self.slot_cache = None
+        self._slot_lock = threading.Lock()
+        self.profile_cache = TTLCache(
+            maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("PROFILE_CACHE_TTL", "300"))
+        )
+        self._initialized = False
+        self._init_lock = threading.Lock()
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        """Get database connection, creating the schema on first use"""
+        if not self._initialized:
+            self.ensure_initialized()
+        return self._connect()
+    
+    def ensure_initialized(self):
+        """Create tables once; safe to call from several threads"""
+        with self._init_lock:
+            if not self._initialized:
+                self.init_database()
+                self._initialized = True
+    
+    def _connect(self):
+        """Open a connection (traced when a QueryTracer is configured).
+        
+        On the event loop thread SQLite only busy-waits for loop_busy_timeout,
+        so a locked database fails fast instead of stalling every other coroutine.
+        """
+        policy = self.retry_policy
+        timeout = policy.loop_busy_timeout if on_event_loop() else policy.busy_timeout
+        if self.tracer is None:
+            return sqlite3.connect(self.db_path, timeout=timeout)
+        
+        conn = sqlite3.connect(self.db_path, timeout=timeout, factory=TracedConnection)
+        conn.tracer = self.tracer
+        return conn
+    
+    def _count(self, name: str, event: str):
+        with self._stats_lock:
+            self.operation_stats[name][event] += 1
+    
+    def _retry_delay(self, name: str, action: str, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """Backoff before retrying a failed attempt, or None once the failure is final (logged and counted)"""
+        if is_transient_error(error):
+            delay = self.retry_policy.backoff(attempt)
+            if time.monotonic() + delay < deadline:
+                self._count(name, "retries")
+                return delay
+            self._count(name, "timeouts")
+            logger.warning(f"Gave up {action} after {attempt} attempts: {error}")
+        else:
+            logger.error(f"Error {action}: {error}")
+        self._count(name, "failures")
+        return None
+    
+    def _run_with_retry(self, method, action: str, default, args, kwargs):
+        """Call `method`, retrying transient errors with backoff until the deadline.
+        
+        The backoff sleeps, so it is only used off the event loop (warm-up,
+        flushes, asyncio.to_thread); a call made on the loop thread gets a single
+        attempt and coroutines are expected to use run() instead.
+        """
+        self._count(method.__name__, "calls")
+        deadline = time.monotonic() + self.retry_policy.deadline
+        if on_event_loop():
+            deadline = 0  # First failure is final
+        attempt = 0
+        
+        while True:
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(method.__name__, action, e, attempt, deadline)
+                if delay is None:
+                    return default() if isinstance(default, type) else default
+                time.sleep(delay)
+    
+    async def run(self, operation, *args, **kwargs):
+        """Await a DatabaseManager method from a coroutine without blocking the event loop.
+        
+        Each attempt of a db_operation runs in a worker thread and the backoff
+        between attempts is an asyncio.sleep; other methods (such as the cached
+        add_user and get_user_stats) run in a worker thread as a whole.
+        """
+        spec = getattr(operation, "db_operation", None)
+        if spec is None:
+            return await asyncio.to_thread(operation, *args, **kwargs)
+        
+        method, action, default = spec
+        self._count(method.__name__, "calls")
+        deadline = time.monotonic() + self.retry_policy.deadline
+        attempt = 0
+        
+        while True:
+            try:
+                return await asyncio.to_thread(method, self, *args, **kwargs)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(method.__name__, action, e, attempt, deadline)
+                if delay is None:
+                    return default() if isinstance(default, type) else default
+                await asyncio.sleep(delay)
+    
+    def get_operation_stats(self) -> dict:
+        """Get per-method call, retry and failure counters"""
+        with self._stats_lock:
+            return {name: dict(counts) for name, counts in self.operation_stats.items()}
+    
+    def _write_through(self, user_id: int, **changes):
+        """Patch a cached profile after a committed write so reads stay current"""
+        def apply(profile):
+            values = list(profile)
+            for field, value in changes.items():
+                values[PROFILE_FIELDS.index(field)] = value
+            return tuple(values)
+        self.profile_cache.update(user_id, apply)
+    
+    def invalidate_user(self, user_id: int):
+        """Forget a cached profile after writing to users outside DatabaseManager"""
+        self.profile_cache.invalidate(user_id)
     
     def init_database(self):
         """Initialize database tables"""
-        conn = self.get_connection()
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Users table
@@ -129,116 +333,417 @@ class DatabaseManager:
             )
         """)
         
+        # Stable bit position for every lesson; slots are only ever appended
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lesson_slots (
+                slot INTEGER PRIMARY KEY,
+                course_id INTEGER NOT NULL,
+                module_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                UNIQUE (course_id, module_id, lesson_id)
+            )
+        """)
+        
+        # Completed lessons per user as a bitset over lesson_slots
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lesson_completion_bits (
+                user_id INTEGER PRIMARY KEY,
+                bits BLOB NOT NULL, -- little-endian, bit n = slot n
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+        
+        # When each lesson was first completed
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lesson_completion_times (
+                user_id INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, slot)
+            )
+        """)
+        
+        cursor.execute("SELECT 1 FROM course_progress LIMIT 1")
+        if cursor.fetchone():
+            self._migrate_course_progress(cursor)
+        
+        # Admin-authored course content, laid over the course files by CourseStore
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS authored_courses (
+                course_id INTEGER PRIMARY KEY,
+                title TEXT, -- NULL keeps the course file's value
+                description TEXT,
+                level TEXT,
+                revision INTEGER NOT NULL DEFAULT 1, -- bumped on every authored change to the course
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS authored_modules (
+                course_id INTEGER NOT NULL,
+                module_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                PRIMARY KEY (course_id, module_id)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS authored_lessons (
+                course_id INTEGER NOT NULL,
+                module_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                xp_reward INTEGER NOT NULL DEFAULT 100,
+                PRIMARY KEY (course_id, module_id, lesson_id)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS authored_quizzes (
+                course_id INTEGER NOT NULL,
+                module_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                options TEXT NOT NULL, -- JSON list of strings
+                correct INTEGER NOT NULL,
+                explanation TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (course_id, module_id, lesson_id)
+            )
+        """)
+        
+        # Course outlines (titles, ids, prerequisites) as of a file mtime and authored revision,
+        # so a restart can list and index courses without parsing every course file
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS course_outlines (
+                course_id INTEGER PRIMARY KEY,
+                path TEXT, -- NULL for courses that exist only as authored content
+                mtime_ns INTEGER NOT NULL,
+                revision INTEGER NOT NULL,
+                outline TEXT NOT NULL -- JSON, see courses.encode_outline
+            )
+        """)
+        
+        # Questions each user has been served, per question-bank scope, as a bloom filter
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_seen (
+                user_id INTEGER NOT NULL,
+                scope TEXT NOT NULL, -- e.g. 'module:1.2'
+                capacity INTEGER NOT NULL, -- questions the filter was sized for
+                seen INTEGER NOT NULL DEFAULT 0,
+                bits BLOB NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, scope)
+            )
+        """)
+        
+        # Spaced-repetition state per user and question (SM-2); times are unix seconds
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS review_cards (
+                user_id INTEGER NOT NULL,
+                question_key TEXT NOT NULL, -- question_bank.question_key of the quiz
+                course_id INTEGER NOT NULL,
+                module_id INTEGER NOT NULL,
+                ease REAL NOT NULL DEFAULT 2.5,
+                interval_days REAL NOT NULL DEFAULT 0,
+                repetitions INTEGER NOT NULL DEFAULT 0,
+                due_at REAL NOT NULL,
+                reviewed_at REAL NOT NULL,
+                PRIMARY KEY (user_id, question_key)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_cards_due ON review_cards (due_at)")
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS review_reminders (
+                user_id INTEGER PRIMARY KEY,
+                reminded_at REAL NOT NULL
+            )
+        """)
+        
+        # Elo-scale skill of learners and questions, written in batches by ratings.py
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_ratings (
+                user_id INTEGER PRIMARY KEY,
+                rating REAL NOT NULL,
+                answers INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS question_ratings (
+                question_key TEXT PRIMARY KEY,
+                rating REAL NOT NULL,
+                seed REAL NOT NULL, -- starting rating from the authored difficulty
+                answers INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        # Every graded quiz answer, the input to rating recalibration and item analysis
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                question_key TEXT NOT NULL,
+                course_id INTEGER NOT NULL,
+                module_id INTEGER NOT NULL,
+                correct INTEGER NOT NULL,
+                answered_at REAL NOT NULL,
+                chosen INTEGER, -- option index picked, NULL if unknown
+                latency_ms INTEGER, -- from showing the question to the answer
+                ability REAL -- learner rating just before answering
+            )
+        """)
+        cursor.execute("PRAGMA table_info(quiz_answers)")
+        columns = {row[1] for row in cursor.fetchall()}
+        for column, kind in (("chosen", "INTEGER"), ("latency_ms", "INTEGER"), ("ability", "REAL")):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE quiz_answers ADD COLUMN {column} {kind}")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quiz_answers_question ON quiz_answers (question_key, chosen)")
+        
+        # Finished channel tournaments and each player's final tally
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tournaments (
+                tournament_id INTEGER PRIMARY KEY, -- start time in milliseconds
+                guild_id INTEGER,
+                channel_id INTEGER NOT NULL,
+                host_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                module_id INTEGER NOT NULL,
+                questions INTEGER NOT NULL,
+                players INTEGER NOT NULL,
+                finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tournament_results (
+                tournament_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                points INTEGER NOT NULL,
+                correct INTEGER NOT NULL,
+                answered INTEGER NOT NULL,
+                PRIMARY KEY (tournament_id, user_id)
+            )
+        """)
+        
         conn.commit()
         conn.close()
+        # The legacy migration may have added slots
+        self._slots_committed()
+    
+    def _migrate_course_progress(self, cursor):
+        """Fold legacy one-row-per-completion progress into bitsets; the rows are moved, not copied"""
+        cursor.execute("""
+            SELECT DISTINCT course_id, module_id, lesson_id FROM course_progress
+            WHERE completed = TRUE ORDER BY course_id, module_id, lesson_id
+        """)
+        self._assign_slots(cursor, cursor.fetchall())
+        
+        # Duplicate rows from repeated completions collapse to the earliest one
+        cursor.execute("""
+            INSERT OR IGNORE INTO lesson_completion_times (user_id, slot, completed_at)
+            SELECT p.user_id, s.slot, MIN(COALESCE(p.completion_date, CURRENT_TIMESTAMP))
+            FROM course_progress p JOIN lesson_slots s USING (course_id, module_id, lesson_id)
+            WHERE p.completed = TRUE
+            GROUP BY p.user_id, s.slot
+        """)
+        
+        bits = defaultdict(int)
+        cursor.execute("SELECT user_id, slot FROM lesson_completion_times")
+        for user_id, slot in cursor.fetchall():
+            bits[user_id] |= 1 << slot
+        cursor.executemany("""
+            INSERT OR REPLACE INTO lesson_completion_bits (user_id, bits) VALUES (?, ?)
+        """, [(user_id, bits_to_blob(mask)) for user_id, mask in bits.items()])
+        
+        cursor.execute("DELETE FROM course_progress")
+        logger.info(f"Migrated lesson progress of {len(bits)} users to completion bitsets")
+    
+    def _read_slots(self, cursor) -> tuple:
+        """(slot map, course masks) as the cursor's transaction sees them"""
+        cursor.execute("SELECT slot, course_id, module_id, lesson_id FROM lesson_slots")
+        slots = {}
+        masks = defaultdict(int)
+        for slot, course_id, module_id, lesson_id in cursor.fetchall():
+            slots[(course_id, module_id, lesson_id)] = slot
+            masks[course_id] |= 1 << slot
+        return slots, dict(masks)
+    
+    def _slots(self, cursor) -> tuple:
+        """Cached (slot map, course masks); only call outside transactions that added slots"""
+        cache = self.slot_cache
+        if cache is None:
+            cache = self.slot_cache = self._read_slots(cursor)
+        return cache
+    
+    def _slot_map(self, cursor) -> dict:
+        """(course_id, module_id, lesson_id) -> slot"""
+        return self._slots(cursor)[0]
+    
+    def _assign_slots(self, cursor, lessons) -> tuple:
+        """Give lessons without a slot the next free ones, in the order given.
+        
+        Returns (slot map, whether slots were added). New slots are not cached: the
+        caller calls _slots_committed() once its transaction commits, so a rollback
+        never leaves the cache holding a slot that has no row.
+        """
+        with self._slot_lock:
+            slots = self._slot_map(cursor)
+            missing = [tuple(lesson) for lesson in lessons if tuple(lesson) not in slots]
+            if not missing:
+                return slots, False
+            cursor.executemany("""
+                INSERT OR IGNORE INTO lesson_slots (slot, course_id, module_id, lesson_id)
+                SELECT COALESCE(MAX(slot) + 1, 0), ?, ?, ? FROM lesson_slots
+            """, missing)
+            return self._read_slots(cursor)[0], True
+    
+    def _slots_committed(self):
+        """Drop the cached slot map after committing new slots; it is reloaded on next use"""
+        self.slot_cache = None
+    
+    @db_operation("assigning lesson slots", default=dict)
+    def assign_lesson_slots(self, lessons) -> dict:
+        """Make sure every (course, module, lesson) has a bit position; returns the slot map"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            slots, added = self._assign_slots(cursor, lessons)
+            conn.commit()
+            if added:
+                self._slots_committed()
+            return dict(slots)
+        finally:
+            conn.close()
+    
+    def _completion_bits(self, cursor, user_id: int) -> int:
+        cursor.execute("SELECT bits FROM lesson_completion_bits WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        return blob_to_bits(row[0]) if row else 0
+    
+    @db_operation("getting completion bits", default=0)
+    def get_completion_bits(self, user_id: int) -> int:
+        """Get a user's completed lessons as an int bitset over lesson slots"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            return self._completion_bits(cursor, user_id)
+        finally:
+            conn.close()
     
     def add_user(self, user_id: int, username: str):
         """Add new user or update existing user"""
+        # Most commands re-register the caller; skip the DB when nothing changed
+        if self.known_users.get(user_id) == username:
+            return
+        if self._upsert_user(user_id, username):
+            self.known_users.set(user_id, username)
+    
+    @db_operation("adding user", default=False)
+    def _upsert_user(self, user_id: int, username: str) -> bool:
+        """Insert the user, or rename them in place keeping progress and join date"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
             cursor.execute("""
-                INSERT OR REPLACE INTO users (user_id, username, xp, level)
-                VALUES (?, ?, COALESCE((SELECT xp FROM users WHERE user_id = ?), 0),
-                        COALESCE((SELECT level FROM users WHERE user_id = ?), 1))
-            """, (user_id, username, user_id, user_id))
+                INSERT INTO users (user_id, username) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET username = excluded.username
+                WHERE users.username IS NOT excluded.username
+            """, (user_id, username))
             conn.commit()
-        except Exception as e:
-            print(f"Error adding user: {e}")
+            self._write_through(user_id, username=username)
+            return True
         finally:
             conn.close()
     
+    @db_operation("adding XP", default=0)
     def add_xp(self, user_id: int, amount: int) -> int:
         """Add XP to user and return new total"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Get current XP
-            cursor.execute("SELECT xp, level FROM users WHERE user_id = ?", (user_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                return 0
-            
-            current_xp, current_level = result
-            new_xp = current_xp + amount
-            
-            # Calculate new level (every 1000 XP = 1 level)
-            new_level = (new_xp // 1000) + 1
-            
-            # Update user
-            cursor.execute("""
-                UPDATE users SET xp = ?, level = ? WHERE user_id = ?
-            """, (new_xp, new_level, user_id))
-            
-            # Check for level up achievement - use the same connection
-            if new_level > current_level:
-                self._add_achievement_with_connection(conn, cursor, user_id, f"Level {new_level} Reached", "level_up")
-            
+            new_xp = self._apply_xp(cursor, user_id, amount)
             conn.commit()
+            self._write_through(user_id, xp=new_xp, level=level_for_xp(new_xp))
             return new_xp
-        except Exception as e:
-            print(f"Error adding XP: {e}")
-            return 0
         finally:
             conn.close()
     
-    def _add_achievement_with_connection(self, conn, cursor, user_id: int, achievement_name: str, achievement_type: str):
+    def _apply_xp(self, cursor, user_id: int, amount: int, award_level_up: bool = True) -> int:
+        """Add XP inside the caller's transaction and return the new total (0 if no user)"""
+        # Get current XP
+        cursor.execute("SELECT xp, level FROM users WHERE user_id = ?", (user_id,))
+        result = cursor.fetchone()
+        
+        if not result:
+            return 0
+        
+        current_xp, current_level = result
+        new_xp = current_xp + amount
+        
+        # Calculate new level
+        new_level = level_for_xp(new_xp)
+        
+        # Update user
+        cursor.execute("""
+            UPDATE users SET xp = ?, level = ? WHERE user_id = ?
+        """, (new_xp, new_level, user_id))
+        
+        # Check for level up achievement - use the same connection
+        if award_level_up and new_level > current_level:
+            self._add_achievement_with_connection(cursor, user_id, f"Level {new_level} Reached", "level_up")
+        
+        return new_xp
+    
+    def _add_achievement_with_connection(self, cursor, user_id: int, achievement_name: str, achievement_type: str):
         """Add achievement using existing connection to prevent database locks"""
-        try:
-            # Check if achievement already exists
+        # Check if achievement already exists
+        cursor.execute("""
+            SELECT id FROM achievements 
+            WHERE user_id = ? AND achievement_name = ?
+        """, (user_id, achievement_name))
+        
+        if not cursor.fetchone():
             cursor.execute("""
-                SELECT id FROM achievements 
-                WHERE user_id = ? AND achievement_name = ?
-            """, (user_id, achievement_name))
-            
-            if not cursor.fetchone():
-                cursor.execute("""
-                    INSERT INTO achievements (user_id, achievement_name, achievement_type)
-                    VALUES (?, ?, ?)
-                """, (user_id, achievement_name, achievement_type))
-                return True
-            return False
-        except Exception as e:
-            print(f"Error adding achievement: {e}")
-            return False
+                INSERT INTO achievements (user_id, achievement_name, achievement_type)
+                VALUES (?, ?, ?)
+            """, (user_id, achievement_name, achievement_type))
+            return True
+        return False
     
+    @db_operation("adding XP (no achievements)", default=0)
     def add_xp_no_achievements(self, user_id: int, amount: int) -> int:
         """Add XP to user without triggering achievement checks (to prevent recursion)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Get current XP
-            cursor.execute("SELECT xp, level FROM users WHERE user_id = ?", (user_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                return 0
-            
-            current_xp, current_level = result
-            new_xp = current_xp + amount
-            
-            # Calculate new level (every 1000 XP = 1 level)
-            new_level = (new_xp // 1000) + 1
-            
-            # Update user (no achievement checks)
-            cursor.execute("""
-                UPDATE users SET xp = ?, level = ? WHERE user_id = ?
-            """, (new_xp, new_level, user_id))
-            
+            new_xp = self._apply_xp(cursor, user_id, amount, award_level_up=False)
             conn.commit()
+            self._write_through(user_id, xp=new_xp, level=level_for_xp(new_xp))
             return new_xp
-        except Exception as e:
-            print(f"Error adding XP (no achievements): {e}")
-            return 0
         finally:
             conn.close()
     
     def get_user_stats(self, user_id: int) -> Optional[Tuple]:
-        """Get user statistics"""
+        """Get user statistics, served from the profile cache when possible"""
+        profile = self.profile_cache.get(user_id)
+        if profile is None:
+            # A write committed during the read makes the row stale; don't cache it then
+            version = self.profile_cache.version(user_id)
+            profile = self._load_user_stats(user_id)
+            if profile is not None:
+                self.profile_cache.set(user_id, profile, version)
+        return profile
+    
+    @db_operation("getting user stats")
+    def _load_user_stats(self, user_id: int) -> Optional[Tuple]:
+        """Read a user's profile row"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -248,24 +753,91 @@ class DatabaseManager:
                 FROM users WHERE user_id = ?
             """, (user_id,))
             return cursor.fetchone()
-        except Exception as e:
-            print(f"Error getting user stats: {e}")
-            return None
         finally:
             conn.close()
     
+    @db_operation("getting user snapshot")
+    def get_user_snapshot(self, user_id: int) -> Optional[dict]:
+        """Get profile, achievements and progress rollups for a user in one round trip"""
+        version = self.profile_cache.version(user_id)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT u.username, u.xp, u.level, u.current_course, u.current_module, u.current_lesson,
+                       (SELECT COUNT(*) FROM quiz_attempts q
+                        WHERE q.user_id = u.user_id AND q.score = q.total_questions),
+                       (SELECT COUNT(*) FROM quiz_attempts q WHERE q.user_id = u.user_id),
+                       (SELECT COUNT(DISTINCT s.challenge_id) FROM ctf_submissions s
+                        WHERE s.user_id = u.user_id AND s.is_correct = 1)
+                FROM users u WHERE u.user_id = ?
+            """, (user_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            bits = self._completion_bits(cursor, user_id)
+            completed_by_course = {
+                course_id: (bits & mask).bit_count()
+                for course_id, mask in self._slots(cursor)[1].items() if bits & mask
+            }
+            
+            cursor.execute("""
+                SELECT achievement_name, achievement_type, date_awarded
+                FROM achievements WHERE user_id = ?
+                ORDER BY date_awarded DESC
+            """, (user_id,))
+            achievements = cursor.fetchall()
+            
+            stats = tuple(row[:6])
+            self.profile_cache.set(user_id, stats, version)
+            return {
+                "stats": stats,
+                "perfect_quizzes": row[6],
+                "quiz_attempts": row[7],
+                "ctf_solves": row[8],
+                "completed_by_course": completed_by_course,
+                "completed_lessons": bits.bit_count(),
+                "completion_bits": bits,
+                "achievements": achievements
+            }
+        finally:
+            conn.close()
+    
+    @db_operation("getting completed lessons", default=list)
+    def get_completed_lessons(self, user_id: int) -> List[Tuple[int, int, int]]:
+        """Get (course_id, module_id, lesson_id) of every lesson a user completed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            bits = self._completion_bits(cursor, user_id)
+            return [lesson for lesson, slot in self._slot_map(cursor).items() if bits >> slot & 1]
+        finally:
+            conn.close()
+    
+    @db_operation("updating progress")
     def update_progress(self, user_id: int, course_id: int, module_id: int, lesson_id: int):
-        """Update user's current progress"""
+        """Mark a lesson completed (idempotent) and move the user past it"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Mark lesson as completed
+            lesson = (course_id, module_id, lesson_id)
+            slots, added = self._assign_slots(cursor, [lesson])
+            slot = slots[lesson]
+            
+            # Only the first completion sets the bit and records a timestamp
             cursor.execute("""
-                INSERT OR REPLACE INTO course_progress 
-                (user_id, course_id, module_id, lesson_id, completed, completion_date)
-                VALUES (?, ?, ?, ?, TRUE, CURRENT_TIMESTAMP)
-            """, (user_id, course_id, module_id, lesson_id))
+                INSERT OR IGNORE INTO lesson_completion_times (user_id, slot) VALUES (?, ?)
+            """, (user_id, slot))
+            if cursor.rowcount:
+                bits = self._completion_bits(cursor, user_id) | 1 << slot
+                cursor.execute("""
+                    INSERT INTO lesson_completion_bits (user_id, bits) VALUES (?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET bits = excluded.bits
+                """, (user_id, bits_to_blob(bits)))
             
             # Update user's current position
             cursor.execute("""
@@ -274,11 +846,14 @@ class DatabaseManager:
             """, (course_id, module_id, lesson_id + 1, user_id))
             
             conn.commit()
-        except Exception as e:
-            print(f"Error updating progress: {e}")
+            if added:
+                self._slots_committed()
+            self._write_through(user_id, current_course=course_id, current_module=module_id,
+                                current_lesson=lesson_id + 1)
         finally:
             conn.close()
     
+    @db_operation("updating user progress")
     def update_user_progress(self, user_id: int, course_id: int, module_id: int, lesson_id: int):
         """Update user's current position without marking as completed"""
         conn = self.get_connection()
@@ -292,11 +867,12 @@ class DatabaseManager:
             """, (course_id, module_id, lesson_id, user_id))
             
             conn.commit()
-        except Exception as e:
-            print(f"Error updating user progress: {e}")
+            self._write_through(user_id, current_course=course_id, current_module=module_id,
+                                current_lesson=lesson_id)
         finally:
             conn.close()
     
+    @db_operation("adding achievement", default=False)
     def add_achievement(self, user_id: int, achievement_name: str, achievement_type: str):
         """Add achievement to user"""
         conn = self.get_connection()
@@ -317,14 +893,12 @@ class DatabaseManager:
                 conn.commit()
                 return True
             return False
-        except Exception as e:
-            print(f"Error adding achievement: {e}")
-            return False
         finally:
             conn.close()
     
-    def get_leaderboard(self, limit: int = 10) -> List[Tuple]:
-        """Get top users by XP"""
+    @db_operation("getting leaderboard")
+    def get_leaderboard(self, limit: int = 10) -> Optional[List[Tuple]]:
+        """Get top users by XP (None on error)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -334,12 +908,10 @@ class DatabaseManager:
                 ORDER BY xp DESC LIMIT ?
             """, (limit,))
             return cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting leaderboard: {e}")
-            return []
         finally:
             conn.close()
     
+    @db_operation("getting achievements", default=list)
     def get_user_achievements(self, user_id: int) -> List[Tuple]:
         """Get all achievements for a user"""
         conn = self.get_connection()
@@ -352,12 +924,10 @@ class DatabaseManager:
                 ORDER BY date_awarded DESC
             """, (user_id,))
             return cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting achievements: {e}")
-            return []
         finally:
             conn.close()
     
+    @db_operation("recording quiz attempt")
     def record_quiz_attempt(self, user_id: int, course_id: int, module_id: int, 
                            lesson_id: int, score: int, total_questions: int):
         """Record a quiz attempt"""
@@ -371,12 +941,11 @@ class DatabaseManager:
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (user_id, course_id, module_id, lesson_id, score, total_questions))
             conn.commit()
-        except Exception as e:
-            print(f"Error recording quiz attempt: {e}")
         finally:
             conn.close()
     
     # CTF Challenge Methods
+    @db_operation("adding CTF challenge", default=False)
     def add_ctf_challenge(self, name: str, category: str, difficulty: str, points: int, 
                          description: str, flag: str, hints: str = "", required_xp: int = 0):
         """Add a new CTF challenge"""
@@ -391,12 +960,32 @@ class DatabaseManager:
             """, (name, category, difficulty, points, description, flag, hints, required_xp))
             conn.commit()
             return True
-        except Exception as e:
-            print(f"Error adding CTF challenge: {e}")
-            return False
         finally:
             conn.close()
     
+    @db_operation("seeding CTF challenges", default=0)
+    def seed_ctf_challenges(self, challenges: list) -> int:
+        """Insert any built-in CTF challenges that are missing and return how many were added"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT COUNT(*) FROM ctf_challenges")
+            before = cursor.fetchone()[0]
+            cursor.executemany("""
+                INSERT OR IGNORE INTO ctf_challenges 
+                (challenge_name, category, difficulty, points, description, flag, hints, required_xp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(c['name'], c['category'], c['difficulty'], c['points'], c['description'],
+                   c['flag'], c['hints'], c['required_xp']) for c in challenges])
+            cursor.execute("SELECT COUNT(*) FROM ctf_challenges")
+            added = cursor.fetchone()[0] - before
+            conn.commit()
+            return added
+        finally:
+            conn.close()
+    
+    @db_operation("getting CTF challenges", default=list)
     def get_ctf_challenges(self, user_xp: int = 0):
         """Get available CTF challenges based on user XP"""
         conn = self.get_connection()
@@ -410,12 +999,26 @@ class DatabaseManager:
                 ORDER BY difficulty, points
             """, (user_xp,))
             return cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting CTF challenges: {e}")
-            return []
         finally:
             conn.close()
     
+    @db_operation("getting CTF challenge")
+    def get_ctf_challenge(self, challenge_id: int):
+        """One CTF challenge row by id, or None"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT id, challenge_name, category, difficulty, points, description, required_xp
+                FROM ctf_challenges 
+                WHERE id = ?
+            """, (challenge_id,))
+            return cursor.fetchone()
+        finally:
+            conn.close()
+    
+    @db_operation("submitting CTF flag", default=(False, "Error processing submission"))
     def submit_ctf_flag(self, user_id: int, challenge_id: int, submitted_flag: str):
         """Submit a CTF flag and check if correct"""
         conn = self.get_connection()
@@ -438,18 +1041,39 @@ class DatabaseManager:
                 VALUES (?, ?, ?, ?)
             """, (user_id, challenge_id, submitted_flag, is_correct))
             
-            # If correct, award points
-            if is_correct:
-                self.add_xp(user_id, points)
+            # If correct, award points in the same transaction (a second
+            # connection would block on the lock this one already holds)
+            new_xp = self._apply_xp(cursor, user_id, points) if is_correct else None
             
             conn.commit()
+            if new_xp is not None:
+                self._write_through(user_id, xp=new_xp, level=level_for_xp(new_xp))
             return is_correct, points if is_correct else 0
-        except Exception as e:
-            print(f"Error submitting CTF flag: {e}")
-            return False, "Error processing submission"
         finally:
             conn.close()
     
+    @db_operation("getting CTF leaderboard")
+    def get_ctf_leaderboard(self, limit: int = 10) -> Optional[List[Tuple]]:
+        """Get top CTF solvers as (username, points, solved); None on error"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT u.username, SUM(c.points) as total_points, COUNT(s.id) as challenges_solved
+                FROM ctf_submissions s
+                JOIN users u ON s.user_id = u.user_id
+                JOIN ctf_challenges c ON s.challenge_id = c.id
+                WHERE s.is_correct = 1
+                GROUP BY u.user_id, u.username
+                ORDER BY total_points DESC, challenges_solved DESC
+                LIMIT ?
+            """, (limit,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    @db_operation("getting CTF progress", default=list)
     def get_user_ctf_progress(self, user_id: int):
         """Get user's CTF challenge progress"""
         conn = self.get_connection()
@@ -464,13 +1088,11 @@ class DatabaseManager:
                 ORDER BY s.submission_date DESC
             """, (user_id,))
             return cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting CTF progress: {e}")
-            return []
         finally:
             conn.close()
     
     # Multimedia Content Methods
+    @db_operation("adding multimedia content", default=False)
     def add_multimedia_content(self, content_type: str, content_url: str, description: str,
                               course_id: int, module_id: int, lesson_id: int):
         """Add multimedia content to a lesson"""
@@ -485,12 +1107,10 @@ class DatabaseManager:
             """, (content_type, content_url, description, course_id, module_id, lesson_id))
             conn.commit()
             return True
-        except Exception as e:
-            print(f"Error adding multimedia content: {e}")
-            return False
         finally:
             conn.close()
     
+    @db_operation("getting multimedia content", default=list)
     def get_lesson_multimedia(self, course_id: int, module_id: int, lesson_id: int):
         """Get multimedia content for a specific lesson"""
         conn = self.get_connection()
@@ -503,13 +1123,476 @@ class DatabaseManager:
                 WHERE course_id = ? AND module_id = ? AND lesson_id = ?
             """, (course_id, module_id, lesson_id))
             return cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting multimedia content: {e}")
-            return []
+        finally:
+            conn.close()
+    
+    @db_operation("getting all lesson multimedia", default=list)
+    def get_all_lesson_multimedia(self):
+        """Get (course_id, module_id, lesson_id, description) for every multimedia item"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT course_id, module_id, lesson_id, content_description
+                FROM multimedia_content
+            """)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    # Course Authoring Methods
+    def _bump_course_revision(self, cursor, course_id: int):
+        """Record that a course's authored content changed"""
+        cursor.execute("""
+            INSERT INTO authored_courses (course_id) VALUES (?)
+            ON CONFLICT(course_id) DO UPDATE SET revision = revision + 1, updated_at = CURRENT_TIMESTAMP
+        """, (course_id,))
+    
+    @db_operation("creating authored course", default=None)
+    def create_authored_course(self, title: str, description: str, level: str, first_free_id: int) -> Optional[int]:
+        """Store a new course under the next unused id (at least first_free_id) and return it"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT MAX(course_id) FROM authored_courses")
+            course_id = max(first_free_id, (cursor.fetchone()[0] or 0) + 1)
+            cursor.execute("""
+                INSERT INTO authored_courses (course_id, title, description, level)
+                VALUES (?, ?, ?, ?)
+            """, (course_id, title, description, level))
+            conn.commit()
+            return course_id
+        finally:
+            conn.close()
+    
+    @db_operation("saving authored lesson", default=False)
+    def save_authored_lesson(self, course_id: int, module_id: int, lesson_id: int, title: str,
+                             content: str, xp_reward: int = 100, module_title: str = None) -> bool:
+        """Create or replace a lesson, and optionally (re)title its module"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            if module_title:
+                cursor.execute("""
+                    INSERT INTO authored_modules (course_id, module_id, title) VALUES (?, ?, ?)
+                    ON CONFLICT(course_id, module_id) DO UPDATE SET title = excluded.title
+                """, (course_id, module_id, module_title))
+            cursor.execute("""
+                INSERT INTO authored_lessons (course_id, module_id, lesson_id, title, content, xp_reward)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(course_id, module_id, lesson_id) DO UPDATE SET
+                    title = excluded.title, content = excluded.content, xp_reward = excluded.xp_reward
+            """, (course_id, module_id, lesson_id, title, content, xp_reward))
+            self._bump_course_revision(cursor, course_id)
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("saving authored quiz", default=False)
+    def save_authored_quiz(self, course_id: int, module_id: int, lesson_id: int, question: str,
+                           options: list, correct: int, explanation: str = "") -> bool:
+        """Create or replace the quiz of a lesson"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                INSERT INTO authored_quizzes (course_id, module_id, lesson_id, question, options, correct, explanation)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(course_id, module_id, lesson_id) DO UPDATE SET
+                    question = excluded.question, options = excluded.options,
+                    correct = excluded.correct, explanation = excluded.explanation
+            """, (course_id, module_id, lesson_id, question, json.dumps(options), correct, explanation))
+            self._bump_course_revision(cursor, course_id)
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("checking authored course", default=False)
+    def is_authored_course(self, course_id: int) -> bool:
+        """Whether an admin created this course (it may not have lessons yet)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT 1 FROM authored_courses WHERE course_id = ? AND title IS NOT NULL", (course_id,))
+            return cursor.fetchone() is not None
+        finally:
+            conn.close()
+    
+    @db_operation("getting authored course ids", default=list)
+    def get_authored_course_ids(self) -> list:
+        """Ids of admin-created courses that have at least one lesson"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT course_id FROM authored_courses
+                WHERE title IS NOT NULL
+                  AND EXISTS (SELECT 1 FROM authored_lessons l WHERE l.course_id = authored_courses.course_id)
+            """)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    @db_operation("getting authored course", default=None)
+    def get_authored_course(self, course_id: int) -> Optional[Tuple[int, dict]]:
+        """Get (revision, content) for a course's authored changes, shaped like a course file"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT revision, title, description, level FROM authored_courses WHERE course_id = ?
+            """, (course_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            revision = row[0]
+            course = {key: value for key, value in zip(("title", "description", "level"), row[1:]) if value is not None}
+            modules = {}
+            
+            cursor.execute("SELECT module_id, title FROM authored_modules WHERE course_id = ?", (course_id,))
+            for module_id, title in cursor.fetchall():
+                modules[str(module_id)] = {"title": title}
+            
+            cursor.execute("""
+                SELECT module_id, lesson_id, title, content, xp_reward FROM authored_lessons WHERE course_id = ?
+            """, (course_id,))
+            for module_id, lesson_id, title, content, xp_reward in cursor.fetchall():
+                lessons = modules.setdefault(str(module_id), {}).setdefault("lessons", {})
+                lessons[str(lesson_id)] = {"title": title, "content": content, "xp_reward": xp_reward}
+            
+            cursor.execute("""
+                SELECT module_id, lesson_id, question, options, correct, explanation
+                FROM authored_quizzes WHERE course_id = ?
+            """, (course_id,))
+            for module_id, lesson_id, question, options, correct, explanation in cursor.fetchall():
+                lessons = modules.setdefault(str(module_id), {}).setdefault("lessons", {})
+                lessons.setdefault(str(lesson_id), {})["quiz"] = {
+                    "question": question, "options": json.loads(options),
+                    "correct": correct, "explanation": explanation
+                }
+            
+            if modules:
+                course["modules"] = modules
+            return revision, course
+        finally:
+            conn.close()
+    
+    @db_operation("getting course outlines", default=dict)
+    def get_course_outlines(self) -> dict:
+        """Get course_id -> (path, mtime_ns, revision, current authored revision, outline JSON)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT o.course_id, o.path, o.mtime_ns, o.revision, COALESCE(a.revision, 0), o.outline
+                FROM course_outlines o LEFT JOIN authored_courses a ON a.course_id = o.course_id
+            """)
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+    
+    @db_operation("saving course outline", default=False)
+    def save_course_outline(self, course_id: int, path: Optional[str], mtime_ns: int, revision: int,
+                            outline: str) -> bool:
+        """Store a course's outline as of a file mtime and authored revision"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                INSERT INTO course_outlines (course_id, path, mtime_ns, revision, outline) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(course_id) DO UPDATE SET
+                    path = excluded.path, mtime_ns = excluded.mtime_ns,
+                    revision = excluded.revision, outline = excluded.outline
+            """, (course_id, path, mtime_ns, revision, outline))
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("getting seen questions")
+    def get_seen_questions(self, user_id: int, scope: str) -> Optional[Tuple[int, int, bytes]]:
+        """Get (capacity, seen, bits) of a user's seen-question filter for a scope"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT capacity, seen, bits FROM quiz_seen WHERE user_id = ? AND scope = ?
+            """, (user_id, scope))
+            row = cursor.fetchone()
+            return (row[0], row[1], bytes(row[2])) if row else None
+        finally:
+            conn.close()
+    
+    @db_operation("saving seen questions", default=False)
+    def save_seen_questions(self, user_id: int, scope: str, capacity: int, seen: int, bits: bytes) -> bool:
+        """Store a user's seen-question filter for a scope"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                INSERT INTO quiz_seen (user_id, scope, capacity, seen, bits) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, scope) DO UPDATE SET
+                    capacity = excluded.capacity, seen = excluded.seen,
+                    bits = excluded.bits, updated_at = CURRENT_TIMESTAMP
+            """, (user_id, scope, capacity, seen, bits))
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("getting review cards", default=list)
+    def get_review_cards(self, user_id: int) -> List[Tuple]:
+        """Get (question_key, course_id, module_id, ease, interval_days, repetitions, due_at) of a user's cards"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT question_key, course_id, module_id, ease, interval_days, repetitions, due_at
+                FROM review_cards WHERE user_id = ?
+            """, (user_id,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    @db_operation("saving review card", default=False)
+    def save_review_card(self, user_id: int, question_key: str, course_id: int, module_id: int,
+                         ease: float, interval_days: float, repetitions: int, due_at: float, reviewed_at: float) -> bool:
+        """Create or update the spaced-repetition state of one question for a user"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                INSERT INTO review_cards (user_id, question_key, course_id, module_id, ease, interval_days,
+                                          repetitions, due_at, reviewed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, question_key) DO UPDATE SET
+                    course_id = excluded.course_id, module_id = excluded.module_id, ease = excluded.ease,
+                    interval_days = excluded.interval_days, repetitions = excluded.repetitions,
+                    due_at = excluded.due_at, reviewed_at = excluded.reviewed_at
+            """, (user_id, question_key, course_id, module_id, ease, interval_days, repetitions, due_at, reviewed_at))
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("deleting review card", default=False)
+    def delete_review_card(self, user_id: int, question_key: str) -> bool:
+        """Forget a card whose question no longer exists"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("DELETE FROM review_cards WHERE user_id = ? AND question_key = ?", (user_id, question_key))
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("getting review reminders", default=list)
+    def get_review_reminders(self, now: float, limit: int = 500) -> List[Tuple[int, int]]:
+        """(user_id, due count) for users with a review that came due since their last reminder"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT c.user_id, COUNT(*) FROM review_cards c
+                LEFT JOIN review_reminders r ON r.user_id = c.user_id
+                WHERE c.due_at <= ?
+                GROUP BY c.user_id
+                HAVING MAX(c.due_at) > COALESCE(MAX(r.reminded_at), 0)
+                LIMIT ?
+            """, (now, limit))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    @db_operation("marking review reminders", default=False)
+    def mark_review_reminders(self, user_ids: list, now: float) -> bool:
+        """Record that a batch of users was reminded at `now`"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("""
+                INSERT INTO review_reminders (user_id, reminded_at) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET reminded_at = excluded.reminded_at
+            """, [(user_id, now) for user_id in user_ids])
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("getting user rating")
+    def get_user_rating(self, user_id: int) -> Optional[Tuple[float, int]]:
+        """Get (rating, answers) of a learner"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT rating, answers FROM user_ratings WHERE user_id = ?", (user_id,))
+            return cursor.fetchone()
+        finally:
+            conn.close()
+    
+    @db_operation("getting question ratings", default=dict)
+    def get_question_ratings(self) -> dict:
+        """Get question_key -> (rating, seed, answers) for every rated question"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT question_key, rating, seed, answers FROM question_ratings")
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+    
+    @db_operation("saving ratings", default=False)
+    def save_ratings(self, users: list, questions: list, answers: list = ()) -> bool:
+        """Write batches of user ratings, question ratings and quiz_answers rows in one transaction"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("""
+                INSERT INTO user_ratings (user_id, rating, answers) VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET rating = excluded.rating, answers = excluded.answers
+            """, users)
+            cursor.executemany("""
+                INSERT INTO question_ratings (question_key, rating, seed, answers) VALUES (?, ?, ?, ?)
+                ON CONFLICT(question_key) DO UPDATE SET rating = excluded.rating, answers = excluded.answers
+            """, questions)
+            cursor.executemany("""
+                INSERT INTO quiz_answers (user_id, question_key, course_id, module_id, correct, answered_at,
+                                          chosen, latency_ms, ability)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, answers)
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("saving tournament", default=False)
+    def save_tournament(self, tournament_id: int, guild_id: int, channel_id: int, host_id: int, course_id: int,
+                        module_id: int, questions: int, results: list) -> bool:
+        """Record a finished tournament and award its XP in one transaction.
+        
+        `results` holds (user_id, username, points, correct, answered, xp) rows, one per player.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                INSERT INTO tournaments (tournament_id, guild_id, channel_id, host_id, course_id, module_id,
+                                         questions, players)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (tournament_id, guild_id, channel_id, host_id, course_id, module_id, questions, len(results)))
+            cursor.executemany("""
+                INSERT INTO users (user_id, username) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET username = excluded.username
+                WHERE users.username IS NOT excluded.username
+            """, [(row[0], row[1]) for row in results if self.known_users.get(row[0]) != row[1]])
+            cursor.executemany("""
+                INSERT INTO tournament_results (tournament_id, user_id, points, correct, answered)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(tournament_id, *row[:1], *row[2:5]) for row in results])
+            totals = {}
+            for user_id, _, _, _, _, xp in results:
+                if xp:
+                    totals[user_id] = self._apply_xp(cursor, user_id, xp)
+            conn.commit()
+            for user_id, username, *_ in results:
+                self.known_users.set(user_id, username)
+                if user_id in totals:
+                    self._write_through(user_id, username=username, xp=totals[user_id],
+                                        level=level_for_xp(totals[user_id]))
+                else:
+                    self._write_through(user_id, username=username)
+            return True
+        finally:
+            conn.close()
+    
+    @db_operation("getting answer log", default=list)
+    def get_answer_log(self) -> List[Tuple[int, str, int]]:
+        """Get (user_id, question_key, correct) of every logged quiz answer"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT user_id, question_key, correct FROM quiz_answers")
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    @db_operation("getting item statistics", default=list)
+    def get_item_statistics(self, min_answers: int = 1) -> List[Tuple]:
+        """Per-question sums over quiz_answers for item analysis, aggregated in one pass.
+        
+        Rows are (question_key, course_id, module_id, answers, correct, avg latency_ms, then
+        over answers with a recorded ability: count, correct, Σability, Σability², Σcorrect·ability).
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT question_key, MIN(course_id), MIN(module_id), COUNT(*), SUM(correct), AVG(latency_ms),
+                       COUNT(ability), SUM(CASE WHEN ability IS NOT NULL THEN correct ELSE 0 END),
+                       SUM(ability), SUM(ability * ability), SUM(correct * ability)
+                FROM quiz_answers
+                GROUP BY question_key
+                HAVING COUNT(*) >= ?
+            """, (min_answers,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    @db_operation("getting option counts", default=list)
+    def get_option_counts(self) -> List[Tuple[str, int, int]]:
+        """(question_key, chosen option, answers) for every answer with a known choice"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT question_key, chosen, COUNT(*) FROM quiz_answers
+                WHERE chosen IS NOT NULL
+                GROUP BY question_key, chosen
+            """)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    @db_operation("getting user ratings", default=dict)
+    def get_user_ratings(self) -> dict:
+        """Get user_id -> (rating, answers) for every rated learner"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT user_id, rating, answers FROM user_ratings")
+            return {row[0]: row[1:] for row in cursor.fetchall()}
         finally:
             conn.close()
     
     # Training Session Management Methods
+    @db_operation("saving training session", default=False)
     def save_training_session(self, user_id: int, session_type: str, current_position: str, session_data: str):
         """Save or update a training session for stop/resume functionality"""
         conn = self.get_connection()
@@ -530,12 +1613,10 @@ class DatabaseManager:
             
             conn.commit()
             return True
-        except Exception as e:
-            print(f"Error saving training session: {e}")
-            return False
         finally:
             conn.close()
     
+    @db_operation("getting training session")
     def get_training_session(self, user_id: int, session_type: str):
         """Get a saved training session"""
         conn = self.get_connection()
@@ -551,12 +1632,10 @@ class DatabaseManager:
             """, (user_id, session_type))
             
             return cursor.fetchone()
-        except Exception as e:
-            print(f"Error getting training session: {e}")
-            return None
         finally:
             conn.close()
     
+    @db_operation("deleting training session", default=False)
     def delete_training_session(self, user_id: int, session_type: str):
         """Delete a training session (when completed)"""
         conn = self.get_connection()
@@ -570,12 +1649,10 @@ class DatabaseManager:
             
             conn.commit()
             return True
-        except Exception as e:
-            print(f"Error deleting training session: {e}")
-            return False
         finally:
             conn.close()
     
+    @db_operation("getting user training sessions", default=list)
     def get_user_training_sessions(self, user_id: int):
         """Get all saved training sessions for a user"""
         conn = self.get_connection()
@@ -590,11 +1667,8 @@ class DatabaseManager:
             """, (user_id,))
             
             return cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting user training sessions: {e}")
-            return []
         finally:
             conn.close()
 
 # Global database instance
-db = DatabaseManager()
+db = DatabaseManager(os.getenv("DATABASE_PATH", "academy.db"))
@@ -0,0 +1,145 @@
+"""
+Item Analysis
+Classical item statistics for quiz questions — p-values, distractor selection rates
+and discrimination — from sums that SQLite aggregates over quiz_answers in one pass
+"""
+
+import csv
+import io
+import math
+import os
+import discord
+from cache import ResponseCache
+from database import db
+from question_bank import question_bank
+
+# Below this many answers a question's statistics are too noisy to report
+MIN_ANSWERS = int(os.getenv("ITEM_ANALYSIS_MIN_ANSWERS", "20"))
+TOO_EASY = 0.9
+TOO_HARD = 0.3
+LOW_DISCRIMINATION = 0.1
+
+# The report scans the whole answer log, so it is reused for a while
+item_report_cache = ResponseCache(ttl=float(os.getenv("ITEM_ANALYSIS_TTL", "600")), maxsize=8)
+
+class ItemStats:
+    """Statistics of one question"""
+    
+    __slots__ = ("key", "course_id", "module_id", "answers", "p_value", "latency_ms",
+                 "discrimination", "option_rates", "quiz")
+    
+    def __init__(self, key: str, course_id: int, module_id: int, answers: int, p_value: float,
+                 latency_ms, discrimination, option_rates: dict, quiz=None):
+        self.key = key
+        self.course_id = course_id
+        self.module_id = module_id
+        self.answers = answers
+        self.p_value = p_value  # Share answered correctly
+        self.latency_ms = latency_ms
+        self.discrimination = discrimination  # Point-biserial correlation with learner rating, None if undefined
+        self.option_rates = option_rates  # option index -> share of answers with a known choice
+        self.quiz = quiz  # None once the question is gone from the course
+    
+    @property
+    def strongest_distractor(self):
+        """(option, rate) of the most picked wrong option, or None"""
+        if self.quiz is None:
+            return None
+        wrong = [(rate, option) for option, rate in self.option_rates.items() if option != self.quiz["correct"]]
+        if not wrong:
+            return None
+        rate, option = max(wrong)
+        return option, rate
+    
+    @property
+    def flags(self) -> list:
+        flags = []
+        if self.p_value >= TOO_EASY:
+            flags.append("too easy")
+        elif self.p_value <= TOO_HARD:
+            flags.append("too hard")
+        if self.discrimination is not None and self.discrimination < LOW_DISCRIMINATION:
+            flags.append("low discrimination")
+        distractor = self.strongest_distractor
+        if distractor is not None and distractor[1] > self.option_rates.get(self.quiz["correct"], 0.0):
+            flags.append("distractor beats key")
+        return flags
+
+def point_biserial(answers: int, correct: int, sum_y: float, sum_yy: float, sum_xy: float):
+    """Correlation between a 0/1 score and a continuous ability from running sums"""
+    if not answers:
+        return None
+    p = correct / answers
+    mean_y = sum_y / answers
+    variance_y = sum_yy / answers - mean_y * mean_y
+    if p <= 0.0 or p >= 1.0 or variance_y <= 1e-9:
+        return None
+    covariance = sum_xy / answers - p * mean_y
+    return covariance / math.sqrt(p * (1.0 - p) * variance_y)
+
+def analyze_items(min_answers: int = MIN_ANSWERS) -> list:
+    """ItemStats for every question with at least `min_answers` logged answers"""
+    options = {}
+    for key, chosen, count in db.get_option_counts():
+        options.setdefault(key, {})[chosen] = count
+    
+    items = []
+    for (key, course_id, module_id, answers, correct, latency_ms,
+         rated, rated_correct, sum_y, sum_yy, sum_xy) in db.get_item_statistics(min_answers):
+        counts = options.get(key, {})
+        chosen_total = sum(counts.values())
+        option_rates = {option: count / chosen_total for option, count in counts.items()} if chosen_total else {}
+        # Only answers logged with the learner's rating count towards discrimination
+        discrimination = point_biserial(rated, rated_correct, sum_y or 0.0, sum_yy or 0.0, sum_xy or 0.0)
+        items.append(ItemStats(key, course_id, module_id, answers, correct / answers, latency_ms,
+                               discrimination, option_rates, question_bank.find(course_id, module_id, key)))
+    return items
+
+def _describe(item: ItemStats) -> str:
+    question = item.quiz["question"] if item.quiz is not None else f"(removed question {item.key})"
+    stats = f"p={item.p_value:.2f}"
+    if item.discrimination is not None:
+        stats += f" • r={item.discrimination:.2f}"
+    stats += f" • n={item.answers}"
+    distractor = item.strongest_distractor
+    if distractor is not None:
+        stats += f" • {chr(65 + distractor[0])} picked {distractor[1]:.0%}"
+    return f"**{item.course_id}.{item.module_id}** {question[:80]}\n{stats}"
+
+def render_item_report(min_answers: int = MIN_ANSWERS) -> dict:
+    """Embed payload plus a CSV of every analysed question"""
+    items = analyze_items(min_answers)
+    
+    embed = discord.Embed(
+        title="🔬 Quiz Item Analysis",
+        description=f"{len(items)} question(s) with at least {min_answers} answers",
+        color=0x0099FF
+    )
+    sections = (
+        ("😴 Too Easy", lambda item: "too easy" in item.flags, lambda item: -item.p_value),
+        ("🧗 Too Hard", lambda item: "too hard" in item.flags, lambda item: item.p_value),
+        ("🪤 Misleading", lambda item: {"low discrimination", "distractor beats key"} & set(item.flags),
+         lambda item: item.discrimination if item.discrimination is not None else 0.0)
+    )
+    for name, matches, order in sections:
+        flagged = sorted((item for item in items if matches(item)), key=order)
+        if flagged:
+            embed.add_field(name=f"{name} ({len(flagged)})",
+                            value="\n".join(_describe(item) for item in flagged[:5])[:1024], inline=False)
+    if not items:
+        embed.add_field(name="Not Enough Data", value="No question has enough logged answers yet.", inline=False)
+    
+    report = io.StringIO()
+    writer = csv.writer(report)
+    writer.writerow(["course", "module", "question_key", "question", "answers", "p_value", "discrimination",
+                     "avg_latency_ms", "option_rates", "flags"])
+    for item in sorted(items, key=lambda item: (item.course_id, item.module_id, item.key)):
+        writer.writerow([
+            item.course_id, item.module_id, item.key, item.quiz["question"] if item.quiz is not None else "",
+            item.answers, f"{item.p_value:.3f}",
+            f"{item.discrimination:.3f}" if item.discrimination is not None else "",
+            f"{item.latency_ms:.0f}" if item.latency_ms is not None else "",
+            " ".join(f"{chr(65 + option)}={rate:.2f}" for option, rate in sorted(item.option_rates.items())),
+            "; ".join(item.flags)
+        ])
+    return {"embed": embed.to_dict(), "csv": report.getvalue()}
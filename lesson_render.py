@@ -0,0 +1,116 @@
+"""
+Lesson Embed Rendering
+Lesson embeds and their content pages are built once per lesson content version;
+each request only materializes the page being viewed
+"""
+
+import os
+import discord
+from cache import TTLCache
+from courses import COURSES, get_course, get_lesson, get_lesson_position
+from pagination import EMBED_DESCRIPTION_LIMIT, EMBED_FIELD_LIMIT, EMBED_TOTAL_LIMIT, chunk_text
+
+# Room left in the embed total for the "Page N/M • " footer prefix
+PAGE_FOOTER_MARGIN = 32
+
+# (course_id, module_id, lesson_id, content_version) -> RenderedLesson
+lesson_embed_cache = TTLCache(maxsize=int(os.getenv("LESSON_EMBED_CACHE_SIZE", "512")), ttl=float("inf"))
+
+class RenderedLesson:
+    """Static lesson embed payload plus its precomputed content pages"""
+    
+    __slots__ = ("payload", "pages")
+    
+    def __init__(self, payload: dict, pages: tuple):
+        self.payload = payload
+        self.pages = pages
+    
+    def page_embed(self, page: int = 0) -> discord.Embed:
+        """Materialize one page as a fresh Embed"""
+        page = max(0, min(page, len(self.pages) - 1))
+        embed = clone_embed(self.payload)
+        embed.description = self.pages[page]
+        if len(self.pages) > 1:
+            embed.set_footer(text=f"Page {page + 1}/{len(self.pages)} • {self.payload['footer']['text']}")
+        return embed
+
+def render_lesson(course_id: int, module_id: int, lesson_id: int, lesson: dict) -> RenderedLesson:
+    """Build a lesson's static embed and split its content into pages that fit beside it"""
+    course = get_course(course_id)
+    
+    embed = discord.Embed(
+        title=f"📖 {lesson['title']}",
+        color=0x0099FF
+    )
+    
+    position = get_lesson_position(course_id, module_id, lesson_id)
+    position_text = f" ({position[0]} of {position[1]})" if position else ""
+    embed.add_field(
+        name="📚 Course Info",
+        value=f"**{course['title']}**\nCourse {course_id} • Module {module_id} • Lesson {lesson_id}{position_text}",
+        inline=True
+    )
+    
+    embed.add_field(
+        name="⭐ XP Reward",
+        value=f"{lesson.get('xp_reward', 100)} XP",
+        inline=True
+    )
+    
+    # Add practical exercise if available
+    if "practical_exercise" in lesson:
+        exercise = lesson["practical_exercise"]
+        embed.add_field(
+            name="🛠️ Practical Exercise",
+            value=f"**{exercise['title']}**\n{exercise['description']}"[:EMBED_FIELD_LIMIT],
+            inline=False
+        )
+    
+    # Add quiz info if available
+    if "quiz" in lesson:
+        embed.add_field(
+            name="🎯 Quiz Available",
+            value="Test your knowledge with the lesson quiz!",
+            inline=False
+        )
+    
+    embed.set_footer(text="Complete the lesson to earn XP and unlock achievements!")
+    
+    page_limit = min(EMBED_DESCRIPTION_LIMIT, EMBED_TOTAL_LIMIT - len(embed) - PAGE_FOOTER_MARGIN)
+    return RenderedLesson(embed.to_dict(), chunk_text(lesson["content"], page_limit))
+
+def clone_embed(payload: dict) -> discord.Embed:
+    """Build an Embed from a cached payload without sharing its lists and dicts"""
+    # Embed.from_dict keeps references to fields/footer/etc., so copy them first
+    data = dict(payload)
+    if "fields" in data:
+        data["fields"] = [dict(field) for field in data["fields"]]
+    for key in ("footer", "author", "thumbnail", "image"):
+        if key in data:
+            data[key] = dict(data[key])
+    return discord.Embed.from_dict(data)
+
+def get_rendered_lesson(course_id: int, module_id: int, lesson_id: int):
+    """Get the cached RenderedLesson for a lesson, or None if the lesson does not exist"""
+    lesson = get_lesson(course_id, module_id, lesson_id)
+    if not lesson:
+        return None
+    
+    key = (course_id, module_id, lesson_id, COURSES.version(course_id))
+    rendered = lesson_embed_cache.get(key)
+    if rendered is None:
+        rendered = render_lesson(course_id, module_id, lesson_id, lesson)
+        lesson_embed_cache.set(key, rendered)
+    return rendered
+
+def get_lesson_embed(course_id: int, module_id: int, lesson_id: int, page: int = 0):
+    """Get a fresh copy of one page of a lesson's embed, or None if the lesson does not exist"""
+    rendered = get_rendered_lesson(course_id, module_id, lesson_id)
+    return rendered.page_embed(page) if rendered else None
+
+def invalidate_lesson_embeds(course_ids):
+    """Drop cached embeds of reloaded courses"""
+    course_ids = set(course_ids)
+    lesson_embed_cache.invalidate_where(lambda key: key[0] in course_ids)
+
+COURSES.add_reload_listener(invalidate_lesson_embeds)
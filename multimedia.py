@@ -3,10 +3,13 @@ Multimedia Content Manager
 Handles images, videos, audio, and interactive content for lessons
 """
 
+import asyncio
 import discord
-from discord.ui import Button, View
+from discord.ui import Button, DynamicItem, View
 import random
 from database import db
+from persistent import OwnedItem, persistent
+from timer_wheel import WheelView
 
 # Sample multimedia content URLs (using placeholder services and free resources)
 MULTIMEDIA_CONTENT = {
@@ -169,7 +172,7 @@ MULTIMEDIA_CONTENT = {
     ]
 }
 
-class PhishingQuizView(View):
+class PhishingQuizView(WheelView):
     def __init__(self, user_id: int, email_data: dict):
         super().__init__(timeout=300)
         self.user_id = user_id
@@ -229,7 +232,7 @@ class PhishingQuizView(View):
                 color=0x00FF00
             )
             xp_earned = 150
-            db.add_xp(self.user_id, xp_earned)
+            await db.run(db.add_xp, self.user_id, xp_earned)
             embed.add_field(
                 name="XP Earned",
                 value=f"+{xp_earned} XP",
@@ -249,82 +252,77 @@ class PhishingQuizView(View):
         
         await interaction.response.edit_message(embed=embed, view=self)
 
-class MultimediaView(View):
-    def __init__(self, user_id: int, content_list: list, content_type: str):
-        super().__init__(timeout=300)
-        self.user_id = user_id
-        self.content_list = content_list
-        self.content_type = content_type
-        self.current_index = 0
-        
-        # Add navigation buttons
-        if len(content_list) > 1:
-            prev_btn = Button(
-                label="◀️ Previous",
-                style=discord.ButtonStyle.secondary,
-                disabled=True
-            )
-            prev_btn.callback = self.previous_content
-            self.add_item(prev_btn)
-            
-            next_btn = Button(
-                label="Next ▶️",
-                style=discord.ButtonStyle.secondary
-            )
-            next_btn.callback = self.next_content
-            self.add_item(next_btn)
-        
-        # Add interactive quiz button for phishing content
-        if content_type == "phishing":
-            quiz_btn = Button(
-                label="🎯 Take Quiz",
-                style=discord.ButtonStyle.primary
-            )
-            quiz_btn.callback = self.start_phishing_quiz
-            self.add_item(quiz_btn)
-        
-        # Add stop & save button
-        stop_btn = Button(
-            label="⏸️ Stop & Save",
-            style=discord.ButtonStyle.danger
+def create_content_embed(content_type: str, content_list: list, index: int) -> discord.Embed:
+    """Embed showing one item of a multimedia content list"""
+    content = content_list[index]
+    
+    embed = discord.Embed(
+        title=f"📚 {content_type.title()} Content",
+        description=content['description'],
+        color=0x0099FF
+    )
+    
+    if content['type'] == 'image':
+        embed.set_image(url=content['url'])
+    elif content['type'] == 'video':
+        embed.add_field(
+            name="🎥 Video",
+            value=f"[Watch Video]({content['url']})\nDuration: {content.get('duration', 'Unknown')}",
+            inline=False
+        )
+    elif content['type'] == 'audio':
+        embed.add_field(
+            name="🎵 Audio",
+            value=f"[Listen to Audio]({content['url']})\nDuration: {content.get('duration', 'Unknown')}",
+            inline=False
         )
-        stop_btn.callback = self.stop_multimedia
-        self.add_item(stop_btn)
     
-    async def previous_content(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your content!", ephemeral=True)
-            return
-        
-        self.current_index = max(0, self.current_index - 1)
-        await self.update_content(interaction)
+    if len(content_list) > 1:
+        embed.set_footer(text=f"Content {index + 1} of {len(content_list)}")
     
-    async def next_content(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your content!", ephemeral=True)
-            return
-        
-        self.current_index = min(len(self.content_list) - 1, self.current_index + 1)
-        await self.update_content(interaction)
+    return embed
+
+@persistent
+class MultimediaButton(OwnedItem, DynamicItem[Button],
+                       template=r"media:(?P<action>prev|next|quiz|stop):(?P<user>\d+):(?P<kind>[a-z]+):(?P<index>\d+)"):
+    """A button of a multimedia message; `index` is the item the button leads to, or the one shown"""
     
-    async def update_content(self, interaction: discord.Interaction):
-        embed = self.create_content_embed()
-        
-        # Update button states
-        for item in self.children:
-            if item.label == "◀️ Previous":
-                item.disabled = self.current_index == 0
-            elif item.label == "Next ▶️":
-                item.disabled = self.current_index == len(self.content_list) - 1
-        
-        await interaction.response.edit_message(embed=embed, view=self)
+    denied_message = "❌ This isn't your content!"
     
-    async def start_phishing_quiz(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your quiz!", ephemeral=True)
+    def __init__(self, action: str, user_id: int, content_type: str, index: int, label: str,
+                 style=discord.ButtonStyle.secondary, disabled: bool = False):
+        self.action = action
+        self.user_id = user_id
+        self.content_type = content_type
+        self.index = index
+        super().__init__(Button(
+            label=label,
+            style=style,
+            disabled=disabled,
+            custom_id=f"media:{action}:{user_id}:{content_type}:{index}"
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["user"]), match["kind"], int(match["index"]), item.label, item.style)
+    
+    async def callback(self, interaction: discord.Interaction):
+        content_list = multimedia_manager.get_content(self.content_type)
+        if not content_list:
+            await interaction.response.send_message("❌ This content is no longer available.", ephemeral=True)
             return
-        
-        current_content = self.content_list[self.current_index]
+        index = max(0, min(self.index, len(content_list) - 1))
+        
+        if self.action in ("prev", "next"):
+            embed = create_content_embed(self.content_type, content_list, index)
+            view = MultimediaView(self.user_id, content_list, self.content_type, index)
+            await interaction.response.edit_message(embed=embed, view=view)
+        elif self.action == "quiz":
+            await self.start_phishing_quiz(interaction, content_list[index])
+        else:
+            await self.stop_multimedia(interaction, content_list, index)
+    
+    async def start_phishing_quiz(self, interaction: discord.Interaction, current_content: dict):
         quiz_view = PhishingQuizView(self.user_id, current_content)
         
         embed = discord.Embed(
@@ -340,60 +338,28 @@ class MultimediaView(View):
         
         await interaction.response.send_message(embed=embed, view=quiz_view, ephemeral=True)
     
-    def create_content_embed(self):
-        content = self.content_list[self.current_index]
-        
-        embed = discord.Embed(
-            title=f"📚 {self.content_type.title()} Content",
-            description=content['description'],
-            color=0x0099FF
-        )
-        
-        if content['type'] == 'image':
-            embed.set_image(url=content['url'])
-        elif content['type'] == 'video':
-            embed.add_field(
-                name="🎥 Video",
-                value=f"[Watch Video]({content['url']})\nDuration: {content.get('duration', 'Unknown')}",
-                inline=False
-            )
-        elif content['type'] == 'audio':
-            embed.add_field(
-                name="🎵 Audio",
-                value=f"[Listen to Audio]({content['url']})\nDuration: {content.get('duration', 'Unknown')}",
-                inline=False
-            )
-        
-        if len(self.content_list) > 1:
-            embed.set_footer(text=f"Content {self.current_index + 1} of {len(self.content_list)}")
-        
-        return embed
-    
-    async def stop_multimedia(self, interaction: discord.Interaction):
+    async def stop_multimedia(self, interaction: discord.Interaction, content_list: list, index: int):
         """Stop and save multimedia session"""
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your content!", ephemeral=True)
-            return
-        
         # Import here to avoid circular imports
         from training_session import training_session_manager
         from datetime import datetime
         
-        current_content = self.content_list[self.current_index]
+        current_content = content_list[index]
         
         # Save multimedia session
         current_position = {
             'content_type': self.content_type,
-            'current_index': self.current_index,
-            'total_items': len(self.content_list)
+            'current_index': index,
+            'total_items': len(content_list)
         }
         session_data = {
-            'current_content_title': current_content['title'],
+            'current_content_title': current_content.get('title', current_content['description']),
             'current_content_description': current_content['description'],
             'saved_at': str(datetime.now())
         }
         
-        success = training_session_manager.save_session(
+        success = await asyncio.to_thread(
+            training_session_manager.save_session,
             self.user_id, 
             'multimedia', 
             current_position, 
@@ -408,7 +374,7 @@ class MultimediaView(View):
             )
             embed.add_field(
                 name="Saved Position",
-                value=f"{current_content['title']} ({self.current_index + 1}/{len(self.content_list)})",
+                value=f"{session_data['current_content_title']} ({index + 1}/{len(content_list)})",
                 inline=False
             )
         else:
@@ -420,6 +386,29 @@ class MultimediaView(View):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+class MultimediaView(View):
+    """Navigation, quiz and save buttons for one item of a content list; the position lives in their custom_ids"""
+    
+    def __init__(self, user_id: int, content_list: list, content_type: str, index: int = 0):
+        super().__init__(timeout=None)
+        state = (user_id, content_type)
+        
+        # Add navigation buttons
+        if len(content_list) > 1:
+            last = len(content_list) - 1
+            self.add_item(MultimediaButton("prev", *state, max(0, index - 1), "◀️ Previous", disabled=index == 0))
+            self.add_item(MultimediaButton("next", *state, min(index + 1, last), "Next ▶️", disabled=index >= last))
+        
+        # Add interactive quiz button for phishing content
+        if content_type == "phishing":
+            self.add_item(MultimediaButton("quiz", *state, index, "🎯 Take Quiz", discord.ButtonStyle.primary))
+        
+        # Add stop & save button
+        self.add_item(MultimediaButton("stop", *state, index, "⏸️ Stop & Save", discord.ButtonStyle.danger))
+
+# Content types /multimedia serves, in the order they are listed
+CONTENT_TYPES = ("phishing", "passwords", "network", "malware", "videos", "audio")
+
 class MultimediaManager:
     def __init__(self):
         self.content = MULTIMEDIA_CONTENT
@@ -454,18 +443,22 @@ class MultimediaManager:
             return [a for a in audio if a.get('topic') == topic]
         return audio
     
-    def create_multimedia_embed(self, content_type: str, user_id: int):
-        """Create embed with multimedia content and interactive elements"""
+    def get_content(self, content_type: str) -> list:
+        """Content list of a multimedia type, empty for unknown types"""
         content_map = {
-            'phishing': self.get_phishing_examples(),
-            'passwords': self.get_password_examples(),
-            'network': self.get_network_diagrams(),
-            'malware': self.get_malware_examples(),
-            'videos': self.get_educational_videos(),
-            'audio': self.get_audio_content()
+            'phishing': self.get_phishing_examples,
+            'passwords': self.get_password_examples,
+            'network': self.get_network_diagrams,
+            'malware': self.get_malware_examples,
+            'videos': self.get_educational_videos,
+            'audio': self.get_audio_content
         }
-        
-        content_list = content_map.get(content_type, [])
+        getter = content_map.get(content_type)
+        return getter() if getter is not None else []
+    
+    def create_multimedia_embed(self, content_type: str, user_id: int, index: int = 0):
+        """Create embed with multimedia content and interactive elements, opened at item `index`"""
+        content_list = self.get_content(content_type)
         if not content_list:
             return discord.Embed(
                 title="❌ No Content Available",
@@ -473,8 +466,9 @@ class MultimediaManager:
                 color=0xFF0000
             ), None
         
-        view = MultimediaView(user_id, content_list, content_type)
-        embed = view.create_content_embed()
+        index = max(0, min(index, len(content_list) - 1))
+        view = MultimediaView(user_id, content_list, content_type, index)
+        embed = create_content_embed(content_type, content_list, index)
         
         return embed, view
     
@@ -486,69 +480,29 @@ class MultimediaManager:
     def get_lesson_multimedia(self, course_id: int, module_id: int, lesson_id: int):
         """Get multimedia content for a specific lesson"""
         return db.get_lesson_multimedia(course_id, module_id, lesson_id)
-    
-    def create_interactive_lesson_embed(self, course_id: int, module_id: int, lesson_id: int, lesson_content: str):
-        """Create an enhanced lesson embed with multimedia content"""
-        multimedia_content = self.get_lesson_multimedia(course_id, module_id, lesson_id)
-        
-        embed = discord.Embed(
-            title="📚 Enhanced Lesson",
-            description=lesson_content[:1000] + "..." if len(lesson_content) > 1000 else lesson_content,
-            color=0x0099FF
-        )
-        
-        # Add multimedia content
-        images = [m for m in multimedia_content if m[0] == 'image']
-        videos = [m for m in multimedia_content if m[0] == 'video']
-        audio = [m for m in multimedia_content if m[0] == 'audio']
-        
-        if images:
-            embed.set_image(url=images[0][1])  # Set first image
-            if len(images) > 1:
-                embed.add_field(
-                    name="📸 Additional Images",
-                    value=f"{len(images) - 1} more images available",
-                    inline=True
-                )
-        
-        if videos:
-            video_text = "\n".join([f"🎥 [{v[2]}]({v[1]})" for v in videos[:3]])
-            embed.add_field(
-                name="🎥 Videos",
-                value=video_text,
-                inline=True
-            )
-        
-        if audio:
-            audio_text = "\n".join([f"🎵 [{a[2]}]({a[1]})" for a in audio[:3]])
-            embed.add_field(
-                name="🎵 Audio",
-                value=audio_text,
-                inline=True
-            )
-        
-        return embed
 
 # Global multimedia manager instance
 multimedia_manager = MultimediaManager()
 
-# Initialize some sample multimedia content in database
-def initialize_sample_content():
-    """Initialize sample multimedia content for lessons"""
+# Sample multimedia content attached to lessons: (course, module, lesson, type, url, description)
+SAMPLE_LESSON_MULTIMEDIA = [
     # Add phishing examples to phishing lessons
-    multimedia_manager.add_lesson_multimedia(3, 1, 1, "image", 
-        "https://via.placeholder.com/600x400/FF6B6B/FFFFFF?text=PHISHING+EMAIL+EXAMPLE",
-        "Example phishing email with red flags highlighted")
-    
-    # Add password examples to password lessons  
-    multimedia_manager.add_lesson_multimedia(2, 1, 1, "image",
-        "https://via.placeholder.com/600x300/4ECDC4/FFFFFF?text=STRONG+PASSWORD+EXAMPLE", 
-        "Visual guide to creating strong passwords")
-    
+    (3, 1, 1, "image", "https://via.placeholder.com/600x400/FF6B6B/FFFFFF?text=PHISHING+EMAIL+EXAMPLE",
+     "Example phishing email with red flags highlighted"),
+    # Add password examples to password lessons
+    (2, 1, 1, "image", "https://via.placeholder.com/600x300/4ECDC4/FFFFFF?text=STRONG+PASSWORD+EXAMPLE",
+     "Visual guide to creating strong passwords"),
     # Add network diagrams to network lessons
-    multimedia_manager.add_lesson_multimedia(4, 1, 1, "image",
-        "https://via.placeholder.com/600x400/45B7D1/FFFFFF?text=NETWORK+DIAGRAM",
-        "Home network security diagram")
+    (4, 1, 1, "image", "https://via.placeholder.com/600x400/45B7D1/FFFFFF?text=NETWORK+DIAGRAM",
+     "Home network security diagram")
+]
 
-# Initialize sample content when module is imported
-initialize_sample_content()
\ No newline at end of file
+def initialize_sample_content():
+    """Initialize sample multimedia content for lessons (skips rows that already exist)"""
+    added = 0
+    for course_id, module_id, lesson_id, content_type, url, description in SAMPLE_LESSON_MULTIMEDIA:
+        existing_urls = {row[1] for row in multimedia_manager.get_lesson_multimedia(course_id, module_id, lesson_id)}
+        if url not in existing_urls:
+            multimedia_manager.add_lesson_multimedia(course_id, module_id, lesson_id, content_type, url, description)
+            added += 1
+    return added
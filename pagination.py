@@ -0,0 +1,128 @@
+"""
+Embed Pagination
+Splits long text into pages that fit Discord's embed limits and pages through them
+"""
+
+import functools
+import re
+from abc import ABCMeta, abstractmethod
+import discord
+from discord.ui import Button
+from timer_wheel import WheelView
+
+# Discord embed limits
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_TOTAL_LIMIT = 6000
+EMBED_FIELD_LIMIT = 1024
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_HEADING = re.compile(r"^\s*(#{1,6}\s|\*\*[^*\n]+\*\*\s*$)")
+
+def _blocks(text: str) -> list:
+    """Split text into paragraphs, keeping fenced code blocks in one piece"""
+    blocks = []
+    in_fence = False
+    for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+        if in_fence:
+            blocks[-1] += "\n\n" + paragraph
+        else:
+            blocks.append(paragraph)
+        if paragraph.count("```") % 2:
+            in_fence = not in_fence
+    return blocks
+
+def _split_oversized(block: str, limit: int) -> list:
+    """Split one block that exceeds the limit at line, then word, boundaries"""
+    pieces = []
+    current = ""
+    for line in block.split("\n"):
+        while len(line) > limit:
+            cut = line.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:cut])
+            line = line[cut:].lstrip()
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            pieces.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+@functools.lru_cache(maxsize=256)
+def chunk_text(text: str, limit: int = EMBED_DESCRIPTION_LIMIT) -> tuple:
+    """Split text into pages of at most `limit` characters.
+    
+    Pages break between paragraphs, preferring to start a new page at a
+    markdown heading once the current page is half full; only paragraphs
+    longer than a page are split further, at line and then word boundaries.
+    """
+    if len(text) <= limit:
+        return (text,)
+    
+    pages = []
+    current = ""
+    for block in _blocks(text):
+        pieces = [block] if len(block) <= limit else _split_oversized(block, limit)
+        for piece in pieces:
+            candidate = f"{current}\n\n{piece}" if current else piece
+            heading_break = current and _HEADING.match(piece) and len(current) > limit // 2
+            if len(candidate) > limit or heading_break:
+                pages.append(current)
+                candidate = piece
+            current = candidate
+    if current:
+        pages.append(current)
+    return tuple(pages)
+
+class PagerView(WheelView, metaclass=ABCMeta):
+    """View with ◀️/▶️ buttons that swap the message between pages.
+    
+    Subclasses implement render_page(); single-page content gets no pager buttons.
+    """
+    
+    def __init__(self, user_id: int, page_count: int, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.user_id = user_id
+        self.set_page_count(page_count)
+    
+    def set_page_count(self, page_count: int):
+        """Go back to the first page of `page_count`, showing the pager buttons only if needed"""
+        self.page = 0
+        self.page_count = page_count
+        for button in (self.previous_page, self.next_page):
+            if page_count <= 1:
+                self.remove_item(button)
+            elif button not in self.children:
+                self.add_item(button)
+        if page_count > 1:
+            self._sync_buttons()
+    
+    @abstractmethod
+    def render_page(self, page: int) -> discord.Embed:
+        """The embed for one page"""
+    
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+    
+    async def _turn(self, interaction: discord.Interaction, step: int):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("❌ Only the person who opened this can turn its pages.", ephemeral=True)
+            return
+        
+        self.page = max(0, min(self.page + step, self.page_count - 1))
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.render_page(self.page), view=self)
+    
+    @discord.ui.button(label="◀️ Previous", style=discord.ButtonStyle.secondary, row=1)
+    async def previous_page(self, interaction: discord.Interaction, button: Button):
+        await self._turn(interaction, -1)
+    
+    @discord.ui.button(label="Next ▶️", style=discord.ButtonStyle.secondary, row=1)
+    async def next_page(self, interaction: discord.Interaction, button: Button):
+        await self._turn(interaction, 1)
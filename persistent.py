@@ -0,0 +1,122 @@
+"""
+Persistent Views
+Dynamic buttons whose custom_id carries the state they act on, so messages keep
+working across restarts and no View is held in memory per message
+"""
+
+import discord
+from discord.ui import Button, DynamicItem, View
+from cache import TTLCache
+
+# Dynamic item classes the bot registers at startup
+PERSISTENT_ITEMS = []
+
+# One-shot actions (answering, finishing) already taken per message; the edit that
+# disables the buttons usually lands first, this closes the window before it does
+_claimed = TTLCache(maxsize=4096, ttl=900.0)
+
+def persistent(cls):
+    """Class decorator registering a dynamic item for dispatch after restarts"""
+    PERSISTENT_ITEMS.append(cls)
+    return cls
+
+def claim(message_id: int, step: str = "") -> bool:
+    """True the first time a one-shot action runs on this message"""
+    key = (message_id, step)
+    if _claimed.get(key) is not None:
+        return False
+    _claimed.set(key, True)
+    return True
+
+def seconds_since_render(interaction: discord.Interaction) -> float:
+    """Time since the message was sent or last edited, for answer latency"""
+    message = interaction.message
+    return (discord.utils.utcnow() - (message.edited_at or message.created_at)).total_seconds()
+
+def build_view(*items) -> View:
+    """A View of dynamic items; nothing of it stays in memory once it is sent"""
+    view = View(timeout=None)
+    for item in items:
+        view.add_item(item)
+    return view
+
+class OwnedItem:
+    """Mixin for dynamic items that only the user in their custom_id may press"""
+    
+    denied_message = "❌ This isn't yours!"
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.user_id:
+            return True
+        try:
+            await interaction.response.send_message(self.denied_message, ephemeral=True)
+        except discord.errors.NotFound:
+            # Interaction expired, ignore
+            pass
+        return False
+
+@persistent
+class OpenLessonButton(OwnedItem, DynamicItem[Button],
+                       template=r"lesson_open:(?P<user>\d+):(?P<course>\d+):(?P<module>\d+):(?P<lesson>\d+)"):
+    """Sends a lesson as a new message"""
+    
+    denied_message = "❌ This isn't your journey!"
+    
+    def __init__(self, user_id: int, course_id: int, module_id: int, lesson_id: int,
+                 label: str = "📖 Return to Lesson", style=discord.ButtonStyle.primary):
+        self.user_id = user_id
+        self.course_id = course_id
+        self.module_id = module_id
+        self.lesson_id = lesson_id
+        super().__init__(Button(
+            label=label,
+            style=style,
+            custom_id=f"lesson_open:{user_id}:{course_id}:{module_id}:{lesson_id}"
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user"]), int(match["course"]), int(match["module"]), int(match["lesson"]),
+                   item.label, item.style)
+    
+    async def callback(self, interaction: discord.Interaction):
+        # Import here to avoid circular imports
+        from bot import show_lesson
+        try:
+            await interaction.response.send_message("📖 Loading lesson...", ephemeral=True)
+            await show_lesson(interaction.followup, self.course_id, self.module_id, self.lesson_id, self.user_id)
+        except discord.errors.NotFound:
+            # Interaction expired, send a new message instead
+            channel = interaction.channel if hasattr(interaction, 'channel') else None
+            if channel:
+                await show_lesson(channel, self.course_id, self.module_id, self.lesson_id, self.user_id)
+
+@persistent
+class BrowseCoursesButton(OwnedItem, DynamicItem[Button], template=r"courses:(?P<user>\d+)"):
+    """Sends the course catalog as a new message"""
+    
+    denied_message = "❌ This isn't your journey!"
+    
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        super().__init__(Button(
+            label="📚 Browse Courses",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"courses:{user_id}"
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user"]))
+    
+    async def callback(self, interaction: discord.Interaction):
+        # Import here to avoid circular imports
+        from bot import list_courses_with_selection
+        try:
+            await interaction.response.send_message("📚 Loading course catalog...", ephemeral=True)
+            await list_courses_with_selection(interaction.followup, self.user_id)
+        except discord.errors.NotFound:
+            # Interaction expired, send the course list directly to the channel
+            channel = interaction.channel if hasattr(interaction, 'channel') else None
+            if channel:
+                await list_courses_with_selection(channel, self.user_id)
@@ -0,0 +1,253 @@
+"""
+Prerequisite Graph
+Lessons and CTF challenges compiled into a DAG of prerequisites; each user's
+completed and unlocked sets are bitmasks that are updated as lessons are completed
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import threading
+from cache import TTLCache
+from courses import COURSES
+from ctf import CTF_CHALLENGES
+from curriculum import CurriculumError, parse_lesson_ref
+from database import db
+
+logger = logging.getLogger("cyberbot.prerequisites")
+
+def challenge_node(name: str) -> tuple:
+    """Graph node for a CTF challenge (lessons are plain (course, module, lesson) tuples)"""
+    return ("ctf", name)
+
+def _sort_key(node: tuple) -> tuple:
+    # Lessons first in curriculum order, then challenges by name
+    return (1,) + node if node[0] == "ctf" else (0,) + node
+
+def topological_order(prerequisites: dict) -> list:
+    """Order nodes so each comes after its prerequisites, breaking ties in curriculum order.
+    
+    Raises CurriculumError naming some of the nodes if the prerequisites form a cycle.
+    """
+    waiting = {node: len(required) for node, required in prerequisites.items()}
+    dependents = {node: [] for node in prerequisites}
+    for node, required in prerequisites.items():
+        for prerequisite in required:
+            dependents[prerequisite].append(node)
+    
+    ready = [(_sort_key(node), node) for node, count in waiting.items() if count == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        node = heapq.heappop(ready)[1]
+        order.append(node)
+        for dependent in dependents[node]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                heapq.heappush(ready, (_sort_key(dependent), dependent))
+    
+    if len(order) < len(prerequisites):
+        stuck = sorted((node for node, count in waiting.items() if count), key=_sort_key)
+        raise CurriculumError(f"prerequisite cycle among {stuck[:5]}")
+    return order
+
+class PrerequisiteGraph:
+    """Nodes in topological order; bit i of every mask stands for nodes[i]"""
+    
+    __slots__ = ("nodes", "bits", "requires", "dependents", "lesson_mask", "course_masks", "generation")
+    
+    def __init__(self, prerequisites: dict, generation: int = 0):
+        """Build from node -> prerequisite nodes; raises CurriculumError on a cycle"""
+        self.generation = generation  # CourseStore.generation the graph was built from
+        self.nodes = tuple(topological_order(prerequisites))
+        self.bits = {node: bit for bit, node in enumerate(self.nodes)}
+        
+        requires = []
+        dependents = [[] for _ in self.nodes]
+        self.lesson_mask = 0
+        self.course_masks = {}  # course_id -> mask of its lessons
+        for bit, node in enumerate(self.nodes):
+            mask = 0
+            for prerequisite in prerequisites[node]:
+                mask |= 1 << self.bits[prerequisite]
+                dependents[self.bits[prerequisite]].append(bit)
+            requires.append(mask)
+            if node[0] != "ctf":
+                self.lesson_mask |= 1 << bit
+                self.course_masks[node[0]] = self.course_masks.get(node[0], 0) | 1 << bit
+        self.requires = tuple(requires)  # bit -> mask of its prerequisites
+        self.dependents = tuple(tuple(bits) for bits in dependents)  # bit -> bits that require it
+    
+    def mask_of(self, nodes) -> int:
+        """Mask of the known nodes among `nodes`"""
+        mask = 0
+        for node in nodes:
+            bit = self.bits.get(node)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+    
+    def nodes_in(self, mask: int):
+        """Yield the nodes of a mask in topological order"""
+        while mask:
+            low = mask & -mask
+            yield self.nodes[low.bit_length() - 1]
+            mask ^= low
+    
+    def unlocked(self, completed: int) -> int:
+        """Mask of every node whose prerequisites are all in `completed`"""
+        mask = 0
+        for bit, requires in enumerate(self.requires):
+            if not requires & ~completed:
+                mask |= 1 << bit
+        return mask
+    
+    def unlock_after(self, bit: int, completed: int, unlocked: int) -> int:
+        """Update `unlocked` after `bit` joined `completed`; only its dependents are checked"""
+        for dependent in self.dependents[bit]:
+            if not self.requires[dependent] & ~completed:
+                unlocked |= 1 << dependent
+        return unlocked
+
+def build_prerequisite_graph(courses: dict, challenges: list, generation: int = 0,
+                             explicit: bool = True) -> PrerequisiteGraph:
+    """Compile lesson and challenge prerequisites from course outlines and challenge definitions.
+    
+    Lessons without a "prerequisites" list (or every lesson, when explicit is
+    False) require the previous lesson of their course.
+    """
+    prerequisites = {}
+    for course_id in sorted(courses):
+        previous = None
+        modules = courses[course_id].get("modules", {})
+        for module_id in sorted(modules):
+            lessons = modules[module_id].get("lessons", {})
+            for lesson_id in sorted(lessons):
+                node = (course_id, module_id, lesson_id)
+                required = lessons[lesson_id].get("prerequisites") if explicit else None
+                prerequisites[node] = required if required is not None else ((previous,) if previous else ())
+                previous = node
+    
+    for challenge in challenges:
+        refs = challenge.get("prerequisites", ())
+        prerequisites[challenge_node(challenge["name"])] = tuple(parse_lesson_ref(ref) for ref in refs)
+    
+    for node, required in prerequisites.items():
+        known = tuple(prerequisite for prerequisite in required if prerequisite in prerequisites and prerequisite != node)
+        if len(known) != len(required):
+            logger.warning(f"Ignoring unknown prerequisites of {node}: {sorted(set(required) - set(known))}")
+            prerequisites[node] = known
+    return PrerequisiteGraph(prerequisites, generation)
+
+_graph = None
+_graph_lock = threading.Lock()
+
+def get_prerequisite_graph() -> PrerequisiteGraph:
+    """Get the prerequisite graph, rebuilding it after course content changes"""
+    global _graph
+    graph = _graph
+    if graph is None or graph.generation != COURSES.generation:
+        with _graph_lock:
+            graph = _graph
+            if graph is None or graph.generation != COURSES.generation:
+                generation = COURSES.generation
+                courses = COURSES.outlines()
+                try:
+                    graph = build_prerequisite_graph(courses, CTF_CHALLENGES, generation)
+                except CurriculumError as e:
+                    logger.error(f"{e}; falling back to linear lesson order")
+                    graph = build_prerequisite_graph(courses, CTF_CHALLENGES, generation, explicit=False)
+                _graph = graph
+    return graph
+
+class UserUnlocks:
+    """One user's completed and unlocked node masks for a graph generation"""
+    
+    __slots__ = ("generation", "completed", "unlocked")
+    
+    def __init__(self, generation: int, completed: int, unlocked: int):
+        self.generation = generation
+        self.completed = completed
+        self.unlocked = unlocked
+
+class UnlockTracker:
+    """Per-user unlock bitmasks, loaded from completed lessons once and then updated in place"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 900.0):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)  # user_id -> UserUnlocks
+    
+    def _state(self, user_id: int):
+        graph = get_prerequisite_graph()
+        state = self.cache.get(user_id)
+        if state is None or state.generation != graph.generation:
+            completed = graph.mask_of(db.get_completed_lessons(user_id))
+            state = UserUnlocks(graph.generation, completed, graph.unlocked(completed))
+            self.cache.set(user_id, state)
+        return graph, state
+    
+    async def load(self, user_id: int):
+        """Read a user's masks in a worker thread, so the lookups below do not query the database on the event loop"""
+        state = self.cache.get(user_id)
+        if state is None or state.generation != get_prerequisite_graph().generation:
+            await asyncio.to_thread(self._state, user_id)
+    
+    def record_completion(self, user_id: int, course_id: int, module_id: int, lesson_id: int):
+        """Mark a lesson completed and unlock whatever depended on it"""
+        graph = get_prerequisite_graph()
+        bit = graph.bits.get((course_id, module_id, lesson_id))
+        
+        def apply(state):
+            if bit is None or state.generation != graph.generation:
+                return state  # Reloaded from the database on next use
+            completed = state.completed | 1 << bit
+            return UserUnlocks(state.generation, completed, graph.unlock_after(bit, completed, state.unlocked))
+        self.cache.update(user_id, apply)
+    
+    def invalidate(self, user_id: int):
+        """Forget a user's masks after their progress was changed elsewhere"""
+        self.cache.invalidate(user_id)
+    
+    def is_unlocked(self, user_id: int, node: tuple) -> bool:
+        """Whether a lesson or challenge node is open to the user (unknown nodes are not gated)"""
+        graph, state = self._state(user_id)
+        bit = graph.bits.get(node)
+        return bit is None or bool((state.unlocked | state.completed) >> bit & 1)
+    
+    def missing(self, user_id: int, node: tuple) -> list:
+        """Prerequisites of a node that the user has not completed yet"""
+        graph, state = self._state(user_id)
+        bit = graph.bits.get(node)
+        if bit is None:
+            return []
+        return list(graph.nodes_in(graph.requires[bit] & ~state.completed))
+    
+    def available_lessons(self, user_id: int) -> list:
+        """Unlocked lessons the user has not completed, in topological order"""
+        graph, state = self._state(user_id)
+        return list(graph.nodes_in(state.unlocked & ~state.completed & graph.lesson_mask))
+    
+    def unlocked_challenges(self, user_id: int) -> set:
+        """Names of CTF challenges whose lesson prerequisites the user has completed"""
+        graph, state = self._state(user_id)
+        return {node[1] for node in graph.nodes_in(state.unlocked & ~graph.lesson_mask)}
+    
+    def next_lesson(self, user_id: int, course_id: int = None):
+        """First available lesson, preferring one in `course_id`; None when nothing is left"""
+        graph, state = self._state(user_id)
+        available = state.unlocked & ~state.completed & graph.lesson_mask
+        preferred = available & graph.course_masks.get(course_id, 0)
+        mask = preferred or available
+        return graph.nodes[(mask & -mask).bit_length() - 1] if mask else None
+    
+    def counts(self, user_id: int) -> tuple:
+        """(completed lessons, available lessons, total lessons) in the graph"""
+        graph, state = self._state(user_id)
+        completed = state.completed & graph.lesson_mask
+        available = state.unlocked & ~state.completed & graph.lesson_mask
+        return completed.bit_count(), available.bit_count(), graph.lesson_mask.bit_count()
+
+unlock_tracker = UnlockTracker(
+    maxsize=int(os.getenv("UNLOCK_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("UNLOCK_CACHE_TTL", "900"))
+)
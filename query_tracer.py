@@ -0,0 +1,285 @@
+"""
+Query Tracer for the SQLite layer
+Times every executed statement, keeps per-statement histograms and a slow-query log
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, float("inf"))
+
+# Statements EXPLAIN QUERY PLAN can describe
+EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and literals so equivalent statements share one entry"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+class StatementStats:
+    """Latency histogram and counters for one normalized statement"""
+    
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_count = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.callers = Counter()
+        self.query_plan = None
+    
+    def add(self, duration_ms: float, rows: int, caller: str):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += rows
+        self.callers[caller] += 1
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                break
+    
+    def percentile(self, fraction: float) -> float:
+        """Upper bucket bound below which `fraction` of executions fall"""
+        target = self.count * fraction
+        seen = 0
+        for bound, hits in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= target:
+                return bound if bound != float("inf") else self.max_ms
+        return self.max_ms
+    
+    def to_dict(self) -> dict:
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "slow_count": self.slow_count,
+            "histogram": {
+                ("inf" if bound == float("inf") else f"<={bound}ms"): hits
+                for bound, hits in zip(LATENCY_BUCKETS_MS, self.buckets)
+            },
+            "callers": dict(self.callers.most_common()),
+            "query_plan": self.query_plan
+        }
+
+class QueryTracer:
+    """Collects statement timings from TracedConnection cursors"""
+    
+    def __init__(self, slow_threshold_ms: float = 100.0, slow_log_path: str = None,
+                 explain_slow: bool = True):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.explain_slow = explain_slow
+        self.statements = {}  # normalized sql -> StatementStats
+        self.started_at = datetime.now()
+        self._lock = threading.Lock()
+        self.slow_logger = logging.getLogger("cyberbot.slow_query")
+        if slow_log_path and not self.slow_logger.handlers:
+            handler = logging.FileHandler(slow_log_path, delay=True)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+            self.slow_logger.addHandler(handler)
+    
+    @classmethod
+    def from_env(cls):
+        """Build a tracer from DB_* environment variables, or None if tracing is off"""
+        if os.getenv("DB_QUERY_TRACING", "1").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            slow_threshold_ms=float(os.getenv("DB_SLOW_QUERY_MS", "100")),
+            slow_log_path=os.getenv("DB_SLOW_QUERY_LOG") or None
+        )
+    
+    def record(self, conn, sql: str, parameters, duration_ms: float, rows: int, caller: str):
+        """Record one finished statement"""
+        normalized = normalize_sql(sql)
+        with self._lock:
+            stats = self.statements.get(normalized)
+            if stats is None:
+                stats = self.statements[normalized] = StatementStats(normalized)
+            stats.add(duration_ms, rows, caller)
+            is_slow = duration_ms >= self.slow_threshold_ms
+            if is_slow:
+                stats.slow_count += 1
+            needs_plan = is_slow and self.explain_slow and stats.query_plan is None
+        
+        if not is_slow:
+            return
+        if needs_plan:
+            stats.query_plan = self._explain(conn, sql, parameters)
+        self.slow_logger.warning(
+            f"{duration_ms:.1f}ms rows={rows} caller={caller} sql={normalized}"
+            + (f" plan={stats.query_plan}" if needs_plan and stats.query_plan else "")
+        )
+    
+    def _explain(self, conn, sql: str, parameters):
+        """Capture EXPLAIN QUERY PLAN for a statement, bypassing tracing"""
+        if not sql.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+            return None
+        try:
+            cursor = sqlite3.Cursor(conn)
+            sqlite3.Cursor.execute(cursor, f"EXPLAIN QUERY PLAN {sql}", parameters)
+            return " | ".join(row[-1] for row in sqlite3.Cursor.fetchall(cursor))
+        except sqlite3.Error as e:
+            return f"unavailable: {e}"
+    
+    def snapshot(self, order_by: str = "total_ms") -> list:
+        """Get per-statement stats, most expensive first"""
+        with self._lock:
+            entries = [stats.to_dict() for stats in self.statements.values()]
+        return sorted(entries, key=lambda entry: entry[order_by], reverse=True)
+    
+    def dump(self, path: str, extra: dict = None) -> str:
+        """Write all statement stats (plus any extra sections) to a JSON file"""
+        data = {
+            "since": self.started_at.isoformat(),
+            "dumped_at": datetime.now().isoformat(),
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "statements": self.snapshot()
+        }
+        if extra:
+            data.update(extra)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        return path
+    
+    def reset(self):
+        """Clear collected stats"""
+        with self._lock:
+            self.statements = {}
+            self.started_at = datetime.now()
+
+def _find_caller() -> str:
+    """Name the first frame outside the tracing classes, e.g. 'quiz.QuizManager.get_quiz_stats'"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code in _TRACER_CODES:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's duration and row count to the tracer"""
+    
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._pending = None  # [sql, parameters, duration_ms, rows, caller]
+        connection._open_cursors.append(self)
+    
+    def execute(self, sql, parameters=()):
+        self._finish()
+        caller = _find_caller()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, (time.perf_counter() - start) * 1000, 0, caller]
+        if self.rowcount > 0:
+            self._pending[3] = self.rowcount
+        return self
+    
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        caller = _find_caller()
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = [sql, (), (time.perf_counter() - start) * 1000, 0, caller]
+        self._pending[3] = max(self.rowcount, 0)
+        return self
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add_fetch(start, 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+    
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add_fetch(start, len(rows))
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add_fetch(start, len(rows))
+        self._finish()
+        return rows
+    
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add_fetch(start, 0)
+            self._finish()
+            raise
+        self._add_fetch(start, 1)
+        return row
+    
+    def _add_fetch(self, start: float, rows: int):
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - start) * 1000
+            self._pending[3] += rows
+    
+    def _finish(self):
+        """Report the pending statement, if any"""
+        if self._pending is None:
+            return
+        sql, parameters, duration_ms, rows, caller = self._pending
+        self._pending = None
+        self.connection.tracer.record(self.connection, sql, parameters, duration_ms, rows, caller)
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors are TracedCursors; pass as sqlite3.connect(factory=...)"""
+    
+    tracer = None
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._open_cursors = []
+    
+    def cursor(self, factory=None):
+        return super().cursor(factory or TracedCursor)
+    
+    def close(self):
+        for cursor in self._open_cursors:
+            cursor._finish()
+        self._open_cursors = []
+        super().close()
+
+_TRACER_CODES = {
+    function.__code__
+    for cls in (TracedCursor, TracedConnection)
+    for function in vars(cls).values()
+    if hasattr(function, "__code__")
+}
@@ -0,0 +1,251 @@
+"""
+Question Bank
+Every quiz question of a module pooled with its tags and difficulty; module quizzes
+draw questions the user has not been served yet, tracked in a per-user, per-scope
+bloom filter that is persisted between quizzes
+"""
+
+import hashlib
+import math
+import os
+import random
+from cache import TTLCache
+from courses import COURSES
+from database import db
+
+# Seen-set false positives only make an unseen question look seen, so 1% costs little
+SEEN_FALSE_POSITIVE_RATE = 0.01
+# Filters are sized for this many times the pool so added questions fit without a rebuild
+SEEN_CAPACITY_HEADROOM = 2
+MIN_SEEN_CAPACITY = 64
+# Random probes per requested question before falling back to a full pass over the pool
+PROBES_PER_QUESTION = 8
+# Hex digits of a question_key that identify it within its module, short enough
+# for a quiz's question list to fit in a button custom_id. Pools whose keys clash
+# at SHORT_KEY_LENGTH digits use longer ones, up to the most five keys can take
+# within Discord's 100 characters
+SHORT_KEY_LENGTH = 6
+MAX_SHORT_KEY_LENGTH = 9
+
+def question_hashes(quiz) -> tuple:
+    """Two 64-bit hashes of a question's text and answer, stable across restarts and reorderings"""
+    text = f"{quiz['question']}\0{quiz['options'][quiz['correct']]}".encode()
+    digest = hashlib.blake2b(text, digest_size=16).digest()
+    # The second hash is the probe stride, so it must be odd to reach every bit
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+def question_key(quiz) -> str:
+    """Stable id of a question, used to remember it outside the bank"""
+    return f"{question_hashes(quiz)[0]:016x}"
+
+def short_key_length(keys) -> int:
+    """Fewest hex digits, from SHORT_KEY_LENGTH up, that tell distinct question keys apart"""
+    keys = set(keys)
+    for length in range(SHORT_KEY_LENGTH, MAX_SHORT_KEY_LENGTH):
+        if len({key[:length] for key in keys}) == len(keys):
+            return length
+    return MAX_SHORT_KEY_LENGTH
+
+class BankQuestion:
+    """A pooled question with where it came from and its precomputed hashes"""
+    
+    __slots__ = ("quiz", "lesson_id", "hashes")
+    
+    def __init__(self, quiz, lesson_id: int = None):
+        self.quiz = quiz
+        self.lesson_id = lesson_id  # None for module-level bank questions
+        self.hashes = question_hashes(quiz)
+    
+    @property
+    def key(self) -> str:
+        return f"{self.hashes[0]:016x}"
+    
+    @property
+    def difficulty(self) -> int:
+        return self.quiz["difficulty"]
+
+class SeenFilter:
+    """Bloom filter of served questions; membership may be a false positive, never a false negative"""
+    
+    __slots__ = ("capacity", "count", "bits", "hash_count")
+    
+    def __init__(self, capacity: int, count: int = 0, bits: bytes = None):
+        self.capacity = capacity
+        self.count = count  # Questions added, counting each once
+        size = max(8, math.ceil(-capacity * math.log(SEEN_FALSE_POSITIVE_RATE) / math.log(2) ** 2))
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+        self.hash_count = max(1, round(len(self.bits) * 8 / capacity * math.log(2)))
+    
+    @classmethod
+    def for_pool(cls, pool_size: int) -> "SeenFilter":
+        return cls(max(MIN_SEEN_CAPACITY, pool_size * SEEN_CAPACITY_HEADROOM))
+    
+    def _positions(self, hashes: tuple):
+        first, stride = hashes
+        size = len(self.bits) * 8
+        for i in range(self.hash_count):
+            yield (first + i * stride) % size
+    
+    def __contains__(self, question: BankQuestion) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] >> (position & 7) & 1 for position in self._positions(question.hashes))
+    
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+    
+    def add(self, question: BankQuestion):
+        if question in self:
+            return
+        for position in self._positions(question.hashes):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+class QuestionPool:
+    """All questions of one module, indexed by tag and difficulty"""
+    
+    __slots__ = ("scope", "questions", "by_key", "short_length", "by_short_key", "by_tag", "by_difficulty")
+    
+    def __init__(self, scope: str, questions: list):
+        self.scope = scope
+        self.questions = tuple(questions)
+        self.by_key = {}
+        self.by_short_key = {}  # short key -> question, None where distinct keys still clash
+        self.by_tag = {}
+        self.by_difficulty = {}
+        for question in self.questions:
+            self.by_key.setdefault(question.key, question)
+            for tag in question.quiz["tags"]:
+                self.by_tag.setdefault(tag, []).append(question)
+            self.by_difficulty.setdefault(question.difficulty, []).append(question)
+        self.short_length = short_key_length(self.by_key)
+        for key, question in self.by_key.items():
+            short_key = key[:self.short_length]
+            self.by_short_key[short_key] = None if short_key in self.by_short_key else question
+    
+    @classmethod
+    def from_module(cls, course_id: int, module_id: int, module) -> "QuestionPool":
+        questions = []
+        for lesson_id, lesson in module["lessons"].items():
+            if "quiz" in lesson:
+                questions.append(BankQuestion(lesson["quiz"], lesson_id))
+            questions.extend(BankQuestion(quiz, lesson_id) for quiz in lesson.get("questions", ()))
+        questions.extend(BankQuestion(quiz) for quiz in module.get("questions", ()))
+        return cls(f"module:{course_id}.{module_id}", questions)
+    
+    def __len__(self) -> int:
+        return len(self.questions)
+    
+    def short_key(self, key: str):
+        """The short form of a question_key in this pool, or None if it cannot be told apart"""
+        short_key = key[:self.short_length]
+        return short_key if self.by_short_key.get(short_key) is not None else None
+    
+    @property
+    def tags(self) -> list:
+        return sorted(self.by_tag)
+    
+    def candidates(self, tag: str = None, difficulty: int = None):
+        """Questions matching the filters, using the smaller index when both are given"""
+        if tag is None and difficulty is None:
+            return self.questions
+        by_tag = self.by_tag.get(tag.lower(), ()) if tag is not None else None
+        by_difficulty = self.by_difficulty.get(difficulty, ()) if difficulty is not None else None
+        if by_tag is None or by_difficulty is None:
+            return by_tag if by_difficulty is None else by_difficulty
+        return [question for question in by_tag if question.difficulty == difficulty]
+    
+    def sample(self, seen: SeenFilter, count: int, tag: str = None, difficulty: int = None,
+               rng: random.Random = random, rank=None) -> list:
+        """Pick up to `count` questions, unseen ones first, and record them in `seen`.
+        
+        A few random probes cover the usual case without touching the rest of the
+        pool; with a `rank` key the lowest-ranked of the probed questions win. Once
+        the unfiltered pool runs out of unseen questions a new cycle starts and
+        `seen` is cleared; a filtered one is topped up with repeats.
+        """
+        candidates = self.candidates(tag, difficulty)
+        count = min(count, len(candidates))
+        probes = rng.sample(range(len(candidates)), min(len(candidates), count * PROBES_PER_QUESTION))
+        picked = [candidates[i] for i in probes if candidates[i] not in seen]
+        if len(picked) < count and len(probes) < len(candidates):
+            # Few unseen questions left: look at every one of them
+            picked = [question for question in candidates if question not in seen]
+            rng.shuffle(picked)
+        if rank is not None:
+            picked.sort(key=rank)
+        picked = picked[:count]
+        
+        if len(picked) < count:
+            chosen = set(map(id, picked))
+            repeats = [question for question in candidates if id(question) not in chosen]
+            picked.extend(rng.sample(repeats, count - len(picked)))
+            if candidates is self.questions:
+                seen.clear()
+        
+        for question in picked:
+            seen.add(question)
+        # Easier questions first so a quiz ramps up
+        picked.sort(key=lambda question: question.difficulty)
+        return picked
+
+class QuestionBank:
+    """Module question pools, rebuilt when their course's content version changes"""
+    
+    def __init__(self, pool_cache_size: int = 128):
+        self.pools = TTLCache(maxsize=pool_cache_size, ttl=float("inf"))  # (course, module, version) -> pool
+    
+    def pool(self, course_id: int, module_id: int):
+        """The module's question pool, or None if the module does not exist"""
+        course = COURSES.get(course_id)
+        module = course["modules"].get(module_id) if course is not None else None
+        if module is None:
+            return None
+        key = (course_id, module_id, COURSES.version(course_id))
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = QuestionPool.from_module(course_id, module_id, module)
+            self.pools.set(key, pool)
+        return pool
+    
+    def find(self, course_id: int, module_id: int, key: str):
+        """The quiz record with a question_key in a module, or None once it is gone"""
+        pool = self.pool(course_id, module_id)
+        question = pool.by_key.get(key) if pool is not None else None
+        return question.quiz if question is not None else None
+    
+    def find_short(self, course_id: int, module_id: int, short_key: str):
+        """Like find(), by a key prefix from QuestionPool.short_key(); None unless it is unambiguous"""
+        pool = self.pool(course_id, module_id)
+        if pool is None:
+            return None
+        if len(short_key) == pool.short_length:
+            question = pool.by_short_key.get(short_key)
+        else:
+            # Shortened before the module's questions changed; only a unique match counts
+            matches = [question for key, question in pool.by_key.items() if key.startswith(short_key)]
+            question = matches[0] if len(matches) == 1 else None
+        return question.quiz if question is not None else None
+    
+    def load_seen(self, user_id: int, pool: QuestionPool) -> SeenFilter:
+        """A user's seen filter for a pool; one that is too small for the pool starts over"""
+        stored = db.get_seen_questions(user_id, pool.scope)
+        if stored is not None:
+            capacity, count, bits = stored
+            if capacity >= len(pool):
+                return SeenFilter(capacity, count, bits)
+        return SeenFilter.for_pool(len(pool))
+    
+    def draw(self, user_id: int, course_id: int, module_id: int, count: int = 5,
+             tag: str = None, difficulty: int = None, rank=None) -> list:
+        """Quiz records for a module quiz, preferring questions the user has not seen"""
+        pool = self.pool(course_id, module_id)
+        if not pool:
+            return []
+        seen = self.load_seen(user_id, pool)
+        questions = pool.sample(seen, count, tag, difficulty, rank=rank)
+        if questions:
+            db.save_seen_questions(user_id, pool.scope, seen.capacity, seen.count, bytes(seen.bits))
+        return [question.quiz for question in questions]
+
+question_bank = QuestionBank(pool_cache_size=int(os.getenv("QUESTION_POOL_CACHE_SIZE", "128")))
@@ -3,133 +3,142 @@ Interactive Quiz System for Cybersecurity Learning Bot
 Handles quiz creation, user interactions, and scoring
 """
 
-import discord
-from discord.ui import Button, View
 import asyncio
-import random
+import discord
+from discord.ui import Button, DynamicItem, View
+import logging
+import os
+import time
 from datetime import datetime
 from database import db
 from achievements import achievement_manager
-from courses import get_lesson
+from courses import get_lesson, get_module
+from persistent import (OwnedItem, BrowseCoursesButton, OpenLessonButton, build_view, claim, persistent,
+                        seconds_since_render)
+from question_bank import question_bank, question_key
+from review import review_scheduler
+from ratings import rating_engine
+from timer_wheel import timer_wheel
 
-class QuizView(View):
-    def __init__(self, quiz_data: dict, user_id: int, course_id: int, module_id: int, lesson_id: int):
-        super().__init__(timeout=300)  # 5 minute timeout
-        self.quiz_data = quiz_data
+logger = logging.getLogger("cyberbot.quiz")
+
+MODULE_QUIZ_QUESTIONS = 5
+# Timed module quizzes: seconds per question, and the most speed bonus XP one answer earns
+QUESTION_SECONDS = float(os.getenv("TIMED_QUIZ_SECONDS", "20"))
+MAX_SPEED_BONUS = 25
+
+@persistent
+class QuizButton(OwnedItem, DynamicItem[Button],
+                 template=r"quiz:(?P<action>\d|stop):(?P<user>\d+):(?P<course>\d+):(?P<module>\d+):(?P<lesson>\d+)"):
+    """An answer (or Stop & Save) button of a lesson quiz"""
+    
+    denied_message = "❌ This isn't your quiz! Use `/quiz` to start your own."
+    
+    def __init__(self, action: str, user_id: int, course_id: int, module_id: int, lesson_id: int,
+                 label: str, style=discord.ButtonStyle.secondary, disabled: bool = False):
+        self.action = action
         self.user_id = user_id
         self.course_id = course_id
         self.module_id = module_id
         self.lesson_id = lesson_id
-        self.answered = False
-        self.correct_answer = quiz_data["correct"]
-        
-        # Create buttons for each option
-        for i, option in enumerate(quiz_data["options"]):
-            button = Button(
-                label=f"{chr(65 + i)}. {option}",  # A, B, C, D
-                style=discord.ButtonStyle.secondary,
-                custom_id=f"quiz_option_{i}"
+        super().__init__(Button(
+            label=label,
+            style=style,
+            disabled=disabled,
+            custom_id=f"quiz:{action}:{user_id}:{course_id}:{module_id}:{lesson_id}"
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["user"]), int(match["course"]), int(match["module"]),
+                   int(match["lesson"]), item.label, item.style)
+    
+    async def callback(self, interaction: discord.Interaction):
+        lesson = get_lesson(self.course_id, self.module_id, self.lesson_id)
+        if not lesson or "quiz" not in lesson:
+            await interaction.response.send_message("❌ This quiz is no longer available.", ephemeral=True)
+            return
+        if self.action == "stop":
+            await self.stop_quiz(interaction, lesson["quiz"])
+        else:
+            await self.answer(interaction, lesson["quiz"], int(self.action))
+    
+    async def answer(self, interaction: discord.Interaction, quiz_data: dict, option_index: int):
+        if not claim(interaction.message.id):
+            await interaction.response.send_message(
+                "❌ You've already answered this quiz!",
+                ephemeral=True
             )
-            button.callback = self.create_callback(i)
-            self.add_item(button)
+            return
         
-        # Add stop & save button
-        stop_button = Button(
-            label="⏸️ Stop & Save Quiz",
-            style=discord.ButtonStyle.danger,
-            custom_id="stop_quiz"
-        )
-        stop_button.callback = self.stop_quiz
-        self.add_item(stop_button)
-    
-    def create_callback(self, option_index: int):
-        """Create callback function for quiz option button"""
-        async def callback(interaction: discord.Interaction):
-            if interaction.user.id != self.user_id:
-                await interaction.response.send_message(
-                    "❌ This isn't your quiz! Use `/quiz` to start your own.",
-                    ephemeral=True
-                )
-                return
-            
-            if self.answered:
-                await interaction.response.send_message(
-                    "❌ You've already answered this quiz!",
-                    ephemeral=True
-                )
-                return
-            
-            self.answered = True
+        # Check if answer is correct
+        correct_answer = quiz_data["correct"]
+        is_correct = option_index == correct_answer
+        latency = seconds_since_render(interaction)
+        await review_scheduler.record_answer(self.user_id, self.course_id, self.module_id, quiz_data, is_correct)
+        await asyncio.to_thread(rating_engine.record_answer, self.user_id, self.course_id, self.module_id,
+                                quiz_data, is_correct, option_index, latency)
+        
+        # Create response embed
+        if is_correct:
+            embed = discord.Embed(
+                title="✅ Correct!",
+                description=f"**Great job!** {quiz_data['explanation']}",
+                color=0x00FF00
+            )
+            xp_earned = 100
+            await db.run(db.add_xp, self.user_id, xp_earned)
+            embed.add_field(
+                name="XP Earned",
+                value=f"+{xp_earned} XP",
+                inline=True
+            )
             
-            # Disable all buttons
-            for item in self.children:
-                item.disabled = True
+            # Record perfect quiz attempt
+            await db.run(
+                db.record_quiz_attempt,
+                self.user_id, self.course_id, self.module_id, 
+                self.lesson_id, 1, 1
+            )
             
-            # Check if answer is correct
-            is_correct = option_index == self.correct_answer
+            # Check for achievements
+            new_achievements = await asyncio.to_thread(
+                achievement_manager.check_and_award_achievements,
+                self.user_id, "perfect_quiz"
+            )
             
-            # Create response embed
-            if is_correct:
-                embed = discord.Embed(
-                    title="✅ Correct!",
-                    description=f"**Great job!** {self.quiz_data['explanation']}",
-                    color=0x00FF00
-                )
-                xp_earned = 100
-                db.add_xp(self.user_id, xp_earned)
+            if new_achievements:
+                achievement_text = "\n".join([f"🏆 {ach['name']}" for ach in new_achievements])
                 embed.add_field(
-                    name="XP Earned",
-                    value=f"+{xp_earned} XP",
-                    inline=True
-                )
-                
-                # Record perfect quiz attempt
-                db.record_quiz_attempt(
-                    self.user_id, self.course_id, self.module_id, 
-                    self.lesson_id, 1, 1
-                )
-                
-                # Check for achievements
-                new_achievements = achievement_manager.check_and_award_achievements(
-                    self.user_id, "perfect_quiz"
-                )
-                
-                if new_achievements:
-                    achievement_text = "\n".join([f"🏆 {ach['name']}" for ach in new_achievements])
-                    embed.add_field(
-                        name="New Achievements!",
-                        value=achievement_text,
-                        inline=False
-                    )
-            else:
-                embed = discord.Embed(
-                    title="❌ Incorrect",
-                    description=f"The correct answer was **{chr(65 + self.correct_answer)}. {self.quiz_data['options'][self.correct_answer]}**\n\n{self.quiz_data['explanation']}",
-                    color=0xFF0000
-                )
-                embed.add_field(
-                    name="Keep Learning!",
-                    value="Review the lesson material and try again later.",
+                    name="New Achievements!",
+                    value=achievement_text,
                     inline=False
                 )
-                
-                # Record failed quiz attempt
-                db.record_quiz_attempt(
-                    self.user_id, self.course_id, self.module_id,
-                    self.lesson_id, 0, 1
-                )
+        else:
+            embed = discord.Embed(
+                title="❌ Incorrect",
+                description=f"The correct answer was **{chr(65 + correct_answer)}. {quiz_data['options'][correct_answer]}**\n\n{quiz_data['explanation']}",
+                color=0xFF0000
+            )
+            embed.add_field(
+                name="Keep Learning!",
+                value="Review the lesson material and try again later.",
+                inline=False
+            )
             
-            # Update the message with results
-            await interaction.response.edit_message(embed=embed, view=self)
+            # Record failed quiz attempt
+            await db.run(
+                db.record_quiz_attempt,
+                self.user_id, self.course_id, self.module_id,
+                self.lesson_id, 0, 1
+            )
         
-        return callback
+        # Update the message with results, all buttons disabled
+        view = QuizView(quiz_data, self.user_id, self.course_id, self.module_id, self.lesson_id, answered=True)
+        await interaction.response.edit_message(embed=embed, view=view)
     
-    async def stop_quiz(self, interaction: discord.Interaction):
+    async def stop_quiz(self, interaction: discord.Interaction, quiz_data: dict):
         """Stop and save quiz progress"""
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your quiz!", ephemeral=True)
-            return
-        
         # Import here to avoid circular imports
         from training_session import training_session_manager
         
@@ -142,13 +151,14 @@ class QuizView(View):
             'total_questions': 1
         }
         session_data = {
-            'quiz_question': self.quiz_data['question'],
-            'quiz_options': self.quiz_data['options'],
-            'correct_answer': self.correct_answer,
+            'quiz_question': quiz_data['question'],
+            'quiz_options': quiz_data['options'],
+            'correct_answer': quiz_data['correct'],
             'saved_at': str(datetime.now())
         }
         
-        success = training_session_manager.save_session(
+        success = await asyncio.to_thread(
+            training_session_manager.save_session,
             self.user_id, 
             'quiz', 
             current_position, 
@@ -174,342 +184,383 @@ class QuizView(View):
             )
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
+
+class QuizView(View):
+    """Buttons of a lesson quiz; all state lives in their custom_ids"""
     
-    async def on_timeout(self):
-        """Handle quiz timeout"""
-        for item in self.children:
-            item.disabled = True
+    def __init__(self, quiz_data: dict, user_id: int, course_id: int, module_id: int, lesson_id: int,
+                 answered: bool = False):
+        super().__init__(timeout=None)
+        ids = (user_id, course_id, module_id, lesson_id)
+        
+        # Create buttons for each option
+        for i, option in enumerate(quiz_data["options"]):
+            self.add_item(QuizButton(str(i), *ids, label=f"{chr(65 + i)}. {option}", disabled=answered))  # A, B, C, D
+        
+        # Add stop & save button
+        self.add_item(QuizButton("stop", *ids, label="⏸️ Stop & Save Quiz", style=discord.ButtonStyle.danger,
+                                 disabled=answered))
 
-class MultiQuizView(View):
-    def __init__(self, questions: list, user_id: int, course_id: int, module_id: int, lesson_id: int):
-        super().__init__(timeout=600)  # 10 minute timeout
-        self.questions = questions
+class ModuleQuizState:
+    """Where a module quiz stands, as carried in its buttons' custom_ids"""
+    
+    __slots__ = ("user_id", "course_id", "module_id", "keys", "index", "score", "bonus", "timed")
+    
+    def __init__(self, user_id: int, course_id: int, module_id: int, keys: tuple, index: int = 0,
+                 score: int = 0, bonus: int = 0, timed: bool = False):
         self.user_id = user_id
         self.course_id = course_id
         self.module_id = module_id
-        self.lesson_id = lesson_id
-        self.current_question = 0
-        self.score = 0
-        self.answers = []
-        
-        # Create option buttons
-        for i in range(4):  # Assuming max 4 options
-            button = Button(
-                label=f"{chr(65 + i)}.",  # A, B, C, D
-                style=discord.ButtonStyle.secondary,
-                custom_id=f"multi_quiz_option_{i}",
-                row=0
-            )
-            button.callback = self.create_option_callback(i)
-            self.add_item(button)
-        
-        # Add navigation buttons
-        self.next_button = Button(
-            label="Next Question ➡️",
-            style=discord.ButtonStyle.primary,
-            custom_id="next_question",
-            disabled=True,
-            row=1
+        self.keys = tuple(keys)  # Short question keys in the order they are asked
+        self.index = index
+        self.score = score
+        self.bonus = bonus  # Speed bonus XP earned so far in timed mode
+        self.timed = timed
+    
+    @classmethod
+    def from_match(cls, match) -> "ModuleQuizState":
+        return cls(int(match["user"]), int(match["course"]), int(match["module"]), match["keys"].split("."),
+                   int(match["index"]), int(match["score"]), int(match["bonus"]), match["mode"] == "t")
+    
+    def custom_id(self, action: str) -> str:
+        mode = "t" if self.timed else "m"
+        return (f"{mode}quiz:{action}:{self.user_id}:{self.course_id}:{self.module_id}:{self.index}:{self.score}:"
+                f"{self.bonus}:{'.'.join(self.keys)}")
+    
+    def advanced(self, index: int = None, correct: bool = False, bonus: int = 0) -> "ModuleQuizState":
+        return ModuleQuizState(self.user_id, self.course_id, self.module_id, self.keys,
+                               self.index if index is None else index, self.score + correct, self.bonus + bonus,
+                               self.timed)
+    
+    @property
+    def total(self) -> int:
+        return len(self.keys)
+    
+    def question(self):
+        """Quiz record of the current question, or None once it left the module"""
+        if self.index >= len(self.keys):
+            return None
+        return question_bank.find_short(self.course_id, self.module_id, self.keys[self.index])
+
+class QuestionClock:
+    """Server-side deadline of the question a timed quiz message is showing"""
+    
+    __slots__ = ("state", "shown_at", "message", "timer")
+    
+    def __init__(self, state: ModuleQuizState, shown_at: float, message, timer):
+        self.state = state
+        self.shown_at = shown_at  # time.monotonic() when the question was shown
+        self.message = message  # Edited when the deadline passes
+        self.timer = timer
+
+question_clocks = {}  # message id -> QuestionClock of the question it shows
+
+def start_question_clock(message, state: ModuleQuizState):
+    """Start the deadline of the question a message now shows"""
+    stop_question_clock(message.id)
+    timer = timer_wheel.schedule(QUESTION_SECONDS, expire_question, message.id, state.index)
+    question_clocks[message.id] = QuestionClock(state, time.monotonic(), message, timer)
+
+def stop_question_clock(message_id: int, index: int = None):
+    """Remove and return a message's clock, only if it is on question `index` when given"""
+    clock = question_clocks.get(message_id)
+    if clock is None or (index is not None and clock.state.index != index):
+        return None
+    del question_clocks[message_id]
+    timer_wheel.cancel(clock.timer)
+    return clock
+
+def speed_bonus(elapsed: float) -> int:
+    """Bonus XP for a correct timed answer, falling linearly to 0 at the deadline"""
+    return round(MAX_SPEED_BONUS * max(0.0, 1.0 - elapsed / QUESTION_SECONDS))
+
+def create_question_embed(quiz_data: dict, index: int, total: int, score: int, deadline: float = None) -> discord.Embed:
+    """Create embed for one question of a module quiz; `deadline` is a unix time in timed mode"""
+    embed = discord.Embed(
+        title=f"❓ Question {index + 1}/{total}",
+        description=quiz_data["question"],
+        color=0x0099FF
+    )
+    
+    # Add options
+    options_text = ""
+    for i, option in enumerate(quiz_data["options"]):
+        options_text += f"**{chr(65 + i)}.** {option}\n"
+    
+    embed.add_field(
+        name="Options",
+        value=options_text,
+        inline=False
+    )
+    
+    embed.add_field(
+        name="Progress",
+        value=f"Score: {score}/{index} so far",
+        inline=True
+    )
+    
+    if deadline is not None:
+        embed.add_field(name="⏱️ Time Left", value=f"Ends <t:{int(deadline)}:R>", inline=True)
+    
+    return embed
+
+def render_question(state: ModuleQuizState, note: str = None):
+    """(embed, view) asking the state's current question, or None once it left the module"""
+    quiz_data = state.question()
+    if quiz_data is None:
+        return None
+    deadline = time.time() + QUESTION_SECONDS if state.timed else None
+    embed = create_question_embed(quiz_data, state.index, state.total, state.score, deadline)
+    if note:
+        embed.add_field(name="Previous Question", value=note, inline=False)
+    return embed, MultiQuizView(state, len(quiz_data["options"]))
+
+async def finish_module_quiz(state: ModuleQuizState) -> tuple:
+    """Award and record a finished module quiz; returns the results (embed, view)"""
+    # Calculate results
+    total_questions = state.total
+    percentage = (state.score / total_questions) * 100
+    
+    # Create results embed
+    embed = discord.Embed(
+        title="🎯 Quiz Complete!",
+        description=f"**Score: {state.score}/{total_questions} ({percentage:.1f}%)**",
+        color=0x00FF00 if percentage >= 70 else 0xFFAA00 if percentage >= 50 else 0xFF0000
+    )
+    
+    # Add performance message
+    if percentage >= 90:
+        embed.add_field(name="Performance", value="🌟 Excellent! You're a cybersecurity star!", inline=False)
+    elif percentage >= 70:
+        embed.add_field(name="Performance", value="👍 Good job! You're getting the hang of this!", inline=False)
+    elif percentage >= 50:
+        embed.add_field(name="Performance", value="📚 Not bad, but review the material and try again!", inline=False)
+    else:
+        embed.add_field(name="Performance", value="📖 Keep studying! Review the lessons and come back stronger!", inline=False)
+    
+    # Award XP based on performance, plus the speed bonus of a timed quiz
+    base_xp = 50
+    bonus_xp = state.score * 25
+    total_xp = base_xp + bonus_xp + state.bonus
+    
+    await db.run(db.add_xp, state.user_id, total_xp)
+    embed.add_field(name="XP Earned", value=f"+{total_xp} XP", inline=True)
+    if state.timed:
+        embed.add_field(name="⚡ Speed Bonus", value=f"+{state.bonus} XP", inline=True)
+    
+    # Record quiz attempt (module quizzes have no lesson)
+    await db.run(
+        db.record_quiz_attempt,
+        state.user_id, state.course_id, state.module_id,
+        0, state.score, total_questions
+    )
+    
+    # Check for achievements
+    achievement_types = ["perfect_quiz"] if state.score == total_questions else []
+    new_achievements = []
+    for ach_type in achievement_types:
+        new_achievements.extend(
+            await asyncio.to_thread(achievement_manager.check_and_award_achievements, state.user_id, ach_type)
         )
-        self.next_button.callback = self.next_question
-        self.add_item(self.next_button)
-        
-        self.finish_button = Button(
-            label="Finish Quiz 🏁",
-            style=discord.ButtonStyle.success,
-            custom_id="finish_quiz",
-            disabled=True,
-            row=1
+    
+    if new_achievements:
+        achievement_text = "\n".join([f"🏆 {ach['name']}" for ach in new_achievements])
+        embed.add_field(
+            name="New Achievements!",
+            value=achievement_text,
+            inline=False
         )
-        self.finish_button.callback = self.finish_quiz
-        self.add_item(self.finish_button)
-    
-    def create_option_callback(self, option_index: int):
-        """Create callback for option selection"""
-        async def callback(interaction: discord.Interaction):
-            if interaction.user.id != self.user_id:
-                await interaction.response.send_message(
-                    "❌ This isn't your quiz!",
-                    ephemeral=True
-                )
-                return
-            
-            # Record answer
-            current_q = self.questions[self.current_question]
-            is_correct = option_index == current_q["correct"]
-            
-            self.answers.append({
-                "question_index": self.current_question,
-                "selected": option_index,
-                "correct": current_q["correct"],
-                "is_correct": is_correct
-            })
-            
-            if is_correct:
-                self.score += 1
-            
-            # Disable option buttons and enable next/finish
-            for item in self.children[:4]:  # First 4 are option buttons
-                item.disabled = True
-                if item.custom_id == f"multi_quiz_option_{option_index}":
-                    item.style = discord.ButtonStyle.success if is_correct else discord.ButtonStyle.danger
-            
-            # Enable appropriate navigation button
-            if self.current_question < len(self.questions) - 1:
-                self.next_button.disabled = False
-            else:
-                self.finish_button.disabled = False
-            
-            # Show immediate feedback
-            feedback = "✅ Correct!" if is_correct else f"❌ Incorrect. The answer was {chr(65 + current_q['correct'])}."
-            
-            embed = self.create_question_embed()
-            embed.add_field(
-                name="Answer",
-                value=feedback,
-                inline=False
-            )
-            
-            await interaction.response.edit_message(embed=embed, view=self)
-        
-        return callback
     
-    async def next_question(self, interaction: discord.Interaction):
-        """Move to next question"""
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message(
-                "❌ This isn't your quiz!",
-                ephemeral=True
-            )
+    # Add navigation buttons
+    module = get_module(state.course_id, state.module_id)
+    first_lesson = min(module["lessons"]) if module and module["lessons"] else 1
+    view = build_view(
+        OpenLessonButton(state.user_id, state.course_id, state.module_id, first_lesson),
+        RetakeModuleQuizButton(state.user_id, state.course_id, state.module_id, state.timed),
+        BrowseCoursesButton(state.user_id)
+    )
+    return embed, view
+
+async def expire_question(message_id: int, index: int):
+    """Deadline of a timed question: count it as missed and move on without waiting for a click"""
+    if not claim(message_id, str(index)):
+        # Answered in the same moment
+        return
+    clock = stop_question_clock(message_id, index)
+    if clock is None:
+        return
+    state = clock.state
+    quiz_data = state.question()
+    note = "⏰ Time's up!"
+    if quiz_data is not None:
+        await review_scheduler.record_answer(state.user_id, state.course_id, state.module_id, quiz_data, False)
+        await asyncio.to_thread(rating_engine.record_answer, state.user_id, state.course_id, state.module_id,
+                                quiz_data, False, None, QUESTION_SECONDS)
+        note = f"⏰ Time's up! The answer was {chr(65 + quiz_data['correct'])}."
+    
+    next_state = state.advanced(index + 1)
+    rendered = render_question(next_state, note) if next_state.index < state.total else None
+    try:
+        if rendered is None:
+            if not claim(message_id, "finish"):
+                return
+            embed, view = await finish_module_quiz(next_state)
+            await clock.message.edit(embed=embed, view=view)
             return
+        await clock.message.edit(embed=rendered[0], view=rendered[1])
+    except discord.HTTPException as e:
+        logger.debug(f"Could not advance timed quiz message {message_id}: {e}")
+        return
+    start_question_clock(clock.message, next_state)
+
+@persistent
+class MultiQuizButton(OwnedItem, DynamicItem[Button],
+                      template=r"(?P<mode>[mt])quiz:(?P<action>\d|next|finish):(?P<user>\d+):(?P<course>\d+)"
+                               r":(?P<module>\d+):(?P<index>\d+):(?P<score>\d+):(?P<bonus>\d+):(?P<keys>[0-9a-f.]+)"):
+    """A button of a module quiz, carrying the whole ModuleQuizState"""
+    
+    denied_message = "❌ This isn't your quiz!"
+    
+    def __init__(self, action: str, state: ModuleQuizState, label: str, style=discord.ButtonStyle.secondary,
+                 disabled: bool = False, row: int = None):
+        self.action = action
+        self.state = state
+        self.user_id = state.user_id
+        super().__init__(Button(
+            label=label,
+            style=style,
+            disabled=disabled,
+            custom_id=state.custom_id(action)
+        ), row=row)
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], ModuleQuizState.from_match(match), item.label, item.style)
+    
+    async def callback(self, interaction: discord.Interaction):
+        state = self.state
+        message_id = interaction.message.id
         
-        self.current_question += 1
-        
-        # Reset buttons for next question
-        for item in self.children[:4]:  # Option buttons
-            item.disabled = False
-            item.style = discord.ButtonStyle.secondary
+        if self.action == "finish":
+            if not claim(message_id, "finish"):
+                await interaction.response.send_message("❌ You've already finished this quiz!", ephemeral=True)
+                return
+            embed, view = await finish_module_quiz(state)
+            await interaction.response.edit_message(embed=embed, view=view)
+            return
         
-        self.next_button.disabled = True
-        self.finish_button.disabled = True
+        if self.action == "next":
+            rendered = render_question(state.advanced(state.index + 1)) if claim(message_id, f"next{state.index}") else None
+            if rendered is None:
+                await interaction.response.send_message("❌ This quiz can't continue. Use `/quiz` to take it again.",
+                                                        ephemeral=True)
+                return
+            await interaction.response.edit_message(embed=rendered[0], view=rendered[1])
+            if state.timed:
+                start_question_clock(interaction.message, state.advanced(state.index + 1))
+            return
         
-        # Update question display
-        embed = self.create_question_embed()
-        await interaction.response.edit_message(embed=embed, view=self)
-    
-    async def finish_quiz(self, interaction: discord.Interaction):
-        """Finish quiz and show results"""
-        if interaction.user.id != self.user_id:
+        quiz_data = state.question()
+        if quiz_data is None:
             await interaction.response.send_message(
-                "❌ This isn't your quiz!",
+                "❌ This quiz changed since it started. Use `/quiz` to take it again.",
                 ephemeral=True
             )
             return
         
-        # Clear all existing buttons
-        self.clear_items()
-        
-        # Calculate results
-        total_questions = len(self.questions)
-        percentage = (self.score / total_questions) * 100
-        
-        # Create results embed
-        embed = discord.Embed(
-            title="🎯 Quiz Complete!",
-            description=f"**Score: {self.score}/{total_questions} ({percentage:.1f}%)**",
-            color=0x00FF00 if percentage >= 70 else 0xFFAA00 if percentage >= 50 else 0xFF0000
-        )
-        
-        # Add performance message
-        if percentage >= 90:
-            embed.add_field(name="Performance", value="🌟 Excellent! You're a cybersecurity star!", inline=False)
-        elif percentage >= 70:
-            embed.add_field(name="Performance", value="👍 Good job! You're getting the hang of this!", inline=False)
-        elif percentage >= 50:
-            embed.add_field(name="Performance", value="📚 Not bad, but review the material and try again!", inline=False)
-        else:
-            embed.add_field(name="Performance", value="📖 Keep studying! Review the lessons and come back stronger!", inline=False)
-        
-        # Award XP based on performance
-        base_xp = 50
-        bonus_xp = self.score * 25
-        total_xp = base_xp + bonus_xp
-        
-        db.add_xp(self.user_id, total_xp)
-        embed.add_field(name="XP Earned", value=f"+{total_xp} XP", inline=True)
+        # Timed questions are judged by the server's clock, not by when the click arrives
+        clock = question_clocks.get(message_id)
+        if clock is not None and clock.state.index != state.index:
+            clock = None
+        elapsed = time.monotonic() - clock.shown_at if clock is not None else None
+        if elapsed is not None and elapsed > QUESTION_SECONDS:
+            await interaction.response.send_message("⏰ Time's up for this question!", ephemeral=True)
+            return
         
-        # Record quiz attempt
-        db.record_quiz_attempt(
-            self.user_id, self.course_id, self.module_id,
-            self.lesson_id, self.score, total_questions
+        if not claim(message_id, str(state.index)):
+            await interaction.response.send_message("❌ You've already answered this question!", ephemeral=True)
+            return
+        stop_question_clock(message_id)
+        
+        # Record answer
+        option_index = int(self.action)
+        is_correct = option_index == quiz_data["correct"]
+        latency = elapsed if elapsed is not None else seconds_since_render(interaction)
+        await review_scheduler.record_answer(state.user_id, state.course_id, state.module_id, quiz_data, is_correct)
+        await asyncio.to_thread(rating_engine.record_answer, state.user_id, state.course_id, state.module_id,
+                                quiz_data, is_correct, option_index, latency)
+        bonus = speed_bonus(elapsed) if is_correct and elapsed is not None else 0
+        
+        # Show immediate feedback; the view carries the new score to Next/Finish
+        feedback = "✅ Correct!" if is_correct else f"❌ Incorrect. The answer was {chr(65 + quiz_data['correct'])}."
+        if bonus:
+            feedback += f" ⚡ +{bonus} XP speed bonus ({elapsed:.1f}s)"
+        embed = create_question_embed(quiz_data, state.index, state.total, state.score)
+        embed.add_field(
+            name="Answer",
+            value=feedback,
+            inline=False
         )
-        
-        # Check for achievements
-        achievement_types = ["perfect_quiz"] if self.score == total_questions else []
-        new_achievements = []
-        for ach_type in achievement_types:
-            new_achievements.extend(
-                achievement_manager.check_and_award_achievements(self.user_id, ach_type)
-            )
-        
-        if new_achievements:
-            achievement_text = "\n".join([f"🏆 {ach['name']}" for ach in new_achievements])
-            embed.add_field(
-                name="New Achievements!",
-                value=achievement_text,
-                inline=False
-            )
-        
-        # Add navigation buttons
-        self.add_navigation_buttons()
-        
-        await interaction.response.edit_message(embed=embed, view=self)
+        view = MultiQuizView(state.advanced(correct=is_correct, bonus=bonus), len(quiz_data["options"]),
+                             chosen=option_index, is_correct=is_correct)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+@persistent
+class RetakeModuleQuizButton(OwnedItem, DynamicItem[Button],
+                             template=r"(?P<mode>[mt])quiz_retake:(?P<user>\d+):(?P<course>\d+):(?P<module>\d+)"):
+    """Starts a fresh module quiz, in the same mode, in a new message"""
     
-    def add_navigation_buttons(self):
-        """Add navigation buttons after quiz completion"""
-        # Return to lesson button
-        return_button = Button(
-            label="📖 Return to Lesson",
-            style=discord.ButtonStyle.primary,
-            emoji="📖"
-        )
-        return_button.callback = self.return_to_lesson
-        self.add_item(return_button)
-        
-        # Retake quiz button
-        retake_button = Button(
+    denied_message = "❌ This isn't your quiz!"
+    
+    def __init__(self, user_id: int, course_id: int, module_id: int, timed: bool = False):
+        self.user_id = user_id
+        self.course_id = course_id
+        self.module_id = module_id
+        self.timed = timed
+        mode = "t" if timed else "m"
+        super().__init__(Button(
             label="🔄 Retake Quiz",
             style=discord.ButtonStyle.secondary,
-            emoji="🔄"
-        )
-        retake_button.callback = self.retake_quiz
-        self.add_item(retake_button)
-        
-        # Browse courses button
-        browse_button = Button(
-            label="📚 Browse Courses",
-            style=discord.ButtonStyle.secondary,
-            emoji="📚"
-        )
-        browse_button.callback = self.browse_courses
-        self.add_item(browse_button)
-    
-    async def return_to_lesson(self, interaction: discord.Interaction):
-        """Return to the lesson view"""
-        if interaction.user.id != self.user_id:
-            try:
-                await interaction.response.send_message(
-                    "❌ This isn't your quiz!",
-                    ephemeral=True
-                )
-            except discord.errors.NotFound:
-                pass
-            return
-        
-        try:
-            await interaction.response.send_message(
-                "📖 Returning to lesson...",
-                ephemeral=True
-            )
-            
-            # Import here to avoid circular imports
-            from bot import show_lesson
-            await show_lesson(interaction.followup, self.course_id, self.module_id, self.lesson_id, self.user_id)
-        except discord.errors.NotFound:
-            # Interaction expired, send lesson directly to channel
-            channel = interaction.channel if hasattr(interaction, 'channel') else None
-            if channel:
-                from bot import show_lesson
-                await show_lesson(channel, self.course_id, self.module_id, self.lesson_id, self.user_id)
-    
-    async def retake_quiz(self, interaction: discord.Interaction):
-        """Retake the quiz"""
-        if interaction.user.id != self.user_id:
-            try:
-                await interaction.response.send_message(
-                    "❌ This isn't your quiz!",
-                    ephemeral=True
-                )
-            except discord.errors.NotFound:
-                pass
-            return
-        
-        try:
-            await interaction.response.send_message(
-                "🔄 Starting quiz again...",
-                ephemeral=True
-            )
-            
-            # Start the quiz again
-            quiz_manager = QuizManager()
-            await quiz_manager.start_lesson_quiz(
-                interaction.followup, self.course_id, self.module_id, self.lesson_id, self.user_id
-            )
-        except discord.errors.NotFound:
-            # Interaction expired, send quiz directly to channel
-            channel = interaction.channel if hasattr(interaction, 'channel') else None
-            if channel:
-                quiz_manager = QuizManager()
-                await quiz_manager.start_lesson_quiz(
-                    channel, self.course_id, self.module_id, self.lesson_id, self.user_id
-                )
+            custom_id=f"{mode}quiz_retake:{user_id}:{course_id}:{module_id}"
+        ))
     
-    async def browse_courses(self, interaction: discord.Interaction):
-        """Browse available courses"""
-        if interaction.user.id != self.user_id:
-            try:
-                await interaction.response.send_message(
-                    "❌ This isn't your quiz!",
-                    ephemeral=True
-                )
-            except discord.errors.NotFound:
-                pass
-            return
-        
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user"]), int(match["course"]), int(match["module"]), match["mode"] == "t")
+    
+    async def callback(self, interaction: discord.Interaction):
         try:
-            await interaction.response.send_message(
-                "📚 Loading course catalog...",
-                ephemeral=True
-            )
-            
-            # Import here to avoid circular imports
-            from bot import list_courses_with_selection
-            await list_courses_with_selection(interaction.followup, self.user_id)
+            await interaction.response.defer(thinking=True)
+            await quiz_manager.start_module_quiz(interaction.followup, self.course_id, self.module_id, self.user_id,
+                                                 timed=self.timed)
         except discord.errors.NotFound:
-            # Interaction expired, send course list directly to channel
+            # Interaction expired, send quiz directly to channel
             channel = interaction.channel if hasattr(interaction, 'channel') else None
             if channel:
-                from bot import list_courses_with_selection
-                await list_courses_with_selection(channel, self.user_id)
+                await quiz_manager.start_module_quiz(channel, self.course_id, self.module_id, self.user_id,
+                                                     timed=self.timed)
+
+class MultiQuizView(View):
+    """Buttons for one question of a module quiz, before or after it was answered"""
     
-    def create_question_embed(self) -> discord.Embed:
-        """Create embed for current question"""
-        current_q = self.questions[self.current_question]
+    def __init__(self, state: ModuleQuizState, option_count: int, chosen: int = None, is_correct: bool = False):
+        super().__init__(timeout=None)
+        answered = chosen is not None
         
-        embed = discord.Embed(
-            title=f"❓ Question {self.current_question + 1}/{len(self.questions)}",
-            description=current_q["question"],
-            color=0x0099FF
-        )
-        
-        # Add options
-        options_text = ""
-        for i, option in enumerate(current_q["options"]):
-            options_text += f"**{chr(65 + i)}.** {option}\n"
-        
-        embed.add_field(
-            name="Options",
-            value=options_text,
-            inline=False
-        )
-        
-        embed.add_field(
-            name="Progress",
-            value=f"Score: {self.score}/{self.current_question} so far",
-            inline=True
-        )
-        
-        return embed
+        # Create option buttons
+        for i in range(option_count):
+            style = discord.ButtonStyle.secondary
+            if i == chosen:
+                style = discord.ButtonStyle.success if is_correct else discord.ButtonStyle.danger
+            self.add_item(MultiQuizButton(str(i), state, label=f"{chr(65 + i)}.", style=style,  # A, B, C, D
+                                          disabled=answered, row=0))
+        
+        # Enable the navigation button that fits once the question is answered
+        last = state.index >= state.total - 1
+        self.add_item(MultiQuizButton("next", state, label="Next Question ➡️", style=discord.ButtonStyle.primary,
+                                      disabled=not answered or last, row=1))
+        self.add_item(MultiQuizButton("finish", state, label="Finish Quiz 🏁", style=discord.ButtonStyle.success,
+                                      disabled=not answered or not last, row=1))
 
 class QuizManager:
     def __init__(self):
@@ -548,8 +599,6 @@ class QuizManager:
             inline=False
         )
         
-        embed.set_footer(text="You have 5 minutes to answer!")
-        
         # Determine user_id - handle both regular context and webhook context
         if user_id is None:
             if hasattr(ctx, 'author'):
@@ -563,10 +612,9 @@ class QuizManager:
         
         await ctx.send(embed=embed, view=view)
     
-    async def start_module_quiz(self, ctx, course_id: int, module_id: int, user_id: int = None):
-        """Start a comprehensive quiz for a module"""
-        from courses import get_module
-        
+    async def start_module_quiz(self, ctx, course_id: int, module_id: int, user_id: int = None,
+                                tag: str = None, difficulty: int = None, timed: bool = False):
+        """Start a comprehensive quiz for a module, drawn from its question bank"""
         module = get_module(course_id, module_id)
         if not module:
             embed = discord.Embed(
@@ -577,27 +625,37 @@ class QuizManager:
             await ctx.send(embed=embed)
             return
         
-        # Collect all quiz questions from module lessons
-        questions = []
-        for lesson_id, lesson in module["lessons"].items():
-            if "quiz" in lesson:
-                questions.append(lesson["quiz"])
+        # Determine user_id - handle both regular context and webhook context
+        if user_id is None:
+            if hasattr(ctx, 'author'):
+                user_id = ctx.author.id
+            else:
+                # This shouldn't happen, but provide a fallback
+                raise ValueError("user_id must be provided when using webhook context")
+        
+        # Up to 5 questions for better UX, preferring unseen ones close to the learner's rating
+        rank = await asyncio.to_thread(rating_engine.ranker, user_id)
+        questions = await asyncio.to_thread(question_bank.draw, user_id, course_id, module_id, MODULE_QUIZ_QUESTIONS,
+                                            tag, difficulty, rank)
+        pool = question_bank.pool(course_id, module_id)
+        # Buttons find questions again by short key; skip the rare ones whose key still clashes
+        questions = [quiz_data for quiz_data in questions if pool.short_key(question_key(quiz_data)) is not None]
         
         if not questions:
+            if pool and (tag or difficulty):
+                description = "No questions in this module match that topic and difficulty."
+                if pool.tags:
+                    description += f"\n\n**Topics:** {', '.join(pool.tags)}"
+            else:
+                description = "This module doesn't have any quizzes yet."
             embed = discord.Embed(
                 title="❌ No Quizzes Available",
-                description="This module doesn't have any quizzes yet.",
+                description=description,
                 color=0xFF0000
             )
             await ctx.send(embed=embed)
             return
         
-        # Shuffle questions for variety
-        random.shuffle(questions)
-        
-        # Limit to 5 questions max for better UX
-        questions = questions[:5]
-        
         # Create initial embed
         embed = discord.Embed(
             title=f"🎯 {module['title']} - Module Quiz",
@@ -611,23 +669,25 @@ class QuizManager:
             inline=False
         )
         
-        # Determine user_id - handle both regular context and webhook context
-        if user_id is None:
-            if hasattr(ctx, 'author'):
-                user_id = ctx.author.id
-            else:
-                # This shouldn't happen, but provide a fallback
-                raise ValueError("user_id must be provided when using webhook context")
-        
-        # Create multi-quiz view
-        view = MultiQuizView(questions, user_id, course_id, module_id, 0)
-        
-        await ctx.send(embed=embed)
+        if timed:
+            embed.add_field(
+                name="⏱️ Timed Mode",
+                value=f"• {QUESTION_SECONDS:g} seconds per question; unanswered questions count as missed\n"
+                      f"• Fast correct answers earn up to {MAX_SPEED_BONUS} bonus XP",
+                inline=False
+            )
         
-        # Start first question after a brief delay
-        await asyncio.sleep(2)
-        question_embed = view.create_question_embed()
-        await ctx.send(embed=question_embed, view=view)
+        # Intro and first question go out together in one message
+        keys = tuple(pool.short_key(question_key(quiz_data)) for quiz_data in questions)
+        state = ModuleQuizState(user_id, course_id, module_id, keys, timed=timed)
+        question_embed, view = render_question(state)
+        if isinstance(ctx, discord.Webhook):
+            # Interaction followups only return the message when asked to wait for it
+            message = await ctx.send(embeds=[embed, question_embed], view=view, wait=True)
+        else:
+            message = await ctx.send(embeds=[embed, question_embed], view=view)
+        if timed:
+            start_question_clock(message, state)
     
     async def get_quiz_stats(self, ctx, user_id: int = None):
         """Get quiz statistics for a user"""
@@ -669,7 +729,7 @@ class QuizManager:
             total_attempts, avg_percentage, perfect_scores, best_percentage = stats
             
             # Get user info
-            user_stats = self.db.get_user_stats(target_user_id)
+            user_stats = await self.db.run(self.db.get_user_stats, target_user_id)
             username = user_stats[0] if user_stats else "Unknown User"
             
             embed = discord.Embed(
@@ -707,6 +767,13 @@ class QuizManager:
                 inline=False
             )
             
+            skill_rating = await asyncio.to_thread(rating_engine.user_rating, target_user_id)
+            embed.add_field(
+                name="📐 Skill Rating",
+                value=f"**{skill_rating:.0f}** (module quizzes pick questions near your level)",
+                inline=False
+            )
+            
             await ctx.send(embed=embed)
             
         except Exception as e:
@@ -0,0 +1,256 @@
+"""
+Adaptive Ratings
+Elo-scale ratings for learners and quiz questions, nudged in O(1) on every answer
+and written to the database in batches; a nightly pass refits them from the full
+answer log
+"""
+
+import logging
+import math
+import threading
+import time
+from database import db
+from curriculum import DEFAULT_DIFFICULTY
+from question_bank import question_key
+
+logger = logging.getLogger("cyberbot.ratings")
+
+DEFAULT_USER_RATING = 1200.0
+# Each difficulty step away from the middle moves a question's starting rating this far
+DIFFICULTY_STEP = 150.0
+USER_K = 32.0
+QUESTION_K = 16.0
+# Ratings move twice as fast until they have seen this many answers
+PROVISIONAL_ANSWERS = 10
+# Module quizzes aim for questions the learner answers correctly this often
+TARGET_SUCCESS = 0.7
+TARGET_OFFSET = 400.0 * math.log10(TARGET_SUCCESS / (1 - TARGET_SUCCESS))
+
+# Recalibration: Newton passes over the answer log, pulled towards each rating's
+# prior with this spread so a perfect record still gets a finite rating
+RECALIBRATION_PASSES = 12
+PRIOR_SPREAD = 250.0
+MAX_STEP = 200.0
+_LOGISTIC_SCALE = math.log(10) / 400.0
+
+def seed_rating(difficulty: int) -> float:
+    """Starting rating of a question from its authored 1-5 difficulty"""
+    return DEFAULT_USER_RATING + (difficulty - DEFAULT_DIFFICULTY) * DIFFICULTY_STEP
+
+def expected_score(user_rating: float, question_rating: float) -> float:
+    """Chance that a learner answers a question correctly"""
+    return 1.0 / (1.0 + 10.0 ** ((question_rating - user_rating) / 400.0))
+
+def _k(base: float, answers: int) -> float:
+    return base * 2 if answers < PROVISIONAL_ANSWERS else base
+
+def calibrate(answers: list, users: dict, questions: dict, passes: int = RECALIBRATION_PASSES) -> tuple:
+    """Refit ratings to an answer log by regularised maximum likelihood.
+    
+    `answers` holds (user_id, question_key, correct) rows; `users` maps user_id to its
+    prior rating and `questions` maps question_key to its seed. The log is split into
+    columns once so each pass is a few flat loops. Returns (user ratings, question ratings).
+    """
+    user_ids = list(users)
+    question_keys = list(questions)
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    question_index = {key: i for i, key in enumerate(question_keys)}
+    rows = [(user_index[u], question_index[q], 1.0 if c else 0.0)
+            for u, q, c in answers if u in user_index and q in question_index]
+    user_column = [row[0] for row in rows]
+    question_column = [row[1] for row in rows]
+    score_column = [row[2] for row in rows]
+    
+    user_prior = [float(users[user_id]) for user_id in user_ids]
+    question_prior = [float(questions[key]) for key in question_keys]
+    user_ratings = list(user_prior)
+    question_ratings = list(question_prior)
+    precision = 1.0 / PRIOR_SPREAD ** 2
+    
+    for _ in range(passes):
+        user_gradient = [0.0] * len(user_ids)
+        user_information = [0.0] * len(user_ids)
+        question_gradient = [0.0] * len(question_keys)
+        question_information = [0.0] * len(question_keys)
+        for u, q, score in zip(user_column, question_column, score_column):
+            p = 1.0 / (1.0 + 10.0 ** ((question_ratings[q] - user_ratings[u]) / 400.0))
+            residual = (score - p) * _LOGISTIC_SCALE
+            information = p * (1.0 - p) * _LOGISTIC_SCALE ** 2
+            user_gradient[u] += residual
+            user_information[u] += information
+            question_gradient[q] -= residual
+            question_information[q] += information
+        
+        for ratings, prior, gradient, information in (
+            (user_ratings, user_prior, user_gradient, user_information),
+            (question_ratings, question_prior, question_gradient, question_information)
+        ):
+            for i, rating in enumerate(ratings):
+                step = (gradient[i] - (rating - prior[i]) * precision) / (information[i] + precision)
+                ratings[i] = rating + max(-MAX_STEP, min(MAX_STEP, step))
+    
+    return dict(zip(user_ids, user_ratings)), dict(zip(question_keys, question_ratings))
+
+class RatingEngine:
+    """In-memory ratings updated per answer; dirty entries and logged answers wait for flush()"""
+    
+    def __init__(self):
+        self.users = {}  # user_id -> [rating, answers], loaded per user on first use
+        self.questions = None  # question_key -> [rating, seed, answers], loaded on first use
+        self._dirty_users = set()
+        self._dirty_questions = set()
+        self._pending_answers = []  # quiz_answers rows not written yet
+        self._replay = None  # answers taken while a recalibration runs, reapplied afterwards
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()  # One batch write at a time; held for a whole recalibration
+    
+    def _user(self, user_id: int) -> list:
+        state = self.users.get(user_id)
+        if state is None:
+            stored = db.get_user_rating(user_id)
+            state = self.users[user_id] = list(stored) if stored else [DEFAULT_USER_RATING, 0]
+        return state
+    
+    def _question(self, key: str, difficulty: int) -> list:
+        if self.questions is None:
+            self.questions = {k: list(row) for k, row in db.get_question_ratings().items()}
+        state = self.questions.get(key)
+        if state is None:
+            seed = seed_rating(difficulty)
+            state = self.questions[key] = [seed, seed, 0]
+        return state
+    
+    def user_rating(self, user_id: int) -> float:
+        with self._lock:
+            return self._user(user_id)[0]
+    
+    def _apply(self, user_id: int, key: str, difficulty: int, correct: bool, count: bool = True,
+               move_user: bool = True, move_question: bool = True):
+        user = self._user(user_id)
+        question = self._question(key, difficulty)
+        surprise = (1.0 if correct else 0.0) - expected_score(user[0], question[0])
+        if move_user:
+            user[0] += _k(USER_K, user[1]) * surprise
+            self._dirty_users.add(user_id)
+        if move_question:
+            question[0] -= _k(QUESTION_K, question[2]) * surprise
+            self._dirty_questions.add(key)
+        if count:
+            user[1] += 1
+            question[2] += 1
+    
+    def record_answer(self, user_id: int, course_id: int, module_id: int, quiz, correct: bool,
+                      chosen: int = None, latency: float = None):
+        """Update both ratings for one graded answer and queue it for the answer log"""
+        key = question_key(quiz)
+        latency_ms = round(latency * 1000) if latency is not None else None
+        with self._lock:
+            ability = self._user(user_id)[0]
+            self._apply(user_id, key, quiz["difficulty"], correct)
+            self._pending_answers.append((user_id, key, course_id, module_id, int(correct), time.time(),
+                                          chosen, latency_ms, ability))
+            if self._replay is not None:
+                self._replay.append((user_id, key, quiz["difficulty"], correct))
+    
+    def ranker(self, user_id: int):
+        """Sort key for BankQuestions: distance from the rating this learner should hit TARGET_SUCCESS on"""
+        with self._lock:
+            target = self._user(user_id)[0] - TARGET_OFFSET
+        
+        def distance(question) -> float:
+            with self._lock:
+                return abs(self._question(question.key, question.difficulty)[0] - target)
+        return distance
+    
+    @property
+    def recalibrating(self) -> bool:
+        return self._replay is not None
+    
+    def _take_batch(self) -> tuple:
+        """(users, questions, answers) waiting to be written, cleared for the next batch; caller holds _lock"""
+        users = [(user_id, *self.users[user_id]) for user_id in self._dirty_users]
+        questions = [(key, *self.questions[key]) for key in self._dirty_questions]
+        answers = self._pending_answers
+        self._dirty_users = set()
+        self._dirty_questions = set()
+        self._pending_answers = []
+        return users, questions, answers
+    
+    def _write_batch(self, users: list, questions: list, answers: list) -> bool:
+        if not (users or questions or answers) or db.save_ratings(users, questions, answers):
+            return True
+        # Keep the batch for the next flush
+        with self._lock:
+            self._dirty_users.update(row[0] for row in users)
+            self._dirty_questions.update(row[0] for row in questions)
+            self._pending_answers[:0] = answers
+        return False
+    
+    def flush(self) -> int:
+        """Write dirty ratings and pending answers in one batch; returns the answers written.
+        
+        Waits for a running recalibration, which flushes on its own when done.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take_batch()
+            return len(batch[2]) if self._write_batch(*batch) else 0
+    
+    def recalibrate(self) -> int:
+        """Refit every rating from the answer log; answers taken meanwhile are reapplied on top.
+        
+        The replay starts in the same lock section that takes the pending batch,
+        and no other flush runs until it is over, so every answer is either in
+        the log that is fitted or in the replay, never both.
+        """
+        with self._flush_lock:
+            return self._recalibrate()
+    
+    def _recalibrate(self) -> int:
+        with self._lock:
+            batch = self._take_batch()
+            self._replay = []
+        try:
+            if not self._write_batch(*batch):
+                logger.warning("Skipped rating recalibration: pending answers could not be written")
+                return 0
+            stored_users = db.get_user_ratings()
+            stored_questions = db.get_question_ratings()
+            answers = db.get_answer_log()
+            users = {user_id: DEFAULT_USER_RATING for user_id in stored_users}
+            questions = {key: row[1] for key, row in stored_questions.items()}
+            user_ratings, question_ratings = calibrate(answers, users, questions)
+            
+            with self._lock:
+                for user_id, rating in user_ratings.items():
+                    state = self.users.get(user_id)
+                    if state is not None:
+                        state[0] = rating
+                    else:
+                        self.users[user_id] = [rating, stored_users[user_id][1]]
+                    self._dirty_users.add(user_id)
+                if self.questions is None:
+                    self.questions = {k: list(row) for k, row in stored_questions.items()}
+                for key, rating in question_ratings.items():
+                    self.questions.setdefault(key, list(stored_questions[key]))[0] = rating
+                    self._dirty_questions.add(key)
+                for user_id, key, difficulty, correct in self._replay:
+                    # Already counted when first applied; only ratings the refit replaced lost the answer
+                    self._apply(user_id, key, difficulty, correct, count=False,
+                                move_user=user_id in user_ratings, move_question=key in question_ratings)
+        finally:
+            with self._lock:
+                self._replay = None
+        self.flush()
+        logger.info(f"Recalibrated {len(user_ratings)} learner and {len(question_ratings)} question ratings "
+                    f"from {len(answers)} answers")
+        return len(answers)
+    
+    def forget_user(self, user_id: int):
+        """Drop a learner's cached rating after it was reset elsewhere"""
+        with self._lock:
+            self.users.pop(user_id, None)
+            self._dirty_users.discard(user_id)
+            self._pending_answers = [row for row in self._pending_answers if row[0] != user_id]
+
+rating_engine = RatingEngine()
@@ -0,0 +1,270 @@
+"""
+Spaced Repetition Reviews
+SM-2 scheduling of quiz questions a user has answered; each user's cards sit in a
+min-heap keyed by due time that is loaded from the database on first use
+"""
+
+import asyncio
+import heapq
+import os
+import time
+import discord
+from discord.ui import Button
+from cache import TTLCache
+from database import db
+from question_bank import question_bank, question_key
+from timer_wheel import WheelView
+
+DAY = 86400.0
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# SM-2 grades answers 0-5; a button quiz only knows right or wrong
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+
+class ReviewCard:
+    """SM-2 state of one question for one user"""
+    
+    __slots__ = ("key", "course_id", "module_id", "ease", "interval", "repetitions", "due_at")
+    
+    def __init__(self, key: str, course_id: int, module_id: int, ease: float = DEFAULT_EASE,
+                 interval: float = 0.0, repetitions: int = 0, due_at: float = 0.0):
+        self.key = key
+        self.course_id = course_id
+        self.module_id = module_id
+        self.ease = ease
+        self.interval = interval  # days
+        self.repetitions = repetitions  # correct answers in a row
+        self.due_at = due_at  # unix seconds
+
+def schedule(card: ReviewCard, quality: int, now: float) -> ReviewCard:
+    """The card after an answer graded `quality` (0-5) at `now`, per SM-2"""
+    if quality >= 3:
+        if card.repetitions == 0:
+            interval = 1.0
+        elif card.repetitions == 1:
+            interval = 6.0
+        else:
+            interval = round(card.interval * card.ease)
+        repetitions = card.repetitions + 1
+    else:
+        interval = 1.0
+        repetitions = 0
+    ease = max(MIN_EASE, card.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ReviewCard(card.key, card.course_id, card.module_id, ease, interval, repetitions, now + interval * DAY)
+
+class ReviewQueue:
+    """One user's cards plus a heap of (due_at, key); entries superseded by a reschedule are skipped.
+    
+    A second heap holds the cards not yet counted as due; due_count() moves the ones
+    that came due into the `due` set, so each card is counted in O(log n) once.
+    """
+    
+    __slots__ = ("cards", "heap", "upcoming", "due")
+    
+    def __init__(self, cards=()):
+        self.cards = {card.key: card for card in cards}
+        self.due = set()  # Keys of cards counted as due
+        self._rebuild()
+    
+    def _rebuild(self):
+        self.heap = [(card.due_at, card.key) for card in self.cards.values()]
+        heapq.heapify(self.heap)
+        self.upcoming = [entry for entry in self.heap if entry[1] not in self.due]
+        heapq.heapify(self.upcoming)
+    
+    def _live(self, due_at: float, key: str) -> bool:
+        card = self.cards.get(key)
+        return card is not None and card.due_at == due_at
+    
+    def push(self, card: ReviewCard):
+        self.cards[card.key] = card
+        self.due.discard(card.key)
+        heapq.heappush(self.heap, (card.due_at, card.key))
+        heapq.heappush(self.upcoming, (card.due_at, card.key))
+        if len(self.heap) > 2 * len(self.cards) + 16:
+            # Too many stale entries: rebuild from the live cards
+            self._rebuild()
+    
+    def remove(self, key: str):
+        self.cards.pop(key, None)
+        self.due.discard(key)
+    
+    def peek(self):
+        """The card due soonest, or None when there are no cards"""
+        heap = self.heap
+        while heap:
+            due_at, key = heap[0]
+            if self._live(due_at, key):
+                return self.cards[key]
+            heapq.heappop(heap)
+        return None
+    
+    def due_count(self, now: float) -> int:
+        """Cards due at `now`; `now` must not go backwards between calls"""
+        upcoming = self.upcoming
+        while upcoming and upcoming[0][0] <= now:
+            due_at, key = heapq.heappop(upcoming)
+            if self._live(due_at, key):
+                self.due.add(key)
+        return len(self.due)
+
+class ReviewScheduler:
+    """Per-user review queues, hydrated from review_cards on first use and written through on every answer"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 900.0):
+        self.queues = TTLCache(maxsize=maxsize, ttl=ttl)  # user_id -> ReviewQueue
+    
+    def _queue(self, user_id: int) -> ReviewQueue:
+        queue = self.queues.get(user_id)
+        if queue is None:
+            queue = ReviewQueue(ReviewCard(*row) for row in db.get_review_cards(user_id))
+            self.queues.set(user_id, queue)
+        return queue
+    
+    async def load(self, user_id: int) -> ReviewQueue:
+        """A user's queue, hydrated in a worker thread so the event loop never waits on review_cards"""
+        queue = self.queues.get(user_id)
+        if queue is None:
+            queue = await asyncio.to_thread(self._queue, user_id)
+        return queue
+    
+    async def record_answer(self, user_id: int, course_id: int, module_id: int, quiz, correct: bool,
+                            now: float = None) -> ReviewCard:
+        """Schedule a question's next review after the user answered it"""
+        now = time.time() if now is None else now
+        queue = await self.load(user_id)
+        key = question_key(quiz)
+        card = queue.cards.get(key) or ReviewCard(key, course_id, module_id)
+        card = schedule(card, QUALITY_CORRECT if correct else QUALITY_INCORRECT, now)
+        await db.run(db.save_review_card, user_id, key, card.course_id, card.module_id, card.ease, card.interval,
+                     card.repetitions, card.due_at, now)
+        queue.push(card)
+        return card
+    
+    async def next_review(self, user_id: int, now: float = None):
+        """(card, quiz) of the most overdue review, or None if nothing is due"""
+        now = time.time() if now is None else now
+        queue = await self.load(user_id)
+        while True:
+            card = queue.peek()
+            if card is None or card.due_at > now:
+                return None
+            quiz = question_bank.find(card.course_id, card.module_id, card.key)
+            if quiz is not None:
+                return card, quiz
+            # The question was edited or removed from the course
+            queue.remove(card.key)
+            await db.run(db.delete_review_card, user_id, card.key)
+    
+    def next_due_at(self, user_id: int):
+        """When the user's next review comes due, or None without cards"""
+        card = self._queue(user_id).peek()
+        return card.due_at if card is not None else None
+    
+    def due_count(self, user_id: int, now: float = None) -> int:
+        return self._queue(user_id).due_count(time.time() if now is None else now)
+    
+    def invalidate(self, user_id: int):
+        """Forget a user's cached queue after their cards were changed elsewhere"""
+        self.queues.invalidate(user_id)
+    
+    def pending_reminders(self, now: float = None, limit: int = 500) -> list:
+        """(user_id, due count) for everyone with reviews that came due since their last reminder"""
+        return db.get_review_reminders(time.time() if now is None else now, limit)
+
+review_scheduler = ReviewScheduler(
+    maxsize=int(os.getenv("REVIEW_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("REVIEW_CACHE_TTL", "900"))
+)
+
+def create_review_embed(quiz, remaining: int) -> discord.Embed:
+    """Embed asking one review question"""
+    embed = discord.Embed(
+        title="🔁 Review",
+        description=quiz["question"],
+        color=0x9B59B6
+    )
+    embed.add_field(
+        name="Choose your answer:",
+        value="\n".join(f"**{chr(65 + i)}.** {option}" for i, option in enumerate(quiz["options"])),
+        inline=False
+    )
+    embed.set_footer(text=f"{remaining} review(s) due")
+    return embed
+
+def create_no_reviews_embed(user_id: int) -> discord.Embed:
+    """Embed for when nothing is due, saying when the next review is"""
+    next_due = review_scheduler.next_due_at(user_id)
+    if next_due is None:
+        description = "Answer some quizzes first — every question you answer comes back here for review."
+    else:
+        description = f"You're all caught up! Your next review is due <t:{int(next_due)}:R>."
+    return discord.Embed(title="🔁 No Reviews Due", description=description, color=0x00FF00)
+
+class ReviewView(WheelView):
+    """Answer buttons for one review question, then a button for the next one"""
+    
+    def __init__(self, user_id: int, card: ReviewCard, quiz):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.card = card
+        self.quiz = quiz
+        self.answered = False
+        
+        for i in range(len(quiz["options"])):
+            button = Button(label=chr(65 + i), style=discord.ButtonStyle.secondary)
+            button.callback = self.create_callback(i)
+            self.add_item(button)
+    
+    def create_callback(self, option_index: int):
+        """Create callback function for an answer button"""
+        async def callback(interaction: discord.Interaction):
+            if interaction.user.id != self.user_id:
+                await interaction.response.send_message("❌ This isn't your review! Use `/review` to start your own.", ephemeral=True)
+                return
+            if self.answered:
+                await interaction.response.send_message("❌ You've already answered this review!", ephemeral=True)
+                return
+            self.answered = True
+            
+            correct = self.quiz["correct"]
+            is_correct = option_index == correct
+            card = await review_scheduler.record_answer(self.user_id, self.card.course_id, self.card.module_id,
+                                                  self.quiz, is_correct)
+            
+            self.clear_items()
+            if is_correct:
+                embed = discord.Embed(title="✅ Correct!", description=self.quiz["explanation"], color=0x00FF00)
+            else:
+                embed = discord.Embed(
+                    title="❌ Incorrect",
+                    description=f"The correct answer was **{chr(65 + correct)}. {self.quiz['options'][correct]}**\n\n{self.quiz['explanation']}",
+                    color=0xFF0000
+                )
+            embed.add_field(name="Next Review", value=f"<t:{int(card.due_at)}:R>", inline=True)
+            
+            remaining = review_scheduler.due_count(self.user_id)
+            if remaining:
+                next_button = Button(label=f"Next Review ({remaining}) ➡️", style=discord.ButtonStyle.primary)
+                next_button.callback = self.next_review
+                self.add_item(next_button)
+            await interaction.response.edit_message(embed=embed, view=self)
+        
+        return callback
+    
+    async def next_review(self, interaction: discord.Interaction):
+        """Replace this message with the next due review"""
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("❌ This isn't your review!", ephemeral=True)
+            return
+        embed, view = await review_message(self.user_id)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+async def review_message(user_id: int) -> tuple:
+    """(embed, view) for the user's most overdue review; the view is None when nothing is due"""
+    due = await review_scheduler.next_review(user_id)
+    if due is None:
+        return create_no_reviews_embed(user_id), None
+    card, quiz = due
+    return create_review_embed(quiz, review_scheduler.due_count(user_id)), ReviewView(user_id, card, quiz)
@@ -0,0 +1,259 @@
+"""
+Full-Text Search
+Inverted index over lessons, quizzes, CTF challenges and multimedia descriptions,
+ranked with BM25 and supporting prefix matches
+"""
+
+import logging
+import math
+import re
+import sys
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from courses import COURSES
+from ctf import ctf_manager
+from database import db
+from multimedia import CONTENT_TYPES, multimedia_manager
+
+logger = logging.getLogger("cyberbot.search")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by can do for from has have how if in into is it its of on or
+so that the their this to was what when which who why will with you your
+""".split())
+
+# Extra weight for title and question text compared to body text
+TITLE_WEIGHT = 3
+QUIZ_WEIGHT = 2
+# Score multiplier for terms that only match a query word as a prefix
+PREFIX_WEIGHT = 0.5
+MAX_PREFIX_EXPANSIONS = 50
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens without stopwords"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+class SearchIndex:
+    """Inverted index with BM25 ranking and prefix matching on a sorted vocabulary"""
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_key: weighted term frequency}
+        self.documents = {}  # doc_key -> result metadata
+        self.doc_lengths = {}  # doc_key -> weighted token count
+        self.doc_terms = {}  # doc_key -> terms it was indexed under, for removal
+        self.total_length = 0
+        self._vocabulary = None  # Sorted terms for prefix lookup, rebuilt after changes
+        self._lock = threading.RLock()
+    
+    def __len__(self):
+        return len(self.documents)
+    
+    def add(self, key, fields: list, meta: dict):
+        """Index a document from (text, weight) fields, replacing any previous version"""
+        frequencies = Counter()
+        for text, weight in fields:
+            for token in tokenize(text or ""):
+                frequencies[token] += weight
+        
+        with self._lock:
+            self.remove(key)
+            for term, frequency in frequencies.items():
+                self.postings[term][key] = frequency
+            length = sum(frequencies.values())
+            self.documents[key] = meta
+            self.doc_terms[key] = tuple(frequencies)
+            self.doc_lengths[key] = length
+            self.total_length += length
+            self._vocabulary = None
+    
+    def remove(self, key):
+        """Drop a document from the index"""
+        with self._lock:
+            if key not in self.documents:
+                return
+            for term in self.doc_terms.pop(key):
+                docs = self.postings[term]
+                docs.pop(key, None)
+                if not docs:
+                    del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(key)
+            del self.documents[key]
+            self._vocabulary = None
+    
+    def remove_where(self, predicate):
+        """Drop every document whose key matches predicate(key)"""
+        with self._lock:
+            for key in [key for key in self.documents if predicate(key)]:
+                self.remove(key)
+    
+    def _expand(self, token: str) -> list:
+        """(term, weight) pairs for a query token: the exact term plus prefix matches"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        
+        matches = [(token, 1.0)] if token in self.postings else []
+        if len(token) < 2:
+            return matches
+        position = bisect_left(vocabulary, token)
+        for term in vocabulary[position:position + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(token):
+                break
+            if term != token:
+                matches.append((term, PREFIX_WEIGHT))
+        return matches
+    
+    def search(self, query: str, limit: int = 10) -> list:
+        """Return up to `limit` (score, meta) pairs, best first"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        
+        with self._lock:
+            doc_count = len(self.documents)
+            if not doc_count:
+                return []
+            average_length = self.total_length / doc_count
+            scores = defaultdict(float)
+            
+            for token in set(tokens):
+                for term, weight in self._expand(token):
+                    docs = self.postings[term]
+                    idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for key, frequency in docs.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[key] / average_length)
+                        scores[key] += weight * idf * frequency * (self.k1 + 1) / (frequency + norm)
+            
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [(round(score, 3), self.documents[key]) for key, score in ranked]
+
+# Global index, built at warm-up or on the first search
+search_index = None
+_build_lock = threading.Lock()
+
+def _snippet(text: str, length: int = 120) -> str:
+    """First line of lesson text, flattened and shortened for result lists"""
+    text = " ".join(text.replace("*", "").split())
+    return text if len(text) <= length else text[:length].rsplit(" ", 1)[0] + "…"
+
+def _quiz_fields(quiz) -> list:
+    fields = [(quiz.get("question", ""), QUIZ_WEIGHT), (quiz.get("explanation", ""), 1)]
+    fields.extend((option, 1) for option in quiz.get("options", []))
+    return fields
+
+def _index_course(index: SearchIndex, course_id: int, multimedia: dict):
+    """Add every lesson of one course to the index, plus its modules' own question banks"""
+    course = COURSES.get(course_id)
+    if course is None:
+        return
+    for module_id, module in course["modules"].items():
+        for lesson_id, lesson in module["lessons"].items():
+            fields = [
+                (lesson["title"], TITLE_WEIGHT),
+                (lesson.get("content", ""), 1),
+                (module.get("title", ""), 1),
+                (course["title"], 1)
+            ]
+            quiz = lesson.get("quiz")
+            if quiz:
+                fields.extend(_quiz_fields(quiz))
+            for question in lesson.get("questions", ()):
+                fields.extend(_quiz_fields(question))
+            exercise = lesson.get("practical_exercise")
+            if exercise:
+                fields.append((exercise.get("title", ""), 1))
+                fields.append((exercise.get("description", ""), 1))
+            media = lesson.get("multimedia")
+            if media:
+                fields.append((media.get("description", ""), 1))
+            fields.extend((description, 1) for description in multimedia.get((course_id, module_id, lesson_id), []))
+            
+            index.add(("lesson", course_id, module_id, lesson_id), fields, {
+                "kind": "lesson",
+                "ids": (course_id, module_id, lesson_id),
+                "title": lesson["title"],
+                "course_title": course["title"],
+                "snippet": _snippet(lesson.get("content", ""))
+            })
+        
+        # Bank questions that belong to the module rather than a lesson open its module quiz
+        questions = module.get("questions", ())
+        if questions:
+            fields = [(module.get("title", ""), TITLE_WEIGHT), (course["title"], 1)]
+            for question in questions:
+                fields.extend(_quiz_fields(question))
+            index.add(("quiz", course_id, module_id), fields, {
+                "kind": "quiz",
+                "ids": (course_id, module_id),
+                "title": f"{module.get('title', f'Module {module_id}')} Quiz",
+                "course_title": course["title"],
+                "snippet": f"{len(questions)} bank question(s), e.g. {_snippet(questions[0]['question'])}"
+            })
+
+def _index_multimedia(index: SearchIndex):
+    """Add every item of the /multimedia galleries to the index"""
+    for content_type in CONTENT_TYPES:
+        for position, item in enumerate(multimedia_manager.get_content(content_type)):
+            description = item.get("description", "")
+            fields = [(item.get("title") or description, TITLE_WEIGHT), (item.get("explanation", ""), 1),
+                      (item.get("topic", "").replace("_", " "), 1), (content_type, 1)]
+            index.add(("multimedia", content_type, position), fields, {
+                "kind": "multimedia",
+                "ids": (content_type, position),
+                "title": item.get("title") or _snippet(description, 60),
+                "snippet": f"{item.get('type', 'media')} • /multimedia {content_type}"
+            })
+
+def _lesson_multimedia() -> dict:
+    """(course, module, lesson) -> multimedia descriptions"""
+    multimedia = defaultdict(list)
+    for course_id, module_id, lesson_id, description in db.get_all_lesson_multimedia():
+        multimedia[(course_id, module_id, lesson_id)].append(description)
+    return multimedia
+
+def build_search_index() -> SearchIndex:
+    """(Re)build the global index from courses, CTF challenges and multimedia"""
+    multimedia = _lesson_multimedia()
+    index = SearchIndex()
+    for course_id in COURSES:
+        _index_course(index, course_id, multimedia)
+    _index_multimedia(index)
+    
+    for challenge_id, name, category, difficulty, points, description, required_xp in \
+            ctf_manager.get_available_challenges(sys.maxsize):
+        index.add(("ctf", challenge_id), [(name, TITLE_WEIGHT), (description, 1), (category, 1), (difficulty, 1)], {
+            "kind": "ctf",
+            "ids": (challenge_id,),
+            "title": name,
+            "snippet": f"{category} • {difficulty} • {points} pts • {required_xp} XP required"
+        })
+    
+    global search_index
+    search_index = index
+    logger.info(f"🔎 Search index built with {len(index)} documents")
+    return index
+
+def reindex_courses(course_ids):
+    """Re-index only the lessons of reloaded courses"""
+    if search_index is None:
+        return
+    course_ids = set(course_ids)
+    multimedia = _lesson_multimedia()
+    with search_index._lock:
+        search_index.remove_where(lambda key: key[0] in ("lesson", "quiz") and key[1] in course_ids)
+        for course_id in course_ids:
+            _index_course(search_index, course_id, multimedia)
+
+def search_content(query: str, limit: int = 10) -> list:
+    """Search everything, building the index on first use"""
+    index = search_index
+    if index is None:
+        with _build_lock:
+            index = search_index or build_search_index()
+    return index.search(query, limit)
+
+COURSES.add_reload_listener(reindex_courses)
@@ -0,0 +1,21 @@
+"""
+Shared fixtures: the global database points at a throwaway file, so tests never
+create or read academy.db (or its authored content) in the working directory
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_database(tmp_path_factory):
+    """Point the global DatabaseManager at a temporary database for the whole run"""
+    assert not db._initialized, "the global database was opened before the tests started"
+    db.db_path = str(tmp_path_factory.mktemp("db") / "academy.db")
+    yield db
@@ -2,13 +2,16 @@
 Unit tests for courses.py helper functions
 """
 import pytest
+import json
 import sys
 import os
 
 # Add parent directory to path to import courses module
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from courses import get_lesson, get_next_lesson, get_course, get_module, COURSES
+from courses import (get_lesson, get_next_lesson, get_course, get_module, COURSES,
+                     CurriculumIndex, CourseStore, get_previous_lesson, get_lesson_position, count_course_lessons,
+                     encode_outline, decode_outline)
 
 
 class TestGetLesson:
@@ -105,5 +108,453 @@ class TestCourseHelpers:
         assert "lessons" in module
 
 
+class TestCurriculumIndex:
+    """Tests for the flattened lesson ordering"""
+    
+    def test_previous_lesson(self):
+        """Test get_previous_lesson steps back across course boundaries"""
+        assert get_previous_lesson(1, 1, 2) == (1, 1, 1)
+        assert get_previous_lesson(2, 1, 1) == (1, 1, 3)
+        assert get_previous_lesson(1, 1, 1) is None
+    
+    def test_position_and_counts(self):
+        """Test lesson N of M and per-course counts"""
+        assert get_lesson_position(1, 1, 2) == (2, 3)
+        assert get_lesson_position(1, 1, 999) is None
+        assert count_course_lessons(1) == 3
+        assert count_course_lessons(999) == 0
+    
+    def test_non_contiguous_ids(self):
+        """Test that gaps in module and lesson ids do not break navigation"""
+        courses = {
+            1: {"modules": {1: {"lessons": {1: {}, 4: {}}}, 3: {"lessons": {2: {}}}}},
+            5: {"modules": {2: {"lessons": {7: {}}}}}
+        }
+        index = CurriculumIndex(courses)
+        assert index.next(1, 1, 1) == (1, 1, 4)
+        assert index.next(1, 1, 4) == (1, 3, 2)
+        assert index.next(1, 3, 2) == (5, 2, 7)
+        assert index.next(1, 1, 2) == (1, 1, 4)
+        assert index.previous(5, 2, 7) == (1, 3, 2)
+        assert index.module_counts[(1, 1)] == 2
+
+
+class TestCourseStore:
+    """Tests for lazily loaded, hot-reloadable course files"""
+    
+    def write_course(self, directory, course_id, title, mtime_ns):
+        path = directory / f"course_{course_id:02d}.json"
+        path.write_text(json.dumps({
+            "title": title, "description": "d", "level": "Beginner",
+            "modules": {"1": {"title": "m", "lessons": {"1": {"title": f"{title} lesson", "content": "c"}}}}
+        }))
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    
+    def test_lazy_load_with_int_keys(self, tmp_path):
+        """Test that files are only parsed on access and keep integer ids"""
+        self.write_course(tmp_path, 1, "One", 10**18)
+        store = CourseStore(str(tmp_path))
+        assert len(store.cache) == 0
+        assert 1 in store and 2 not in store
+        assert store[1]["modules"][1]["lessons"][1]["title"] == "One lesson"
+        assert store.version(1) == 1
+    
+    def test_hot_reload(self, tmp_path):
+        """Test that edited, added and broken files are handled by reload_changed"""
+        self.write_course(tmp_path, 1, "One", 10**18)
+        store = CourseStore(str(tmp_path))
+        store[1]
+        generation = store.generation
+        
+        self.write_course(tmp_path, 1, "Uno", 2 * 10**18)
+        self.write_course(tmp_path, 2, "Two", 10**18)
+        assert store.reload_changed() == [1, 2]
+        assert store[1]["title"] == "Uno"
+        assert store.version(1) == 2
+        assert list(store) == [1, 2]
+        assert store.generation > generation
+        
+        (tmp_path / "course_01.json").write_text("{ half written")
+        os.utime(tmp_path / "course_01.json", ns=(3 * 10**18, 3 * 10**18))
+        assert store.reload_changed() == []
+        assert store[1]["title"] == "Uno"
+    
+    def test_stored_outlines_skip_parsing(self, tmp_path):
+        """Test that a restarted store serves persisted outlines until a file changes"""
+        from database import DatabaseManager
+        outlines = DatabaseManager(str(tmp_path / "outlines.db"))
+        self.write_course(tmp_path, 1, "One", 10**18)
+        self.write_course(tmp_path, 2, "Two", 10**18)
+        CourseStore(str(tmp_path), outline_store=outlines).outlines()
+        
+        self.write_course(tmp_path, 2, "Deux", 2 * 10**18)
+        store = CourseStore(str(tmp_path), outline_store=outlines)
+        assert store.outline(1)["modules"][1]["lessons"][1]["title"] == "One lesson"
+        assert store.cache.get(1) is None
+        assert store.version(1) == 1
+        assert store.outline(2)["title"] == "Deux"
+        assert store.cache.get(2) is not None
+    
+    def test_outline_round_trip(self):
+        """Test that encoded outlines keep integer ids and prerequisite tuples"""
+        outline = {
+            "title": "t", "description": "d", "level": "Beginner",
+            "modules": {3: {"title": "m", "lessons": {
+                1: {"title": "a", "prerequisites": None},
+                7: {"title": "b", "prerequisites": ((1, 3, 1), (2, 1, 1))}
+            }}}
+        }
+        assert decode_outline(encode_outline(outline)) == outline
+    
+    def test_index_reads_only_changed_outlines(self, tmp_path, monkeypatch):
+        """Test that a generation change splices the changed course instead of re-reading every outline"""
+        import courses
+        self.write_course(tmp_path, 1, "One", 10**18)
+        self.write_course(tmp_path, 2, "Two", 10**18)
+        store = CourseStore(str(tmp_path))
+        monkeypatch.setattr(courses, "COURSES", store)
+        monkeypatch.setattr(courses, "_curriculum_index", None)
+        assert len(courses.get_curriculum_index()) == 2
+        
+        read = []
+        outline = store.outline
+        monkeypatch.setattr(store, "outline", lambda course_id: read.append(course_id) or outline(course_id))
+        self.write_course(tmp_path, 2, "Two", 2 * 10**18)
+        self.write_course(tmp_path, 3, "Three", 10**18)
+        store.reload_changed()
+        index = courses.get_curriculum_index()
+        assert sorted(read) == [2, 3]
+        assert index.lessons == ((1, 1, 1), (2, 1, 1), (3, 1, 1))
+        assert index.generation == store.generation
+
+
+class TestCompiledCurriculum:
+    """Tests for the frozen, validated course records"""
+    
+    def course_data(self, **quiz):
+        return {
+            "title": "T", "description": "d", "level": "Beginner",
+            "modules": {"1": {"title": "m", "lessons": {"1": {
+                "title": "L", "content": "c",
+                "quiz": {"question": "q", "options": ["a", "b"], "correct": 1, "explanation": "e", **quiz}
+            }}}}
+        }
+    
+    def test_records_are_frozen_with_dict_access(self):
+        """Test that lessons keep mapping-style access but cannot be mutated"""
+        from dataclasses import FrozenInstanceError
+        from curriculum import compile_course
+        course = compile_course(1, self.course_data())
+        lesson = course.lesson(1, 1)
+        assert lesson is course["modules"][1]["lessons"][1]
+        assert lesson["quiz"]["options"] == ("a", "b")
+        assert lesson.get("xp_reward") == 100
+        assert "quiz" in lesson and "practical_exercise" not in lesson
+        with pytest.raises(FrozenInstanceError):
+            lesson.title = "changed"
+        with pytest.raises(TypeError):
+            course["modules"][2] = None
+    
+    def test_invalid_content_rejected(self):
+        """Test that bad quiz indexes and unknown keys raise CurriculumError"""
+        from curriculum import CurriculumError, compile_course
+        with pytest.raises(CurriculumError, match="out of range"):
+            compile_course(1, self.course_data(correct=2))
+        with pytest.raises(CurriculumError, match="unknown keys"):
+            compile_course(1, self.course_data(answer=0))
+
+
+class TestAuthoredContent:
+    """Tests for admin-authored content stored in the database"""
+    
+    @pytest.fixture
+    def store(self, tmp_path):
+        from database import DatabaseManager
+        TestCourseStore().write_course(tmp_path, 1, "One", 10**18)
+        return CourseStore(str(tmp_path), authored=DatabaseManager(str(tmp_path / "authored.db")))
+    
+    def test_overlay_and_new_course(self, store):
+        """Test that authored lessons, quizzes and courses are merged and published on reload"""
+        authored = store.authored
+        store[1]
+        assert authored.save_authored_lesson(1, 2, 1, "Added", "text", 50, module_title="New module")
+        assert store.reload_course(1)
+        assert store[1].lesson(2, 1).xp_reward == 50
+        assert store.version(1) == 2
+        
+        assert authored.save_authored_quiz(1, 1, 1, "Q?", ["a", "b", "c"], 2, "because")
+        assert store.reload_course(1)
+        assert store[1].lesson(1, 1)["quiz"]["options"] == ("a", "b", "c")
+        assert store[1].lesson(1, 1).title == "One lesson"
+        
+        course_id = authored.create_authored_course("Fresh", "d", "Advanced", max(store) + 1)
+        assert course_id == 2
+        assert not store.reload_course(course_id)
+        assert authored.save_authored_lesson(course_id, 1, 1, "First", "text", module_title="m")
+        assert store.reload_course(course_id)
+        assert list(store) == [1, 2] and store[2]["level"] == "Advanced"
+    
+    def test_invalid_overlay_keeps_file_content(self, store):
+        """Test that authored changes which fail validation are reported and not served"""
+        store.authored.save_authored_quiz(1, 5, 1, "Q?", ["a", "b"], 0)
+        assert not store.reload_course(1)
+        assert 1 in store.authoring_errors
+        assert store[1]["title"] == "One"
+    
+    def test_index_splices_changed_course(self):
+        """Test that replace_courses matches a full rebuild"""
+        outlines = COURSES.outlines()
+        index = CurriculumIndex(outlines, 0)
+        changed = dict(outlines)
+        changed[2] = {"modules": {1: {"lessons": {1: {}, 2: {}}}}}
+        spliced = index.replace_courses({2: changed[2], 3: None}, 1)
+        del changed[3]
+        rebuilt = CurriculumIndex(changed, 1)
+        assert spliced.lessons == rebuilt.lessons
+        assert dict(spliced.course_counts) == dict(rebuilt.course_counts)
+        assert dict(spliced.course_starts) == dict(rebuilt.course_starts)
+
+
+class TestPrerequisiteGraph:
+    """Tests for the lesson/challenge prerequisite DAG"""
+    
+    courses = {
+        1: {"modules": {1: {"lessons": {1: {}, 2: {}, 3: {"prerequisites": ((1, 1, 1),)}}}}},
+        2: {"modules": {1: {"lessons": {1: {"prerequisites": ((1, 1, 2), (9, 9, 9))}, 2: {}}}}}
+    }
+    
+    def test_order_and_default_edges(self):
+        """Test topological order, implicit in-course edges and dropped unknown references"""
+        from prerequisites import build_prerequisite_graph
+        graph = build_prerequisite_graph(self.courses, [{"name": "Flag", "prerequisites": ["2.1.2"]}])
+        assert graph.nodes == ((1, 1, 1), (1, 1, 2), (1, 1, 3), (2, 1, 1), (2, 1, 2), ("ctf", "Flag"))
+        assert list(graph.nodes_in(graph.requires[graph.bits[(2, 1, 1)]])) == [(1, 1, 2)]
+        assert list(graph.nodes_in(graph.requires[graph.bits[(1, 1, 3)]])) == [(1, 1, 1)]
+    
+    def test_cycle_detected(self):
+        """Test that a prerequisite cycle raises CurriculumError"""
+        from curriculum import CurriculumError
+        from prerequisites import build_prerequisite_graph
+        courses = {1: {"modules": {1: {"lessons": {1: {"prerequisites": ((1, 1, 2),)}, 2: {}}}}}}
+        with pytest.raises(CurriculumError, match="cycle"):
+            build_prerequisite_graph(courses, [])
+        assert len(build_prerequisite_graph(courses, [], explicit=False).nodes) == 2
+    
+    def test_incremental_unlocks_match_full_recompute(self):
+        """Test that unlock_after gives the same mask as recomputing from scratch"""
+        from prerequisites import build_prerequisite_graph
+        graph = build_prerequisite_graph(self.courses, [{"name": "Flag", "prerequisites": ["2.1.2"]}])
+        completed = 0
+        unlocked = graph.unlocked(completed)
+        assert set(graph.nodes_in(unlocked)) == {(1, 1, 1)}
+        for node in [(1, 1, 1), (1, 1, 2), (2, 1, 1), (2, 1, 2)]:
+            bit = graph.bits[node]
+            completed |= 1 << bit
+            unlocked = graph.unlock_after(bit, completed, unlocked)
+            assert unlocked == graph.unlocked(completed)
+        assert ("ctf", "Flag") in set(graph.nodes_in(unlocked))
+
+
+class TestLessonEmbedCache:
+    """Tests for pre-rendered lesson embeds"""
+    
+    def test_rendered_once_and_cloned(self):
+        """Test that repeat requests reuse the payload but get independent embeds"""
+        from lesson_render import get_lesson_embed, lesson_embed_cache
+        
+        first = get_lesson_embed(1, 1, 1)
+        hits = lesson_embed_cache.hits
+        second = get_lesson_embed(1, 1, 1)
+        assert lesson_embed_cache.hits == hits + 1
+        
+        first.add_field(name="Per-user", value="only on the first copy")
+        assert len(second.fields) == len(first.fields) - 1
+        assert len(get_lesson_embed(1, 1, 1).fields) == len(second.fields)
+        assert second.title == "📖 What is Cybersecurity?"
+        assert get_lesson_embed(1, 1, 999) is None
+
+
+class TestCompletionMasks:
+    """Tests for the cached completion-bitset masks"""
+    
+    def test_failed_slot_lookup_is_not_cached(self, monkeypatch):
+        """Test that masks built from a failed slot lookup are served once, not kept"""
+        import courses
+        monkeypatch.setattr(courses, "_completion_masks", None)
+        monkeypatch.setattr(courses.db, "assign_lesson_slots", lambda lessons: {})
+        assert courses.get_completion_masks() == (0, {})
+        assert courses._completion_masks is None
+        
+        monkeypatch.undo()
+        monkeypatch.setattr(courses, "_completion_masks", None)
+        everything, by_course = courses.get_completion_masks()
+        assert everything.bit_count() == len(courses.get_curriculum_index().lessons)
+        assert courses._completion_masks is not None
+
+
+class TestCatalog:
+    """Tests for the paginated course catalog"""
+    
+    def test_pages_and_level_filter(self):
+        """Test that many courses are split into bounded pages and filtered by level"""
+        from catalog import Catalog, CATALOG_PAGE_SIZE
+        courses = [{"id": i, "title": f"Course {i}", "description": "d" * 500,
+                    "level": "Intermediate" if i % 3 == 0 else "Beginner"} for i in range(1, 251)]
+        catalog = Catalog(courses)
+        assert catalog.page_count == 25
+        assert catalog.levels == ("Beginner", "Intermediate")
+        
+        embed = catalog.page_embed(24)
+        assert len(embed.fields) == 250 - 24 * CATALOG_PAGE_SIZE
+        assert len(embed) <= 6000
+        assert embed.footer.text.startswith("Page 25/25")
+        assert len(catalog._payloads) == 1
+        
+        intermediate = Catalog(courses, "Intermediate")
+        assert intermediate.total == 83
+        assert all(course["level"] == "Intermediate" for page in intermediate.pages for course in page)
+    
+    def test_catalog_cached_per_generation(self):
+        """Test that get_catalog reuses its catalog until the course store changes"""
+        from catalog import get_catalog
+        assert get_catalog() is get_catalog()
+        assert get_catalog("Beginner") is not get_catalog()
+
+
+class TestQuestionBank:
+    """Tests for question pools and no-repeat sampling"""
+    
+    @staticmethod
+    def _pool(size):
+        from curriculum import Quiz
+        from question_bank import BankQuestion, QuestionPool
+        questions = [BankQuestion(Quiz(f"Question {i}?", ("yes", "no"), i % 2, "", ("even",) if i % 2 == 0 else (),
+                                       i % 5 + 1)) for i in range(size)]
+        return QuestionPool("module:test", questions)
+    
+    def test_module_pool_includes_bank_questions(self):
+        """Test that a module pool holds lesson quizzes, tagged and ordered by difficulty"""
+        from question_bank import question_bank
+        pool = question_bank.pool(1, 1)
+        assert len(pool) == 7
+        assert "threats" in pool.tags
+        assert all("fundamentals" in question.quiz["tags"] for question in pool.candidates(tag="Fundamentals"))
+        assert question_bank.pool(1, 1) is pool
+        assert question_bank.pool(1, 999) is None
+    
+    def test_no_repeats_until_exhausted(self):
+        """Test that draws avoid seen questions, then start a new cycle"""
+        import random
+        from question_bank import SeenFilter
+        pool = self._pool(20)
+        seen = SeenFilter.for_pool(len(pool))
+        rng = random.Random(7)
+        
+        drawn = []
+        for _ in range(4):
+            picked = pool.sample(seen, 5, rng=rng)
+            assert [question.difficulty for question in picked] == sorted(question.difficulty for question in picked)
+            drawn.extend(picked)
+        assert len(set(map(id, drawn))) == 20
+        assert seen.count == 20
+        
+        assert len(pool.sample(seen, 5, rng=rng)) == 5
+        assert seen.count == 5
+        
+        stored = SeenFilter(seen.capacity, seen.count, bytes(seen.bits))
+        assert all((question in stored) == (question in seen) for question in pool.questions)
+    
+    def test_filtered_draw_falls_back_to_repeats(self):
+        """Test that an exhausted tag filter repeats questions without resetting the seen set"""
+        import random
+        from question_bank import SeenFilter
+        pool = self._pool(10)
+        seen = SeenFilter.for_pool(len(pool))
+        rng = random.Random(3)
+        assert len(pool.sample(seen, 5, tag="even", rng=rng)) == 5
+        assert len(pool.sample(seen, 3, tag="even", rng=rng)) == 3
+        assert seen.count == 5
+        assert pool.sample(seen, 5, tag="missing", rng=rng) == []
+    
+    def test_large_pool_sampling_is_cheap(self):
+        """Test that drawing from a large pool probes only a few questions"""
+        import random
+        from question_bank import SeenFilter
+        pool = self._pool(20000)
+        seen = SeenFilter.for_pool(len(pool))
+        calls = 0
+        contains = SeenFilter.__contains__
+        
+        class CountingFilter(SeenFilter):
+            def __contains__(self, question):
+                nonlocal calls
+                calls += 1
+                return contains(self, question)
+        
+        counting = CountingFilter(seen.capacity)
+        picked = pool.sample(counting, 5, rng=random.Random(1))
+        assert len(picked) == 5
+        assert calls <= 5 * 8 + 5
+
+
+class TestRatings:
+    """Tests for Elo-scale question and learner ratings"""
+    
+    def test_calibration_orders_learners_and_questions(self):
+        """Test that refitting the answer log ranks strong learners and hard questions higher"""
+        import random
+        from ratings import DEFAULT_USER_RATING, calibrate, expected_score
+        rng = random.Random(5)
+        true_users = {1: 900.0, 2: 1200.0, 3: 1500.0}
+        true_questions = {"easy": 1000.0, "medium": 1200.0, "hard": 1400.0}
+        answers = [(u, q, rng.random() < expected_score(true_users[u], true_questions[q]))
+                   for _ in range(150) for u in true_users for q in true_questions]
+        
+        users, questions = calibrate(answers, dict.fromkeys(true_users, DEFAULT_USER_RATING),
+                                     dict.fromkeys(true_questions, 1200.0))
+        assert users[1] < users[2] < users[3]
+        assert questions["easy"] < questions["medium"] < questions["hard"]
+
+
+class TestChunking:
+    """Tests for splitting long lessons into embed pages"""
+    
+    def test_short_text_is_one_page(self):
+        """Test that text under the limit is left alone"""
+        from pagination import chunk_text
+        assert chunk_text("short lesson", 100) == ("short lesson",)
+    
+    def test_pages_fit_and_keep_paragraphs(self):
+        """Test that pages respect the limit and break between paragraphs"""
+        from pagination import chunk_text
+        paragraphs = [f"Paragraph {i}" + " word" * 30 for i in range(20)]
+        paragraphs.insert(5, "```\nline one\n\nline two\n```")
+        text = "\n\n".join(paragraphs)
+        
+        pages = chunk_text(text, 500)
+        assert len(pages) > 1
+        assert all(len(page) <= 500 for page in pages)
+        assert "\n\n".join(pages) == text
+        assert any("line one\n\nline two" in page for page in pages)
+    
+    def test_oversized_paragraph_split_at_words(self):
+        """Test that a single paragraph longer than a page is split between words"""
+        from pagination import chunk_text
+        pages = chunk_text("word " * 100, 60)
+        assert all(len(page) <= 60 for page in pages)
+        assert " ".join(pages).split() == ["word"] * 100
+    
+    def test_long_lesson_embed_fits_limits(self):
+        """Test that every page of a long lesson stays within Discord's embed limits"""
+        from lesson_render import render_lesson
+        lesson = dict(get_lesson(1, 1, 1), content="\n\n".join(["A paragraph of text. " * 20] * 60))
+        rendered = render_lesson(1, 1, 1, lesson)
+        assert len(rendered.pages) > 1
+        for page in range(len(rendered.pages)):
+            embed = rendered.page_embed(page)
+            assert len(embed.description) <= 4096
+            assert len(embed) <= 6000
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
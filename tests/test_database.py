@@ -0,0 +1,604 @@
+"""
+Unit tests for database.py retry handling
+"""
+import pytest
+import sqlite3
+import sys
+import os
+import threading
+
+# Add parent directory to path to import database module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager, RetryPolicy, is_transient_error
+from query_tracer import QueryTracer, normalize_sql
+
+
+@pytest.fixture
+def manager(tmp_path):
+    """DatabaseManager on a throwaway file with fast retries"""
+    policy = RetryPolicy(base_delay=0.01, max_delay=0.05, deadline=0.3, busy_timeout=0.01)
+    return DatabaseManager(str(tmp_path / "test.db"), retry_policy=policy)
+
+
+class TestErrorClassification:
+    """Tests for is_transient_error"""
+    
+    def test_locked_errors_are_transient(self):
+        """Test that busy/locked errors are retried"""
+        assert is_transient_error(sqlite3.OperationalError("database is locked"))
+        assert is_transient_error(sqlite3.OperationalError("database table is locked"))
+    
+    def test_programming_errors_are_not_transient(self):
+        """Test that schema and usage errors are not retried"""
+        assert not is_transient_error(sqlite3.OperationalError("no such table: users"))
+        assert not is_transient_error(sqlite3.IntegrityError("UNIQUE constraint failed"))
+        assert not is_transient_error(ValueError("bad value"))
+
+
+class TestRetry:
+    """Tests for the retry layer around DatabaseManager methods"""
+    
+    def test_retries_until_lock_released(self, manager):
+        """Test that a write waits out a competing writer instead of failing"""
+        blocker = sqlite3.connect(manager.db_path, check_same_thread=False)
+        blocker.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.05, blocker.commit).start()
+        
+        manager.add_user(1, "alice")
+        blocker.close()
+        
+        assert manager.get_user_stats(1)[0] == "alice"
+        stats = manager.get_operation_stats()["_upsert_user"]
+        assert stats["retries"] >= 1
+        assert stats.get("failures", 0) == 0
+    
+    def test_gives_up_after_deadline(self, manager):
+        """Test that a lock held past the deadline is counted as a failure"""
+        manager.add_user(1, "alice")
+        blocker = sqlite3.connect(manager.db_path)
+        blocker.execute("BEGIN IMMEDIATE")
+        
+        try:
+            assert manager.add_xp(1, 100) == 0
+        finally:
+            blocker.rollback()
+            blocker.close()
+        
+        stats = manager.get_operation_stats()["add_xp"]
+        assert stats["failures"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["retries"] >= 1
+    
+    def test_programming_error_not_retried(self, manager):
+        """Test that non-transient errors fail immediately with the default value"""
+        manager.ensure_initialized()
+        conn = sqlite3.connect(manager.db_path)
+        conn.execute("DROP TABLE achievements")
+        conn.commit()
+        conn.close()
+        
+        assert manager.get_user_achievements(1) == []
+        stats = manager.get_operation_stats()["get_user_achievements"]
+        assert stats["failures"] == 1
+        assert stats.get("retries", 0) == 0
+    
+    def test_busy_write_does_not_block_event_loop(self, manager):
+        """Test that run() waits out a lock while other coroutines keep being scheduled"""
+        import asyncio
+        manager.add_user(1, "alice")
+        blocker = sqlite3.connect(manager.db_path, check_same_thread=False)
+        blocker.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.2, blocker.commit).start()
+        
+        async def main():
+            ticks = []
+            async def ticker():
+                while True:
+                    ticks.append(asyncio.get_running_loop().time())
+                    await asyncio.sleep(0.005)
+            task = asyncio.create_task(ticker())
+            new_xp = await manager.run(manager.add_xp, 1, 100)
+            task.cancel()
+            return new_xp, ticks
+        
+        new_xp, ticks = asyncio.run(main())
+        blocker.close()
+        assert new_xp == 100
+        assert manager.get_operation_stats()["add_xp"]["retries"] >= 1
+        assert len(ticks) > 10
+        assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.1
+    
+    def test_call_on_event_loop_fails_fast(self, manager):
+        """Test that a blocking call made on the loop thread is not retried with sleeps"""
+        import asyncio
+        import time
+        manager.add_user(1, "alice")
+        blocker = sqlite3.connect(manager.db_path)
+        blocker.execute("BEGIN IMMEDIATE")
+        
+        async def main():
+            began = time.monotonic()
+            return manager.add_xp(1, 100), time.monotonic() - began
+        
+        try:
+            new_xp, elapsed = asyncio.run(main())
+        finally:
+            blocker.rollback()
+            blocker.close()
+        assert new_xp == 0 and elapsed < 0.1
+        assert manager.get_operation_stats()["add_xp"].get("retries", 0) == 0
+
+
+class TestCTFSubmission:
+    """Tests for flag submission awarding XP"""
+    
+    def test_correct_flag_awards_points(self, manager):
+        """Test that points are awarded in the same transaction as the submission"""
+        manager.add_user(1, "alice")
+        manager.add_ctf_challenge("Test", "crypto", "Easy", 150, "desc", "FLAG")
+        
+        assert manager.submit_ctf_flag(1, 1, "FLAG") == (True, 150)
+        assert manager.get_user_stats(1)[1] == 150
+
+
+
+
+class TestLazyInitialization:
+    """Tests for deferred schema creation"""
+    
+    def test_constructor_does_not_touch_disk(self, tmp_path):
+        """Test that creating a manager has no side effects until first use"""
+        path = tmp_path / "lazy.db"
+        manager = DatabaseManager(str(path))
+        assert not path.exists()
+        
+        manager.add_user(1, "alice")
+        assert path.exists()
+        assert manager.get_user_stats(1)[0] == "alice"
+    
+    def test_seed_ctf_challenges_is_idempotent(self, manager):
+        """Test that reseeding the built-in challenges adds nothing"""
+        from ctf import CTF_CHALLENGES
+        
+        assert manager.seed_ctf_challenges(CTF_CHALLENGES) == len(CTF_CHALLENGES)
+        assert manager.seed_ctf_challenges(CTF_CHALLENGES) == 0
+
+
+class TestAddUser:
+    """Tests for upsert-based user registration"""
+    
+    def test_rename_keeps_progress(self, manager):
+        """Test that re-registering with a new name keeps XP, position and join date"""
+        manager.add_user(1, "alice")
+        manager.add_xp(1, 250)
+        manager.update_user_progress(1, 2, 1, 3)
+        conn = sqlite3.connect(manager.db_path)
+        join_date = conn.execute("SELECT join_date FROM users WHERE user_id = 1").fetchone()[0]
+        
+        manager.add_user(1, "alice2")
+        
+        assert manager.get_user_stats(1) == ("alice2", 250, 1, 2, 1, 3)
+        assert conn.execute("SELECT join_date FROM users WHERE user_id = 1").fetchone()[0] == join_date
+        conn.close()
+    
+    def test_known_user_skips_database(self, manager):
+        """Test that an unchanged display name does not hit the database again"""
+        manager.add_user(1, "alice")
+        manager.add_user(1, "alice")
+        manager.add_user(1, "alice")
+        
+        assert manager.get_operation_stats()["_upsert_user"]["calls"] == 1
+    
+    def test_known_users_are_bounded(self, manager):
+        """Test that remembered names are evicted and a forgotten user is just upserted again"""
+        from cache import TTLCache
+        manager.known_users = TTLCache(maxsize=2, ttl=float("inf"))
+        for user_id in (1, 2, 3):
+            manager.add_user(user_id, f"user{user_id}")
+        assert len(manager.known_users) == 2
+        
+        manager.add_user(1, "user1")
+        manager.add_user(1, "user1")
+        assert manager.get_operation_stats()["_upsert_user"]["calls"] == 4
+        assert manager.get_user_stats(1)[0] == "user1"
+
+
+class TestProfileCache:
+    """Tests for the write-through user profile cache"""
+    
+    def test_reads_served_from_cache(self, manager):
+        """Test that repeated profile reads hit the database once"""
+        manager.add_user(1, "alice")
+        for _ in range(3):
+            assert manager.get_user_stats(1)[0] == "alice"
+        
+        assert manager.get_operation_stats()["_load_user_stats"]["calls"] == 1
+        assert manager.profile_cache.stats()["hits"] == 2
+    
+    def test_writes_keep_cache_current(self, manager):
+        """Test that every write path updates the cached profile"""
+        manager.add_user(1, "alice")
+        manager.get_user_stats(1)
+        manager.add_ctf_challenge("Test", "crypto", "Easy", 150, "desc", "FLAG")
+        
+        manager.add_xp(1, 900)
+        manager.add_xp_no_achievements(1, 50)
+        manager.submit_ctf_flag(1, 1, "FLAG")
+        manager.update_user_progress(1, 2, 1, 1)
+        manager.add_user(1, "alice2")
+        assert manager.get_user_stats(1) == ("alice2", 1100, 2, 2, 1, 1)
+        
+        manager.update_progress(1, 2, 1, 1)
+        assert manager.get_user_stats(1) == ("alice2", 1100, 2, 2, 1, 2)
+        assert manager.get_operation_stats()["_load_user_stats"]["calls"] == 1
+        
+        manager.profile_cache.clear()
+        assert manager.get_user_stats(1) == ("alice2", 1100, 2, 2, 1, 2)
+    
+    def test_write_during_read_is_not_cached_stale(self, manager, monkeypatch):
+        """Test that a row read before a concurrent write does not overwrite the cache"""
+        manager.add_user(1, "alice")
+        load_user_stats = manager._load_user_stats
+        completion_bits = manager._completion_bits
+        
+        def write_after(read):
+            def interleaved(*args):
+                result = read(*args)
+                # Another worker commits and writes through between the SELECT and the fill
+                writer = threading.Thread(target=manager.add_xp_no_achievements, args=(1, 50))
+                writer.start()
+                writer.join()
+                return result
+            return interleaved
+        
+        monkeypatch.setattr(manager, "_load_user_stats", write_after(load_user_stats))
+        assert manager.get_user_stats(1)[1] == 0
+        monkeypatch.setattr(manager, "_load_user_stats", load_user_stats)
+        assert manager.get_user_stats(1)[1] == 50
+        
+        manager.profile_cache.clear()
+        monkeypatch.setattr(manager, "_completion_bits", write_after(completion_bits))
+        assert manager.get_user_snapshot(1)["stats"][1] == 50
+        monkeypatch.setattr(manager, "_completion_bits", completion_bits)
+        assert manager.get_user_stats(1)[1] == 100
+    
+    def test_version_guards_set(self):
+        """Test that set() with a version taken before an update or invalidation stores nothing"""
+        from cache import TTLCache
+        cache = TTLCache()
+        version = cache.version("a")
+        cache.update("a", lambda value: value + 1)
+        assert not cache.set("a", 1, version)
+        assert cache.get("a") is None
+        
+        version = cache.version("a")
+        assert cache.set("a", 1, version)
+        cache.invalidate("a")
+        assert not cache.set("a", 2, version)
+        assert cache.set("a", 3, cache.version("a"))
+        assert cache.get("a") == 3
+    
+    def test_lru_and_ttl(self):
+        """Test size-bound eviction and expiry"""
+        from cache import TTLCache
+        now = [0.0]
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        
+        now[0] = 11
+        assert cache.get("c") is None
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["expirations"] == 1
+
+
+class TestSingleFlight:
+    """Tests for request coalescing in front of expensive reads"""
+    
+    def test_concurrent_requests_share_one_build(self):
+        """Test that a burst of identical requests runs the builder once"""
+        import asyncio
+        import time
+        from cache import ResponseCache
+        
+        builds = []
+        
+        def build():
+            builds.append(1)
+            time.sleep(0.05)
+            return {"title": "Leaderboard"}
+        
+        async def burst():
+            cache = ResponseCache(ttl=5)
+            results = await asyncio.gather(*(cache.get("leaderboard", build) for _ in range(20)))
+            results.append(await cache.get("leaderboard", build))
+            return cache, results
+        
+        cache, results = asyncio.run(burst())
+        assert len(builds) == 1
+        assert all(result == {"title": "Leaderboard"} for result in results)
+        assert cache.stats()["shared"] == 19
+        assert cache.stats()["hits"] == 1
+    
+    def test_failed_leaderboard_is_not_cached(self, manager):
+        """Test that a leaderboard read that fails is reported as None, which ResponseCache does not keep"""
+        manager.add_user(1, "alice")
+        assert manager.get_leaderboard(10) == [("alice", 0, 1)]
+        conn = manager.get_connection()
+        conn.execute("ALTER TABLE users RENAME TO users_gone")
+        conn.commit()
+        conn.close()
+        assert manager.get_leaderboard(10) is None
+
+
+class TestCompletionBits:
+    """Tests for bitset-backed lesson completion"""
+    
+    def test_recompletion_is_idempotent(self, manager):
+        """Test that completing a lesson twice sets one bit and keeps the first timestamp"""
+        manager.add_user(1, "alice")
+        manager.assign_lesson_slots([(1, 1, 1), (1, 1, 2), (2, 1, 1)])
+        manager.update_progress(1, 1, 1, 2)
+        manager.update_progress(1, 1, 1, 2)
+        manager.update_progress(1, 2, 1, 1)
+        
+        assert manager.get_completion_bits(1) == 0b110
+        assert sorted(manager.get_completed_lessons(1)) == [(1, 1, 2), (2, 1, 1)]
+        snapshot = manager.get_user_snapshot(1)
+        assert snapshot["completed_lessons"] == 2
+        assert snapshot["completed_by_course"] == {1: 1, 2: 1}
+        
+        conn = manager.get_connection()
+        assert conn.execute("SELECT COUNT(*) FROM lesson_completion_times").fetchone()[0] == 2
+        conn.close()
+    
+    def test_rolled_back_slot_is_not_cached(self, manager):
+        """Test that a slot assigned in a transaction that rolls back is never handed out"""
+        manager.add_user(1, "alice")
+        manager.add_user(2, "bob")
+        conn = manager.get_connection()
+        manager._assign_slots(conn.cursor(), [(9, 9, 9)])
+        conn.rollback()
+        conn.close()
+        
+        manager.update_progress(1, 9, 9, 9)
+        manager.update_progress(2, 1, 1, 1)
+        assert manager.get_completed_lessons(1) == [(9, 9, 9)]
+        assert manager.get_completed_lessons(2) == [(1, 1, 1)]
+    
+    def test_legacy_rows_migrated(self, tmp_path):
+        """Test that duplicated course_progress rows fold into one bit per lesson"""
+        path = str(tmp_path / "legacy.db")
+        DatabaseManager(path).ensure_initialized()
+        conn = sqlite3.connect(path)
+        conn.executemany("""
+            INSERT INTO course_progress (user_id, course_id, module_id, lesson_id, completed, completion_date)
+            VALUES (?, ?, ?, ?, TRUE, ?)
+        """, [(1, 1, 1, 1, "2024-01-02"), (1, 1, 1, 1, "2024-01-01"), (1, 3, 1, 2, "2024-02-01"), (2, 1, 1, 1, "2024-03-01")])
+        conn.commit()
+        conn.close()
+        
+        manager = DatabaseManager(path)
+        assert sorted(manager.get_completed_lessons(1)) == [(1, 1, 1), (3, 1, 2)]
+        assert manager.get_completed_lessons(2) == [(1, 1, 1)]
+        conn = manager.get_connection()
+        assert conn.execute("SELECT COUNT(*) FROM course_progress").fetchone()[0] == 0
+        assert conn.execute("""
+            SELECT completed_at FROM lesson_completion_times WHERE user_id = 1 ORDER BY slot
+        """).fetchall() == [("2024-01-01",), ("2024-02-01",)]
+        conn.close()
+
+
+class TestRatingEngine:
+    """Tests for incremental ratings and their batched persistence"""
+    
+    def test_answers_update_in_memory_and_flush_in_one_batch(self, manager, monkeypatch):
+        """Test that answers move ratings immediately and reach the database on flush"""
+        import ratings
+        from curriculum import Quiz
+        from question_bank import question_key
+        monkeypatch.setattr(ratings, "db", manager)
+        manager.ensure_initialized()
+        engine = ratings.RatingEngine()
+        quiz = Quiz("Hard?", ("a", "b"), 0, "", (), 5)
+        
+        engine.record_answer(1, 1, 1, quiz, True)
+        engine.record_answer(2, 1, 1, quiz, False)
+        assert engine.user_rating(1) > ratings.DEFAULT_USER_RATING > engine.user_rating(2)
+        assert manager.get_answer_log() == []
+        
+        assert engine.flush() == 2
+        assert engine.flush() == 0
+        assert sorted(manager.get_answer_log()) == [(1, question_key(quiz), 1), (2, question_key(quiz), 0)]
+        assert manager.get_user_rating(1)[1] == 1
+        
+        assert engine.recalibrate() == 2
+        assert manager.get_user_rating(1)[0] > manager.get_user_rating(2)[0]
+        assert manager.get_question_ratings()[question_key(quiz)][2] == 2
+    
+    def test_answer_during_recalibration_counts_once(self, manager, monkeypatch):
+        """Test that an answer recorded while the log is read is replayed, not also fitted from the log"""
+        import ratings
+        from curriculum import Quiz
+        from question_bank import question_key
+        monkeypatch.setattr(ratings, "db", manager)
+        manager.ensure_initialized()
+        engine = ratings.RatingEngine()
+        quiz = Quiz("Hard?", ("a", "b"), 0, "", (), 5)
+        engine.record_answer(1, 1, 1, quiz, True)
+        engine.record_answer(2, 1, 1, quiz, False)
+        engine.flush()
+        
+        read_log = manager.get_answer_log
+        answered = []
+        def get_answer_log():
+            # A quiz answer and a periodic flush land while the log is being read
+            engine.record_answer(3, 1, 1, quiz, True)
+            answered.append(engine.user_rating(3))
+            flushing = threading.Thread(target=engine.flush)
+            flushing.start()
+            flushing.join(0.1)
+            return read_log()
+        monkeypatch.setattr(manager, "get_answer_log", get_answer_log)
+        
+        assert engine.recalibrate() == 2
+        log = read_log()
+        assert [row[0] for row in log].count(3) == 1
+        
+        # The refit question rating gets the answer once more; the learner's was never refit and keeps it
+        key = question_key(quiz)
+        _, fitted = ratings.calibrate([row for row in log if row[0] != 3],
+                                      dict.fromkeys((1, 2), ratings.DEFAULT_USER_RATING),
+                                      {key: row[1] for key, row in manager.get_question_ratings().items()})
+        surprise = 1.0 - ratings.expected_score(answered[0], fitted[key])
+        assert engine.user_rating(3) == answered[0]
+        assert engine.questions[key][0] == pytest.approx(
+            fitted[key] - ratings._k(ratings.QUESTION_K, engine.questions[key][2]) * surprise)
+
+
+class TestTournament:
+    """Tests for tournament tallies and their batched persistence"""
+    
+    def test_one_answer_per_user_and_one_write(self, manager):
+        """Test that repeat clicks are ignored, only correct answers score, and results land in one save"""
+        import time
+        from types import SimpleNamespace
+        from tournament import MAX_SPEED_POINTS, POINTS_CORRECT, POINTS_PER_XP, Tournament
+        quiz = {"question": "?", "options": ["a", "b"], "correct": 1, "explanation": ""}
+        tournament = Tournament(1, 10, 20, SimpleNamespace(id=99, display_name="host"), 1, 1, "Module",
+                                [quiz], 20)
+        assert not tournament.accepting(0)
+        tournament.shown_index = 0
+        tournament.shown_at = time.monotonic()
+        assert tournament.accepting(0) and not tournament.accepting(1)
+        
+        assert tournament.record(1, "alice", 1)
+        assert not tournament.record(1, "alice", 0)
+        assert tournament.record(2, "bob", 0)
+        tournament.tally()
+        assert not tournament.accepting(0)
+        assert tournament.last_result == (2, 1)
+        assert tournament.standings()[1] == (2, 0, 0, 1)
+        points = tournament.scores[1][0]
+        assert POINTS_CORRECT < points <= POINTS_CORRECT + MAX_SPEED_POINTS
+        
+        manager.add_user(1, "alice")
+        assert manager.save_tournament(1, 10, 20, 99, 1, 1, 1, tournament.results())
+        assert manager.get_user_stats(1)[1] == points // POINTS_PER_XP
+        assert manager.get_user_stats(2)[0] == "bob"
+
+
+class TestItemAnalysis:
+    """Tests for per-answer telemetry and item statistics"""
+    
+    def test_statistics_from_answer_log(self, manager, monkeypatch):
+        """Test p-values, distractor rates and discrimination aggregated from quiz_answers"""
+        import item_analysis
+        monkeypatch.setattr(item_analysis, "db", manager)
+        manager.ensure_initialized()
+        rows = []
+        for user_id in range(40):
+            ability = 1000.0 + user_id * 10
+            # Strong learners pick the key (0), weak ones split between options 1 and 2
+            chosen = 0 if user_id >= 20 else 1 + user_id % 2
+            rows.append((user_id, "good", 1, 1, int(chosen == 0), 0.0, chosen, 1500, ability))
+            rows.append((user_id, "trap", 1, 1, int(user_id < 8), 0.0, 0 if user_id < 8 else 3, 900, ability))
+        manager.save_ratings([], [], rows)
+        
+        items = {item.key: item for item in item_analysis.analyze_items(min_answers=20)}
+        good, trap = items["good"], items["trap"]
+        assert good.p_value == 0.5
+        assert good.option_rates == {0: 0.5, 1: 0.25, 2: 0.25}
+        assert good.discrimination > 0.8
+        assert good.latency_ms == 1500
+        assert trap.p_value == 0.2
+        assert trap.discrimination < 0
+        assert item_analysis.analyze_items(min_answers=41) == []
+    
+    def test_existing_answer_log_gains_columns(self, tmp_path):
+        """Test that a quiz_answers table from before telemetry is migrated in place"""
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("""
+            CREATE TABLE quiz_answers (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                question_key TEXT NOT NULL, course_id INTEGER NOT NULL, module_id INTEGER NOT NULL,
+                correct INTEGER NOT NULL, answered_at REAL NOT NULL)
+        """)
+        conn.execute("INSERT INTO quiz_answers (user_id, question_key, course_id, module_id, correct, answered_at) VALUES (1, 'q', 1, 1, 1, 0)")
+        conn.commit()
+        conn.close()
+        
+        manager = DatabaseManager(path)
+        assert manager.get_answer_log() == [(1, "q", 1)]
+        assert manager.get_item_statistics()[0][6:] == (0, 0, None, None, None)
+
+
+class TestUserSnapshot:
+    """Tests for the batched per-interaction user snapshot"""
+    
+    def test_snapshot_rollups(self, manager):
+        """Test that one snapshot carries profile, achievements and progress counts"""
+        manager.add_user(1, "alice")
+        manager.add_xp(1, 120)
+        manager.update_progress(1, 1, 1, 1)
+        manager.update_progress(1, 2, 1, 1)
+        manager.record_quiz_attempt(1, 1, 1, 1, 3, 3)
+        manager.record_quiz_attempt(1, 1, 1, 2, 1, 3)
+        manager.add_achievement(1, "Tester", "special")
+        
+        snapshot = manager.get_user_snapshot(1)
+        assert snapshot["stats"] == manager.get_user_stats(1)
+        assert snapshot["completed_lessons"] == 2
+        assert snapshot["completed_by_course"] == {1: 1, 2: 1}
+        assert snapshot["perfect_quizzes"] == 1
+        assert snapshot["quiz_attempts"] == 2
+        assert snapshot["ctf_solves"] == 0
+        assert [a[0] for a in snapshot["achievements"]] == ["Tester"]
+    
+    def test_unknown_user(self, manager):
+        """Test that unknown users have no snapshot"""
+        assert manager.get_user_snapshot(42) is None
+
+
+class TestQueryTracing:
+    """Tests for per-statement tracing"""
+    
+    def test_normalize_sql(self):
+        """Test that literals and whitespace do not split statement stats"""
+        assert normalize_sql("SELECT *  FROM users\n WHERE xp > 500 AND username = 'bob'") == \
+            "SELECT * FROM users WHERE xp > ? AND username = ?"
+        assert normalize_sql("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == "SELECT ? FROM t WHERE id IN (?, ...)"
+    
+    def test_records_caller_and_rows(self, tmp_path):
+        """Test that statements are attributed to the calling method with row counts"""
+        tracer = QueryTracer(slow_threshold_ms=float("inf"))
+        manager = DatabaseManager(str(tmp_path / "traced.db"), tracer=tracer)
+        manager.add_user(1, "alice")
+        manager.add_user(2, "bob")
+        manager.get_leaderboard(10)
+        
+        entry = next(e for e in tracer.snapshot() if e["sql"].startswith("SELECT username, xp, level FROM users"))
+        assert entry["count"] == 1
+        assert entry["rows"] == 2
+        assert entry["callers"] == {"database.DatabaseManager.get_leaderboard": 1}
+        assert sum(entry["histogram"].values()) == 1
+    
+    def test_slow_statement_captures_plan(self, tmp_path):
+        """Test that statements over the threshold get an EXPLAIN QUERY PLAN"""
+        tracer = QueryTracer(slow_threshold_ms=0.0)
+        manager = DatabaseManager(str(tmp_path / "traced.db"), tracer=tracer)
+        manager.get_user_stats(1)
+        
+        entry = next(e for e in tracer.snapshot() if "FROM users WHERE user_id" in e["sql"])
+        assert entry["slow_count"] == 1
+        assert "users" in entry["query_plan"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
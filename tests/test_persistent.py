@@ -0,0 +1,61 @@
+"""
+Unit tests for restart-safe quiz buttons and question short keys
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import quiz and question_bank modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestPersistentViews:
+    """Tests for buttons that keep their state in custom_ids"""
+    
+    def test_module_quiz_state_round_trips(self):
+        """Test that a module quiz button fits Discord's limit and decodes back to its questions and score"""
+        import asyncio
+        from quiz import ModuleQuizState, MultiQuizButton, MultiQuizView
+        from question_bank import MAX_SHORT_KEY_LENGTH, question_bank
+        pool = question_bank.pool(1, 1)
+        # The longest keys a pool may use must still fit
+        keys = tuple(question.key[:MAX_SHORT_KEY_LENGTH] for question in pool.questions[:5])
+        state = ModuleQuizState(2 ** 63 - 1, 1, 1, keys, index=3, score=2, bonus=120, timed=True)
+        view = MultiQuizView(state, 4, chosen=1, is_correct=True)
+        
+        for item in view.children:
+            assert len(item.custom_id) <= 100
+            match = MultiQuizButton.__discord_ui_compiled_template__.fullmatch(item.custom_id)
+            decoded = asyncio.run(MultiQuizButton.from_custom_id(None, item.item, match)).state
+            assert (decoded.user_id, decoded.index, decoded.score, decoded.bonus, decoded.timed, decoded.keys) == \
+                (2 ** 63 - 1, 3, 2, 120, True, keys)
+        assert [item.item.disabled for item in view.children] == [True] * 4 + [False, True]
+        assert question_bank.find_short(1, 1, keys[0]) is pool.questions[0].quiz
+        assert question_bank.find_short(1, 1, pool.short_key(pool.questions[1].key)) is pool.questions[1].quiz
+    
+    def test_clashing_short_keys_are_lengthened(self):
+        """Test that keys sharing a prefix get longer short keys, and clashes past the limit resolve to nothing"""
+        from types import SimpleNamespace
+        from question_bank import MAX_SHORT_KEY_LENGTH, SHORT_KEY_LENGTH, QuestionPool, short_key_length
+        assert short_key_length(["abcdef01", "abcdef02"]) == SHORT_KEY_LENGTH + 2
+        assert short_key_length(["abcdef01", "abcdfe01"]) == SHORT_KEY_LENGTH
+        
+        clash = "f" * MAX_SHORT_KEY_LENGTH
+        questions = [SimpleNamespace(key=key, difficulty=3, quiz={"tags": ()})
+                     for key in ("0123456789", clash + "1", clash + "2")]
+        pool = QuestionPool("test", questions)
+        assert pool.short_length == MAX_SHORT_KEY_LENGTH
+        assert pool.short_key("0123456789") == "012345678"
+        assert pool.by_short_key["012345678"] is questions[0]
+        assert pool.short_key(clash + "1") is None and pool.by_short_key[clash] is None
+    
+    def test_speed_bonus_falls_to_zero_at_deadline(self):
+        """Test that timed answers earn the full bonus instantly and none at the deadline"""
+        from quiz import MAX_SPEED_BONUS, QUESTION_SECONDS, speed_bonus
+        assert speed_bonus(0.0) == MAX_SPEED_BONUS
+        assert 0 < speed_bonus(QUESTION_SECONDS / 2) < MAX_SPEED_BONUS
+        assert speed_bonus(QUESTION_SECONDS) == speed_bonus(QUESTION_SECONDS * 2) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,62 @@
+"""
+Unit tests for review.py spaced-repetition scheduling
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import review module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestReviewScheduling:
+    """Tests for SM-2 scheduling and the due-review heap"""
+    
+    def test_sm2_intervals(self):
+        """Test that correct answers stretch the interval and a miss resets it"""
+        from review import DAY, MIN_EASE, QUALITY_CORRECT, QUALITY_INCORRECT, ReviewCard, schedule
+        card = ReviewCard("q", 1, 1)
+        intervals = []
+        for _ in range(4):
+            card = schedule(card, QUALITY_CORRECT, 0.0)
+            intervals.append(card.interval)
+        assert intervals[:2] == [1.0, 6.0]
+        assert intervals[2] > 6.0 and intervals[3] > intervals[2]
+        
+        missed = schedule(card, QUALITY_INCORRECT, 100.0)
+        assert (missed.interval, missed.repetitions, missed.due_at) == (1.0, 0, 100.0 + DAY)
+        assert missed.ease < card.ease
+        for _ in range(20):
+            missed = schedule(missed, QUALITY_INCORRECT, 0.0)
+        assert missed.ease == MIN_EASE
+    
+    def test_queue_skips_rescheduled_entries(self):
+        """Test that the heap serves the most overdue live card and drops stale entries"""
+        from review import ReviewCard, ReviewQueue
+        queue = ReviewQueue([ReviewCard("a", 1, 1, due_at=30.0), ReviewCard("b", 1, 1, due_at=10.0),
+                             ReviewCard("c", 1, 1, due_at=20.0)])
+        assert queue.peek().key == "b"
+        queue.push(ReviewCard("b", 1, 1, due_at=50.0))
+        assert queue.peek().key == "c"
+        queue.remove("c")
+        assert queue.peek().key == "a"
+        assert queue.due_count(40.0) == 1
+        assert len(queue.heap) == 2
+    
+    def test_due_count_follows_reschedules(self):
+        """Test that the due counter drops answered and removed cards and picks up newly due ones"""
+        from review import ReviewCard, ReviewQueue
+        queue = ReviewQueue([ReviewCard(key, 1, 1, due_at=due) for key, due in (("a", 10.0), ("b", 20.0), ("c", 90.0))])
+        assert queue.due_count(5.0) == 0
+        assert queue.due_count(25.0) == 2
+        queue.push(ReviewCard("a", 1, 1, due_at=60.0))
+        assert queue.due_count(30.0) == 1
+        queue.remove("b")
+        assert queue.due_count(70.0) == 1 and queue.due == {"a"}
+        for step in range(40):
+            queue.push(ReviewCard("c", 1, 1, due_at=100.0 + step))
+        assert queue.due_count(200.0) == 2 and len(queue.heap) <= 2 * len(queue.cards) + 16
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
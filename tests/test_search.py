@@ -0,0 +1,80 @@
+"""
+Unit tests for search.py ranking and indexing
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import search module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchIndex, tokenize, _index_course, _index_multimedia
+
+
+@pytest.fixture
+def index():
+    """Small index with a few lessons"""
+    index = SearchIndex()
+    index.add("phishing", [("Spotting Phishing Emails", 3), ("Check the sender address and links", 1)], {"title": "phishing"})
+    index.add("passwords", [("Password Strength", 3), ("Long passphrases beat complex passwords", 1)], {"title": "passwords"})
+    index.add("firewalls", [("Firewalls", 3), ("A firewall filters network traffic", 1)], {"title": "firewalls"})
+    return index
+
+
+class TestSearchIndex:
+    """Tests for SearchIndex"""
+    
+    def test_tokenize_drops_stopwords(self):
+        """Test that tokenization lowercases and removes stopwords"""
+        assert tokenize("What is a Firewall?") == ["firewall"]
+    
+    def test_ranks_title_matches_first(self, index):
+        """Test that the document about the query term ranks highest"""
+        results = index.search("passwords")
+        assert results[0][1]["title"] == "passwords"
+        assert len(results) == 1
+    
+    def test_prefix_matching(self, index):
+        """Test that partial words match longer terms"""
+        assert index.search("phish")[0][1]["title"] == "phishing"
+        assert index.search("fire")[0][1]["title"] == "firewalls"
+    
+    def test_remove_and_reindex(self, index):
+        """Test that removing a document drops it from results and vocabulary"""
+        index.remove("firewalls")
+        assert index.search("firewall") == []
+        assert "firewall" not in index.postings
+        
+        index.add("firewalls", [("Network Firewalls", 3)], {"title": "firewalls"})
+        assert index.search("network")[0][1]["title"] == "firewalls"
+    
+    def test_indexes_course_content(self):
+        """Test that lessons are indexed with quiz text and linked by ids"""
+        index = SearchIndex()
+        _index_course(index, 1, {(1, 1, 1): ["Diagram of a security mindset"]})
+        results = index.search("diagram")
+        assert results[0][1]["ids"] == (1, 1, 1)
+        assert index.search("primary goal")[0][1]["ids"] == (1, 1, 1)
+    
+    def test_indexes_bank_questions_and_lesson_media(self):
+        """Test that module bank questions and a lesson's own multimedia description are searchable"""
+        index = SearchIndex()
+        _index_course(index, 1, {})
+        _index_course(index, 3, {})
+        quiz = index.search("CIA triad")[0][1]
+        assert (quiz["kind"], quiz["ids"]) == ("quiz", (1, 1))
+        assert index.search("red flag identification")[0][1]["ids"] == (3, 1, 1)
+    
+    def test_indexes_multimedia_galleries(self):
+        """Test that /multimedia items are indexed by description and open at their position"""
+        from multimedia import multimedia_manager
+        index = SearchIndex()
+        _index_multimedia(index)
+        result = index.search("phone call")[0][1]
+        assert result["kind"] == "multimedia"
+        content_type, position = result["ids"]
+        assert "Phone Call" in multimedia_manager.get_content(content_type)[position]["description"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
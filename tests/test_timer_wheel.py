@@ -0,0 +1,37 @@
+"""
+Unit tests for timer_wheel.py
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import timer_wheel module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestTimerWheel:
+    """Tests for the hashed timer wheel"""
+    
+    def test_timers_fire_in_order_across_turns(self):
+        """Test that timers fire on their tick, also beyond one turn of the wheel, and cancel in O(1)"""
+        from timer_wheel import TimerWheel
+        now = [0.0]
+        wheel = TimerWheel(tick=1.0, slots=8, clock=lambda: now[0])
+        fired = []
+        for delay in (3, 20, 5):
+            wheel.schedule(delay, fired.append, delay)
+        dropped = wheel.schedule(4, fired.append, 4)
+        assert len(wheel) == 4
+        assert wheel.cancel(dropped) and not wheel.cancel(dropped)
+        
+        assert wheel.advance(2.9) == 0
+        assert wheel.advance(5.0) == 2 and fired == [3, 5]
+        now[0] = 5.0
+        late = wheel.schedule(0.2, fired.append, "late")
+        assert wheel.advance(19.9) == 1 and fired[-1] == "late" and not late.active
+        assert wheel.advance(20.0) == 1 and fired[-1] == 20
+        assert wheel.stats()["live"] == 0 and wheel.stats()["cancelled"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
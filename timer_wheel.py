@@ -0,0 +1,192 @@
+"""
+Timer Wheel
+One hashed timer wheel, advanced by a single ticking task, for view timeouts,
+quiz deadlines and other delayed callbacks; scheduling and cancelling are O(1)
+"""
+
+import asyncio
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from discord.ui import View
+
+logger = logging.getLogger("cyberbot.timers")
+
+class TimerHandle:
+    """A scheduled callback; pass it to TimerWheel.cancel() to drop it"""
+    
+    __slots__ = ("callback", "args", "when", "slot", "rounds")
+    
+    def __init__(self, callback, args: tuple, when: float, slot: int, rounds: int):
+        self.callback = callback
+        self.args = args
+        self.when = when  # Clock time it was asked to fire at
+        self.slot = slot  # None once fired or cancelled
+        self.rounds = rounds  # Full turns of the wheel still to wait
+    
+    @property
+    def active(self) -> bool:
+        return self.slot is not None
+
+class TimerWheel:
+    """Hashed timer wheel with `slots` buckets of `tick` seconds each.
+    
+    A timer lands in the bucket of the tick it is due on, with the number of full
+    turns still to wait; each tick only looks at one bucket. Timers fire up to one
+    tick late, never early. Callbacks may be plain functions or coroutine functions.
+    """
+    
+    def __init__(self, tick: float = 0.5, slots: int = 1024, clock=time.monotonic):
+        if tick <= 0 or slots < 1:
+            raise ValueError("tick must be positive and slots at least 1")
+        self.tick = tick
+        self.clock = clock
+        self.buckets = [set() for _ in range(slots)]
+        self.origin = clock()
+        self.ticks = 0  # Ticks processed since origin
+        self.live = 0
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.errors = 0
+        self._tasks = set()  # Running coroutine callbacks, kept referenced until done
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return self.live
+    
+    def schedule(self, delay: float, callback, *args) -> TimerHandle:
+        """Call callback(*args) once `delay` seconds from now"""
+        when = self.clock() + max(0.0, delay)
+        with self._lock:
+            due_tick = max(self.ticks + 1, math.ceil((when - self.origin) / self.tick))
+            slots = len(self.buckets)
+            handle = TimerHandle(callback, args, when, due_tick % slots, (due_tick - self.ticks - 1) // slots)
+            self.buckets[handle.slot].add(handle)
+            self.live += 1
+            self.scheduled += 1
+        return handle
+    
+    def cancel(self, handle: TimerHandle) -> bool:
+        """Drop a pending timer; False if it already fired or was cancelled"""
+        with self._lock:
+            if handle.slot is None:
+                return False
+            self.buckets[handle.slot].discard(handle)
+            handle.slot = None
+            self.live -= 1
+            self.cancelled += 1
+        return True
+    
+    def reschedule(self, handle: TimerHandle, delay: float) -> TimerHandle:
+        """Cancel a timer and schedule its callback again `delay` seconds from now"""
+        self.cancel(handle)
+        return self.schedule(delay, handle.callback, *handle.args)
+    
+    def advance(self, now: float = None) -> int:
+        """Process every tick up to `now`, firing due timers; returns how many fired"""
+        now = self.clock() if now is None else now
+        fired = 0
+        while True:
+            with self._lock:
+                if self.origin + (self.ticks + 1) * self.tick > now:
+                    break
+                self.ticks += 1
+                bucket = self.buckets[self.ticks % len(self.buckets)]
+                due = []
+                for handle in bucket:
+                    if handle.rounds:
+                        handle.rounds -= 1
+                    else:
+                        due.append(handle)
+                for handle in due:
+                    bucket.discard(handle)
+                    handle.slot = None
+                self.live -= len(due)
+                self.fired += len(due)
+            for handle in due:
+                self._fire(handle)
+            fired += len(due)
+        return fired
+    
+    def _fire(self, handle: TimerHandle):
+        try:
+            result = handle.callback(*handle.args)
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                self._tasks.add(task)
+                task.add_done_callback(self._task_done)
+        except Exception as e:
+            self.errors += 1
+            logger.exception(f"Timer callback {handle.callback!r} failed: {e}")
+    
+    def _task_done(self, task: asyncio.Future):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+            logger.error(f"Timer callback failed: {task.exception()!r}")
+    
+    async def run(self):
+        """The single ticking task: sleep until the next tick, then advance"""
+        while True:
+            next_tick = self.origin + (self.ticks + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_tick - self.clock()))
+            self.advance()
+    
+    def stats(self) -> dict:
+        return {
+            "live": self.live,
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "running_callbacks": len(self._tasks)
+        }
+
+timer_wheel = TimerWheel(
+    tick=float(os.getenv("TIMER_WHEEL_TICK", "0.5")),
+    slots=int(os.getenv("TIMER_WHEEL_SLOTS", "1024"))
+)
+
+class WheelView(View):
+    """View whose inactivity timeout is a timer on the shared wheel instead of its own task.
+    
+    Subclasses that override interaction_check() must call super() so that
+    interactions keep the view alive.
+    """
+    
+    def __init__(self, timeout: float = 180.0):
+        super().__init__(timeout=None)
+        self.idle_timeout = timeout
+        self._timer = timer_wheel.schedule(timeout, self._expire) if timeout else None
+    
+    @property
+    def timeout(self):
+        # discord.py starts a task per view with a timeout; the wheel handles it instead
+        return None
+    
+    @timeout.setter
+    def timeout(self, value):
+        # discord.py gives ephemeral views without a timeout 15 minutes; keep the one we have
+        if self.idle_timeout or not value:
+            return
+        self.idle_timeout = value
+        self._timer = timer_wheel.schedule(value, self._expire)
+    
+    async def interaction_check(self, interaction) -> bool:
+        if self._timer is not None:
+            self._timer = timer_wheel.reschedule(self._timer, self.idle_timeout)
+        return True
+    
+    def _expire(self):
+        self._timer = None
+        self._dispatch_timeout()
+    
+    def stop(self):
+        if self._timer is not None:
+            timer_wheel.cancel(self._timer)
+            self._timer = None
+        super().stop()
@@ -0,0 +1,365 @@
+"""
+Quiz Tournaments
+Live quizzes a host runs for a whole channel. Answers are tallied in memory, the
+scoreboard message is edited on a coalesced schedule however many people click,
+and the results are written in one batch when the tournament ends
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import random
+import time
+import discord
+from discord.ui import Button, DynamicItem
+from database import db
+from courses import get_module
+from persistent import build_view, persistent
+from question_bank import question_bank
+from timer_wheel import timer_wheel
+
+logger = logging.getLogger("cyberbot.tournament")
+
+# Scoreboard edits per second per tournament, however many answers come in between
+EDITS_PER_SECOND = float(os.getenv("TOURNAMENT_EDITS_PER_SECOND", "1"))
+DEFAULT_QUESTIONS = 10
+MAX_QUESTIONS = 25
+DEFAULT_SECONDS = 20
+# Seconds the answer stays on screen before the next question opens
+REVEAL_SECONDS = 6
+POINTS_CORRECT = 100
+MAX_SPEED_POINTS = 50
+POINTS_PER_XP = 5
+SCOREBOARD_SIZE = 10
+MEDALS = ("🥇", "🥈", "🥉")
+
+class Tournament:
+    """One running tournament; every field is only touched from the event loop"""
+    
+    __slots__ = ("id", "guild_id", "channel_id", "host_id", "host_name", "course_id", "module_id", "title",
+                 "questions", "seconds", "index", "open", "shown_index", "shown_at", "answers", "scores",
+                 "names", "last_result", "message", "timer", "render_timer", "last_render", "rendering",
+                 "dirty", "finished")
+    
+    def __init__(self, tournament_id: int, guild_id: int, channel_id: int, host, course_id: int,
+                 module_id: int, title: str, questions: list, seconds: int):
+        self.id = tournament_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.host_id = host.id
+        self.host_name = host.display_name
+        self.course_id = course_id
+        self.module_id = module_id
+        self.title = title
+        self.questions = questions  # quiz records, in the order they are asked
+        self.seconds = seconds
+        self.index = 0
+        self.open = True  # Whether the current question still takes answers
+        self.shown_index = None  # Last question whose open state reached the message
+        self.shown_at = 0.0  # Monotonic time that happened
+        self.answers = {}  # user_id -> (option, seconds taken) for the open question
+        self.scores = {}  # user_id -> [points, correct, answered]
+        self.names = {}  # user_id -> display name
+        self.last_result = (0, 0)  # (answered, correct) of the last closed question
+        self.message = None
+        self.timer = None  # Closes the question or opens the next one
+        self.render_timer = None
+        self.last_render = 0.0
+        self.rendering = False
+        self.dirty = False
+        self.finished = False
+    
+    def question(self) -> dict:
+        return self.questions[self.index]
+    
+    def accepting(self, index: int) -> bool:
+        """Whether answers to question `index` count right now"""
+        return not self.finished and self.open and self.index == index and self.shown_index == index
+    
+    def record(self, user_id: int, name: str, option: int) -> bool:
+        """Lock in a user's answer to the open question; False if they already answered it"""
+        if user_id in self.answers:
+            return False
+        self.answers[user_id] = (option, max(0.0, time.monotonic() - self.shown_at))
+        self.names[user_id] = name
+        return True
+    
+    def tally(self):
+        """Close the open question and score its answers"""
+        correct_option = self.question()["correct"]
+        correct = 0
+        for user_id, (option, elapsed) in self.answers.items():
+            score = self.scores.setdefault(user_id, [0, 0, 0])
+            score[2] += 1
+            if option == correct_option:
+                score[0] += POINTS_CORRECT + speed_points(elapsed, self.seconds)
+                score[1] += 1
+                correct += 1
+        self.last_result = (len(self.answers), correct)
+        self.answers = {}
+        self.open = False
+    
+    def standings(self, limit: int = SCOREBOARD_SIZE) -> list:
+        """Top (user_id, points, correct, answered) rows, best first"""
+        top = heapq.nsmallest(limit, self.scores.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        return [(user_id, *score) for user_id, score in top]
+    
+    def results(self) -> list:
+        """Rows for DatabaseManager.save_tournament, one per player"""
+        return [(user_id, self.names.get(user_id, str(user_id)), points, correct, answered, points // POINTS_PER_XP)
+                for user_id, (points, correct, answered) in self.scores.items()]
+
+def speed_points(elapsed: float, seconds: float) -> int:
+    """Bonus points for a correct answer, falling linearly to 0 when the question closes"""
+    return round(MAX_SPEED_POINTS * max(0.0, 1.0 - elapsed / seconds))
+
+def scoreboard_text(tournament: Tournament, limit: int = SCOREBOARD_SIZE) -> str:
+    lines = []
+    for rank, (user_id, points, correct, answered) in enumerate(tournament.standings(limit)):
+        marker = MEDALS[rank] if rank < len(MEDALS) else f"**{rank + 1}.**"
+        lines.append(f"{marker} {tournament.names.get(user_id, user_id)} — **{points}** pts ({correct}/{answered})")
+    return "\n".join(lines)[:1024] or "No points scored yet."
+
+def create_tournament_embed(tournament: Tournament) -> discord.Embed:
+    """The tournament message: open question, revealed answer, or final results"""
+    total = len(tournament.questions)
+    if tournament.finished:
+        embed = discord.Embed(
+            title=f"🏁 {tournament.title} Tournament — Final Results",
+            description=f"**{len(tournament.scores)}** player(s) • **{total}** question(s)",
+            color=0xFFD700
+        )
+        embed.add_field(name="🏆 Final Standings", value=scoreboard_text(tournament), inline=False)
+        embed.set_footer(text=f"Hosted by {tournament.host_name} • every {POINTS_PER_XP} points earned 1 XP")
+        return embed
+    
+    quiz_data = tournament.question()
+    embed = discord.Embed(
+        title=f"🏟️ {tournament.title} Tournament — Question {tournament.index + 1}/{total}",
+        description=quiz_data["question"],
+        color=0x0099FF if tournament.open else 0x9B59B6
+    )
+    embed.add_field(
+        name="Options",
+        value="\n".join(f"**{chr(65 + i)}.** {option}" for i, option in enumerate(quiz_data["options"])),
+        inline=False
+    )
+    if tournament.open:
+        if tournament.shown_index == tournament.index:
+            remaining = tournament.seconds - (time.monotonic() - tournament.shown_at)
+        else:
+            remaining = tournament.seconds
+        embed.add_field(name="⏱️ Closes", value=f"<t:{int(time.time() + max(0.0, remaining))}:R>", inline=True)
+        embed.add_field(name="🔒 Locked In", value=f"{len(tournament.answers)} answer(s)", inline=True)
+    else:
+        answered, correct = tournament.last_result
+        correct_option = quiz_data["correct"]
+        embed.add_field(
+            name="✅ Answer",
+            value=f"**{chr(65 + correct_option)}. {quiz_data['options'][correct_option]}**\n"
+                  f"{correct}/{answered} got it right\n\n{quiz_data['explanation']}"[:1024],
+            inline=False
+        )
+    embed.add_field(name="🏆 Scoreboard", value=scoreboard_text(tournament), inline=False)
+    embed.set_footer(text=f"Hosted by {tournament.host_name} • one answer each, faster correct answers score more")
+    return embed
+
+@persistent
+class TournamentButton(DynamicItem[Button], template=r"tourney:(?P<id>\d+):(?P<index>\d+):(?P<action>\d|end)"):
+    """An answer button everyone in the channel shares, or the host's End button"""
+    
+    def __init__(self, tournament_id: int, index: int, action: str, label: str,
+                 style=discord.ButtonStyle.secondary, disabled: bool = False):
+        self.tournament_id = tournament_id
+        self.index = index
+        self.action = action
+        super().__init__(Button(
+            label=label,
+            style=style,
+            disabled=disabled,
+            custom_id=f"tourney:{tournament_id}:{index}:{action}"
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["id"]), int(match["index"]), match["action"], item.label, item.style)
+    
+    async def callback(self, interaction: discord.Interaction):
+        tournament = tournament_manager.tournaments.get(self.tournament_id)
+        if tournament is None or tournament.finished:
+            await interaction.response.send_message("🏁 This tournament has ended.", ephemeral=True)
+            return
+        if self.action == "end":
+            if interaction.user.id != tournament.host_id:
+                await interaction.response.send_message("❌ Only the host can end the tournament.", ephemeral=True)
+                return
+            await interaction.response.send_message("🏁 Ending the tournament...", ephemeral=True)
+            await tournament_manager.finish(tournament)
+            return
+        
+        if not tournament.accepting(self.index):
+            await interaction.response.send_message("⏰ This question is closed.", ephemeral=True)
+            return
+        if not tournament.record(interaction.user.id, interaction.user.display_name, int(self.action)):
+            await interaction.response.send_message("🔒 You've already locked in an answer!", ephemeral=True)
+            return
+        await interaction.response.send_message(f"🔒 Locked in **{chr(65 + int(self.action))}**. Good luck!",
+                                                ephemeral=True)
+        tournament_manager.request_render(tournament)
+
+def build_tournament_view(tournament: Tournament):
+    """Answer buttons for the current question plus End, or None once finished"""
+    if tournament.finished:
+        return None
+    quiz_data = tournament.question()
+    buttons = []
+    for i in range(len(quiz_data["options"])):
+        style = discord.ButtonStyle.secondary
+        if not tournament.open and i == quiz_data["correct"]:
+            style = discord.ButtonStyle.success
+        buttons.append(TournamentButton(tournament.id, tournament.index, str(i), chr(65 + i), style,
+                                        disabled=not tournament.open))
+    buttons.append(TournamentButton(tournament.id, tournament.index, "end", "🏁 End",
+                                    discord.ButtonStyle.danger))
+    return build_view(*buttons)
+
+class TournamentManager:
+    """Starts tournaments, paces their questions and coalesces their message edits"""
+    
+    def __init__(self):
+        self.tournaments = {}  # tournament id -> Tournament
+        self.by_channel = {}  # channel id -> tournament id, one tournament per channel
+        self._last_id = 0
+    
+    def _next_id(self) -> int:
+        # Start time in milliseconds, so buttons left over from before a restart never match a new tournament
+        self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+        return self._last_id
+    
+    async def start(self, interaction: discord.Interaction, course_id: int, module_id: int,
+                    question_count: int = DEFAULT_QUESTIONS, seconds: int = DEFAULT_SECONDS):
+        """Run a tournament on a module's question bank in the interaction's channel"""
+        if interaction.guild is None or interaction.channel is None:
+            await interaction.response.send_message("❌ Tournaments can only run in a server channel.",
+                                                    ephemeral=True)
+            return
+        if interaction.channel.id in self.by_channel:
+            await interaction.response.send_message("❌ A tournament is already running in this channel.",
+                                                    ephemeral=True)
+            return
+        module = get_module(course_id, module_id)
+        pool = question_bank.pool(course_id, module_id)
+        if module is None or pool is None or not len(pool):
+            embed = discord.Embed(
+                title="❌ No Quizzes Available",
+                description="That module doesn't exist or doesn't have any quizzes yet.",
+                color=0xFF0000
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        question_count = max(1, min(question_count, MAX_QUESTIONS, len(pool)))
+        seconds = max(5, min(seconds, 120))
+        questions = [question.quiz for question in random.sample(pool.questions, question_count)]
+        tournament = Tournament(self._next_id(), interaction.guild.id, interaction.channel.id, interaction.user,
+                                course_id, module_id, module["title"], questions, seconds)
+        self.tournaments[tournament.id] = tournament
+        self.by_channel[tournament.channel_id] = tournament.id
+        
+        await interaction.response.send_message(
+            f"🏟️ Starting a {question_count}-question tournament with {seconds}s per question!", ephemeral=True
+        )
+        try:
+            # A channel message, not a followup: it outlives the 15 minute interaction token
+            tournament.message = await interaction.channel.send(embed=create_tournament_embed(tournament),
+                                                                view=build_tournament_view(tournament))
+        except discord.HTTPException as e:
+            logger.error(f"Could not start tournament in channel {tournament.channel_id}: {e}")
+            self._forget(tournament)
+            return
+        tournament.last_render = time.monotonic()
+        self._question_shown(tournament)
+    
+    def request_render(self, tournament: Tournament):
+        """Mark the message stale; it is edited at most EDITS_PER_SECOND times a second"""
+        tournament.dirty = True
+        if tournament.rendering or (tournament.render_timer is not None and tournament.render_timer.active):
+            # The pending or running render picks the change up
+            return
+        delay = tournament.last_render + 1.0 / EDITS_PER_SECOND - time.monotonic()
+        tournament.render_timer = timer_wheel.schedule(delay, self._render, tournament)
+    
+    async def _render(self, tournament: Tournament):
+        tournament.render_timer = None
+        if not tournament.dirty or tournament.rendering:
+            return
+        tournament.dirty = False
+        tournament.rendering = True
+        tournament.last_render = time.monotonic()
+        index, is_open = tournament.index, tournament.open
+        try:
+            await tournament.message.edit(embed=create_tournament_embed(tournament),
+                                          view=build_tournament_view(tournament))
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update tournament {tournament.id}: {e}")
+        finally:
+            tournament.rendering = False
+        
+        # Open questions start their clock once the buttons are actually on screen
+        if (is_open and tournament.open and not tournament.finished and tournament.index == index
+                and tournament.shown_index != index):
+            self._question_shown(tournament)
+        if tournament.dirty:
+            self.request_render(tournament)
+    
+    def _question_shown(self, tournament: Tournament):
+        tournament.shown_index = tournament.index
+        tournament.shown_at = time.monotonic()
+        tournament.timer = timer_wheel.schedule(tournament.seconds, self._close_question, tournament,
+                                                tournament.index)
+    
+    def _close_question(self, tournament: Tournament, index: int):
+        if tournament.finished or tournament.index != index or not tournament.open:
+            return
+        tournament.tally()
+        self.request_render(tournament)
+        tournament.timer = timer_wheel.schedule(REVEAL_SECONDS, self._next_question, tournament, index)
+    
+    async def _next_question(self, tournament: Tournament, index: int):
+        if tournament.finished or tournament.index != index:
+            return
+        if index + 1 >= len(tournament.questions):
+            await self.finish(tournament)
+            return
+        tournament.index = index + 1
+        tournament.open = True
+        self.request_render(tournament)
+    
+    async def finish(self, tournament: Tournament):
+        """End a tournament, save every player's result in one write and show the final standings"""
+        if tournament.finished:
+            return
+        if tournament.open and tournament.shown_index == tournament.index:
+            # Answers already locked in on the open question still count
+            tournament.tally()
+        tournament.finished = True
+        if tournament.timer is not None:
+            timer_wheel.cancel(tournament.timer)
+        self._forget(tournament)
+        
+        results = tournament.results()
+        if results and not await asyncio.to_thread(
+            db.save_tournament, tournament.id, tournament.guild_id, tournament.channel_id, tournament.host_id,
+            tournament.course_id, tournament.module_id, len(tournament.questions), results
+        ):
+            logger.error(f"Could not save the results of tournament {tournament.id}")
+        logger.info(f"Tournament {tournament.id} finished with {len(results)} player(s)")
+        self.request_render(tournament)
+    
+    def _forget(self, tournament: Tournament):
+        self.tournaments.pop(tournament.id, None)
+        if self.by_channel.get(tournament.channel_id) == tournament.id:
+            del self.by_channel[tournament.channel_id]
+
+tournament_manager = TournamentManager()
@@ -3,11 +3,13 @@ Training Session Manager
 Handles stop/resume functionality for learning sessions
 """
 
+import asyncio
 import discord
-from discord.ui import Button, View
+from discord.ui import Button
 import json
 from datetime import datetime
 from database import db
+from timer_wheel import WheelView
 
 class TrainingSessionManager:
     """Manages training sessions with stop/resume functionality"""
@@ -59,9 +61,10 @@ class TrainingSessionManager:
         
         return formatted_sessions
     
-    def create_session_embed(self, user_id: int):
-        """Create embed showing saved sessions"""
-        sessions = self.get_user_sessions(user_id)
+    def create_session_embed(self, user_id: int, sessions: list = None):
+        """Create embed showing saved sessions (read from the database unless given)"""
+        if sessions is None:
+            sessions = self.get_user_sessions(user_id)
         
         embed = discord.Embed(
             title="📚 Your Saved Training Sessions",
@@ -117,7 +120,7 @@ class TrainingSessionManager:
         view = TrainingSessionView(user_id, sessions[:5])
         return embed, view
 
-class TrainingSessionView(View):
+class TrainingSessionView(WheelView):
     """View for managing training sessions"""
     
     def __init__(self, user_id: int, sessions: list):
@@ -221,7 +224,7 @@ class TrainingSessionView(View):
         
         # Delete all sessions for this user
         for session in self.sessions:
-            db.delete_training_session(self.user_id, session['type'])
+            await db.run(db.delete_training_session, self.user_id, session['type'])
         
         embed = discord.Embed(
             title="🗑️ Sessions Cleared",
@@ -231,7 +234,7 @@ class TrainingSessionView(View):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class StopResumeView(View):
+class StopResumeView(WheelView):
     """View with Stop and Continue buttons for active training"""
     
     def __init__(self, user_id: int, session_type: str, current_position: dict, session_data: dict):
@@ -249,7 +252,8 @@ class StopResumeView(View):
             return
         
         # Save session to database
-        success = training_session_manager.save_session(
+        success = await asyncio.to_thread(
+            training_session_manager.save_session,
             self.user_id, 
             self.session_type, 
             self.current_position, 
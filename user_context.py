@@ -0,0 +1,82 @@
+"""
+Per-Interaction User Context
+Loads a user's profile, achievements and progress rollups once and shares them
+across every helper that runs while handling the same interaction
+"""
+
+from courses import get_completion_masks
+from database import db
+
+class UserContext:
+    """Memoized snapshot of one user's data for a single interaction"""
+    
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self._snapshot = None
+        self._loaded = False
+    
+    def _get(self, key: str, default=None):
+        """Load the snapshot on first access and return one of its entries"""
+        if not self._loaded:
+            self._snapshot = db.get_user_snapshot(self.user_id)
+            self._loaded = True
+        if self._snapshot is None:
+            return default
+        return self._snapshot[key]
+    
+    async def load(self) -> "UserContext":
+        """Read the snapshot without blocking the event loop; the properties then serve it from memory"""
+        if not self._loaded:
+            self._snapshot = await db.run(db.get_user_snapshot, self.user_id)
+            self._loaded = True
+        return self
+    
+    def invalidate(self):
+        """Drop the snapshot after a write so the next read reloads it"""
+        self._snapshot = None
+        self._loaded = False
+    
+    @property
+    def stats(self):
+        """Same tuple as db.get_user_stats, or None for unknown users"""
+        return self._get("stats")
+    
+    @property
+    def achievements(self) -> list:
+        return self._get("achievements", [])
+    
+    @property
+    def achievement_names(self) -> set:
+        return {achievement[0] for achievement in self.achievements}
+    
+    @property
+    def completed_lessons(self) -> int:
+        return self._get("completed_lessons", 0)
+    
+    @property
+    def perfect_quizzes(self) -> int:
+        return self._get("perfect_quizzes", 0)
+    
+    @property
+    def quiz_attempts(self) -> int:
+        return self._get("quiz_attempts", 0)
+    
+    @property
+    def ctf_solves(self) -> int:
+        return self._get("ctf_solves", 0)
+    
+    @property
+    def completion_bits(self) -> int:
+        """Completed lessons as a bitset over lesson slots"""
+        return self._get("completion_bits", 0)
+    
+    def completed_in_course(self, course_id: int) -> int:
+        """Completed lesson count for one course's current lessons"""
+        return (self.completion_bits & get_completion_masks()[1].get(course_id, 0)).bit_count()
+    
+    def percent_complete(self, course_id: int = None) -> float:
+        """Share of the current lessons (of one course, or all) the user has completed"""
+        everything, by_course = get_completion_masks()
+        mask = everything if course_id is None else by_course.get(course_id, 0)
+        total = mask.bit_count()
+        return 100 * (self.completion_bits & mask).bit_count() / total if total else 0.0